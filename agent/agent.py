@@ -2,6 +2,7 @@
 Monitoring Agent - Modular architecture with collect, grpc, and plugins
 """
 
+import os
 import time
 import grpc
 import threading
@@ -12,6 +13,13 @@ from google.protobuf.json_format import MessageToDict
 from agent.collect import MetricCollector
 from agent.plugin_manager import PluginManager
 from agent.etcd_config import EtcdConfigManager
+from agent.pipeline import AgentPipeline
+from agent.stats import build_agent_registry
+from config import Config
+from telemetry.exporter import StatsServer
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class MonitoringAgent:
@@ -24,6 +32,9 @@ class MonitoringAgent:
         etcd_host: str = None,
         etcd_port: int = None,
         config_key: Optional[str] = None,
+        stats_port: Optional[int] = None,
+        config_group: Optional[str] = None,
+        config_cache_dir: Optional[str] = None,
     ):
         """
         Initialize monitoring agent
@@ -34,17 +45,24 @@ class MonitoringAgent:
             etcd_host: etcd server hostname (defaults to ETCD_HOST env var or localhost)
             etcd_port: etcd server port (defaults to ETCD_PORT env var or 2379)
             config_key: Optional custom config key (defaults to /monitor/config/<hostname>)
+            stats_port: Optional local port for the Prometheus-text stats endpoint
+            config_group: Optional group layer to read (defaults to the hostname without its numeric suffix)
+            config_cache_dir: Directory of the local config cache (defaults to AGENT_CONFIG_CACHE_DIR, "" disables)
         """
         self.server_address = server_address
         self.hostname = hostname
 
+        cache_dir = Config.AGENT_CONFIG_CACHE_DIR if config_cache_dir is None else config_cache_dir
         self.etcd_config = EtcdConfigManager(
             hostname=hostname,
             etcd_host=etcd_host,
             etcd_port=etcd_port,
             config_key=config_key,
+            group=config_group,
+            cache_path=os.path.join(cache_dir, f"{hostname}.json") if cache_dir else None,
+            reconcile_jitter=Config.AGENT_CONFIG_RECONCILE_JITTER,
         )
-        initial_config = self.etcd_config.load_initial_config()
+        initial_config = self.etcd_config.load_config()
         self._interval_lock = threading.Lock()
         self._interval = initial_config.get("interval", 5)
         self.active_metrics = initial_config.get("metrics", [])
@@ -53,6 +71,17 @@ class MonitoringAgent:
         self.stub = None
         self.connected = False
         self.plugin_manager = PluginManager(initial_config)
+        self.pipeline = AgentPipeline.from_config(
+            initial_config,
+            self.collector,
+            self.plugin_manager,
+            self.etcd_config,
+            lambda: self.interval,
+        )
+        self.stats_server = (
+            StatsServer(build_agent_registry(self), stats_port) if stats_port else None
+        )
+        self._loaded_plugin_config = None
         self.running = False
 
     @property
@@ -73,26 +102,37 @@ class MonitoringAgent:
         Args:
             new_config: New configuration dictionary
         """
-        print(f"Applying config update for agent {self.hostname}...")
+        logger.info(f"Applying config update for agent {self.hostname}...")
 
         new_interval = new_config.get("interval", 5)
         self._update_interval(new_interval)
-        print(f"  Updated interval: {new_interval}s")
+        logger.info(f"  Updated interval: {new_interval}s")
 
         new_metrics = new_config.get("metrics", [])
         if new_metrics != self.active_metrics:
             self.active_metrics = new_metrics
             self.collector.update_metrics(new_metrics)
-            print(f"  Updated metrics: {new_metrics}")
+            logger.info(f"  Updated metrics: {new_metrics}")
 
-        self.plugin_manager.load_plugins(new_config)
-        print("Config update applied")
+        # Interval and metric changes are applied above; only rebuild plugins
+        # when something the plugins read has changed
+        plugin_config = self._plugin_config(new_config)
+        if plugin_config != self._loaded_plugin_config:
+            self.plugin_manager.load_plugins(new_config)
+            self._loaded_plugin_config = plugin_config
+        logger.info("Config update applied")
+
+    @staticmethod
+    def _plugin_config(config: Dict[str, Any]) -> Dict[str, Any]:
+        """Config without the keys the agent applies itself (interval, metrics)"""
+        return {k: v for k, v in config.items() if k not in ("interval", "metrics")}
 
     def initialize(self):
         """Initialize agent and all modules"""
-        print(f"Initializing agent {self.hostname}...")
+        logger.info(f"Initializing agent {self.hostname}...")
         initial_config = self.etcd_config.get_config()
         self.plugin_manager.load_plugins(initial_config)
+        self._loaded_plugin_config = self._plugin_config(initial_config)
         self.etcd_config.start_watching()
 
         # Set up config update callback
@@ -119,23 +159,22 @@ class MonitoringAgent:
 
         self.running = True
         self._config_monitor_thread.start()
-        print(f"Agent {self.hostname} initialized")
+        self.pipeline.start()
+        if self.stats_server:
+            self.stats_server.start()
+        logger.info(f"Agent {self.hostname} initialized")
 
     def metrics_generator(self) -> Iterator[monitoring_pb2.MetricsRequest]:
         """
         Generator that yields metrics requests
 
+        Collection and plugin processing run on the pipeline's own threads;
+        this generator is the sender stage feeding the gRPC stream.
+
         Yields:
             MetricsRequest messages
         """
-        while self.running:
-            metrics, metadata = self.collector.collect_metrics()
-            self.etcd_config.save_heartbeat()
-            metrics_request = self.collector.create_metrics_request(metrics, metadata)
-            processed_request = self.plugin_manager.process_metrics(metrics_request)
-            if processed_request is not None:
-                yield processed_request
-            time.sleep(self.interval)
+        yield from self.pipeline.requests()
 
     def run(self):
         """Run the agent - main execution loop"""
@@ -143,18 +182,21 @@ class MonitoringAgent:
             response_stream = self.stub.StreamMetrics(self.metrics_generator())
             for cmd in response_stream:
                 if cmd.type == monitoring_pb2.CommandType.CONFIG:
-                    self.etcd_config.store_config(MessageToDict(cmd.params))
+                    self.etcd_config.apply_runtime_config(MessageToDict(cmd.params))
                 elif cmd.type == monitoring_pb2.CommandType.DIAGNOSTIC:
                     self.collector.run_diag(key=MessageToDict(cmd.params)["key"])
 
         except KeyboardInterrupt:
-            print("\nShutting down agent...")
+            logger.info("Shutting down agent...")
         finally:
             self.finalize()
 
     def finalize(self):
         """Finalize agent and cleanup resources"""
         self.running = False
+        self.pipeline.stop()
+        if self.stats_server:
+            self.stats_server.stop()
         self.etcd_config.stop_watching()
         self.plugin_manager.finalize_all()
 
@@ -164,4 +206,9 @@ class MonitoringAgent:
 
         self.etcd_config.close()
 
-        print(f"Agent {self.hostname} finalized")
+        for stage in self.pipeline.snapshot()["stages"]:
+            logger.info(
+                f"  Stage {stage['stage']}: count={stage['count']} errors={stage['errors']} "
+                f"avg={stage['avg_ms']:.2f}ms max={stage['max_ms']:.2f}ms"
+            )
+        logger.info(f"Agent {self.hostname} finalized")
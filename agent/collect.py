@@ -8,6 +8,7 @@ from typing import Dict, Any, List
 from datetime import datetime
 from protobuf import monitoring_pb2
 from google.protobuf.struct_pb2 import Struct
+from telemetry.log import get_logger
 
 try:
     import psutil
@@ -16,6 +17,8 @@ except ImportError:
         "psutil is required for metric collection. Install it with: pip install psutil"
     )
 
+logger = get_logger(__name__)
+
 
 class MetricCollector:
     """Collects system metrics from localhost"""
@@ -114,7 +117,7 @@ class MetricCollector:
                     self._last_disk_io = current_disk_io
             except Exception as e:
                 # Handle cases where disk_io_counters might not be available
-                print(f"Error collecting disk metrics: {e}")
+                logger.error(f"Error collecting disk metrics: {e}")
 
         # Collect network I/O metrics (rate per second)
         net_in_mb = 0.0
@@ -138,11 +141,11 @@ class MetricCollector:
                     self._last_net_io = current_net_io
             except Exception as e:
                 # Handle cases where net_io_counters might not be available
-                print(f"Error collecting network metrics: {e}")
+                logger.error(f"Error collecting network metrics: {e}")
 
         self._last_measurement_time = current_time
         meta = {}
-        print(self.flag)
+        logger.debug("Diagnostic flag: %s", self.flag)
         if self.flag:
             procs = []
 
@@ -193,9 +196,11 @@ class MetricCollector:
         """
         meta = Struct()
         meta.update(metadata)
+        now = datetime.now().timestamp()
         return monitoring_pb2.MetricsRequest(
             hostname=self.hostname,
-            timestamp=int(datetime.now().timestamp()),
+            timestamp=int(now),
+            timestamp_ms=int(now * 1000),
             metrics=monitoring_pb2.SystemMetrics(
                 cpu_percent=metrics["cpu_percent"],
                 memory_percent=metrics["memory_percent"],
@@ -1,13 +1,119 @@
 """
 etcd Configuration Manager - handles reading and watching configuration from etcd
+
+Configuration is layered under one prefix (default /monitor/config/):
+
+- <prefix>@global         fleet-wide settings
+- <prefix>@group/<group>  settings of one host group (see elk.rollup_schema.group_of)
+- <prefix><hostname>      overrides of one host
+
+An agent's configuration is the built-in defaults deep-merged with the global,
+group and host layers, in that order. The agent reads its three keys in one
+transaction and follows all of them with a single prefix watch, re-merging
+only when one of its own layers changes. A fleet-wide change is one write.
+
+Server CONFIG commands go to a runtime layer on top of the host layer that is
+kept in memory only: it is never written to etcd or the cache, and an etcd
+change of a setting drops the runtime override of that setting, so operator
+edits of any layer take effect again (the server re-sends if its policy still
+disagrees).
+
+With a cache file, the layers and the etcd revision they were read at are
+kept on disk: the agent starts from them without contacting etcd, then a
+background thread reconciles after a random delay, applying only layers whose
+mod revision is newer than the cached one, and watches from there on.
 """
 
+import copy
 import json
+import os
+import random
 import threading
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import etcd3
 from agent.utils import deep_merge
+from elk.rollup_schema import group_of
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+CONFIG_PREFIX = "/monitor/config/"
+HEARTBEAT_PREFIX = "/monitor/heartbeat/"
+
+# Layers from lowest to highest precedence
+LAYERS = ("global", "group", "host")
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "interval": 5,
+    "metrics": [
+        "cpu",
+        "memory",
+        "disk read",
+        "disk write",
+        "net in",
+        "net out",
+    ],
+    "plugins": [
+        "agent.plugins.deduplication.Deduplication",
+        "agent.plugins.threshold_alert.ThresholdAlertPlugin",
+    ],
+    "thresholds": {
+        "cpu_percent": 80.0,
+        "memory_percent": 85.0,
+        "disk_read_mb": 100.0,
+        "disk_write_mb": 100.0,
+        "net_in_mb": 50.0,
+        "net_out_mb": 50.0,
+    },
+    "min_cpu": 5.0,
+    "min_memory": 5.0,
+    "window_size": 5,
+    "pipeline": {
+        "queue_size": 100,
+        "overflow": "drop_oldest",
+    },
+}
+
+
+def layer_key(layer: str, name: Optional[str] = None, prefix: str = CONFIG_PREFIX) -> str:
+    """
+    etcd key of a configuration layer
+
+    Args:
+        layer: "global", "group" or "host"
+        name: Group name or hostname (ignored for "global")
+        prefix: Configuration prefix
+
+    Returns:
+        Key (e.g., /monitor/config/@group/web)
+    """
+    if layer == "global":
+        return f"{prefix}@global"
+    if not name:
+        raise ValueError(f"The {layer} layer needs a name")
+    if layer == "group":
+        return f"{prefix}@group/{name}"
+    if layer == "host":
+        return f"{prefix}{name}"
+    raise ValueError(f"Unknown layer '{layer}', expected one of {', '.join(LAYERS)}")
+
+
+def merge_layers(layers: Dict[str, Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Effective configuration: defaults deep-merged with the layers in precedence order
+
+    Args:
+        layers: {layer: config} (missing layers are skipped)
+        defaults: Base configuration (default: DEFAULT_CONFIG)
+
+    Returns:
+        Merged configuration
+    """
+    config = copy.deepcopy(DEFAULT_CONFIG if defaults is None else defaults)
+    for layer in LAYERS:
+        config = deep_merge(config, layers.get(layer) or {})
+    return config
 
 
 class EtcdConfigManager:
@@ -19,6 +125,11 @@ class EtcdConfigManager:
         etcd_host: str,
         etcd_port: int,
         config_key: Optional[str] = None,
+        client=None,
+        group: Optional[str] = None,
+        prefix: str = CONFIG_PREFIX,
+        cache_path: Optional[str] = None,
+        reconcile_jitter: float = 5.0,
     ):
         """
         Initialize etcd configuration manager
@@ -27,22 +138,46 @@ class EtcdConfigManager:
             hostname: Agent identifier for config key
             etcd_host: etcd server hostname (defaults to ETCD_HOST env var or localhost)
             etcd_port: etcd server port (defaults to ETCD_PORT env var or 2379)
-            config_key: Full config key path (if None, uses /monitor/config/<hostname>)
+            config_key: Full key of the host layer (if None, uses <prefix><hostname>)
+            client: Pre-built etcd3 client (or compatible stand-in); created from host/port if None
+            group: Group layer to read (default: the hostname without its numeric suffix)
+            prefix: Configuration prefix holding the global, group and host layers
+            cache_path: Local file the layers are cached in for starting without etcd (None: no cache)
+            reconcile_jitter: Upper bound of the random delay (seconds) before reconciling a cached start
         """
         self.etcd_host = etcd_host
         self.etcd_port = etcd_port
         self.hostname = hostname
+        self.group = group or group_of(hostname)
+        self.prefix = prefix
 
         # Default config key format: /monitor/config/<hostname>
-        self.config_key = config_key or f"/monitor/config/{hostname}"
+        self.config_key = config_key or layer_key("host", hostname, prefix)
+        self.layer_keys = {
+            layer_key("global", prefix=prefix): "global",
+            layer_key("group", self.group, prefix): "group",
+            self.config_key: "host",
+        }
 
         # Thread-safe configuration storage
         self._config: Dict[str, Any] = {}
+        self._layers: Dict[str, Dict[str, Any]] = {layer: {} for layer in LAYERS}
+        self._layer_revisions: Dict[str, int] = {layer: 0 for layer in LAYERS}
+        self._runtime: Dict[str, Any] = {}  # server-issued overrides, not persisted
+        self._revision = 0  # etcd revision the layers were read at
         self._config_lock = threading.RLock()  # Reader-writer lock for config access
-        self._watch_id = None
+        self._watch_ids: List[int] = []
+        self.cache_path = cache_path
+        self.reconcile_jitter = reconcile_jitter
+        self._reconcile_pending = False  # started from the cache, etcd not read yet
+        self._store_defaults = True
+        self._stop_event = threading.Event()
+        self._reconcile_thread: Optional[threading.Thread] = None
 
         # Initialize etcd client
-        self.etcd = etcd3.client(host=etcd_host, port=etcd_port)
+        if client is None:
+            client = etcd3.client(host=etcd_host, port=etcd_port)
+        self.etcd = client
 
     def get_config(self) -> Dict[str, Any]:
         """
@@ -54,72 +189,256 @@ class EtcdConfigManager:
         with self._config_lock:
             return self._config.copy()
 
-    def _update_config(self, new_config: Dict[str, Any]):
+    def get_layers(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the configuration layers read from etcd (thread-safe)
+
+        Returns:
+            {"global", "group", "host"} -> layer configuration ({} when the key does not exist)
+        """
+        with self._config_lock:
+            return copy.deepcopy(self._layers)
+
+    def _set_layer(self, layer: str, config: Dict[str, Any], revision: int = 0):
         """
-        Update configuration (thread-safe, internal use)
+        Replace one layer and re-merge (thread-safe, internal use)
+
+        Runtime overrides of settings the change modifies are dropped.
 
         Args:
-            new_config: New configuration dictionary
+            layer: "global", "group" or "host"
+            config: Layer configuration ({} when the key was deleted)
+            revision: etcd mod revision of the change; older changes than the layer's are ignored
         """
         with self._config_lock:
-            self._config = deep_merge(self._config, new_config)
+            if revision and revision < self._layer_revisions[layer]:
+                return
+            previous = merge_layers(self._layers) if self._runtime else None
+            self._layers[layer] = config
+            self._layer_revisions[layer] = revision
+            persisted = merge_layers(self._layers)
+            if previous is not None:
+                for key in [key for key in self._runtime if persisted.get(key) != previous.get(key)]:
+                    logger.info(f"Setting '{key}' changed in etcd, dropping its runtime override")
+                    del self._runtime[key]
+            self._config = deep_merge(persisted, self._runtime)
 
-    def store_config(self, config: Dict[str, Any]) -> bool:
+    def apply_runtime_config(self, config: Dict[str, Any]) -> bool:
         """
-        Store configuration to etcd
+        Apply server-issued overrides (CONFIG commands) on top of the layers, in memory only
 
         Args:
-            config: Configuration dictionary to store
+            config: Configuration dictionary to merge into the runtime layer
 
         Returns:
-            True if successful, False otherwise
+            True if the configuration changed
         """
-        try:
-            config = deep_merge(self._config, config)
-            self.etcd.put(self.config_key, json.dumps(config, indent=2))
-            self._update_config(config)
-            print(f"Stored config to etcd: {self.config_key}")
-            return True
-        except Exception as e:
-            print(f"Error storing config to etcd: {e}")
-            return False
+        with self._config_lock:
+            runtime = deep_merge(self._runtime, config)
+            if runtime == self._runtime:
+                logger.debug("Runtime config unchanged: %s", config)
+                return False
+            self._runtime = runtime
+            self._config = deep_merge(merge_layers(self._layers), runtime)
+        logger.info(f"Applied runtime config: {config}")
+        return True
+
+    def get_runtime_config(self) -> Dict[str, Any]:
+        """
+        Get the server-issued overrides in effect (thread-safe)
+
+        Returns:
+            Runtime layer configuration
+        """
+        with self._config_lock:
+            return copy.deepcopy(self._runtime)
+
+    def _read_layers(self) -> Dict[str, Any]:
+        """
+        Read the global, group and host layers in one transaction (one consistent revision)
+
+        Returns:
+            {layer: (value bytes or None, metadata or None)}
+        """
+        txn = self.etcd.transactions
+        _, responses = self.etcd.transaction(compare=[], success=[txn.get(key) for key in self.layer_keys])
+        layers = {}
+        for layer, kvs in zip(self.layer_keys.values(), responses):
+            layers[layer] = kvs[0] if kvs else (None, None)
+        return layers
+
+    def store_default_config(self) -> bool:
+        """
+        Create the global layer with the built-in defaults, unless some agent already did
+
+        Returns:
+            True if this call created it
+        """
+        key = layer_key("global", prefix=self.prefix)
+        txn = self.etcd.transactions
+        created, _ = self.etcd.transaction(
+            compare=[txn.version(key) == 0],
+            success=[txn.put(key, json.dumps(DEFAULT_CONFIG, indent=2))],
+            failure=[],
+        )
+        if created:
+            logger.info(f"Stored default config to etcd: {key}")
+        return created
 
     def load_initial_config(self, store_defaults: bool = True) -> Dict[str, Any]:
         """
         Load initial configuration from etcd
 
         Args:
-            store_defaults: If True, store default config to etcd when not found
+            store_defaults: If True, create the global layer with the defaults when it does not exist
 
         Returns:
             Configuration dictionary
         """
         try:
-            value, _ = self.etcd.get(self.config_key)
-            if value:
-                config = json.loads(value.decode("utf-8"))
-                self._update_config(config)
-                print(f"Loaded initial config from etcd: {self.config_key}")
-                return config
-            else:
-                print(f"No config found at {self.config_key}, using defaults")
-                default_config = self._get_default_config()
-                self._update_config(default_config)
-                # Store default config to etcd if requested
-                if store_defaults:
-                    self.store_config(default_config)
-                return default_config
+            found = self._read_layers()
+            for layer, (value, metadata) in found.items():
+                if metadata is not None:
+                    self._revision = max(self._revision, metadata.response_header.revision)
+                    self._set_layer(layer, json.loads(value.decode("utf-8")), metadata.mod_revision)
+                else:
+                    self._set_layer(layer, {})
+            present = [layer for layer, (_, metadata) in found.items() if metadata is not None]
+            logger.info(
+                f"Loaded config layers from etcd ({', '.join(present) or 'none, using defaults'}) "
+                f"for {self.hostname} (group {self.group})"
+            )
+            if store_defaults and found["global"][1] is None:
+                self.store_default_config()
+            self.save_cache()
+        except Exception as e:
+            logger.error(f"Error loading config from etcd: {e}, using defaults")
+            for layer in LAYERS:
+                self._set_layer(layer, {})
+        return self.get_config()
+
+    def load_cached_config(self) -> bool:
+        """
+        Load the layers from the cache file
+
+        The cache is ignored when it was written for other keys (another
+        hostname, group or prefix) or cannot be read.
+
+        Returns:
+            True if the layers were loaded from the cache
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("keys") != self.layer_keys:
+                logger.info(f"Config cache {self.cache_path} is for other keys, ignoring it")
+                return False
+            with self._config_lock:
+                for layer in LAYERS:
+                    self._layers[layer] = cached["layers"].get(layer) or {}
+                    self._layer_revisions[layer] = int(cached["layer_revisions"].get(layer, 0))
+                self._revision = int(cached["revision"])
+                self._config = deep_merge(merge_layers(self._layers), self._runtime)
         except Exception as e:
-            print(f"Error loading config from etcd: {e}")
-            default_config = self._get_default_config()
-            self._update_config(default_config)
-            # Store default config to etcd if requested (even on error)
-            if store_defaults:
-                try:
-                    self.store_config(default_config)
-                except Exception as store_error:
-                    print(f"Error storing default config to etcd: {store_error}")
-            return default_config
+            logger.warning(f"Error reading config cache {self.cache_path}: {e}")
+            return False
+        logger.info(f"Loaded config from cache {self.cache_path} (etcd revision {self._revision})")
+        return True
+
+    def save_cache(self) -> bool:
+        """
+        Write the layers and their revisions to the cache file (atomically, via a temporary file)
+
+        Returns:
+            True if written, False when there is no cache file or writing failed
+        """
+        if not self.cache_path:
+            return False
+        with self._config_lock:
+            cached = {
+                "keys": self.layer_keys,
+                "revision": self._revision,
+                "layers": copy.deepcopy(self._layers),
+                "layer_revisions": dict(self._layer_revisions),
+                "saved_at": time.time(),
+            }
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cached, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+            return True
+        except Exception as e:
+            logger.warning(f"Error writing config cache {self.cache_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+
+    def load_config(self, store_defaults: bool = True) -> Dict[str, Any]:
+        """
+        Load configuration from the cache file if there is one, otherwise from etcd
+
+        After a cached start, start_watching reconciles with etcd in the background.
+
+        Args:
+            store_defaults: If True, create the global layer with the defaults when it does not exist
+
+        Returns:
+            Configuration dictionary
+        """
+        self._store_defaults = store_defaults
+        if self.load_cached_config():
+            self._reconcile_pending = True
+            return self.get_config()
+        return self.load_initial_config(store_defaults)
+
+    def reconcile(self) -> int:
+        """
+        Re-read the layers from etcd and apply those that changed after the cached revision
+
+        Returns:
+            Number of layers changed
+        """
+        found = self._read_layers()
+        changed = 0
+        for layer, (value, metadata) in found.items():
+            with self._config_lock:
+                cached_revision = self._layer_revisions[layer]
+            if metadata is not None:
+                self._revision = max(self._revision, metadata.response_header.revision)
+                if metadata.mod_revision > cached_revision:
+                    self._set_layer(layer, json.loads(value.decode("utf-8")), metadata.mod_revision)
+                    changed += 1
+            elif cached_revision:
+                # Deleted since the cache was written
+                self._set_layer(layer, {})
+                changed += 1
+        if self._store_defaults and found["global"][1] is None:
+            self.store_default_config()
+        self._reconcile_pending = False
+        self.save_cache()
+        logger.info(f"Reconciled config with etcd at revision {self._revision}: {changed} layer(s) changed")
+        return changed
+
+    def _reconcile_loop(self):
+        """Reconcile after a random delay (spreading a mass restart), retrying with backoff, then watch"""
+        delay = random.uniform(0, self.reconcile_jitter)
+        backoff = 1.0
+        while not self._stop_event.wait(delay):
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.warning(f"Error reconciling config with etcd: {e}, running on the cached config")
+                delay = random.uniform(backoff / 2, backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            self._add_watches()
+            return
 
     def _get_default_config(self) -> Dict[str, Any]:
         """
@@ -128,73 +447,79 @@ class EtcdConfigManager:
         Returns:
             Default configuration dictionary
         """
-        return {
-            "interval": 5,
-            "metrics": [
-                "cpu",
-                "memory",
-                "disk read",
-                "disk write",
-                "net in",
-                "net out",
-            ],
-            "plugins": [
-                "agent.plugins.deduplication.Deduplication",
-                "agent.plugins.threshold_alert.ThresholdAlertPlugin",
-            ],
-            "thresholds": {
-                "cpu_percent": 80.0,
-                "memory_percent": 85.0,
-                "disk_read_mb": 100.0,
-                "disk_write_mb": 100.0,
-                "net_in_mb": 50.0,
-                "net_out_mb": 50.0,
-            },
-            "min_cpu": 5.0,
-            "min_memory": 5.0,
-            "window_size": 5,
-        }
+        return copy.deepcopy(DEFAULT_CONFIG)
 
     def _watch_config_callback(self, watch_response):
         """
         Callback for etcd watch events
 
+        Events of other hosts' and groups' keys under the prefix are skipped.
+
         Args:
             watch_response: etcd watch response
         """
         for event in watch_response.events:
+            key = event.key.decode("utf-8") if isinstance(event.key, bytes) else event.key
+            layer = self.layer_keys.get(key)
+            if layer is None:
+                continue
             if isinstance(event, etcd3.events.PutEvent):
                 try:
                     new_config = json.loads(event.value.decode("utf-8"))
-                    self._update_config(new_config)
-                    print(f"Config updated from etcd: {self.config_key}")
-                    print(f"  New config: {new_config}")
+                    self._set_layer(layer, new_config, event.mod_revision)
+                    self.save_cache()
+                    logger.info(f"Config updated from etcd: {key} ({layer} layer)")
+                    logger.debug(f"  New {layer} layer: {new_config}")
                 except Exception as e:
-                    print(f"Error parsing config update: {e}")
+                    logger.error(f"Error parsing config update: {e}")
             elif isinstance(event, etcd3.events.DeleteEvent):
-                print(f"Config deleted from etcd: {self.config_key}, using defaults")
-                self._update_config(self._get_default_config())
+                logger.info(f"Config deleted from etcd: {key}, dropping the {layer} layer")
+                self._set_layer(layer, {}, event.mod_revision)
+                self.save_cache()
 
     def start_watching(self):
-        """Start watching for configuration changes in etcd"""
+        """
+        Start watching for configuration changes in etcd (one prefix watch for all layers)
+
+        After a cached start, the watch is started by a background thread once it has reconciled with etcd.
+        """
+        self._stop_event.clear()
+        if self._reconcile_pending:
+            self._reconcile_thread = threading.Thread(target=self._reconcile_loop, name="config-reconcile", daemon=True)
+            self._reconcile_thread.start()
+            return
+        self._add_watches()
+
+    def _add_watches(self):
+        """Add the prefix watch from the revision after the one the layers were read at"""
+        if self._stop_event.is_set():
+            return
+        kwargs = {"start_revision": self._revision + 1} if self._revision else {}
         try:
-            self._watch_id = self.etcd.add_watch_callback(
-                self.config_key, self._watch_config_callback
+            self._watch_ids.append(
+                self.etcd.add_watch_prefix_callback(self.prefix, self._watch_config_callback, **kwargs)
             )
-            print(f"Started watching config key: {self.config_key}")
+            if not self.config_key.startswith(self.prefix):
+                self._watch_ids.append(
+                    self.etcd.add_watch_callback(self.config_key, self._watch_config_callback, **kwargs)
+                )
+            logger.info(f"Started watching config prefix: {self.prefix}")
         except Exception as e:
-            print(f"Error starting config watch: {e}")
+            logger.error(f"Error starting config watch: {e}")
 
     def stop_watching(self):
-        """Stop watching for configuration changes"""
-        if self._watch_id is not None:
+        """Stop watching for configuration changes (and a pending reconciliation)"""
+        self._stop_event.set()
+        if self._reconcile_thread is not None:
+            self._reconcile_thread.join(timeout=5)
+            self._reconcile_thread = None
+        while self._watch_ids:
+            watch_id = self._watch_ids.pop()
             try:
-                self.etcd.cancel_watch(self._watch_id)
-                print("Stopped watching config")
+                self.etcd.cancel_watch(watch_id)
+                logger.info("Stopped watching config")
             except Exception as e:
-                print(f"Error stopping config watch: {e}")
-            finally:
-                self._watch_id = None
+                logger.error(f"Error stopping config watch: {e}")
 
     def save_heartbeat(self) -> bool:
         """
@@ -204,15 +529,13 @@ class EtcdConfigManager:
             True if successful, False otherwise
         """
         try:
-            heartbeat_key = f"/monitor/heartbeat/{self.hostname}"
+            heartbeat_key = f"{HEARTBEAT_PREFIX}{self.hostname}"
             timestamp = str(int(time.time()))
             self.etcd.put(heartbeat_key, timestamp)
-            print(
-                f"Saved heartbeat to etcd: key: {heartbeat_key} value: {self.etcd.get(heartbeat_key)}"
-            )
+            logger.debug("Saved heartbeat to etcd: key: %s value: %s", heartbeat_key, timestamp)
             return True
         except Exception as e:
-            print(f"Error saving heartbeat to etcd: {e}")
+            logger.error(f"Error saving heartbeat to etcd: {e}")
             return False
 
     def close(self):
@@ -220,11 +543,9 @@ class EtcdConfigManager:
         self.stop_watching()
         # etcd3 client doesn't have an explicit close method, but we can clear references
         try:
-            heartbeat_key = f"/monitor/heartbeat/{self.hostname}"
-            self.etcd.put(f"/monitor/heartbeat/{self.hostname}", str(-1))
-            print(
-                f"Saved heartbeat to etcd: key: {heartbeat_key} value: {self.etcd.get(heartbeat_key)}"
-            )
+            heartbeat_key = f"{HEARTBEAT_PREFIX}{self.hostname}"
+            self.etcd.put(heartbeat_key, str(-1))
+            logger.info(f"Saved heartbeat to etcd: key: {heartbeat_key} value: -1")
         except Exception as e:
-            print(f"Error saving heartbeat to etcd: {e}")
+            logger.error(f"Error saving heartbeat to etcd: {e}")
         self.etcd = None
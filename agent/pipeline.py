@@ -0,0 +1,347 @@
+"""
+Pipeline module - staged agent pipeline (collector -> plugins -> sender)
+
+Each stage runs on its own thread and hands samples to the next stage through a
+bounded queue, so a slow plugin or a slow gRPC stream never delays collection.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config import Config
+from protobuf import monitoring_pb2
+from telemetry.histogram import LatencyHistogram
+from telemetry.log import get_logger
+from telemetry.tracing import HopTracer
+
+logger = get_logger(__name__)
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK, OVERFLOW_COALESCE)
+
+
+class StageStats:
+    """Latency counters for a single pipeline stage (thread-safe)"""
+
+    def __init__(self, name: str):
+        """
+        Initialize stage counters
+
+        Args:
+            name: Stage name used in reports
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.histogram = LatencyHistogram()
+
+    def record(self, seconds: float):
+        """
+        Record one stage execution
+
+        Args:
+            seconds: Time spent in the stage
+        """
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.last_seconds = seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+        self.histogram.record(seconds)
+
+    def record_error(self):
+        """Record a failed stage execution"""
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a consistent copy of the counters
+
+        Returns:
+            Dictionary with count, errors and latency figures in milliseconds
+        """
+        with self._lock:
+            avg = self.total_seconds / self.count if self.count else 0.0
+            return {
+                "stage": self.name,
+                "count": self.count,
+                "errors": self.errors,
+                "avg_ms": avg * 1000,
+                "max_ms": self.max_seconds * 1000,
+                "last_ms": self.last_seconds * 1000,
+            }
+
+
+class BoundedQueue:
+    """Bounded FIFO queue with a configurable overflow policy"""
+
+    def __init__(self, maxsize: int, overflow: str = OVERFLOW_DROP_OLDEST):
+        """
+        Initialize bounded queue
+
+        Args:
+            maxsize: Maximum number of queued items
+            overflow: What to do when full - "drop_oldest" evicts the oldest item,
+                      "block" waits for room, "coalesce" replaces the newest item
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}"
+            )
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item: Any) -> bool:
+        """
+        Add an item, applying the overflow policy when the queue is full
+
+        Args:
+            item: Item to enqueue
+
+        Returns:
+            False if the queue is closed, True otherwise
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.overflow == OVERFLOW_COALESCE:
+                    self._items[-1] = item
+                    self.coalesced += 1
+                    return True
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Remove and return the oldest item
+
+        Args:
+            timeout: Seconds to wait for an item (None waits forever)
+
+        Returns:
+            The item, or None on timeout or when the queue is closed and empty
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._items or self._closed, timeout=timeout
+            ):
+                return None
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Close the queue and wake up all waiting producers and consumers"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class AgentPipeline:
+    """Runs collection, plugin processing and sending as decoupled stages"""
+
+    def __init__(
+        self,
+        collector,
+        plugin_manager,
+        etcd_config,
+        interval_fn: Callable[[], float],
+        queue_size: int = 100,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        tracing: bool = Config.TRACING,
+    ):
+        """
+        Initialize agent pipeline
+
+        Args:
+            collector: MetricCollector used by the collector stage
+            plugin_manager: PluginManager used by the plugin stage
+            etcd_config: EtcdConfigManager used to save heartbeats
+            interval_fn: Callable returning the current collection interval in seconds
+            queue_size: Capacity of each inter-stage queue
+            overflow: Overflow policy for the inter-stage queues
+            tracing: Stamp the collected and sent hops into each request's metadata (see telemetry.tracing)
+        """
+        self.collector = collector
+        self.plugin_manager = plugin_manager
+        self.etcd_config = etcd_config
+        self.interval_fn = interval_fn
+
+        self.collect_queue = BoundedQueue(queue_size, overflow)
+        self.send_queue = BoundedQueue(queue_size, overflow)
+
+        self.stats = {
+            "collect": StageStats("collect"),
+            "plugins": StageStats("plugins"),
+            "send": StageStats("send"),
+        }
+        self.tracer = HopTracer() if tracing else None
+        self.running = False
+        self._threads = []
+
+    @classmethod
+    def from_config(
+        cls, config: Dict[str, Any], collector, plugin_manager, etcd_config, interval_fn
+    ) -> "AgentPipeline":
+        """
+        Build a pipeline from the "pipeline" section of the agent configuration
+
+        Args:
+            config: Agent configuration dictionary
+            collector: MetricCollector instance
+            plugin_manager: PluginManager instance
+            etcd_config: EtcdConfigManager instance
+            interval_fn: Callable returning the current collection interval
+
+        Returns:
+            Configured AgentPipeline
+        """
+        pipeline_config = config.get("pipeline", {})
+        return cls(
+            collector,
+            plugin_manager,
+            etcd_config,
+            interval_fn,
+            queue_size=int(pipeline_config.get("queue_size", 100)),
+            overflow=pipeline_config.get("overflow", OVERFLOW_DROP_OLDEST),
+        )
+
+    def start(self):
+        """Start the collector and plugin stage threads"""
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._collect_loop, name="collector", daemon=True),
+            threading.Thread(target=self._plugin_loop, name="plugins", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop all stages and release anything blocked on the queues"""
+        self.running = False
+        self.collect_queue.close()
+        self.send_queue.close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _collect_loop(self):
+        """
+        Collector stage: sample on a fixed schedule
+
+        Ticks are scheduled against a monotonic deadline so the time spent
+        collecting does not accumulate as drift. If a tick is missed entirely
+        the schedule restarts from now instead of bursting to catch up.
+        """
+        next_tick = time.monotonic()
+        while self.running:
+            started = time.monotonic()
+            collected_at = time.time()
+            try:
+                metrics, metadata = self.collector.collect_metrics()
+                # Echo the interval in use so the server only sends CONFIG on a real change
+                metadata["interval"] = self.interval_fn()
+                request = self.collector.create_metrics_request(metrics, metadata)
+                if self.tracer is not None:
+                    self.tracer.stamp_request(request, "collected", collected_at)
+                self.collect_queue.put(request)
+                self.stats["collect"].record(time.monotonic() - started)
+            except Exception as e:
+                self.stats["collect"].record_error()
+                logger.error("Error in collector stage: %s", e)
+
+            next_tick += self.interval_fn()
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+    def _plugin_loop(self):
+        """Plugin stage: heartbeat and run the plugin chain on each sample"""
+        while self.running:
+            request = self.collect_queue.get(timeout=0.5)
+            if request is None:
+                continue
+            started = time.monotonic()
+            try:
+                self.etcd_config.save_heartbeat()
+                processed = self.plugin_manager.process_metrics(request)
+                if processed is not None:
+                    self.send_queue.put((processed, time.monotonic()))
+                self.stats["plugins"].record(time.monotonic() - started)
+            except Exception as e:
+                self.stats["plugins"].record_error()
+                logger.error("Error in plugin stage: %s", e)
+
+    def requests(self) -> Iterator[monitoring_pb2.MetricsRequest]:
+        """
+        Sender stage: yield processed requests to the gRPC stream
+
+        Yields:
+            MetricsRequest messages in collection order
+        """
+        while self.running:
+            item = self.send_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            request, enqueued_at = item
+            self.stats["send"].record(time.monotonic() - enqueued_at)
+            if self.tracer is not None:
+                self.tracer.stamp_request(request, "sent")
+            yield request
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get per-stage counters and queue state
+
+        Returns:
+            Dictionary with stage stats and queue depths/drops
+        """
+        return {
+            "stages": [stats.snapshot() for stats in self.stats.values()],
+            "queues": {
+                name: {
+                    "depth": len(queue),
+                    "dropped": queue.dropped,
+                    "coalesced": queue.coalesced,
+                }
+                for name, queue in (
+                    ("collect", self.collect_queue),
+                    ("send", self.send_queue),
+                )
+            },
+        }
@@ -7,6 +7,9 @@ import threading
 from typing import List, Dict, Any, Optional
 from protobuf import monitoring_pb2
 from agent.plugins.base import BasePlugin
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class PluginManager:
@@ -41,7 +44,7 @@ class PluginManager:
                 try:
                     plugin.finalize()
                 except Exception as e:
-                    print(f"Error finalizing plugin {plugin.__class__.__name__}: {e}")
+                    logger.error(f"Error finalizing plugin {plugin.__class__.__name__}: {e}")
 
             # Clear and reload plugins
             self.plugins = []
@@ -52,9 +55,9 @@ class PluginManager:
                     plugin = plugin_cls()
                     plugin.initialize(config)
                     self.plugins.append(plugin)
-                    print(f"✓ Loaded plugin: {cls_path}")
+                    logger.info(f"Loaded plugin: {cls_path}")
                 else:
-                    print(f"✗ Failed to load plugin: {cls_path}")
+                    logger.error(f"Failed to load plugin: {cls_path}")
 
     def _resolve_class(self, cls_path: str):
         """
@@ -71,7 +74,7 @@ class PluginManager:
             module = importlib.import_module(module_name)
             return getattr(module, class_name, None)
         except Exception as e:
-            print(f"Error resolving plugin class {cls_path}: {e}")
+            logger.error(f"Error resolving plugin class {cls_path}: {e}")
             return None
 
     def process_metrics(
@@ -96,6 +99,16 @@ class PluginManager:
 
             return result
 
+    def get_plugins(self) -> List[BasePlugin]:
+        """
+        Get a snapshot of the currently loaded plugins (thread-safe)
+
+        Returns:
+            List of plugin instances
+        """
+        with self._plugins_lock:
+            return list(self.plugins)
+
     def finalize_all(self):
         """Finalize all loaded plugins (thread-safe)"""
         with self._plugins_lock:
@@ -103,4 +116,4 @@ class PluginManager:
                 try:
                     plugin.finalize()
                 except Exception as e:
-                    print(f"Error finalizing plugin {plugin.__class__.__name__}: {e}")
+                    logger.error(f"Error finalizing plugin {plugin.__class__.__name__}: {e}")
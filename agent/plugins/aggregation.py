@@ -7,6 +7,9 @@ from protobuf import monitoring_pb2
 from agent.plugins.base import BasePlugin
 from google.protobuf.json_format import MessageToDict
 from google.protobuf.struct_pb2 import Struct
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class AggregationPlugin(BasePlugin):
@@ -33,7 +36,7 @@ class AggregationPlugin(BasePlugin):
         self.history = []
         self.aggregation_count = 0
         self.send_count = 0
-        print(f"[AggregationPlugin] initialized with window_size={self.window_size}")
+        logger.info(f"[AggregationPlugin] initialized with window_size={self.window_size}")
 
     def _aggregate_metrics(self, history: List[Dict[str, float]]) -> Dict[str, float]:
         """
@@ -112,10 +115,11 @@ class AggregationPlugin(BasePlugin):
             # Clear history for next window
             self.history = []
 
-            print(
-                f"[AggregationPlugin] ✓ Aggregated window completed (samples={self.send_count}, "
-                + f"cpu_avg={aggregated.get('cpu_percent_avg', 0):.1f}%, "
-                + f"mem_avg={aggregated.get('memory_percent_avg', 0):.1f}%)"
+            logger.debug(
+                "[AggregationPlugin] Aggregated window completed (samples=%d, cpu_avg=%.1f%%, mem_avg=%.1f%%)",
+                self.send_count,
+                aggregated.get("cpu_percent_avg", 0),
+                aggregated.get("memory_percent_avg", 0),
             )
         else:
             # Mark as raw (non-aggregated) data
@@ -127,9 +131,9 @@ class AggregationPlugin(BasePlugin):
 
     def finalize(self):
         """Finalize plugin and print statistics"""
-        print("[AggregationPlugin] finalized")
-        print(f"  Aggregations sent: {self.send_count}")
-        print(f"  Samples per aggregation: {self.window_size}")
-        print(
+        logger.info("[AggregationPlugin] finalized")
+        logger.info(f"  Aggregations sent: {self.send_count}")
+        logger.info(f"  Samples per aggregation: {self.window_size}")
+        logger.info(
             f"  Total samples processed: {self.aggregation_count * self.window_size + len(self.history)}"
         )
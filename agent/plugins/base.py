@@ -2,9 +2,11 @@
 Base plugin class for monitoring agent plugins
 """
 
+import time
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 from protobuf import monitoring_pb2
+from telemetry.histogram import LatencyHistogram
 
 
 class BasePlugin(ABC):
@@ -12,7 +14,8 @@ class BasePlugin(ABC):
 
     def __init__(self):
         """Initialize stats tracking"""
-        self.stats = {"processed": 0, "passed": 0, "dropped": 0}
+        self.stats = {"processed": 0, "passed": 0, "dropped": 0, "errors": 0}
+        self.latency = LatencyHistogram()
 
     @abstractmethod
     def initialize(self, config: Optional[Dict[str, Any]] = None):
@@ -29,7 +32,8 @@ class BasePlugin(ABC):
     ) -> Optional[monitoring_pb2.MetricsRequest]:
         """
         Process metrics request. Can modify, filter, or return None to drop.
-        Automatically tracks stats (processed/passed/dropped).
+        Automatically tracks stats (processed/passed/dropped/errors) and
+        records the time spent in process() into the latency histogram.
 
         Subclasses should override process() instead of this method.
 
@@ -40,7 +44,14 @@ class BasePlugin(ABC):
             Modified MetricsRequest or None to drop the request
         """
         self.stats["processed"] += 1
-        result = self.process(metrics_request)
+        started = time.perf_counter()
+        try:
+            result = self.process(metrics_request)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.latency.record(time.perf_counter() - started)
 
         if result is None:
             self.stats["dropped"] += 1
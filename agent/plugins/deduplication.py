@@ -5,6 +5,9 @@ Deduplication Plugin - prevents sending identical data consecutively
 from typing import Dict, Any, Optional
 from protobuf import monitoring_pb2
 from agent.plugins.base import BasePlugin
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class DeduplicationPlugin(BasePlugin):
@@ -22,7 +25,7 @@ class DeduplicationPlugin(BasePlugin):
         self.last_metrics = None
         self.dropped_count = 0
         self.sent_count = 0
-        print("[DeduplicationPlugin] initialized")
+        logger.info("[DeduplicationPlugin] initialized")
 
     def _metrics_to_dict(
         self, metrics: monitoring_pb2.SystemMetrics
@@ -64,21 +67,27 @@ class DeduplicationPlugin(BasePlugin):
         ):
             # Metrics are identical to previous, drop this request
             self.dropped_count += 1
-            print(
-                f"[Dedup] 🚫 DROPPED duplicate metrics (cpu={current_metrics['cpu_percent']:.1f}%, mem={current_metrics['memory_percent']:.1f}%) - Total dropped: {self.dropped_count}"
+            logger.debug(
+                "[Dedup] DROPPED duplicate metrics (cpu=%.1f%%, mem=%.1f%%) - Total dropped: %d",
+                current_metrics["cpu_percent"],
+                current_metrics["memory_percent"],
+                self.dropped_count,
             )
             return None
 
         # Metrics are different, update last_metrics and allow through
         self.last_metrics = current_metrics
         self.sent_count += 1
-        print(
-            f"[Dedup] ✓ PASSED metrics (cpu={current_metrics['cpu_percent']:.1f}%, mem={current_metrics['memory_percent']:.1f}%) - Total sent: {self.sent_count}"
+        logger.debug(
+            "[Dedup] PASSED metrics (cpu=%.1f%%, mem=%.1f%%) - Total sent: %d",
+            current_metrics["cpu_percent"],
+            current_metrics["memory_percent"],
+            self.sent_count,
         )
         return metrics_request
 
     def finalize(self):
         """Finalize plugin and print statistics"""
-        print(
+        logger.info(
             f"[DeduplicationPlugin] finalized - Sent: {self.sent_count}, Dropped: {self.dropped_count}"
         )
@@ -5,6 +5,9 @@ Filter Plugin - filters out metrics based on configurable conditions
 from typing import Dict, Any, Optional
 from protobuf import monitoring_pb2
 from agent.plugins.base import BasePlugin
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class FilterPlugin(BasePlugin):
@@ -37,10 +40,10 @@ class FilterPlugin(BasePlugin):
         self.filtered_count = 0
         self.passed_count = 0
 
-        print("[FilterPlugin] initialized")
-        print(f"  min_cpu: {self.min_cpu}%")
-        print(f"  min_memory: {self.min_memory}%")
-        print(f"  send_idle: {self.send_idle}")
+        logger.info("[FilterPlugin] initialized")
+        logger.info(f"  min_cpu: {self.min_cpu}%")
+        logger.info(f"  min_memory: {self.min_memory}%")
+        logger.info(f"  send_idle: {self.send_idle}")
 
     def _is_idle(self, metrics: monitoring_pb2.SystemMetrics) -> bool:
         """
@@ -77,22 +80,24 @@ class FilterPlugin(BasePlugin):
         # Check if system is idle and we're not sending idle metrics
         if not self.send_idle and self._is_idle(metrics):
             self.filtered_count += 1
-            print("[FilterPlugin] Filtered (idle system)")
+            logger.debug("[FilterPlugin] Filtered (idle system)")
             return None
 
         # Check CPU threshold
         if metrics.cpu_percent < self.min_cpu:
             self.filtered_count += 1
-            print(
-                f"[FilterPlugin] Filtered (CPU {metrics.cpu_percent:.1f}% < {self.min_cpu}%)"
+            logger.debug(
+                "[FilterPlugin] Filtered (CPU %.1f%% < %s%%)", metrics.cpu_percent, self.min_cpu
             )
             return None
 
         # Check memory threshold
         if metrics.memory_percent < self.min_memory:
             self.filtered_count += 1
-            print(
-                f"[FilterPlugin] Filtered (Memory {metrics.memory_percent:.1f}% < {self.min_memory}%)"
+            logger.debug(
+                "[FilterPlugin] Filtered (Memory %.1f%% < %s%%)",
+                metrics.memory_percent,
+                self.min_memory,
             )
             return None
 
@@ -105,8 +110,8 @@ class FilterPlugin(BasePlugin):
         total = self.passed_count + self.filtered_count
         filter_rate = (self.filtered_count / total * 100) if total > 0 else 0
 
-        print("[FilterPlugin] finalized")
-        print(f"  Total processed: {total}")
-        print(f"  Passed: {self.passed_count}")
-        print(f"  Filtered: {self.filtered_count}")
-        print(f"  Filter rate: {filter_rate:.1f}%")
+        logger.info("[FilterPlugin] finalized")
+        logger.info(f"  Total processed: {total}")
+        logger.info(f"  Passed: {self.passed_count}")
+        logger.info(f"  Filtered: {self.filtered_count}")
+        logger.info(f"  Filter rate: {filter_rate:.1f}%")
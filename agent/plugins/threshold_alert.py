@@ -7,6 +7,9 @@ from protobuf import monitoring_pb2
 from agent.plugins.base import BasePlugin
 from google.protobuf.json_format import MessageToDict
 from google.protobuf.struct_pb2 import Struct
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
 
 
 class ThresholdAlertPlugin(BasePlugin):
@@ -40,7 +43,7 @@ class ThresholdAlertPlugin(BasePlugin):
         self.alert_count = 0
         self.check_count = 0
         self.alerts = []
-        print(f"[ThresholdAlertPlugin] initialized with thresholds: {self.thresholds}")
+        logger.info(f"[ThresholdAlertPlugin] initialized with thresholds: {self.thresholds}")
 
     def _check_threshold(self, metric_name: str, value: float) -> Optional[str]:
         """
@@ -92,7 +95,7 @@ class ThresholdAlertPlugin(BasePlugin):
                 self.alert_count += 1
                 alerts_this_check.append(alert)
                 self.alerts.append(alert)
-                print(alert)
+                logger.warning(alert)
 
         metadata = MessageToDict(metrics_request.metadata)
         if alerts_this_check:
@@ -108,11 +111,11 @@ class ThresholdAlertPlugin(BasePlugin):
         alert_rate = (
             (self.alert_count / self.check_count * 100) if self.check_count > 0 else 0
         )
-        print("[ThresholdAlertPlugin] finalized")
-        print(f"  Total checks: {self.check_count}")
-        print(f"  Total alerts: {self.alert_count}")
-        print(f"  Alert rate: {alert_rate:.1f}%")
+        logger.info("[ThresholdAlertPlugin] finalized")
+        logger.info(f"  Total checks: {self.check_count}")
+        logger.info(f"  Total alerts: {self.alert_count}")
+        logger.info(f"  Alert rate: {alert_rate:.1f}%")
         if self.alerts:
-            print("  Recent alerts:")
+            logger.info("  Recent alerts:")
             for alert in self.alerts[-5:]:
-                print(f"    {alert}")
+                logger.info(f"    {alert}")
@@ -0,0 +1,88 @@
+"""
+Agent stats - exposes plugin, pipeline stage, queue and hop trace metrics on the stats endpoint
+"""
+
+from telemetry.exporter import MetricsRegistry, format_metric, format_summary
+
+
+def _plugin_metrics(plugin_manager) -> str:
+    """Render per-plugin latency and counters"""
+    plugins = plugin_manager.get_plugins()
+    labelled = [({"plugin": plugin.__class__.__name__}, plugin) for plugin in plugins]
+    chunks = [
+        format_summary(
+            "agent_plugin_latency_seconds",
+            "Time spent in plugin process()",
+            [(labels, plugin.latency) for labels, plugin in labelled],
+        )
+    ]
+    counters = {
+        "processed": "Samples handed to the plugin",
+        "passed": "Samples the plugin passed on",
+        "dropped": "Samples the plugin dropped",
+        "errors": "Exceptions raised by the plugin",
+    }
+    for stat, help_text in counters.items():
+        chunks.append(
+            format_metric(
+                f"agent_plugin_{stat}_total",
+                "counter",
+                help_text,
+                [(labels, plugin.stats.get(stat, 0)) for labels, plugin in labelled],
+            )
+        )
+    return "".join(chunks)
+
+
+def _pipeline_metrics(pipeline) -> str:
+    """Render per-stage latency and queue state"""
+    stages = list(pipeline.stats.values())
+    queues = (("collect", pipeline.collect_queue), ("send", pipeline.send_queue))
+    return "".join(
+        [
+            format_summary(
+                "agent_stage_latency_seconds",
+                "Latency per pipeline stage (send = time queued before the gRPC stream took it)",
+                [({"stage": stage.name}, stage.histogram) for stage in stages],
+            ),
+            format_metric(
+                "agent_stage_errors_total",
+                "counter",
+                "Failed executions per pipeline stage",
+                [({"stage": stage.name}, stage.errors) for stage in stages],
+            ),
+            format_metric(
+                "agent_queue_depth",
+                "gauge",
+                "Items waiting in a pipeline queue",
+                [({"queue": name}, len(queue)) for name, queue in queues],
+            ),
+            format_metric(
+                "agent_queue_dropped_total",
+                "counter",
+                "Items evicted or coalesced by the queue overflow policy",
+                [
+                    ({"queue": name}, queue.dropped + queue.coalesced)
+                    for name, queue in queues
+                ],
+            ),
+        ]
+    )
+
+
+def build_agent_registry(agent) -> MetricsRegistry:
+    """
+    Build the stats registry for a monitoring agent
+
+    Args:
+        agent: MonitoringAgent instance
+
+    Returns:
+        MetricsRegistry exposing plugin, pipeline and hop trace metrics
+    """
+    registry = MetricsRegistry()
+    registry.register(lambda: _plugin_metrics(agent.plugin_manager))
+    registry.register(lambda: _pipeline_metrics(agent.pipeline))
+    if agent.pipeline.tracer is not None:
+        registry.register(agent.pipeline.tracer.render)
+    return registry
@@ -0,0 +1,12 @@
+"""
+Analysis app module - real-time analytics over the metrics topic
+"""
+
+from analysis_app.consumer import AnalysisService, decode_batch
+from analysis_app.window import HostWindows
+
+__all__ = [
+    "AnalysisService",
+    "HostWindows",
+    "decode_batch",
+]
@@ -0,0 +1,492 @@
+"""
+Analysis app - real-time analytics over the metrics topic
+
+- get-metrics: print samples as they arrive
+- serve: worker processes share the topic's partitions (one consumer group),
+  keep per-host windows and answer queries on a local TCP port
+- query: top hosts, trends and outliers from a running `serve`
+"""
+
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for the analysis app. Install it with: pip install numpy"
+    )
+
+from analysis_app.window import ANALYSIS_FIELDS, STATS, HostWindows, outliers, top
+from config import Config
+from elk.rollup_schema import payload_error
+from telemetry.log import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+
+def _consumer(group_id: str, offset_reset: str = "latest"):
+    """Kafka consumer subscribed to the metrics topic"""
+    from confluent_kafka import Consumer
+
+    consumer = Consumer(
+        {
+            "bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER,
+            "group.id": group_id,
+            "auto.offset.reset": offset_reset,
+            "enable.auto.commit": True,
+        }
+    )
+    consumer.subscribe([Config.MONITORING_TOPIC])
+    return consumer
+
+
+def decode_batch(messages: List) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Decode a micro-batch of metrics topic messages
+
+    The message values are joined into one JSON array and parsed with a single
+    json.loads call; a batch holding a malformed message falls back to decoding
+    messages one by one and skips the bad ones. Messages that are not metric
+    samples (see elk.rollup_schema.payload_error) are logged and skipped.
+
+    Args:
+        messages: Kafka messages
+
+    Returns:
+        Tuple of (hostnames, timestamps, values matrix in ANALYSIS_FIELDS order)
+    """
+    raw = [msg.value() for msg in messages if not msg.error() and msg.value()]
+    try:
+        payloads = json.loads(b"[" + b",".join(raw) + b"]")
+    except ValueError:
+        payloads = []
+        for value in raw:
+            try:
+                payloads.append(json.loads(value))
+            except ValueError as e:
+                logger.error(f"Error decoding JSON: {e}")
+    valid = []
+    for payload in payloads:
+        error = payload_error(payload, ANALYSIS_FIELDS)
+        if error is None:
+            valid.append(payload)
+        else:
+            logger.error(f"Skipping invalid message: {error}")
+    payloads = valid
+
+    hostnames = [p.get("hostname", "unknown") for p in payloads]
+    timestamps = np.fromiter((p.get("timestamp", 0) for p in payloads), dtype=np.int64, count=len(payloads))
+    values = np.array(
+        [[p.get("metrics", {}).get(field, 0.0) for field in ANALYSIS_FIELDS] for p in payloads],
+        dtype=np.float64,
+    ).reshape(len(payloads), len(ANALYSIS_FIELDS))
+    return hostnames, timestamps, values
+
+
+def get_metrics(args):
+    """Print samples from the metrics topic"""
+    consumer = _consumer(args.group_id, "earliest" if args.from_beginning else "latest")
+    logger.info(f"Consuming '{Config.MONITORING_TOPIC}' from {Config.KAFKA_BOOTSTRAP_SERVER} (Ctrl+C to stop)")
+    last_message = time.monotonic()
+    try:
+        while True:
+            messages = consumer.consume(num_messages=args.batch_size, timeout=1.0)
+            if messages:
+                last_message = time.monotonic()
+            elif args.timeout and time.monotonic() - last_message >= args.timeout:
+                logger.info(f"No messages for {args.timeout}s, stopping")
+                break
+            hostnames, timestamps, values = decode_batch(messages)
+            for hostname, timestamp, row in zip(hostnames, timestamps.tolist(), values.tolist()):
+                if args.hostname and hostname != args.hostname:
+                    continue
+                if args.json:
+                    sample = {"hostname": hostname, "timestamp": timestamp, **dict(zip(ANALYSIS_FIELDS, row))}
+                    print(json.dumps(sample))
+                else:
+                    print(
+                        f"[{hostname}] {time.strftime('%H:%M:%S', time.localtime(timestamp))} "
+                        f"CPU {row[0]:5.1f}% | Mem {row[1]:5.1f}% | "
+                        f"Disk R {row[2]:.2f} W {row[3]:.2f} MB/s | Net in {row[4]:.2f} out {row[5]:.2f} MB/s"
+                    )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        consumer.close()
+
+
+def _worker_main(
+    worker_id: int, conn, group_id: str, window_seconds: float, slots: int, batch_size: int, log_level
+):
+    """
+    Worker process: consume a share of the partitions and answer column requests
+
+    Args:
+        worker_id: Worker index
+        conn: Pipe end receiving {"metric", "stat"} requests
+        group_id: Kafka consumer group shared by all workers
+        window_seconds: Window length
+        slots: Samples kept per host
+        batch_size: Maximum messages per micro-batch
+        log_level: Log level for the worker
+    """
+    setup_logging(log_level)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    consumer = _consumer(group_id)
+    windows = HostWindows(window_seconds=window_seconds, slots=slots)
+    logger.info(f"Analysis worker {worker_id} started")
+    try:
+        while True:
+            messages = consumer.consume(num_messages=batch_size, timeout=0.2)
+            if messages:
+                try:
+                    windows.add(*decode_batch(messages))
+                except Exception as e:
+                    logger.error(f"Error processing batch of {len(messages)} messages: {e}")
+            while conn.poll():
+                request = conn.recv()
+                if request is None:
+                    return
+                try:
+                    if request.get("op") == "status":
+                        reply = {"hosts": len(windows), "samples": windows.samples, "newest": windows.newest}
+                    else:
+                        hostnames, values = windows.column(request["metric"], request["stat"])
+                        reply = {"hostnames": hostnames, "values": values}
+                except Exception as e:
+                    reply = {"error": str(e)}
+                conn.send(reply)
+    finally:
+        consumer.close()
+
+
+class AnalysisService:
+    """Worker processes plus a local query endpoint merging their answers"""
+
+    def __init__(
+        self,
+        workers: int,
+        group_id: str = Config.MONITORING_GROUP_ID,
+        window_seconds: float = 300.0,
+        slots: int = 64,
+        batch_size: int = 5000,
+        port: int = Config.ANALYSIS_QUERY_PORT,
+        log_level: Optional[str] = None,
+    ):
+        """
+        Initialize analysis service
+
+        Args:
+            workers: Worker processes (more than the topic's partitions leaves some idle)
+            group_id: Kafka consumer group shared by the workers
+            window_seconds: Window length
+            slots: Samples kept per host
+            batch_size: Maximum messages per micro-batch
+            port: Local TCP port for queries
+            log_level: Log level for the workers
+        """
+        self.workers = workers
+        self.port = port
+        self._args = (group_id, window_seconds, slots, batch_size, log_level)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[multiprocessing.Process] = []
+        self._conns = []
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+
+    def start(self):
+        """Start workers and the query endpoint"""
+        for worker_id in range(self.workers):
+            parent, child = self._context.Pipe()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, child) + self._args,
+                name=f"analysis-worker-{worker_id}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+            self._conns.append(parent)
+
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        reply = service.query(json.loads(line))
+                    except Exception as e:
+                        reply = {"error": str(e)}
+                    self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="analysis-query", daemon=True).start()
+        logger.info(f"Analysis service: {self.workers} workers, queries on 127.0.0.1:{self.port}")
+
+    def _gather(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Send a request to every worker and collect the replies"""
+        with self._lock:
+            for conn in self._conns:
+                conn.send(request)
+            replies = [conn.recv() for conn in self._conns]
+        for reply in replies:
+            if "error" in reply:
+                raise ValueError(reply["error"])
+        return replies
+
+    def column(self, metric: str, stat: str) -> Tuple[List[str], np.ndarray]:
+        """
+        One statistic of one metric for every host, merged across workers
+
+        Args:
+            metric: Field out of ANALYSIS_FIELDS
+            stat: One of STATS
+
+        Returns:
+            Tuple of (hostnames, values)
+        """
+        replies = self._gather({"op": "column", "metric": metric, "stat": stat})
+        hostnames = [h for reply in replies for h in reply["hostnames"]]
+        values = np.concatenate([reply["values"] for reply in replies]) if replies else np.zeros(0)
+        return hostnames, values
+
+    def query(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a query
+
+        Args:
+            request: {"query": "top" | "trend" | "outliers" | "status", "metric", "stat",
+                      "k", "ascending", "threshold"}
+
+        Returns:
+            JSON-serializable reply
+        """
+        kind = request.get("query", "top")
+        if kind == "status":
+            replies = self._gather({"op": "status"})
+            return {
+                "workers": len(replies),
+                "hosts": sum(r["hosts"] for r in replies),
+                "samples": sum(r["samples"] for r in replies),
+                "newest": max((r["newest"] for r in replies), default=0),
+            }
+        metric = request.get("metric", "cpu_percent")
+        k = int(request.get("k", 10))
+        if kind == "top":
+            stat = request.get("stat", "avg")
+            hostnames, values = self.column(metric, stat)
+            rows = top(hostnames, values, k, bool(request.get("ascending", False)))
+            return {"query": kind, "metric": metric, "stat": stat, "hosts": len(hostnames), "rows": rows}
+        if kind == "trend":
+            hostnames, values = self.column(metric, "slope")
+            rows = top(hostnames, values, k, bool(request.get("ascending", False)))
+            return {"query": kind, "metric": metric, "stat": "slope", "hosts": len(hostnames), "rows": rows}
+        if kind == "outliers":
+            stat = request.get("stat", "avg")
+            hostnames, values = self.column(metric, stat)
+            rows = outliers(hostnames, values, float(request.get("threshold", 3.5)))[:k]
+            return {"query": kind, "metric": metric, "stat": stat, "hosts": len(hostnames), "rows": rows}
+        raise ValueError(f"Unknown query '{kind}', expected top, trend, outliers or status")
+
+    def run(self):
+        """Run until interrupted (a worker that dies stops the service)"""
+        self.start()
+        try:
+            while all(p.is_alive() for p in self._processes):
+                time.sleep(1.0)
+            logger.error("An analysis worker exited, stopping")
+        except KeyboardInterrupt:
+            logger.info("Shutting down analysis service...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop the query endpoint and the workers"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for conn in self._conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+
+
+def serve(args):
+    """Run the analysis service"""
+    service = AnalysisService(
+        workers=args.workers,
+        group_id=args.group_id,
+        window_seconds=args.window,
+        slots=args.slots,
+        batch_size=args.batch_size,
+        port=args.port,
+        log_level=args.log_level,
+    )
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    service.run()
+
+
+def send_query(
+    request: Dict[str, Any], port: int = Config.ANALYSIS_QUERY_PORT, timeout: float = 30.0
+) -> Dict[str, Any]:
+    """
+    Send one query to a running analysis service
+
+    Args:
+        request: Query (see AnalysisService.query)
+        port: Local query port
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Reply dictionary
+    """
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as sock:
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        reply = sock.makefile("rb").readline()
+    return json.loads(reply)
+
+
+def query(args):
+    """Query a running analysis service and print the answer"""
+    request = {
+        "query": args.query,
+        "metric": args.metric,
+        "k": args.top,
+        "ascending": args.ascending,
+        "threshold": args.threshold,
+    }
+    if args.stat:
+        request["stat"] = args.stat
+    try:
+        reply = send_query(request, port=args.port)
+    except OSError as e:
+        print(f"ERROR: cannot reach the analysis service on port {args.port}: {e}")
+        return 1
+    if "error" in reply:
+        print(f"ERROR: {reply['error']}")
+        return 1
+    if args.json or args.query == "status":
+        print(json.dumps(reply, indent=2))
+        return 0
+
+    print(f"\n{args.query} {reply['metric']} ({reply['stat']}) over {reply['hosts']} hosts\n")
+    for row in reply["rows"]:
+        if args.query == "outliers":
+            print(f"  {row[0]:<32} {row[1]:>10.2f}   z={row[2]:+.1f}")
+        elif args.query == "trend":
+            print(f"  {row[0]:<32} {row[1]:>+10.2f} /min")
+        else:
+            print(f"  {row[0]:<32} {row[1]:>10.2f}")
+    return 0
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Real-time analysis of the metrics topic")
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Commands")
+
+    get_parser = subparsers.add_parser("get-metrics", help="Print samples as they arrive")
+    get_parser.add_argument("--hostname", type=str, default=None, help="Only this host")
+    get_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=0,
+        help="Stop after this many seconds without messages (default: 0, never)",
+    )
+    get_parser.add_argument(
+        "--group-id",
+        type=str,
+        default=f"{Config.MONITORING_GROUP_ID}-cli-{os.getpid()}",
+        help="Kafka consumer group (default: a private group)",
+    )
+    get_parser.add_argument("--from-beginning", action="store_true", help="Start at the earliest retained offset")
+    get_parser.add_argument("--batch-size", type=int, default=1000, help="Maximum messages per poll")
+    get_parser.add_argument("--json", action="store_true", help="Output as JSON lines")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the analysis workers and query endpoint")
+    serve_parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(os.cpu_count() or 1, Config.KAFKA_DEFAULT_PARTITION),
+        help=f"Worker processes (default: min(CPUs, {Config.KAFKA_DEFAULT_PARTITION} partitions))",
+    )
+    serve_parser.add_argument(
+        "--group-id",
+        type=str,
+        default=Config.MONITORING_GROUP_ID,
+        help=f"Kafka consumer group shared by the workers (default: {Config.MONITORING_GROUP_ID})",
+    )
+    serve_parser.add_argument("--window", type=float, default=300.0, help="Window length in seconds (default: 300)")
+    serve_parser.add_argument("--slots", type=int, default=64, help="Samples kept per host (default: 64)")
+    serve_parser.add_argument("--batch-size", type=int, default=5000, help="Maximum messages per micro-batch")
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=Config.ANALYSIS_QUERY_PORT,
+        help=f"Local query port (default: {Config.ANALYSIS_QUERY_PORT})",
+    )
+
+    query_parser = subparsers.add_parser("query", help="Query a running analysis service")
+    query_parser.add_argument("query", choices=["top", "trend", "outliers", "status"], help="Query type")
+    query_parser.add_argument(
+        "--metric",
+        type=str,
+        default="cpu_percent",
+        choices=list(ANALYSIS_FIELDS),
+        help="Metric (default: cpu_percent)",
+    )
+    query_parser.add_argument(
+        "--stat",
+        type=str,
+        default=None,
+        choices=[s for s in STATS if s != "slope"],
+        help="Per-host statistic over the window for top/outliers (default: avg)",
+    )
+    query_parser.add_argument("--top", type=int, default=10, help="Number of hosts (default: 10)")
+    query_parser.add_argument("--ascending", action="store_true", help="Lowest values (or steepest decline) first")
+    query_parser.add_argument("--threshold", type=float, default=3.5, help="Robust z-score for outliers (default: 3.5)")
+    query_parser.add_argument("--port", type=int, default=Config.ANALYSIS_QUERY_PORT, help="Local query port")
+    query_parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    if args.command == "get-metrics":
+        get_metrics(args)
+    elif args.command == "serve":
+        serve(args)
+    elif args.command == "query":
+        return query(args)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
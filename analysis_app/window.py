@@ -0,0 +1,200 @@
+"""
+Host windows - columnar ring buffers holding the recent samples of every host
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for the analysis app. Install it with: pip install numpy"
+    )
+
+ANALYSIS_FIELDS = (
+    "cpu_percent",
+    "memory_percent",
+    "disk_read_mb",
+    "disk_write_mb",
+    "net_in_mb",
+    "net_out_mb",
+)
+FIELD_INDEX = {name: i for i, name in enumerate(ANALYSIS_FIELDS)}
+
+STATS = ("latest", "avg", "min", "max", "p95", "slope")
+
+
+class HostWindows:
+    """
+    Last `slots` samples of each host within `window_seconds` of the newest sample
+
+    Each host owns one row of a (hosts, slots, fields) array used as a ring
+    buffer; a micro-batch is written with a single scatter, and statistics are
+    computed for all hosts at once over the samples still inside the window.
+    """
+
+    def __init__(self, window_seconds: float = 300.0, slots: int = 64, capacity: int = 1024):
+        """
+        Initialize host windows
+
+        Args:
+            window_seconds: Samples older than this (relative to the newest sample) are ignored
+            slots: Samples kept per host (window_seconds / agent interval is enough)
+            capacity: Initial number of host rows (grows by doubling)
+        """
+        self.window_seconds = window_seconds
+        self.slots = slots
+        self._rows: Dict[str, int] = {}
+        self._hostnames: List[str] = []
+        self.values = np.zeros((capacity, slots, len(ANALYSIS_FIELDS)), dtype=np.float32)
+        self.timestamps = np.zeros((capacity, slots), dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.newest = 0
+        self.samples = 0
+
+    def __len__(self) -> int:
+        return len(self._hostnames)
+
+    def _row(self, hostname: str) -> int:
+        row = self._rows.get(hostname)
+        if row is None:
+            row = self._rows[hostname] = len(self._hostnames)
+            self._hostnames.append(hostname)
+            if row == len(self.count):
+                self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+                self.timestamps = np.concatenate([self.timestamps, np.zeros_like(self.timestamps)])
+                self.count = np.concatenate([self.count, np.zeros_like(self.count)])
+        return row
+
+    def add(self, hostnames: Sequence[str], timestamps: np.ndarray, values: np.ndarray):
+        """
+        Append a micro-batch of samples
+
+        Args:
+            hostnames: Hostname of each sample
+            timestamps: Sample timestamps (epoch seconds)
+            values: Matrix (batch, ANALYSIS_FIELDS)
+        """
+        n = len(hostnames)
+        if n == 0:
+            return
+        rows = np.fromiter((self._row(h) for h in hostnames), dtype=np.int64, count=n)
+
+        # Position of each sample within its host's run in this batch (0, 1, 2, ...)
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        first = np.ones(n, dtype=bool)
+        first[1:] = sorted_rows[1:] != sorted_rows[:-1]
+        run_start = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+        rank = np.arange(n) - run_start
+
+        positions = (self.count[sorted_rows] + rank) % self.slots
+        self.values[sorted_rows, positions] = values[order]
+        self.timestamps[sorted_rows, positions] = timestamps[order]
+        self.count += np.bincount(rows, minlength=len(self.count))
+        self.newest = max(self.newest, int(timestamps.max()))
+        self.samples += n
+
+    def column(self, metric: str, stat: str = "latest") -> Tuple[List[str], np.ndarray]:
+        """
+        One statistic of one metric for every host with samples in the window
+
+        Args:
+            metric: Field out of ANALYSIS_FIELDS
+            stat: One of STATS ("slope" is the least-squares trend per minute)
+
+        Returns:
+            Tuple of (hostnames, values)
+        """
+        if metric not in FIELD_INDEX:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {list(ANALYSIS_FIELDS)}")
+        if stat not in STATS:
+            raise ValueError(f"Unknown stat '{stat}', expected one of {list(STATS)}")
+        hosts = len(self._hostnames)
+        if hosts == 0:
+            return [], np.zeros(0)
+
+        timestamps = self.timestamps[:hosts]
+        values = self.values[:hosts, :, FIELD_INDEX[metric]].astype(np.float64)
+        written = np.arange(self.slots)[None, :] < self.count[:hosts, None]
+        mask = written & (timestamps >= self.newest - self.window_seconds)
+        n = mask.sum(axis=1)
+
+        if stat == "latest":
+            last = (self.count[:hosts] - 1) % self.slots
+            result = values[np.arange(hosts), last]
+            keep = n > 0
+        elif stat == "avg":
+            result = np.where(mask, values, 0.0).sum(axis=1) / np.maximum(n, 1)
+            keep = n > 0
+        elif stat == "min":
+            result = np.where(mask, values, np.inf).min(axis=1)
+            keep = n > 0
+        elif stat == "max":
+            result = np.where(mask, values, -np.inf).max(axis=1)
+            keep = n > 0
+        elif stat == "p95":
+            keep = n > 0
+            result = np.zeros(hosts)
+            if keep.any():
+                result[keep] = np.nanpercentile(np.where(mask, values, np.nan)[keep], 95, axis=1)
+        else:
+            t = (timestamps - self.newest) / 60.0
+            weight = mask.astype(np.float64)
+            count = np.maximum(n, 1)
+            t_mean = (t * weight).sum(axis=1) / count
+            v_mean = (values * weight).sum(axis=1) / count
+            dt = (t - t_mean[:, None]) * weight
+            denominator = (dt * dt).sum(axis=1)
+            keep = (n >= 2) & (denominator > 0)
+            result = (dt * (values - v_mean[:, None])).sum(axis=1) / np.where(keep, denominator, 1.0)
+
+        indices = np.flatnonzero(keep)
+        return [self._hostnames[i] for i in indices.tolist()], result[indices]
+
+
+def top(hostnames: List[str], values: np.ndarray, k: int = 10, ascending: bool = False) -> List[Tuple[str, float]]:
+    """
+    Hosts with the highest (or lowest) values
+
+    Args:
+        hostnames: Hostnames
+        values: Value per host
+        k: Number of hosts
+        ascending: Lowest first instead of highest first
+
+    Returns:
+        List of (hostname, value)
+    """
+    keys = values if ascending else -values
+    if 0 < k < len(keys):
+        best = np.argpartition(keys, k - 1)[:k]
+        ordered = best[np.argsort(keys[best], kind="stable")]
+    else:
+        ordered = np.argsort(keys, kind="stable")
+    return [(hostnames[i], float(values[i])) for i in ordered.tolist()]
+
+
+def outliers(hostnames: List[str], values: np.ndarray, threshold: float = 3.5) -> List[Tuple[str, float, float]]:
+    """
+    Hosts far from the fleet by robust z-score (median and MAD)
+
+    Args:
+        hostnames: Hostnames
+        values: Value per host
+        threshold: Absolute robust z-score at which a host is an outlier
+
+    Returns:
+        List of (hostname, value, robust z) ordered by |z| descending
+    """
+    if len(values) == 0:
+        return []
+    median = np.median(values)
+    mad = np.median(np.abs(values - median))
+    if mad == 0:
+        # More than half the fleet is identical: scale by the mean deviation instead
+        mad = np.mean(np.abs(values - median)) or 1.0
+    z = 0.6745 * (values - median) / mad
+    hits = np.flatnonzero(np.abs(z) >= threshold)
+    hits = hits[np.argsort(-np.abs(z[hits]), kind="stable")]
+    return [(hostnames[i], float(values[i]), float(z[i])) for i in hits.tolist()]
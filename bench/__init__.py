@@ -0,0 +1,14 @@
+"""
+Bench module - throughput and latency benchmarks over in-process service stand-ins
+"""
+
+from bench.harness import SCENARIOS, compare, load_results, run_benchmarks, save_results, scenario
+
+__all__ = [
+    "SCENARIOS",
+    "compare",
+    "load_results",
+    "run_benchmarks",
+    "save_results",
+    "scenario",
+]
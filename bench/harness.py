@@ -0,0 +1,214 @@
+"""
+Benchmark harness - scenario registry, timing loop, JSON results and baseline comparison
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from telemetry.histogram import LatencyHistogram
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+# A scenario factory builds its fixtures and returns the operation to time.
+# The operation runs one iteration and returns the number of items it handled.
+ScenarioFactory = Callable[[], Callable[[], int]]
+
+SCENARIOS: Dict[str, "Scenario"] = {}
+
+RESULT_PERCENTILES = (50.0, 90.0, 99.0)
+
+
+class Scenario:
+    """A named benchmark with default iteration counts"""
+
+    def __init__(self, name: str, factory: ScenarioFactory, iterations: int, warmup: int, description: str):
+        """
+        Initialize scenario
+
+        Args:
+            name: Scenario name used on the command line and in results
+            factory: Callable building fixtures and returning the timed operation
+            iterations: Default timed iterations
+            warmup: Default untimed iterations run first
+            description: One-line description
+        """
+        self.name = name
+        self.factory = factory
+        self.iterations = iterations
+        self.warmup = warmup
+        self.description = description
+
+
+def scenario(name: str, iterations: int = 1000, warmup: int = 50):
+    """
+    Register a scenario factory
+
+    Args:
+        name: Scenario name
+        iterations: Default timed iterations
+        warmup: Default untimed iterations
+
+    Returns:
+        Decorator registering the factory
+    """
+
+    def decorator(factory: ScenarioFactory) -> ScenarioFactory:
+        description = (factory.__doc__ or "").strip().splitlines()[0] if factory.__doc__ else ""
+        SCENARIOS[name] = Scenario(name, factory, iterations, warmup, description)
+        return factory
+
+    return decorator
+
+
+def measure(name: str, operation: Callable[[], int], iterations: int, warmup: int) -> Dict[str, Any]:
+    """
+    Time an operation
+
+    Args:
+        name: Scenario name
+        operation: Callable running one iteration and returning items handled
+        iterations: Timed iterations
+        warmup: Untimed iterations run first
+
+    Returns:
+        Result dictionary (per-iteration latency in ms, iteration and item throughput)
+    """
+    for _ in range(warmup):
+        operation()
+
+    histogram = LatencyHistogram()
+    items = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        items += operation() or 0
+        histogram.record(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "iterations": iterations,
+        "items": items,
+        "elapsed_s": elapsed,
+        "ops_per_s": iterations / elapsed if elapsed else 0.0,
+        "items_per_s": items / elapsed if elapsed else 0.0,
+        "mean_ms": histogram.sum_seconds / histogram.count * 1000 if histogram.count else 0.0,
+        "max_ms": histogram.max_seconds * 1000,
+    }
+    for percent, value in histogram.percentiles(RESULT_PERCENTILES).items():
+        result[f"p{percent:g}_ms"] = value * 1000
+    logger.info(
+        "%-20s %8.1f ops/s %10.1f items/s  p50 %.3f ms  p99 %.3f ms",
+        name,
+        result["ops_per_s"],
+        result["items_per_s"],
+        result["p50_ms"],
+        result["p99_ms"],
+    )
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    """Current commit hash, if running inside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names: Optional[Iterable[str]] = None, scale: float = 1.0) -> Dict[str, Any]:
+    """
+    Run scenarios and collect a results document
+
+    Args:
+        names: Scenario names to run (default: all registered)
+        scale: Multiplier applied to the default iteration and warmup counts
+
+    Returns:
+        Results document with environment info and one entry per scenario
+    """
+    # Importing the scenarios module registers them
+    import bench.scenarios  # noqa: F401
+
+    selected = list(names) if names else list(SCENARIOS)
+    unknown = [name for name in selected if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios {unknown}, expected some of {sorted(SCENARIOS)}")
+
+    results = {}
+    for name in selected:
+        spec = SCENARIOS[name]
+        operation = spec.factory()
+        results[name] = measure(
+            name,
+            operation,
+            iterations=max(1, int(spec.iterations * scale)),
+            warmup=int(spec.warmup * scale),
+        )
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.15) -> List[str]:
+    """
+    Compare a results document against a baseline
+
+    A scenario regresses when its item throughput drops, or its p99 latency
+    grows, by more than the tolerance.
+
+    Args:
+        current: Results document from run_benchmarks()
+        baseline: Earlier results document
+        tolerance: Allowed relative change (0.15 = 15%)
+
+    Returns:
+        List of human-readable regression descriptions (empty when none)
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        if base.get("items_per_s") and result["items_per_s"] < base["items_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['items_per_s']:.1f}/s vs baseline {base['items_per_s']:.1f}/s"
+            )
+        if base.get("p99_ms") and result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p99 {result['p99_ms']:.3f} ms vs baseline {base['p99_ms']:.3f} ms"
+            )
+    return regressions
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Read a results document"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(document: Dict[str, Any], path: str):
+    """Write a results document"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,443 @@
+"""
+Benchmark scenarios - agent tick, plugin chain, config fan-out, cached config start, fleet bulk update,
+server ingest, indexer, search, fleet snapshot, rollup, anomaly, time-series store and replay paths
+"""
+
+import json
+import time
+from typing import List
+
+from bench.harness import scenario
+from fakes.elasticsearch import FakeElasticsearch
+from fakes.etcd import FakeEtcdClient
+from fakes.kafka import FakeConsumer, FakeProducer
+from loadgen.simulator import METRIC_FIELDS, FleetSimulator
+from protobuf import monitoring_pb2
+
+BENCH_PLUGINS = [
+    "agent.plugins.deduplication.DeduplicationPlugin",
+    "agent.plugins.threshold_alert.ThresholdAlertPlugin",
+    "agent.plugins.filter.FilterPlugin",
+]
+
+FLEET_SIZE = 500
+INGEST_BATCH = 100
+BULK_BATCH = 500
+SEARCH_DOCS = 20000
+
+
+def _requests(num_agents: int, ticks: int) -> List[monitoring_pb2.MetricsRequest]:
+    """Build realistic MetricsRequests for a simulated fleet"""
+    simulator = FleetSimulator(num_agents, seed=42)
+    now = int(time.time())
+    requests = []
+    for tick in range(ticks):
+        for agent, row in enumerate(simulator.tick(tick).tolist()):
+            requests.append(
+                monitoring_pb2.MetricsRequest(
+                    hostname=f"bench-{agent:05d}",
+                    timestamp=now - (ticks - tick) * 5,
+                    timestamp_ms=(now - (ticks - tick) * 5) * 1000,
+                    metrics=monitoring_pb2.SystemMetrics(**dict(zip(METRIC_FIELDS, row))),
+                )
+            )
+    return requests
+
+
+def _kafka_messages(num_agents: int, ticks: int) -> list:
+    """Serialize requests through MonitoringServicer into retained FakeProducer messages"""
+    from config import Config
+    from grpc_server.server import MonitoringServicer
+
+    producer = FakeProducer(retain=num_agents * ticks)
+    servicer = MonitoringServicer(producer=producer)
+    for _ in servicer.StreamMetrics(iter(_requests(num_agents, ticks)), None):
+        pass
+    return list(producer.messages[Config.MONITORING_TOPIC])
+
+
+@scenario("agent_tick", iterations=20, warmup=2)
+def agent_tick():
+    """One agent tick: collect (psutil), build request, run plugins, heartbeat"""
+    from agent.collect import MetricCollector
+    from agent.etcd_config import EtcdConfigManager
+    from agent.plugin_manager import PluginManager
+
+    etcd_config = EtcdConfigManager("bench-host", "localhost", 2379, client=FakeEtcdClient())
+    config = etcd_config.load_initial_config()
+    collector = MetricCollector("bench-host", config["metrics"])
+    plugins = PluginManager(dict(config, plugins=BENCH_PLUGINS))
+    plugins.load_plugins()
+
+    def operation() -> int:
+        metrics, metadata = collector.collect_metrics()
+        request = collector.create_metrics_request(metrics, metadata)
+        plugins.process_metrics(request)
+        etcd_config.save_heartbeat()
+        return 1
+
+    return operation
+
+
+@scenario("plugin_chain", iterations=20000, warmup=500)
+def plugin_chain():
+    """Default plugin chain over simulated samples"""
+    from agent.etcd_config import EtcdConfigManager
+    from agent.plugin_manager import PluginManager
+
+    config = EtcdConfigManager("bench-host", "localhost", 2379, client=FakeEtcdClient())._get_default_config()
+    plugins = PluginManager(dict(config, plugins=BENCH_PLUGINS))
+    plugins.load_plugins()
+    requests = _requests(1, 1000)
+    position = [0]
+
+    def operation() -> int:
+        request = requests[position[0] % len(requests)]
+        position[0] += 1
+        plugins.process_metrics(request)
+        return 1
+
+    return operation
+
+
+@scenario("config_fanout", iterations=50, warmup=2)
+def config_fanout():
+    """One group-layer update reaching the 100 agents of that group out of a 1000-agent fleet"""
+    from agent.etcd_config import EtcdConfigManager
+    from controller.config_admin import ConfigAdmin
+
+    etcd = FakeEtcdClient()
+    hostnames = [f"group{group:02d}-{host:03d}" for group in range(10) for host in range(100)]
+    agents = [EtcdConfigManager(hostname, "localhost", 2379, client=etcd) for hostname in hostnames]
+    for agent in agents:
+        agent.load_initial_config()
+        agent.start_watching()
+    admin = ConfigAdmin(client=etcd)
+    members = [agent for agent in agents if agent.group == "group03"]
+    interval = [5]
+
+    def operation() -> int:
+        interval[0] = 15 - interval[0]
+        admin.update_layer("group", "group03", {"interval": interval[0]})
+        return sum(1 for agent in members if agent.get_config()["interval"] == interval[0])
+
+    return operation
+
+
+@scenario("config_cached_start", iterations=200, warmup=5)
+def config_cached_start():
+    """Agent config load from the local cache file, without reading etcd"""
+    import os
+    import tempfile
+
+    from agent.etcd_config import EtcdConfigManager
+    from controller.config_admin import ConfigAdmin
+
+    etcd = FakeEtcdClient()
+    admin = ConfigAdmin(client=etcd)
+    admin.update_layer("global", None, {"interval": 5})
+    admin.update_layer("group", "web", {"interval": 10})
+    admin.update_layer("host", "web-001", {"window_size": 9})
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="bench-config-"), "web-001.json")
+    EtcdConfigManager("web-001", "localhost", 2379, client=etcd, cache_path=cache_path).load_config()
+    txns = etcd.txns
+
+    def operation() -> int:
+        manager = EtcdConfigManager("web-001", "localhost", 2379, client=etcd, cache_path=cache_path)
+        manager.load_config()
+        assert etcd.txns == txns, "cached start read etcd"
+        return 1
+
+    return operation
+
+
+@scenario("fleet_bulk_update", iterations=10, warmup=1)
+def fleet_bulk_update():
+    """Liveness of a 10,000-host fleet and one setting merged into every live host's layer"""
+    from controller.fleet import FleetController
+
+    etcd = FakeEtcdClient()
+    now = time.time()
+    for host in range(10000):
+        age = 600 if host % 20 == 0 else 2
+        etcd.put(f"/monitor/heartbeat/host-{host:05d}", str(int(now - age)))
+    fleet = FleetController(client=etcd)
+    interval = [5]
+
+    def operation() -> int:
+        interval[0] = 15 - interval[0]
+        live = fleet.liveness()["live"]
+        return len(fleet.bulk_update(live, {"interval": interval[0]})["updated"])
+
+    return operation
+
+
+@scenario("server_ingest", iterations=300, warmup=10)
+def server_ingest():
+    """MonitoringServicer.StreamMetrics: serialize, produce and command per request"""
+    from grpc_server.server import MonitoringServicer
+
+    servicer = MonitoringServicer(producer=FakeProducer())
+    requests = _requests(INGEST_BATCH, 1)
+
+    def operation() -> int:
+        count = 0
+        for _ in servicer.StreamMetrics(iter(requests), None):
+            count += 1
+        return count
+
+    return operation
+
+
+@scenario("indexer_message", iterations=20, warmup=2)
+def indexer_message():
+    """ElasticsearchIndexer.process_message, one document per Kafka message"""
+    from elk.elasticsearch_indexer import ElasticsearchIndexer
+    from elk.elk_search import ElasticsearchClient
+
+    messages = _kafka_messages(FLEET_SIZE, 1)
+    es_client = ElasticsearchClient(es=FakeElasticsearch())
+    indexer = ElasticsearchIndexer(es_client=es_client, consumer=FakeConsumer())
+
+    def operation() -> int:
+        for msg in messages:
+            indexer.process_message(msg)
+        return len(messages)
+
+    return operation
+
+
+@scenario("indexer_bulk", iterations=20, warmup=2)
+def indexer_bulk():
+    """Decode Kafka messages and index them with one bulk request per batch"""
+    from elk.elasticsearch_indexer import ElasticsearchIndexer
+    from elk.elk_search import ElasticsearchClient
+
+    messages = _kafka_messages(BULK_BATCH, 1)
+    es_client = ElasticsearchClient(es=FakeElasticsearch())
+    indexer = ElasticsearchIndexer(es_client=es_client, consumer=FakeConsumer())
+
+    def operation() -> int:
+        batch = [indexer._parse_metric_data(json.loads(msg.value())) for msg in messages]
+        return es_client.index_metrics_batch(batch)
+
+    return operation
+
+
+def _search_client(profile: str):
+    """Client of an index of one profile pre-loaded with SEARCH_DOCS samples of 100 agents"""
+    from elk.elk_search import ElasticsearchClient
+
+    es_client = ElasticsearchClient(es=FakeElasticsearch(), profile=profile)
+    now = time.time()
+    simulator = FleetSimulator(100, seed=7)
+    ticks = SEARCH_DOCS // 100
+    docs = []
+    for tick in range(ticks):
+        for agent, row in enumerate(simulator.tick(tick).tolist()):
+            docs.append(
+                {
+                    "agent": f"bench-{agent:05d}",
+                    "agent_id": agent,
+                    "timestamp": now - (ticks - tick) * 5,
+                    "cpu": row[0],
+                    "memory": row[1],
+                    "disk_read": row[4],
+                    "disk_write": row[5],
+                    "net_in": row[6],
+                    "net_out": row[7],
+                }
+            )
+    es_client.index_metrics_batch(docs)
+    return es_client
+
+
+def _search_operation(profile: str):
+    """Agent, time range, threshold and aggregation queries against an index of one profile"""
+    es_client = _search_client(profile)
+
+    def operation() -> int:
+        es_client.search_by_agent("bench-00042", size=100)
+        es_client.search_by_time_range(size=100)
+        es_client.search_by_threshold("cpu", 80.0, size=100)
+        es_client.search_aggregated_stats(agent="bench-00042")
+        return 4
+
+    return operation
+
+
+@scenario("search", iterations=50, warmup=3)
+def search():
+    """Agent, time range, threshold and aggregation queries against a pre-loaded index"""
+    return _search_operation("default")
+
+
+@scenario("search_optimized", iterations=50, warmup=3)
+def search_optimized():
+    """The search queries against a metrics-optimized index (values read back from doc values)"""
+    return _search_operation("metrics-optimized")
+
+
+@scenario("search_fanout", iterations=5, warmup=1)
+def search_fanout():
+    """Fleet-wide views over 100 agents: one _msearch, one collapse and one terms + top_hits request"""
+    es_client = _search_client("default")
+
+    def operation() -> int:
+        es_client.search_agents_batch(["bench-*"], size=10)
+        es_client.latest_per_agent()
+        es_client.top_agents_by("cpu", k=10)
+        return 3
+
+    return operation
+
+
+@scenario("async_search", iterations=20, warmup=2)
+def async_search():
+    """100 concurrent agent searches on the async client over a 2 ms round-trip, 32 requests in flight"""
+    import asyncio
+
+    from elk.async_search import AsyncElasticsearchClient
+    from elk.elk_search import ElasticsearchClient
+    from fakes.elasticsearch import FakeAsyncElasticsearch
+
+    now = time.time()
+    loader = ElasticsearchClient(es=FakeElasticsearch())
+    loader.index_metrics_batch(
+        [{"agent": f"bench-{agent:05d}", "timestamp": now - tick * 5} for agent in range(100) for tick in range(10)]
+    )
+    es = FakeAsyncElasticsearch(loader.es, latency=0.002)
+
+    def operation() -> int:
+        async def run() -> int:
+            client = AsyncElasticsearchClient(es=es, max_in_flight=32)
+            results = await asyncio.gather(
+                *(client.search_by_agent(f"bench-{agent:05d}", size=10) for agent in range(100))
+            )
+            return len(results)
+
+        return asyncio.run(run())
+
+    return operation
+
+
+@scenario("grouped_stats", iterations=20, warmup=2)
+def grouped_stats():
+    """Per-agent statistics of 100 agents paged through a composite aggregation, 25 agents per page"""
+    es_client = _search_client("default")
+
+    def operation() -> int:
+        return sum(1 for _ in es_client.iter_grouped_stats(page_size=25))
+
+    return operation
+
+
+@scenario("fleet_snapshot", iterations=2000, warmup=50)
+def fleet_snapshot():
+    """Top-10 by CPU over a 10k-host fleet table with a range filter"""
+    from grpc_server.fleet import FleetTable
+
+    fleet = FleetTable()
+    for request in _requests(10000, 1):
+        fleet.update(request)
+
+    def operation() -> int:
+        fleet.query(ranges=[("memory_percent", 30.0, None)], sort_by="cpu_percent", top_k=10)
+        return 1
+
+    return operation
+
+
+@scenario("rollup", iterations=50, warmup=3)
+def rollup():
+    """Aggregate one micro-batch per tick of a 2k-host fleet into 10s/1m/5m host and group rollups"""
+    from elk.rollup import RollupAggregator, RollupService
+
+    ticks = 60
+    messages = _kafka_messages(2000, ticks)
+    batch = len(messages) // ticks
+    service = RollupService(consumer=FakeConsumer(), producer=FakeProducer(), lateness=0)
+    position = [0]
+
+    def operation() -> int:
+        start = position[0] % ticks * batch
+        if start == 0:
+            # Replaying from the first tick: start over instead of counting everything as late
+            service.aggregator = RollupAggregator(lateness=0)
+        position[0] += 1
+        service.process_batch(messages[start:start + batch])
+        return batch
+
+    return operation
+
+
+@scenario("anomaly_scan", iterations=200, warmup=40)
+def anomaly_scan():
+    """EWMA anomaly scan of a 50k-host micro-batch (every host updated since the previous scan)"""
+    import numpy as np
+
+    from grpc_server.anomaly import EwmaDetector
+
+    hosts = 50000
+    detector = EwmaDetector()
+    slots = np.arange(hosts)
+    generations = np.ones(hosts, dtype=np.int64)
+    timestamps = np.full(hosts, int(time.time()), dtype=np.int64)
+    simulator = FleetSimulator(hosts, seed=11)
+    batches = [simulator.tick(tick) for tick in range(20)]
+    position = [0]
+
+    def operation() -> int:
+        values = batches[position[0] % len(batches)]
+        position[0] += 1
+        detector.score(slots, generations, values, timestamps)
+        return hosts
+
+    return operation
+
+
+@scenario("tsdb_query", iterations=200, warmup=10)
+def tsdb_query():
+    """Hot agent range and downsample queries against an hour of a 100-host fleet in the time-series store"""
+    from datetime import datetime
+
+    import numpy as np
+
+    from tsdb.hybrid import HybridSearchClient
+    from tsdb.store import TimeSeriesStore
+
+    hosts = [f"bench-{agent:05d}" for agent in range(100)]
+    ticks = 720
+    now = int(time.time())
+    store = TimeSeriesStore(retention_seconds=3600)
+    simulator = FleetSimulator(len(hosts), seed=7)
+    for tick in range(ticks):
+        values = simulator.tick(tick)[:, [0, 1, 4, 5, 6, 7]]
+        store.append_batch(hosts, np.full(len(hosts), now - (ticks - tick) * 5, dtype=np.int64), values)
+    client = HybridSearchClient(store)
+    end = datetime.fromtimestamp(now)
+
+    def operation() -> int:
+        client.search_by_time_range(datetime.fromtimestamp(now - 600), end, size=100, agent="bench-00042")
+        client.search_downsampled(datetime.fromtimestamp(now - 3600), end, interval=60, agent="bench-00042")
+        return 2
+
+    return operation
+
+
+@scenario("replay", iterations=10, warmup=1)
+def replay():
+    """Replay 20k metrics topic messages of one partition into an empty index with concurrent bulk requests"""
+    from config import Config
+    from elk.elk_search import ElasticsearchClient
+    from elk.replay import plan_replay, replay_partition
+
+    consumer = FakeConsumer(messages=_kafka_messages(2000, 10))
+    task = plan_replay(consumer, Config.MONITORING_TOPIC)[0]
+
+    def operation() -> int:
+        es_client = ElasticsearchClient(es=FakeElasticsearch())
+        totals = replay_partition(consumer, es_client, Config.MONITORING_TOPIC, task, bulk_threads=4)
+        return totals["indexed"]
+
+    return operation
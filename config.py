@@ -13,8 +13,21 @@ class Config:
     HOSTNAME = socket.gethostname()
     HOST = os.getenv("GRPC_SERVER_HOST", "localhost")
     PORT = int(os.getenv("GRPC_SERVER_PORT", "50051"))
+    GRPC_MAX_WORKERS = int(os.getenv("GRPC_MAX_WORKERS", "10"))
+    GRPC_PROCESSES = int(os.getenv("GRPC_PROCESSES", "1"))
+    COMMAND_POLICY = os.getenv("COMMAND_POLICY", "grpc_server.policy.CpuIntervalPolicy")
+    COMMAND_COOLDOWN_SECONDS = float(os.getenv("COMMAND_COOLDOWN_SECONDS", "30"))
+    DIAGNOSTIC_COOLDOWN_SECONDS = float(os.getenv("DIAGNOSTIC_COOLDOWN_SECONDS", "300"))
+    FLEET_MAX_AGE_SECONDS = float(os.getenv("FLEET_MAX_AGE_SECONDS", "3600"))
+    ANOMALY_DETECTION = os.getenv("ANOMALY_DETECTION", "0").lower() in ("1", "true", "yes")
+    ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "4.0"))
+    ANOMALY_ALPHA = float(os.getenv("ANOMALY_ALPHA", "0.05"))
+    ANOMALY_SEASONAL = os.getenv("ANOMALY_SEASONAL", "0").lower() in ("1", "true", "yes")
+    TRACING = os.getenv("TRACING", "1").lower() in ("1", "true", "yes")
+    ANOMALY_DIAGNOSTICS = os.getenv("ANOMALY_DIAGNOSTICS", "0").lower() in ("1", "true", "yes")
     MONITORING_TOPIC = "metrics"
     COMMAND_TOPIC = "command"
+    ANOMALY_TOPIC = os.getenv("ANOMALY_TOPIC", "anomalies")
     MONITORING_GROUP_ID = os.getenv("MONITORING_GROUP_ID", "monitoring")
     COMMAND_GROUP_ID = os.getenv("COMMAND_GROUP_ID", "cmd")
     KAFKA_BOOTSTRAP_SERVER = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
@@ -24,3 +37,18 @@ class Config:
     )
     ETCD_HOST = os.getenv("ETCD_HOST", "localhost")
     ETCD_PORT = int(os.getenv("ETCD_PORT", "2379"))
+    ETCD_MAX_TXN_OPS = int(os.getenv("ETCD_MAX_TXN_OPS", "128"))
+    HEARTBEAT_STALE_SECONDS = float(os.getenv("HEARTBEAT_STALE_SECONDS", "60"))
+    AGENT_STATS_PORT = int(os.getenv("AGENT_STATS_PORT", "0"))
+    SERVER_STATS_PORT = int(os.getenv("SERVER_STATS_PORT", "0"))
+    INDEXER_STATS_PORT = int(os.getenv("INDEXER_STATS_PORT", "0"))
+    AGENT_CONFIG_CACHE_DIR = os.getenv("AGENT_CONFIG_CACHE_DIR", os.path.expanduser("~/.cache/monitor-agent"))
+    AGENT_CONFIG_RECONCILE_JITTER = float(os.getenv("AGENT_CONFIG_RECONCILE_JITTER", "5"))
+    ANALYSIS_QUERY_PORT = int(os.getenv("ANALYSIS_QUERY_PORT", "50070"))
+    TSDB_RETENTION_HOURS = float(os.getenv("TSDB_RETENTION_HOURS", "2"))
+    TSDB_QUERY_PORT = int(os.getenv("TSDB_QUERY_PORT", "50071"))
+    ES_INDEX_PROFILE = os.getenv("ES_INDEX_PROFILE", "default")
+    ES_MAX_CONNECTIONS = int(os.getenv("ES_MAX_CONNECTIONS", "25"))
+    ES_MAX_RETRIES = int(os.getenv("ES_MAX_RETRIES", "3"))
+    ES_TIMEOUT = float(os.getenv("ES_TIMEOUT", "30"))
+    ES_MAX_IN_FLIGHT = int(os.getenv("ES_MAX_IN_FLIGHT", "32"))
@@ -0,0 +1,12 @@
+"""
+Controller module - administration of the layered fleet configuration and fleet liveness in etcd
+"""
+
+from controller.config_admin import ConfigAdmin, ConfigConflictError
+from controller.fleet import FleetController
+
+__all__ = [
+    "ConfigAdmin",
+    "ConfigConflictError",
+    "FleetController",
+]
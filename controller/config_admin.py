@@ -0,0 +1,247 @@
+"""
+Config admin - read and update the global, group and host configuration layers
+
+Every update is a read followed by one etcd transaction that writes the layer
+only if its mod revision is still the one that was read, so concurrent admins
+never overwrite each other's changes; a lost race is re-read and retried.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.etcd_config import CONFIG_PREFIX, LAYERS, layer_key, merge_layers
+from agent.utils import deep_merge
+from config import Config
+from elk.rollup_schema import group_of
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ConfigConflictError(Exception):
+    """A layer changed between reading and writing it (or since the expected revision)"""
+
+
+def nested(path: str, value: Any) -> Dict[str, Any]:
+    """
+    Dictionary holding value at a dotted path ("thresholds.cpu_percent" -> {"thresholds": {"cpu_percent": v}})
+
+    Args:
+        path: Dotted key path
+        value: Value at the path
+
+    Returns:
+        Nested dictionary
+    """
+    for part in reversed(path.split(".")):
+        value = {part: value}
+    return value
+
+
+def without(config: Dict[str, Any], path: str) -> Dict[str, Any]:
+    """
+    Copy of config with the dotted path removed (unchanged if the path does not exist)
+
+    Args:
+        config: Layer configuration
+        path: Dotted key path
+
+    Returns:
+        New configuration
+    """
+    head, _, rest = path.partition(".")
+    if head not in config:
+        return config
+    result = dict(config)
+    if not rest:
+        del result[head]
+    elif isinstance(result[head], dict):
+        result[head] = without(result[head], rest)
+    return result
+
+
+def edit_config(
+    current: Dict[str, Any],
+    values: Optional[Dict[str, Any]] = None,
+    unset: Optional[List[str]] = None,
+    replace: bool = False,
+) -> Dict[str, Any]:
+    """
+    Layer configuration after an update
+
+    Args:
+        current: Current layer configuration
+        values: Settings to deep-merge into the layer
+        unset: Dotted paths to remove from the layer
+        replace: Replace the layer with values instead of merging
+
+    Returns:
+        New layer configuration
+    """
+    config = dict(values or {}) if replace else deep_merge(current, values or {})
+    for path in unset or []:
+        config = without(config, path)
+    return config
+
+
+class ConfigAdmin:
+    """Reads and atomically updates configuration layers under one etcd prefix"""
+
+    def __init__(
+        self,
+        client=None,
+        etcd_host: str = Config.ETCD_HOST,
+        etcd_port: int = Config.ETCD_PORT,
+        prefix: str = CONFIG_PREFIX,
+    ):
+        """
+        Initialize config admin
+
+        Args:
+            client: Pre-built etcd3 client (or compatible stand-in); created from host/port if None
+            etcd_host: etcd server hostname
+            etcd_port: etcd server port
+            prefix: Configuration prefix (the agents' prefix)
+        """
+        if client is None:
+            import etcd3
+
+            client = etcd3.client(host=etcd_host, port=etcd_port)
+        self.etcd = client
+        self.prefix = prefix
+
+    def key(self, layer: str, name: Optional[str] = None) -> str:
+        """etcd key of a layer (see agent.etcd_config.layer_key)"""
+        return layer_key(layer, name, self.prefix)
+
+    def get_layer(self, layer: str, name: Optional[str] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Read one layer
+
+        Args:
+            layer: "global", "group" or "host"
+            name: Group name or hostname
+
+        Returns:
+            (configuration, mod revision); ({}, 0) when the key does not exist
+        """
+        value, metadata = self.etcd.get(self.key(layer, name))
+        if metadata is None:
+            return {}, 0
+        return json.loads(value.decode("utf-8")), metadata.mod_revision
+
+    def update_layer(
+        self,
+        layer: str,
+        name: Optional[str] = None,
+        values: Optional[Dict[str, Any]] = None,
+        unset: Optional[List[str]] = None,
+        replace: bool = False,
+        expected_revision: Optional[int] = None,
+        retries: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Merge values into a layer (or replace it) in one guarded transaction
+
+        Args:
+            layer: "global", "group" or "host"
+            name: Group name or hostname
+            values: Settings to deep-merge into the layer
+            unset: Dotted paths to remove from the layer
+            replace: Replace the layer with values instead of merging
+            expected_revision: Fail unless the layer is still at this mod revision (0: must not exist);
+                without it a concurrent change is re-read and the update retried
+            retries: Attempts when the layer changes concurrently
+
+        Returns:
+            {"key", "config", "revision", "changed"}
+
+        Raises:
+            ConfigConflictError: The layer is not at expected_revision, or kept changing for `retries` attempts
+        """
+        key = self.key(layer, name)
+        txn = self.etcd.transactions
+        for _ in range(max(1, retries)):
+            current, revision = self.get_layer(layer, name)
+            if expected_revision is not None and revision != expected_revision:
+                raise ConfigConflictError(f"{key} is at revision {revision}, expected {expected_revision}")
+            config = edit_config(current, values, unset, replace)
+            if config == current and revision:
+                return {"key": key, "config": config, "revision": revision, "changed": False}
+            succeeded, responses = self.etcd.transaction(
+                compare=[txn.mod(key) == revision],
+                success=[txn.put(key, json.dumps(config, indent=2))],
+                failure=[],
+            )
+            if succeeded:
+                new_revision = responses[0].response_put.header.revision
+                logger.info(f"Updated {key} at revision {new_revision}")
+                return {"key": key, "config": config, "revision": new_revision, "changed": True}
+            if expected_revision is not None:
+                raise ConfigConflictError(f"{key} changed while updating it")
+            logger.info(f"{key} changed concurrently, retrying")
+        raise ConfigConflictError(f"{key} kept changing, gave up after {retries} attempts")
+
+    def delete_layer(self, layer: str, name: Optional[str] = None, expected_revision: Optional[int] = None) -> bool:
+        """
+        Delete a layer (agents fall back to the layers below it)
+
+        Args:
+            layer: "global", "group" or "host"
+            name: Group name or hostname
+            expected_revision: Only delete if the layer is still at this mod revision
+
+        Returns:
+            True if the key existed and was deleted
+        """
+        key = self.key(layer, name)
+        txn = self.etcd.transactions
+        compare = [txn.version(key) > 0]
+        if expected_revision is not None:
+            compare.append(txn.mod(key) == expected_revision)
+        deleted, _ = self.etcd.transaction(compare=compare, success=[txn.delete(key)], failure=[])
+        if deleted:
+            logger.info(f"Deleted {key}")
+        return deleted
+
+    def list_layers(self) -> List[Dict[str, Any]]:
+        """
+        Global and group layers (host layers are not listed: one range read per host would not scale)
+
+        Returns:
+            [{"layer", "name", "key", "revision", "config"}] global first, then groups by name
+        """
+        layers = []
+        for value, metadata in self.etcd.get_prefix(f"{self.prefix}@"):
+            key = metadata.key.decode("utf-8")
+            name = key[len(self.prefix) + 1:]
+            if name == "global":
+                entry = {"layer": "global", "name": None}
+            elif name.startswith("group/"):
+                entry = {"layer": "group", "name": name[len("group/"):]}
+            else:
+                continue
+            entry.update(key=key, revision=metadata.mod_revision, config=json.loads(value.decode("utf-8")))
+            layers.append(entry)
+        layers.sort(key=lambda entry: (entry["layer"] != "global", entry["name"] or ""))
+        return layers
+
+    def effective_config(self, hostname: str, group: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Configuration an agent ends up with, read in one transaction
+
+        Args:
+            hostname: Agent hostname
+            group: Agent group (default: the hostname without its numeric suffix)
+
+        Returns:
+            {"group", "layers": {layer: config}, "config": merged configuration}
+        """
+        group = group or group_of(hostname)
+        keys = {"global": self.key("global"), "group": self.key("group", group), "host": self.key("host", hostname)}
+        txn = self.etcd.transactions
+        _, responses = self.etcd.transaction(compare=[], success=[txn.get(key) for key in keys.values()])
+        layers = {}
+        for layer, kvs in zip(LAYERS, responses):
+            layers[layer] = json.loads(kvs[0][0].decode("utf-8")) if kvs else {}
+        return {"group": group, "layers": layers, "config": merge_layers(layers)}
@@ -0,0 +1,367 @@
+"""
+Fleet controller - fleet-wide liveness and bulk host-layer edits in a few etcd requests
+
+- Heartbeats (/monitor/heartbeat/<host>) and the configuration layers are each
+  read with one range request, whatever the number of hosts
+- Hosts are live, stale (no heartbeat within max_age) or stopped (the agent
+  wrote -1 on shutdown)
+- Bulk edits write the host layers in transactions of up to ETCD_MAX_TXN_OPS
+  puts, each guarded by the mod revisions read; a batch that lost a race is
+  re-read in one transaction and retried
+- Host layers written by pre-layering agents (full copies of the defaults)
+  are migrated by stripping the settings equal to DEFAULT_CONFIG
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from agent.etcd_config import CONFIG_PREFIX, DEFAULT_CONFIG, HEARTBEAT_PREFIX, layer_key, merge_layers
+from config import Config
+from controller.config_admin import edit_config
+from elk.rollup_schema import group_of
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+HOST_STATES = ("live", "stale", "stopped")
+
+
+def _batches(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def strip_defaults(config: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A layer without the settings equal to the defaults (nested dictionaries are compared key by key)
+
+    Args:
+        config: Layer configuration
+        defaults: Default configuration
+
+    Returns:
+        The settings of config that differ from defaults
+    """
+    stripped = {}
+    for key, value in config.items():
+        default = defaults.get(key)
+        if isinstance(value, dict) and isinstance(default, dict):
+            value = strip_defaults(value, default)
+            if value:
+                stripped[key] = value
+        elif key not in defaults or value != default:
+            stripped[key] = value
+    return stripped
+
+
+class FleetController:
+    """Fleet-wide reads and batched, revision-guarded writes of heartbeats and host layers"""
+
+    def __init__(
+        self,
+        client=None,
+        etcd_host: str = Config.ETCD_HOST,
+        etcd_port: int = Config.ETCD_PORT,
+        prefix: str = CONFIG_PREFIX,
+        heartbeat_prefix: str = HEARTBEAT_PREFIX,
+        batch_size: int = Config.ETCD_MAX_TXN_OPS,
+    ):
+        """
+        Initialize fleet controller
+
+        Args:
+            client: Pre-built etcd3 client (or compatible stand-in); created from host/port if None
+            etcd_host: etcd server hostname
+            etcd_port: etcd server port
+            prefix: Configuration prefix (the agents' prefix)
+            heartbeat_prefix: Prefix of the agents' heartbeat keys
+            batch_size: Hosts per transaction (at most etcd's --max-txn-ops)
+        """
+        if client is None:
+            import etcd3
+
+            client = etcd3.client(host=etcd_host, port=etcd_port)
+        self.etcd = client
+        self.prefix = prefix
+        self.heartbeat_prefix = heartbeat_prefix
+        self.batch_size = max(1, batch_size)
+
+    def heartbeats(self) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """
+        Read every heartbeat in one range request
+
+        Returns:
+            ({hostname: {"timestamp", "revision"}}, etcd revision of the read); timestamp is
+            -1 for an agent that shut down and None for an unreadable value
+        """
+        heartbeats = {}
+        revision = 0
+        for value, metadata in self.etcd.get_prefix(self.heartbeat_prefix):
+            hostname = metadata.key.decode("utf-8")[len(self.heartbeat_prefix):]
+            try:
+                timestamp = float(value.decode("utf-8"))
+            except ValueError:
+                timestamp = None
+            heartbeats[hostname] = {"timestamp": timestamp, "revision": metadata.mod_revision}
+            revision = max(revision, metadata.response_header.revision)
+        return heartbeats, revision
+
+    def liveness(self, max_age: float = Config.HEARTBEAT_STALE_SECONDS, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Split the hosts with a heartbeat into live, stale and stopped
+
+        Args:
+            max_age: Seconds since the last heartbeat before a host is stale
+            now: Reference time (default: current time)
+
+        Returns:
+            {"live": [...], "stale": [...], "stopped": [...], "ages": {hostname: seconds or None}, "revision"}
+        """
+        now = time.time() if now is None else now
+        heartbeats, revision = self.heartbeats()
+        result: Dict[str, Any] = {state: [] for state in HOST_STATES}
+        ages = {}
+        for hostname, heartbeat in sorted(heartbeats.items()):
+            timestamp = heartbeat["timestamp"]
+            if timestamp is not None and timestamp < 0:
+                ages[hostname] = None
+                result["stopped"].append(hostname)
+                continue
+            ages[hostname] = round(now - timestamp, 1) if timestamp is not None else None
+            fresh = timestamp is not None and now - timestamp <= max_age
+            result["live" if fresh else "stale"].append(hostname)
+        result["ages"] = ages
+        result["revision"] = revision
+        return result
+
+    def config_snapshot(self) -> Dict[str, Any]:
+        """
+        Read the global, group and host layers in one range request
+
+        Returns:
+            {"global": (config, mod revision), "groups": {group: (config, mod revision)},
+             "hosts": {hostname: (config, mod revision)}, "revision"}
+        """
+        snapshot: Dict[str, Any] = {"global": ({}, 0), "groups": {}, "hosts": {}, "revision": 0}
+        group_prefix = f"{self.prefix}@group/"
+        for value, metadata in self.etcd.get_prefix(self.prefix):
+            key = metadata.key.decode("utf-8")
+            entry = (json.loads(value.decode("utf-8")), metadata.mod_revision)
+            snapshot["revision"] = max(snapshot["revision"], metadata.response_header.revision)
+            if key == layer_key("global", prefix=self.prefix):
+                snapshot["global"] = entry
+            elif key.startswith(group_prefix):
+                snapshot["groups"][key[len(group_prefix):]] = entry
+            elif not key[len(self.prefix):].startswith("@"):
+                snapshot["hosts"][key[len(self.prefix):]] = entry
+        return snapshot
+
+    def effective_configs(
+        self, hostnames: Iterable[str], snapshot: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Configuration each host ends up with (hosts in their default group)
+
+        Args:
+            hostnames: Hosts to resolve
+            snapshot: Result of config_snapshot (read if None)
+
+        Returns:
+            {hostname: merged configuration}
+        """
+        snapshot = snapshot or self.config_snapshot()
+        global_layer = snapshot["global"][0]
+        configs = {}
+        for hostname in hostnames:
+            layers = {
+                "global": global_layer,
+                "group": snapshot["groups"].get(group_of(hostname), ({}, 0))[0],
+                "host": snapshot["hosts"].get(hostname, ({}, 0))[0],
+            }
+            configs[hostname] = merge_layers(layers)
+        return configs
+
+    def select_hosts(
+        self,
+        hostnames: Optional[Iterable[str]] = None,
+        group: Optional[str] = None,
+        states: Optional[Iterable[str]] = None,
+        max_age: float = Config.HEARTBEAT_STALE_SECONDS,
+        liveness: Optional[Dict[str, Any]] = None,
+        snapshot: Optional[Dict[str, Any]] = None,
+    ) -> List[str]:
+        """
+        Hosts matching all the given filters
+
+        Without hostnames, the candidates are every host with a heartbeat or a host layer.
+
+        Args:
+            hostnames: Explicit hosts
+            group: Only hosts of this group
+            states: Only hosts in these liveness states ("live", "stale", "stopped")
+            max_age: Seconds since the last heartbeat before a host is stale
+            liveness: Result of liveness, to reuse a read already made
+            snapshot: Result of config_snapshot, to reuse a read already made
+
+        Returns:
+            Sorted hostnames
+        """
+        if hostnames is not None:
+            selected = set(hostnames)
+        else:
+            liveness = liveness or self.liveness(max_age)
+            snapshot = snapshot or self.config_snapshot()
+            selected = set(liveness["ages"]) | set(snapshot["hosts"])
+        if group:
+            selected = {hostname for hostname in selected if group_of(hostname) == group}
+        if states:
+            liveness = liveness or self.liveness(max_age)
+            selected &= {hostname for state in states for hostname in liveness[state]}
+        return sorted(selected)
+
+    def _read_host_layers(self, hostnames: List[str]) -> Dict[str, Tuple[Dict[str, Any], int]]:
+        """Current host layers of a batch, read in one transaction"""
+        txn = self.etcd.transactions
+        keys = [layer_key("host", hostname, self.prefix) for hostname in hostnames]
+        _, responses = self.etcd.transaction(compare=[], success=[txn.get(key) for key in keys])
+        layers = {}
+        for hostname, kvs in zip(hostnames, responses):
+            layers[hostname] = (json.loads(kvs[0][0].decode("utf-8")), kvs[0][1].mod_revision) if kvs else ({}, 0)
+        return layers
+
+    def bulk_update(
+        self,
+        hostnames: Iterable[str],
+        values: Optional[Dict[str, Any]] = None,
+        unset: Optional[List[str]] = None,
+        replace: bool = False,
+        unchanged_since: Optional[int] = None,
+        retries: int = 5,
+        transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Merge values into (or replace) the host layers of many hosts
+
+        Layers are read with one range request and written in transactions of
+        batch_size puts, each guarded by the mod revisions read. A batch that
+        lost a race is re-read in one transaction and retried.
+
+        Args:
+            hostnames: Hosts whose layer to edit
+            values: Settings to deep-merge into each host layer
+            unset: Dotted paths to remove from each host layer
+            replace: Replace the host layers with values instead of merging
+            unchanged_since: Skip (as conflicts) hosts whose layer changed after this revision
+                (e.g., the revision of a fleet-status the edit was decided on)
+            retries: Attempts per batch when layers change concurrently
+            transform: Function applied to each edited layer (e.g., strip_defaults)
+
+        Returns:
+            {"updated": [...], "unchanged": [...], "conflicts": [...], "transactions", "revision"}
+        """
+        pending = sorted(set(hostnames))
+        snapshot = self.config_snapshot()
+        current = {hostname: snapshot["hosts"].get(hostname, ({}, 0)) for hostname in pending}
+        result: Dict[str, Any] = {
+            "updated": [],
+            "unchanged": [],
+            "conflicts": [],
+            "transactions": 0,
+            "revision": snapshot["revision"],
+        }
+        txn = self.etcd.transactions
+        for batch in _batches(pending, self.batch_size):
+            for _ in range(max(1, retries)):
+                compare, success, changed = [], [], []
+                for hostname in batch:
+                    config, revision = current[hostname]
+                    if unchanged_since is not None and revision > unchanged_since:
+                        result["conflicts"].append(hostname)
+                        continue
+                    new_config = edit_config(config, values, unset, replace)
+                    if transform is not None:
+                        new_config = transform(new_config)
+                    # Nothing to write, and no empty layer to create
+                    if new_config == config and (revision or not new_config):
+                        result["unchanged"].append(hostname)
+                        continue
+                    key = layer_key("host", hostname, self.prefix)
+                    compare.append(txn.mod(key) == revision)
+                    success.append(txn.put(key, json.dumps(new_config, indent=2)))
+                    changed.append(hostname)
+                if not changed:
+                    break
+                succeeded, responses = self.etcd.transaction(compare=compare, success=success, failure=[])
+                result["transactions"] += 1
+                if succeeded:
+                    result["updated"].extend(changed)
+                    result["revision"] = responses[0].response_put.header.revision
+                    break
+                logger.info(f"Host layers of a batch of {len(changed)} changed concurrently, retrying")
+                current.update(self._read_host_layers(changed))
+                batch = changed
+            else:
+                result["conflicts"].extend(batch)
+        logger.info(
+            f"Bulk update: {len(result['updated'])} updated, {len(result['unchanged'])} unchanged, "
+            f"{len(result['conflicts'])} conflicts in {result['transactions']} transactions"
+        )
+        return result
+
+    def strip_default_settings(
+        self, hostnames: Iterable[str], defaults: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Remove the settings equal to the built-in defaults from host layers
+
+        Agents before the layered configuration wrote the full default config
+        (and full merged configs on CONFIG commands) to their host key, which
+        is now the highest layer: those copies pin every setting and hide group
+        and global edits. Stripping them leaves only real host overrides.
+
+        Args:
+            hostnames: Hosts whose layer to migrate
+            defaults: Settings to strip (default: DEFAULT_CONFIG, the legacy agent defaults)
+            **kwargs: Passed to bulk_update (unset, unchanged_since, retries)
+
+        Returns:
+            bulk_update result
+        """
+        defaults = DEFAULT_CONFIG if defaults is None else defaults
+        return self.bulk_update(hostnames, transform=lambda config: strip_defaults(config, defaults), **kwargs)
+
+    def prune_heartbeats(self, hostnames: Iterable[str]) -> Dict[str, Any]:
+        """
+        Delete the heartbeat keys of hosts (e.g., decommissioned stale or stopped hosts)
+
+        A key is only deleted if it is unchanged since it was read, so a host
+        that came back meanwhile keeps its heartbeat.
+
+        Args:
+            hostnames: Hosts whose heartbeat to delete
+
+        Returns:
+            {"deleted": [...], "kept": [...], "transactions"}
+        """
+        heartbeats, _ = self.heartbeats()
+        pending = sorted(hostname for hostname in set(hostnames) if hostname in heartbeats)
+        result: Dict[str, Any] = {"deleted": [], "kept": [], "transactions": 0}
+        txn = self.etcd.transactions
+        for batch in _batches(pending, self.batch_size):
+            keys = [f"{self.heartbeat_prefix}{hostname}" for hostname in batch]
+            compare = [txn.mod(key) == heartbeats[hostname]["revision"] for hostname, key in zip(batch, keys)]
+            succeeded, _ = self.etcd.transaction(
+                compare=compare, success=[txn.delete(key) for key in keys], failure=[]
+            )
+            result["transactions"] += 1
+            if succeeded:
+                result["deleted"].extend(batch)
+                continue
+            # Some host wrote a heartbeat meanwhile: delete the others one guarded op at a time
+            for hostname, key, guard in zip(batch, keys, compare):
+                deleted, _ = self.etcd.transaction(compare=[guard], success=[txn.delete(key)], failure=[])
+                result["transactions"] += 1
+                result["deleted" if deleted else "kept"].append(hostname)
+        logger.info(f"Pruned {len(result['deleted'])} heartbeats, kept {len(result['kept'])} that changed")
+        return result
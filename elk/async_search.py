@@ -0,0 +1,433 @@
+"""
+Async Elasticsearch client - the ElasticsearchClient API on AsyncElasticsearch
+
+Request bodies and response parsing come from elk.queries, so results match
+ElasticsearchClient. Every request goes through one semaphore, which caps the
+requests in flight per client however many coroutines use it; the transport
+keeps a pool of up to ES_MAX_CONNECTIONS connections and retries timeouts and
+429/502/503/504 responses.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from elasticsearch.exceptions import ConflictError
+
+from config import Config
+from elk.elk_search import RETRY_ON_STATUS
+from elk.queries import (
+    METRIC_FIELDS,
+    MetricQueries,
+    is_agent_pattern,
+    metric_document,
+    metric_document_id,
+    time_window,
+)
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class AsyncElasticsearchClient(MetricQueries):
+    """Async client for indexing and searching agent metrics in Elasticsearch"""
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 9200,
+        index_name: str = "agent-metrics",
+        es=None,
+        mappings: Optional[Dict[str, Any]] = None,
+        profile: Optional[str] = None,
+        max_in_flight: int = Config.ES_MAX_IN_FLIGHT,
+        max_connections: int = Config.ES_MAX_CONNECTIONS,
+        max_retries: int = Config.ES_MAX_RETRIES,
+        timeout: float = Config.ES_TIMEOUT,
+    ):
+        """
+        Initialize async Elasticsearch client
+
+        The index is created on the first write (or by ensure_index), not here.
+
+        Args:
+            host: Elasticsearch host (default: localhost)
+            port: Elasticsearch port (default: 9200)
+            index_name: Name of the index to use (default: agent-metrics)
+            es: Pre-built AsyncElasticsearch client (or compatible stand-in); created from host/port if None
+            mappings: Index body used when creating the index (default: the profile's)
+            profile: Metric index profile, a key of INDEX_PROFILES (default: ES_INDEX_PROFILE env var)
+            max_in_flight: Maximum concurrent requests of this client
+            max_connections: Connections kept per Elasticsearch node
+            max_retries: Retries of a request on timeouts, connection errors and RETRY_ON_STATUS
+            timeout: Request timeout in seconds
+        """
+        super().__init__(index_name=index_name, mappings=mappings, profile=profile)
+        if es is None:
+            try:
+                from elasticsearch import AsyncElasticsearch
+            except ImportError:
+                raise ImportError(
+                    "aiohttp is required for the async Elasticsearch client. Install it with: pip install aiohttp"
+                )
+            es = AsyncElasticsearch(
+                [f"http://{host}:{port}"],
+                maxsize=max_connections,
+                timeout=timeout,
+                max_retries=max_retries,
+                retry_on_timeout=True,
+                retry_on_status=RETRY_ON_STATUS,
+            )
+        self.host = host
+        self.port = port
+        self.es = es
+        self.max_in_flight = max_in_flight
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._index_ready = False
+
+    async def __aenter__(self) -> "AsyncElasticsearchClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _request(self, method, **kwargs) -> Any:
+        """Call an AsyncElasticsearch method once a request slot is free"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            return await method(**kwargs)
+
+    async def ensure_index(self):
+        """Create index if it doesn't exist with proper mapping"""
+        if self._index_ready:
+            return
+        try:
+            if not await self._request(self.es.indices.exists, index=self.index_name):
+                await self._request(self.es.indices.create, index=self.index_name, body=self.mappings)
+                logger.info(f"Created index: {self.index_name}")
+            self._index_ready = True
+        except Exception as e:
+            logger.error(f"Error creating index: {e}")
+
+    async def index_metric(
+        self,
+        agent: str,
+        agent_id: int,
+        timestamp: int,
+        cpu: float,
+        memory: float,
+        disk_read: float,
+        disk_write: float,
+        net_in: float,
+        net_out: float,
+    ) -> bool:
+        """
+        Index a single metric document (see ElasticsearchClient.index_metric)
+
+        Returns:
+            True if successful or already indexed, False otherwise
+        """
+        await self.ensure_index()
+        doc = metric_document(
+            {
+                "agent": agent,
+                "agent_id": agent_id,
+                "timestamp": timestamp,
+                "cpu": cpu,
+                "memory": memory,
+                "disk_read": disk_read,
+                "disk_write": disk_write,
+                "net_in": net_in,
+                "net_out": net_out,
+            }
+        )
+        try:
+            await self._request(
+                self.es.index,
+                index=self.index_name,
+                id=metric_document_id(agent, timestamp),
+                document=doc,
+                op_type="create",
+            )
+            return True
+        except ConflictError:
+            logger.debug(f"Metric of {agent} at {timestamp} already indexed")
+            return True
+        except Exception as e:
+            logger.error(f"Error indexing metric: {e}")
+            return False
+
+    async def _bulk_chunk(self, actions: List[Dict[str, Any]]) -> int:
+        """Send one bulk request; returns documents now present (created or already indexed)"""
+        lines: List[Dict[str, Any]] = []
+        for action in actions:
+            meta = {"_index": action["_index"]}
+            if "_id" in action:
+                meta["_id"] = action["_id"]
+            lines.extend([{action.get("_op_type", "index"): meta}, action["_source"]])
+        try:
+            response = await self._request(self.es.bulk, body=lines)
+        except Exception as e:
+            logger.error(f"Error bulk indexing: {e}")
+            return 0
+        present = failed = 0
+        for item in response["items"]:
+            status = next(iter(item.values()))["status"]
+            if status < 300 or status == 409:
+                present += 1
+            else:
+                failed += 1
+        if failed:
+            logger.warning(f"Indexed {present} documents, {failed} failed")
+        return present
+
+    async def index_metrics_batch(self, metrics: List[Dict[str, Any]], chunk_size: int = 500) -> int:
+        """
+        Index multiple metrics as concurrent bulk requests of chunk_size documents
+
+        Documents are created with deterministic IDs, so samples that are
+        already indexed count as successful. Concurrency is bounded by max_in_flight.
+
+        Args:
+            metrics: List of metric dictionaries
+            chunk_size: Documents per bulk request
+
+        Returns:
+            Number of documents now present (created or already indexed)
+        """
+        await self.ensure_index()
+        actions = self._metric_actions(metrics)
+        chunks = [actions[start : start + chunk_size] for start in range(0, len(actions), chunk_size)]
+        return sum(await asyncio.gather(*(self._bulk_chunk(chunk) for chunk in chunks)))
+
+    async def _search(self, body: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+        """Run a search and return the hits as documents (see ElasticsearchClient._search)"""
+        response = await self._request(
+            self.es.search, index=self.index_name, body=self._with_docvalues(body), size=size
+        )
+        return self._documents(response["hits"]["hits"])
+
+    async def _aggregate(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Run an aggregation-only search"""
+        return await self._request(self.es.search, index=self.index_name, body=body, size=0)
+
+    async def search_all(self, size: int = 100) -> List[Dict[str, Any]]:
+        """Search all documents"""
+        try:
+            return await self._search({"query": {"match_all": {}}}, size)
+        except Exception as e:
+            logger.error(f"Error searching: {e}")
+            return []
+
+    async def search_by_agent(self, agent: str, size: int = 100) -> List[Dict[str, Any]]:
+        """Search metrics by agent name, newest first"""
+        try:
+            return await self._search(self._agent_body(agent), size)
+        except Exception as e:
+            logger.error(f"Error searching by agent: {e}")
+            return []
+
+    async def resolve_agents(self, agents: List[str], max_agents: int = 1000) -> List[str]:
+        """Expand agent globs into the agent names present in the index"""
+        names = {agent for agent in agents if not is_agent_pattern(agent)}
+        patterns = [agent for agent in agents if is_agent_pattern(agent)]
+        if patterns:
+            try:
+                response = await self._aggregate(self._resolve_agents_body(patterns, max_agents))
+                names.update(bucket["key"] for bucket in response["aggregations"]["agents"]["buckets"])
+            except Exception as e:
+                logger.error(f"Error resolving agents: {e}")
+        return sorted(names)
+
+    async def search_agents_batch(
+        self,
+        agents: List[str],
+        size: int = 100,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Newest metrics of many agents in one _msearch request"""
+        names = await self.resolve_agents(agents)
+        if not names:
+            return {}
+        try:
+            response = await self._request(
+                self.es.msearch, body=self._agents_batch_lines(names, size, start_time, end_time)
+            )
+        except Exception as e:
+            logger.error(f"Error searching agents: {e}")
+            return {}
+        return self._parse_agents_batch(names, response)
+
+    async def latest_per_agent(
+        self,
+        agents: Optional[List[str]] = None,
+        start_time: Optional[datetime] = None,
+        max_agents: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """Newest sample of every agent (field collapsing on agent)"""
+        start_time, _ = time_window(start_time)
+        try:
+            docs = await self._search(self._latest_body(agents, start_time), max_agents)
+        except Exception as e:
+            logger.error(f"Error getting latest metrics: {e}")
+            return []
+        return sorted(docs, key=lambda doc: doc.get("agent", ""))
+
+    async def top_agents_by(
+        self,
+        metric: str,
+        k: int = 10,
+        stat: str = "max",
+        agents: Optional[List[str]] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """The k agents with the highest value of a metric statistic"""
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._top_agents_body(metric, k, stat, agents, start_time, end_time)
+        try:
+            return self._parse_top_agents(await self._aggregate(body))
+        except Exception as e:
+            logger.error(f"Error getting top agents: {e}")
+            return []
+
+    async def search_by_time_range(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        size: int = 100,
+        agent: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search metrics within a time range (default: the last hour)"""
+        start_time, end_time = time_window(start_time, end_time)
+        try:
+            return await self._search(self._time_range_body(start_time, end_time, agent), size)
+        except Exception as e:
+            logger.error(f"Error searching by time range: {e}")
+            return []
+
+    async def search_by_threshold(
+        self,
+        metric_name: str,
+        threshold: float,
+        operator: str = "gt",
+        size: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Search metrics that exceed a threshold"""
+        try:
+            return await self._search(self._threshold_body(metric_name, threshold, operator), size)
+        except Exception as e:
+            logger.error(f"Error searching by threshold: {e}")
+            return []
+
+    async def search_aggregated_stats(
+        self,
+        agent: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        percents: Optional[List[float]] = None,
+        method: str = "tdigest",
+    ) -> Dict[str, Any]:
+        """Get aggregated statistics (avg, min, max and optional percentiles) for all metrics"""
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._aggregated_stats_body(agent, start_time, end_time, percents, method)
+        try:
+            return self._parse_aggregated_stats(await self._aggregate(body))
+        except Exception as e:
+            logger.error(f"Error getting aggregated stats: {e}")
+            return {}
+
+    async def search_percentile_ranks(
+        self,
+        thresholds: Dict[str, List[float]],
+        agent: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        method: str = "tdigest",
+    ) -> Dict[str, Dict[float, Optional[float]]]:
+        """Percentage of samples at or below each threshold, {metric: {value: percent}}"""
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._percentile_ranks_body(thresholds, agent, start_time, end_time, method)
+        try:
+            return self._parse_percentile_ranks(await self._aggregate(body))
+        except Exception as e:
+            logger.error(f"Error getting percentile ranks: {e}")
+            return {}
+
+    async def search_histogram(
+        self,
+        metric: str,
+        interval: float,
+        agent: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        min_doc_count: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Distribution of one metric in fixed-width value buckets, [{"key", "count"}]"""
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._histogram_body(metric, interval, agent, start_time, end_time, min_doc_count)
+        try:
+            return self._parse_histogram(await self._aggregate(body))
+        except Exception as e:
+            logger.error(f"Error getting histogram: {e}")
+            return []
+
+    async def iter_grouped_stats(
+        self,
+        by: str = "agent",
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        agents: Optional[List[str]] = None,
+        metrics: Optional[List[str]] = None,
+        page_size: int = 1000,
+        percents: Optional[List[float]] = None,
+        method: str = "tdigest",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream per-agent or per-group statistics, one composite page per request"""
+        start_time, end_time = time_window(start_time, end_time)
+        metrics = metrics or METRIC_FIELDS
+        body = self._grouped_stats_body(by, start_time, end_time, agents, metrics, page_size, percents, method)
+        while "aggs" in body:
+            response = await self._aggregate(body)
+            for record in self._parse_grouped_page(by, metrics, page_size, body, response):
+                yield record
+
+    async def search_downsampled(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        interval: int = 60,
+        agent: Optional[str] = None,
+        max_agents: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """Per-agent count, avg, min and max of every metric in fixed time buckets"""
+        start_time, end_time = time_window(start_time, end_time)
+        try:
+            return self._parse_downsampled(
+                await self._aggregate(self._downsample_body(start_time, end_time, interval, agent, max_agents))
+            )
+        except Exception as e:
+            logger.error(f"Error getting downsampled metrics: {e}")
+            return []
+
+    async def get_index_info(self) -> Dict[str, Any]:
+        """Get information about the index"""
+        try:
+            stats, count = await asyncio.gather(
+                self._request(self.es.indices.stats, index=self.index_name),
+                self._request(self.es.count, index=self.index_name),
+            )
+            return {
+                "index_name": self.index_name,
+                "document_count": count["count"],
+                "size": stats["_all"]["total"]["store"]["size_in_bytes"],
+            }
+        except Exception as e:
+            logger.error(f"Error getting index info: {e}")
+            return {}
+
+    async def close(self):
+        """Close the connection pool"""
+        await self.es.close()
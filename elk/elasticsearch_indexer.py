@@ -1,10 +1,59 @@
 import json
 import signal
-from typing import Dict, Any
-from datetime import datetime, timedelta
+import time
+from typing import Dict, Any, Optional
 from confluent_kafka import Consumer
 from config import Config
 from elk.elk_search import ElasticsearchClient
+from telemetry.exporter import MetricsRegistry, StatsServer
+from telemetry.log import get_logger, setup_logging
+from telemetry.tracing import HopTracer, trace_from_message
+
+logger = get_logger(__name__)
+
+
+def parse_metric_data(kafka_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Map a metrics topic payload onto an agent-metrics document
+
+    Args:
+        kafka_data: Decoded message value
+
+    Returns:
+        Metric dictionary for ElasticsearchClient.index_metric/index_metrics_batch, None if the
+        message has no sample time (its document ID would not be stable across replays)
+    """
+    hostname = kafka_data.get("hostname", "unknown")
+    metrics = kafka_data.get("metrics", {})
+
+    # Sample time from the agent: documents keep their real time and their ID stays stable across replays.
+    # timestamp_ms tells apart samples of one host within a second; older producers only send seconds.
+    if kafka_data.get("timestamp_ms"):
+        timestamp = kafka_data["timestamp_ms"] / 1000.0
+    elif kafka_data.get("timestamp"):
+        timestamp = kafka_data["timestamp"]
+    else:
+        logger.warning("Skipping message from %s without a timestamp", hostname)
+        return None
+
+    agent_id = 0
+    try:
+        if "-" in hostname:
+            agent_id = int(hostname.split("-")[-1])
+    except ValueError:
+        pass
+
+    return {
+        "agent": hostname,
+        "agent_id": agent_id,
+        "timestamp": timestamp,
+        "cpu": metrics.get("cpu_percent", 0.0),
+        "memory": metrics.get("memory_percent", 0.0),
+        "disk_read": metrics.get("disk_read_mb", 0.0),
+        "disk_write": metrics.get("disk_write_mb", 0.0),
+        "net_in": metrics.get("net_in_mb", 0.0),
+        "net_out": metrics.get("net_out_mb", 0.0),
+    }
 
 
 class ElasticsearchIndexer:
@@ -17,69 +66,63 @@ class ElasticsearchIndexer:
         elasticsearch_port: int = 9200,
         index_name: str = "agent-metrics",
         consumer_group_id: str = "elasticsearch-indexer",
+        es_client: ElasticsearchClient = None,
+        consumer=None,
+        tracer: HopTracer = None,
+        stats_port: int = 0,
     ):
         """
         Initialize Elasticsearch Indexer
+
+        Args:
+            es_client: Pre-built ElasticsearchClient; created from host/port/index if None
+            consumer: Pre-built Kafka consumer (or compatible stand-in); created from config if None
+            tracer: HopTracer stamping the consumed and indexed hops (defaults to one when TRACING is on)
+            stats_port: Local port of the Prometheus-text stats endpoint with the hop latencies (0 disables)
         """
         # Initialize Elasticsearch client
-        self.es_client = ElasticsearchClient(
-            host=elasticsearch_host, port=elasticsearch_port, index_name=index_name
-        )
+        if es_client is None:
+            es_client = ElasticsearchClient(
+                host=elasticsearch_host, port=elasticsearch_port, index_name=index_name
+            )
+        self.es_client = es_client
 
         # Initialize Kafka consumer
-        kafka_server = kafka_bootstrap_server or Config.KAFKA_BOOTSTRAP_SERVER
-        self.consumer = Consumer(
-            {
-                "bootstrap.servers": kafka_server,
-                "group.id": consumer_group_id,
-                "auto.offset.reset": "earliest",
-                "enable.auto.commit": True,
-                "auto.commit.interval.ms": 1000,
-            }
-        )
+        if consumer is None:
+            kafka_server = kafka_bootstrap_server or Config.KAFKA_BOOTSTRAP_SERVER
+            consumer = Consumer(
+                {
+                    "bootstrap.servers": kafka_server,
+                    "group.id": consumer_group_id,
+                    "auto.offset.reset": "earliest",
+                    "enable.auto.commit": True,
+                    "auto.commit.interval.ms": 1000,
+                }
+            )
+        self.consumer = consumer
         self.consumer.subscribe([Config.MONITORING_TOPIC])
 
         self.running = False
         self.indexed_count = 0
         self.error_count = 0
 
+        self.tracer = tracer if tracer is not None else (HopTracer() if Config.TRACING else None)
+        self.stats_server = None
+        if stats_port and self.tracer is not None:
+            registry = MetricsRegistry()
+            registry.register(self.tracer.render)
+            self.stats_server = StatsServer(registry, stats_port)
+
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
 
     def _signal_handler(self, signum, frame):
-        print(f"\nReceived signal {signum}, shutting down gracefully...")
+        logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.stop()
 
-    def _parse_metric_data(self, kafka_data: Dict[str, Any]) -> Dict[str, Any]:
-        hostname = kafka_data.get("hostname", "unknown")
-        metrics = kafka_data.get("metrics", {})
-
-        current_utc = datetime.utcnow()
-        timestamp = int(current_utc.timestamp())
-
-        print(
-            f"DEBUG TIME: Đang index dữ liệu vào lúc {current_utc} (UTC) -> Timestamp số: {timestamp}"
-        )
-
-        agent_id = 0
-        try:
-            if "-" in hostname:
-                agent_id = int(hostname.split("-")[-1])
-        except ValueError:
-            pass
-
-        return {
-            "agent": hostname,
-            "agent_id": agent_id,
-            "timestamp": timestamp,  # Bây giờ nó là số nguyên (int), code sẽ hết lỗi
-            "cpu": metrics.get("cpu_percent", 0.0),
-            "memory": metrics.get("memory_percent", 0.0),
-            "disk_read": metrics.get("disk_read_mb", 0.0),
-            "disk_write": metrics.get("disk_write_mb", 0.0),
-            "net_in": metrics.get("net_in_mb", 0.0),
-            "net_out": metrics.get("net_out_mb", 0.0),
-        }
+    def _parse_metric_data(self, kafka_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return parse_metric_data(kafka_data)
 
     def _index_metric(self, metric_data: Dict[str, Any]) -> bool:
         """
@@ -98,15 +141,16 @@ class ElasticsearchIndexer:
                 net_out=metric_data["net_out"],
             )
         except Exception as e:
-            print(f"Error indexing metric: {e}")
+            logger.error(f"Error indexing metric: {e}")
             return False
 
     def process_message(self, msg) -> bool:
         """Process một Kafka message"""
         if msg.error():
-            print(f"Consumer error: {msg.error()}")
+            logger.error(f"Consumer error: {msg.error()}")
             return False
 
+        consumed_at = time.time()
         try:
             # Decode message
             key = msg.key().decode("utf-8") if msg.key() else None
@@ -114,13 +158,17 @@ class ElasticsearchIndexer:
 
             # Parse và index
             metric_data = self._parse_metric_data(value)
-            success = self._index_metric(metric_data)
+            success = metric_data is not None and self._index_metric(metric_data)
 
             if success:
+                if self.tracer is not None:
+                    trace = trace_from_message(msg, value)
+                    self.tracer.stamp(trace, "consumed", consumed_at)
+                    self.tracer.stamp(trace, "indexed")
                 self.indexed_count += 1
                 if self.indexed_count % 100 == 0:
-                    print(
-                        f"✓ Indexed {self.indexed_count} metrics (errors: {self.error_count})"
+                    logger.info(
+                        f"Indexed {self.indexed_count} metrics (errors: {self.error_count})"
                     )
             else:
                 self.error_count += 1
@@ -128,33 +176,35 @@ class ElasticsearchIndexer:
             return success
 
         except json.JSONDecodeError as e:
-            print(f"Error decoding JSON: {e}")
+            logger.error(f"Error decoding JSON: {e}")
             self.error_count += 1
             return False
         except Exception as e:
-            print(f"Error processing message: {e}")
+            logger.error(f"Error processing message: {e}")
             self.error_count += 1
             return False
 
     def start(self):
         """Bắt đầu consumer loop"""
-        print("Starting Elasticsearch Indexer...")
-        print(f"  Kafka: {Config.KAFKA_BOOTSTRAP_SERVER}")
-        print(f"  Topic: {Config.MONITORING_TOPIC}")
-        print(f"  Elasticsearch: http://{self.es_client.host}:{self.es_client.port}")
-        print(f"  Index: {self.es_client.index_name}")
-        print("Press Ctrl+C to stop\n")
+        logger.info("Starting Elasticsearch Indexer...")
+        logger.info(f"  Kafka: {Config.KAFKA_BOOTSTRAP_SERVER}")
+        logger.info(f"  Topic: {Config.MONITORING_TOPIC}")
+        logger.info(f"  Elasticsearch: http://{self.es_client.host}:{self.es_client.port}")
+        logger.info(f"  Index: {self.es_client.index_name}")
+        logger.info("Press Ctrl+C to stop")
 
         # Check Elasticsearch connection
         try:
             if not self.es_client.es.ping():
-                print("ERROR: Cannot connect to Elasticsearch!")
+                logger.error("Cannot connect to Elasticsearch!")
                 return
         except Exception as e:
-            print(f"ERROR: Cannot connect to Elasticsearch: {e}")
+            logger.error(f"Cannot connect to Elasticsearch: {e}")
             return
 
         self.running = True
+        if self.stats_server is not None:
+            self.stats_server.start()
 
         try:
             while self.running:
@@ -166,7 +216,7 @@ class ElasticsearchIndexer:
                 self.process_message(msg)
 
         except KeyboardInterrupt:
-            print("\nReceived keyboard interrupt")
+            logger.info("Received keyboard interrupt")
         finally:
             self.stop()
 
@@ -177,10 +227,136 @@ class ElasticsearchIndexer:
 
         self.running = False
         self.consumer.close()
+        if self.stats_server is not None:
+            self.stats_server.stop()
+
+        logger.info("Indexer stopped")
+        logger.info(f"  Total indexed: {self.indexed_count}")
+        logger.info(f"  Total errors: {self.error_count}")
+        if self.tracer is not None:
+            for hop, stats in self.tracer.snapshot().items():
+                logger.info(
+                    f"  Hop {hop}: count={stats['count']} avg={stats['avg_ms']:.1f}ms "
+                    f"p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms"
+                )
 
-        print(f"\n✓ Indexer stopped")
-        print(f"  Total indexed: {self.indexed_count}")
-        print(f"  Total errors: {self.error_count}")
+
+class RollupIndexer:
+    """Consumer that bulk indexes one rollup window topic into its own index"""
+
+    def __init__(
+        self,
+        window: str,
+        kafka_bootstrap_server: str = None,
+        elasticsearch_host: str = "localhost",
+        elasticsearch_port: int = 9200,
+        index_name: str = "agent-metrics",
+        consumer_group_id: str = "elasticsearch-indexer",
+        batch_size: int = 1000,
+        es_client: ElasticsearchClient = None,
+        consumer=None,
+    ):
+        """
+        Initialize rollup indexer
+
+        Args:
+            window: Rollup window (e.g., "1m"); reads topic <MONITORING_TOPIC>-<window>
+                    and writes index <index_name>-<window>
+            batch_size: Maximum messages per bulk request
+            es_client: Pre-built ElasticsearchClient; created from host/port/index if None
+            consumer: Pre-built Kafka consumer (or compatible stand-in); created from config if None
+        """
+        from elk.rollup import ROLLUP_MAPPINGS, rollup_topic
+
+        self.topic = rollup_topic(window)
+        if es_client is None:
+            es_client = ElasticsearchClient(
+                host=elasticsearch_host,
+                port=elasticsearch_port,
+                index_name=f"{index_name}-{window}",
+                mappings=ROLLUP_MAPPINGS,
+            )
+        self.es_client = es_client
+
+        if consumer is None:
+            consumer = Consumer(
+                {
+                    "bootstrap.servers": kafka_bootstrap_server or Config.KAFKA_BOOTSTRAP_SERVER,
+                    "group.id": f"{consumer_group_id}-{window}",
+                    "auto.offset.reset": "earliest",
+                    "enable.auto.commit": True,
+                    "auto.commit.interval.ms": 1000,
+                }
+            )
+        self.consumer = consumer
+        self.consumer.subscribe([self.topic])
+        self.batch_size = batch_size
+
+        self.running = False
+        self.indexed_count = 0
+        self.error_count = 0
+
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        logger.info(f"Received signal {signum}, shutting down gracefully...")
+        self.stop()
+
+    def process_batch(self, messages) -> int:
+        """
+        Index a batch of rollup messages with one bulk request
+
+        Args:
+            messages: Kafka messages from the rollup topic
+
+        Returns:
+            Number of documents indexed
+        """
+        docs = []
+        for msg in messages:
+            if msg.error():
+                logger.error(f"Consumer error: {msg.error()}")
+                self.error_count += 1
+                continue
+            try:
+                docs.append(json.loads(msg.value().decode("utf-8")))
+            except json.JSONDecodeError as e:
+                logger.error(f"Error decoding JSON: {e}")
+                self.error_count += 1
+        if not docs:
+            return 0
+        # One document per (scope, key, bucket): replays overwrite instead of duplicating
+        indexed = self.es_client.index_documents(docs, id_fields=["scope", "key", "timestamp"])
+        self.indexed_count += indexed
+        self.error_count += len(docs) - indexed
+        return indexed
+
+    def start(self):
+        """Bắt đầu consumer loop"""
+        logger.info("Starting rollup indexer...")
+        logger.info(f"  Topic: {self.topic}")
+        logger.info(f"  Index: {self.es_client.index_name}")
+
+        self.running = True
+        try:
+            while self.running:
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=1.0)
+                if messages:
+                    self.process_batch(messages)
+        except KeyboardInterrupt:
+            logger.info("Received keyboard interrupt")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Dừng consumer"""
+        if not self.running:
+            return
+
+        self.running = False
+        self.consumer.close()
+        logger.info(f"Rollup indexer stopped: {self.indexed_count} indexed, {self.error_count} errors")
 
 
 def main():
@@ -222,8 +398,43 @@ def main():
         default="elasticsearch-indexer",
         help="Kafka consumer group ID (default: elasticsearch-indexer)",
     )
+    parser.add_argument(
+        "--rollup",
+        type=str,
+        default=None,
+        metavar="WINDOW",
+        help="Index a rollup topic (10s, 1m, 5m) into <index>-<window> instead of raw metrics",
+    )
+    parser.add_argument(
+        "--stats-port",
+        type=int,
+        default=Config.INDEXER_STATS_PORT,
+        help="Local port for the hop latency stats endpoint (default: INDEXER_STATS_PORT env var, 0 disables)",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO)",
+    )
 
     args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    if args.rollup:
+        from elk.rollup import ROLLUP_WINDOWS
+
+        if args.rollup not in ROLLUP_WINDOWS:
+            parser.error(f"--rollup must be one of {list(ROLLUP_WINDOWS)}")
+        RollupIndexer(
+            args.rollup,
+            kafka_bootstrap_server=args.kafka,
+            elasticsearch_host=args.es_host,
+            elasticsearch_port=args.es_port,
+            index_name=args.index,
+            consumer_group_id=args.consumer_group,
+        ).start()
+        return
 
     # Create và start indexer
     indexer = ElasticsearchIndexer(
@@ -232,6 +443,7 @@ def main():
         elasticsearch_port=args.es_port,
         index_name=args.index,
         consumer_group_id=args.consumer_group,
+        stats_port=args.stats_port,
     )
 
     indexer.start()
@@ -1,14 +1,43 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from datetime import datetime, timedelta
 from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import ConnectionError, RequestError
+from elasticsearch.exceptions import ConflictError, ConnectionError, RequestError
 import json
-
-
-class ElasticsearchClient:
+from config import Config
+from elk.queries import (  # noqa: F401 (re-exported)
+    INDEX_PROFILES,
+    METRIC_FIELDS,
+    METRIC_MAPPINGS,
+    OPTIMIZED_METRIC_MAPPINGS,
+    PERCENTILE_METHODS,
+    MetricQueries,
+    agent_query,
+    is_agent_pattern,
+    metric_document,
+    metric_document_id,
+    time_window,
+)
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+# Status codes retried by the transport (in addition to connection errors and timeouts)
+RETRY_ON_STATUS = (429, 502, 503, 504)
+
+
+class ElasticsearchClient(MetricQueries):
     """Client for indexing and searching agent metrics in Elasticsearch"""
 
-    def __init__(self, host: str = "localhost", port: int = 9200, index_name: str = "agent-metrics"):
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 9200,
+        index_name: str = "agent-metrics",
+        es: Optional[Elasticsearch] = None,
+        mappings: Optional[Dict[str, Any]] = None,
+        profile: Optional[str] = None,
+        ensure_index: bool = True,
+    ):
         """
         Initialize Elasticsearch client
 
@@ -16,42 +45,42 @@ class ElasticsearchClient:
             host: Elasticsearch host (default: localhost)
             port: Elasticsearch port (default: 9200)
             index_name: Name of the index to use (default: agent-metrics)
+            es: Pre-built Elasticsearch client (or compatible stand-in); created from host/port if None
+            mappings: Index body used when creating the index (default: the profile's)
+            profile: Metric index profile, a key of INDEX_PROFILES (default: ES_INDEX_PROFILE env var)
+            ensure_index: Create the index if it does not exist (False for read-only use, which saves
+                the indices.exists request)
         """
+        super().__init__(index_name=index_name, mappings=mappings, profile=profile)
         self.host = host
         self.port = port
-        self.es = Elasticsearch([f"http://{host}:{port}"])
-        self.index_name = index_name
-        self._ensure_index_exists()
+        if es is None:
+            es = Elasticsearch(
+                [f"http://{host}:{port}"],
+                maxsize=Config.ES_MAX_CONNECTIONS,
+                timeout=Config.ES_TIMEOUT,
+                max_retries=Config.ES_MAX_RETRIES,
+                retry_on_timeout=True,
+                retry_on_status=RETRY_ON_STATUS,
+            )
+        self.es = es
+        if ensure_index:
+            self._ensure_index_exists()
 
     def _ensure_index_exists(self):
         """Create index if it doesn't exist with proper mapping"""
         if not self.es.indices.exists(index=self.index_name):
             try:
-                mapping = {
-                    "mappings": {
-                        "properties": {
-                            "agent": {"type": "keyword"},
-                            "agent_id": {"type": "integer"},
-                            "timestamp": {"type": "date"},
-                            "cpu": {"type": "float"},
-                            "memory": {"type": "float"},
-                            "disk_read": {"type": "float"},
-                            "disk_write": {"type": "float"},
-                            "net_in": {"type": "float"},
-                            "net_out": {"type": "float"},
-                        }
-                    }
-                }
-                self.es.indices.create(index=self.index_name, body=mapping)
-                print(f"Created index: {self.index_name}")
+                self.es.indices.create(index=self.index_name, body=self.mappings)
+                logger.info(f"Created index: {self.index_name}")
             except RequestError as e:
-                print(f"Error creating index: {e}")
+                logger.error(f"Error creating index: {e}")
 
     def index_metric(
         self,
         agent: str,
         agent_id: int,
-        timestamp: int,
+        timestamp: float,
         cpu: float,
         memory: float,
         disk_read: float,
@@ -62,10 +91,14 @@ class ElasticsearchClient:
         """
         Index a single metric document
 
+        The document ID is derived from agent and timestamp and the document is
+        created with op_type=create, so indexing the same sample again (Kafka
+        replay, backfill) is a no-op reported as success.
+
         Args:
             agent: Agent name/identifier
             agent_id: Agent ID
-            timestamp: Unix timestamp
+            timestamp: Unix timestamp of the sample
             cpu: CPU usage percentage
             memory: Memory usage percentage
             disk_read: Disk read rate (MB/s)
@@ -77,60 +110,137 @@ class ElasticsearchClient:
             True if successful, False otherwise
         """
         try:
-            doc = {
-                "agent": agent,
-                "agent_id": agent_id,
-                "timestamp": datetime.fromtimestamp(timestamp),
-                "cpu": cpu,
-                "memory": memory,
-                "disk_read": disk_read,
-                "disk_write": disk_write,
-                "net_in": net_in,
-                "net_out": net_out,
-            }
-            self.es.index(index=self.index_name, document=doc)
+            doc = metric_document(
+                {
+                    "agent": agent,
+                    "agent_id": agent_id,
+                    "timestamp": timestamp,
+                    "cpu": cpu,
+                    "memory": memory,
+                    "disk_read": disk_read,
+                    "disk_write": disk_write,
+                    "net_in": net_in,
+                    "net_out": net_out,
+                }
+            )
+            self.es.index(
+                index=self.index_name,
+                id=metric_document_id(agent, timestamp),
+                document=doc,
+                op_type="create",
+            )
+            return True
+        except ConflictError:
+            logger.debug(f"Metric of {agent} at {timestamp} already indexed")
             return True
         except Exception as e:
-            print(f"Error indexing metric: {e}")
+            logger.error(f"Error indexing metric: {e}")
             return False
 
-    def index_metrics_batch(self, metrics: List[Dict[str, Any]]) -> int:
+    def _bulk(self, actions: List[Dict[str, Any]], thread_count: int = 1, chunk_size: int = 500) -> int:
+        """
+        Run bulk actions, optionally as concurrent bulk requests
+
+        Args:
+            actions: Bulk actions
+            thread_count: Concurrent bulk requests (1: sequential)
+            chunk_size: Documents per bulk request
+
+        Returns:
+            Number of documents now present (created, updated or already indexed)
+        """
+        from elasticsearch.helpers import bulk, parallel_bulk
+
+        try:
+            if thread_count > 1:
+                results = parallel_bulk(
+                    self.es,
+                    actions,
+                    thread_count=thread_count,
+                    chunk_size=chunk_size,
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                )
+                success, failed = 0, []
+                for ok, item in results:
+                    if ok:
+                        success += 1
+                    else:
+                        failed.append(item)
+            else:
+                success, failed = bulk(self.es, actions, chunk_size=chunk_size, raise_on_error=False)
+        except Exception as e:
+            logger.error(f"Error bulk indexing: {e}")
+            return 0
+
+        existing = sum(1 for item in failed if item.get("create", {}).get("status") == 409)
+        if len(failed) > existing:
+            logger.warning(f"Indexed {success} documents, {len(failed) - existing} failed")
+        logger.debug(f"Indexed {success} documents, {existing} already indexed")
+        return success + existing
+
+    def index_metrics_batch(
+        self, metrics: List[Dict[str, Any]], thread_count: int = 1, chunk_size: int = 500
+    ) -> int:
         """
         Index multiple metrics in a batch
 
+        Documents are created with deterministic IDs (see index_metric); samples
+        that are already indexed count as successful.
+
         Args:
             metrics: List of metric dictionaries
+            thread_count: Concurrent bulk requests (1: sequential)
+            chunk_size: Documents per bulk request
 
         Returns:
-            Number of successfully indexed documents
+            Number of documents now present (created or already indexed)
+        """
+        return self._bulk(self._metric_actions(metrics), thread_count, chunk_size)
+
+    def index_documents(
+        self,
+        docs: List[Dict[str, Any]],
+        id_fields: Optional[List[str]] = None,
+        thread_count: int = 1,
+        chunk_size: int = 500,
+    ) -> int:
         """
-        from elasticsearch.helpers import bulk
+        Bulk index documents as they are (e.g., rollup records)
+
+        Args:
+            docs: Documents to index
+            id_fields: Fields joined with '-' into the document ID, so re-indexing overwrites (default: auto IDs)
+            thread_count: Concurrent bulk requests (1: sequential)
+            chunk_size: Documents per bulk request
 
+        Returns:
+            Number of successfully indexed documents
+        """
         actions = []
-        for metric in metrics:
-            doc = {
-                "_index": self.index_name,
-                "_source": {
-                    "agent": metric.get("agent", ""),
-                    "agent_id": metric.get("agent_id", 0),
-                    "timestamp": datetime.fromtimestamp(metric.get("timestamp", datetime.now().timestamp())),
-                    "cpu": metric.get("cpu", 0.0),
-                    "memory": metric.get("memory", 0.0),
-                    "disk_read": metric.get("disk_read", 0.0),
-                    "disk_write": metric.get("disk_write", 0.0),
-                    "net_in": metric.get("net_in", 0.0),
-                    "net_out": metric.get("net_out", 0.0),
-                },
-            }
-            actions.append(doc)
+        for doc in docs:
+            action = {"_index": self.index_name, "_source": doc}
+            if id_fields:
+                action["_id"] = "-".join(str(doc[field]) for field in id_fields)
+            actions.append(action)
+        return self._bulk(actions, thread_count, chunk_size)
+
+    def _search(self, body: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+        """
+        Run a search and return the hits as documents
 
-        try:
-            success, failed = bulk(self.es, actions, raise_on_error=False)
-            print(f"Indexed {success} documents, {len(failed)} failed")
-            return success
-        except Exception as e:
-            print(f"Error bulk indexing: {e}")
-            return 0
+        Fields trimmed from _source (see OPTIMIZED_METRIC_MAPPINGS) are requested
+        as doc values and merged back, so both profiles return the same documents.
+
+        Args:
+            body: Search body
+            size: Maximum number of results to return
+
+        Returns:
+            List of documents
+        """
+        response = self.es.search(index=self.index_name, body=self._with_docvalues(body), size=size)
+        return self._documents(response["hits"]["hits"])
 
     def search_all(self, size: int = 100) -> List[Dict[str, Any]]:
         """
@@ -143,15 +253,17 @@ class ElasticsearchClient:
             List of search results
         """
         try:
-            response = self.es.search(index=self.index_name, body={"query": {"match_all": {}}}, size=size)
-            return [hit["_source"] for hit in response["hits"]["hits"]]
+            return self._search({"query": {"match_all": {}}}, size)
         except Exception as e:
-            print(f"Error searching: {e}")
+            logger.error(f"Error searching: {e}")
             return []
 
     def search_by_agent(self, agent: str, size: int = 100) -> List[Dict[str, Any]]:
         """
-        Search metrics by agent name
+        Search metrics by agent name, newest first
+
+        The sort matches the metrics-optimized index sort and the total is not
+        counted, so Elasticsearch stops reading a segment after `size` hits.
 
         Args:
             agent: Agent name to search for
@@ -161,18 +273,136 @@ class ElasticsearchClient:
             List of search results
         """
         try:
-            query = {"query": {"term": {"agent": agent}}}
-            response = self.es.search(index=self.index_name, body=query, size=size)
-            return [hit["_source"] for hit in response["hits"]["hits"]]
+            return self._search(self._agent_body(agent), size)
+        except Exception as e:
+            logger.error(f"Error searching by agent: {e}")
+            return []
+
+    def resolve_agents(self, agents: List[str], max_agents: int = 1000) -> List[str]:
+        """
+        Expand agent globs into the agent names present in the index
+
+        Args:
+            agents: Agent names and/or glob patterns
+            max_agents: Maximum number of names taken from the index
+
+        Returns:
+            Sorted agent names (plain names are kept even without documents)
+        """
+        names = {agent for agent in agents if not is_agent_pattern(agent)}
+        patterns = [agent for agent in agents if is_agent_pattern(agent)]
+        if patterns:
+            try:
+                response = self.es.search(
+                    index=self.index_name, body=self._resolve_agents_body(patterns, max_agents), size=0
+                )
+                names.update(bucket["key"] for bucket in response["aggregations"]["agents"]["buckets"])
+            except Exception as e:
+                logger.error(f"Error resolving agents: {e}")
+        return sorted(names)
+
+    def search_agents_batch(
+        self,
+        agents: List[str],
+        size: int = 100,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Newest metrics of many agents in one _msearch request
+
+        Each agent gets its own search_by_agent-style search, so every agent
+        receives up to `size` results however uneven their sample rates are.
+
+        Args:
+            agents: Agent names and/or glob patterns (globs are resolved first, see resolve_agents)
+            size: Maximum number of results per agent
+            start_time: Optional start datetime
+            end_time: Optional end datetime
+
+        Returns:
+            {agent: [documents, newest first]} in agent order
+        """
+        names = self.resolve_agents(agents)
+        if not names:
+            return {}
+        try:
+            response = self.es.msearch(body=self._agents_batch_lines(names, size, start_time, end_time))
         except Exception as e:
-            print(f"Error searching by agent: {e}")
+            logger.error(f"Error searching agents: {e}")
+            return {}
+        for agent, item in zip(names, response["responses"]):
+            if "error" in item:
+                logger.error(f"Error searching agent {agent}: {item['error']}")
+        return self._parse_agents_batch(names, response)
+
+    def latest_per_agent(
+        self,
+        agents: Optional[List[str]] = None,
+        start_time: Optional[datetime] = None,
+        max_agents: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest sample of every agent (field collapsing on agent)
+
+        Args:
+            agents: Optional agent names and/or glob patterns (default: all agents)
+            start_time: Only consider samples since then (default: 1 hour ago)
+            max_agents: Maximum number of agents returned
+
+        Returns:
+            One document per agent, sorted by agent
+        """
+        start_time, _ = time_window(start_time)
+        try:
+            docs = self._search(self._latest_body(agents, start_time), max_agents)
+        except Exception as e:
+            logger.error(f"Error getting latest metrics: {e}")
             return []
+        return sorted(docs, key=lambda doc: doc.get("agent", ""))
+
+    def top_agents_by(
+        self,
+        metric: str,
+        k: int = 10,
+        stat: str = "max",
+        agents: Optional[List[str]] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        The k agents with the highest value of a metric statistic
+
+        Uses a terms aggregation ordered by the statistic; on multi-shard indices
+        the ranking is approximate like any terms aggregation ordered by a metric.
+
+        Args:
+            metric: Name of the metric (cpu, memory, disk_read, etc.)
+            k: Number of agents
+            stat: "max", "avg" or "min" of the metric per agent
+            agents: Optional agent names and/or glob patterns (default: all agents)
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+
+        Returns:
+            List of {"agent", "value", "count", "sample"} by value descending; sample is the
+            document holding the peak (max/min) or the newest one (avg)
+        """
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._top_agents_body(metric, k, stat, agents, start_time, end_time)
+        try:
+            response = self.es.search(index=self.index_name, body=body, size=0)
+        except Exception as e:
+            logger.error(f"Error getting top agents: {e}")
+            return []
+        return self._parse_top_agents(response)
 
     def search_by_time_range(
         self,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
         size: int = 100,
+        agent: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """
         Search metrics within a time range
@@ -181,31 +411,16 @@ class ElasticsearchClient:
             start_time: Start datetime (default: 1 hour ago)
             end_time: End datetime (default: now)
             size: Maximum number of results to return
+            agent: Optional agent name to filter by
 
         Returns:
             List of search results
         """
-        if end_time is None:
-            end_time = datetime.now()
-        if start_time is None:
-            start_time = end_time - timedelta(hours=1)
-
+        start_time, end_time = time_window(start_time, end_time)
         try:
-            query = {
-                "query": {
-                    "range": {
-                        "timestamp": {
-                            "gte": start_time.isoformat(),
-                            "lte": end_time.isoformat(),
-                        }
-                    }
-                },
-                "sort": [{"timestamp": {"order": "asc"}}],
-            }
-            response = self.es.search(index=self.index_name, body=query, size=size)
-            return [hit["_source"] for hit in response["hits"]["hits"]]
+            return self._search(self._time_range_body(start_time, end_time, agent), size)
         except Exception as e:
-            print(f"Error searching by time range: {e}")
+            logger.error(f"Error searching by time range: {e}")
             return []
 
     def search_by_threshold(
@@ -228,20 +443,9 @@ class ElasticsearchClient:
             List of search results
         """
         try:
-            query = {
-                "query": {
-                    "range": {
-                        metric_name: {
-                            operator: threshold,
-                        }
-                    }
-                },
-                "sort": [{metric_name: {"order": "desc"}}],
-            }
-            response = self.es.search(index=self.index_name, body=query, size=size)
-            return [hit["_source"] for hit in response["hits"]["hits"]]
+            return self._search(self._threshold_body(metric_name, threshold, operator), size)
         except Exception as e:
-            print(f"Error searching by threshold: {e}")
+            logger.error(f"Error searching by threshold: {e}")
             return []
 
     def search_aggregated_stats(
@@ -249,6 +453,8 @@ class ElasticsearchClient:
         agent: Optional[str] = None,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
+        percents: Optional[List[float]] = None,
+        method: str = "tdigest",
     ) -> Dict[str, Any]:
         """
         Get aggregated statistics (avg, min, max) for all metrics
@@ -257,64 +463,199 @@ class ElasticsearchClient:
             agent: Optional agent name to filter by
             start_time: Optional start time
             end_time: Optional end time
+            percents: Optional percentiles to compute in the same request (e.g., [50, 95, 99])
+            method: Percentile estimator, "tdigest" or "hdr" (see PERCENTILE_METHODS)
+
+        Returns:
+            Dictionary with aggregated statistics; with percents, each metric also has
+            "percentiles": {percent: value}
+        """
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._aggregated_stats_body(agent, start_time, end_time, percents, method)
+        try:
+            response = self.es.search(index=self.index_name, body=body, size=0)
+            return self._parse_aggregated_stats(response)
+        except Exception as e:
+            logger.error(f"Error getting aggregated stats: {e}")
+            return {}
+
+    def search_percentile_ranks(
+        self,
+        thresholds: Dict[str, List[float]],
+        agent: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        method: str = "tdigest",
+    ) -> Dict[str, Dict[float, Optional[float]]]:
+        """
+        Percentage of samples at or below each threshold (e.g., an SLO check of cpu <= 90)
+
+        Args:
+            thresholds: {metric: [values]} (e.g., {"cpu": [90], "memory": [80, 95]})
+            agent: Optional agent name to filter by
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            method: Percentile estimator, "tdigest" or "hdr"
+
+        Returns:
+            {metric: {value: percent}}; percent is None when there are no samples
+        """
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._percentile_ranks_body(thresholds, agent, start_time, end_time, method)
+        try:
+            response = self.es.search(index=self.index_name, body=body, size=0)
+            return self._parse_percentile_ranks(response)
+        except Exception as e:
+            logger.error(f"Error getting percentile ranks: {e}")
+            return {}
+
+    def search_histogram(
+        self,
+        metric: str,
+        interval: float,
+        agent: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        min_doc_count: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Distribution of one metric in fixed-width value buckets
+
+        Args:
+            metric: Metric field (e.g., cpu)
+            interval: Bucket width in the metric's unit (e.g., 10 for 10% cpu buckets)
+            agent: Optional agent name to filter by
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            min_doc_count: Leave out buckets with fewer samples (0: keep the empty buckets between min and max)
+
+        Returns:
+            List of {"key": bucket lower bound, "count"} in ascending key order
+        """
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._histogram_body(metric, interval, agent, start_time, end_time, min_doc_count)
+        try:
+            response = self.es.search(index=self.index_name, body=body, size=0)
+            return self._parse_histogram(response)
+        except Exception as e:
+            logger.error(f"Error getting histogram: {e}")
+            return []
+
+    def iter_grouped_stats(
+        self,
+        by: str = "agent",
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        agents: Optional[List[str]] = None,
+        metrics: Optional[List[str]] = None,
+        page_size: int = 1000,
+        percents: Optional[List[float]] = None,
+        method: str = "tdigest",
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream per-agent or per-group statistics, paging through a composite aggregation
+
+        Each page is one request of `page_size` keys continuing after the last
+        key of the previous page, so memory and bucket counts stay bounded
+        however many agents there are. Records are yielded as pages arrive.
+
+        Args:
+            by: "agent" or "group" (see elk.rollup.group_of)
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            agents: Optional agent names and/or glob patterns (default: all agents)
+            metrics: Metrics to aggregate (default: all)
+            page_size: Keys per request
+            percents: Optional percentiles of each metric per key (e.g., [50, 95, 99])
+            method: Percentile estimator, "tdigest" or "hdr"
+
+        Yields:
+            {by: key, "count", "<metric>": {"count", "min", "max", "avg", "sum"[, "percentiles"]}...}
+            in key order; documents indexed without a group are reported under group None
+        """
+        start_time, end_time = time_window(start_time, end_time)
+        metrics = metrics or METRIC_FIELDS
+        body = self._grouped_stats_body(by, start_time, end_time, agents, metrics, page_size, percents, method)
+        while "aggs" in body:
+            response = self.es.search(index=self.index_name, body=body, size=0)
+            yield from self._parse_grouped_page(by, metrics, page_size, body, response)
+
+    def search_downsampled(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        interval: int = 60,
+        agent: Optional[str] = None,
+        max_agents: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-agent count, avg, min and max of every metric in fixed time buckets
+
+        Args:
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            interval: Bucket length in seconds
+            agent: Optional agent name to filter by
+            max_agents: Maximum number of agents (terms aggregation size)
 
         Returns:
-            Dictionary with aggregated statistics
+            List of {"agent", "timestamp", "count", "<metric>_<stat>"...} sorted by agent then timestamp
+        """
+        start_time, end_time = time_window(start_time, end_time)
+        body = self._downsample_body(start_time, end_time, interval, agent, max_agents)
+        try:
+            response = self.es.search(index=self.index_name, body=body, size=0)
+            return self._parse_downsampled(response)
+        except Exception as e:
+            logger.error(f"Error getting downsampled metrics: {e}")
+            return []
+
+    def search_rollups(
+        self,
+        scope: str = "host",
+        key: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        size: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search a rollup index (see elk.rollup) in time order
+
+        Args:
+            scope: "host" or "group"
+            key: Optional hostname or group name to filter by
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            size: Maximum number of results to return
+
+        Returns:
+            List of rollup records
         """
         if end_time is None:
             end_time = datetime.now()
         if start_time is None:
             start_time = end_time - timedelta(hours=1)
 
-        query = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {
-                            "range": {
-                                "timestamp": {
-                                    "gte": start_time.isoformat(),
-                                    "lte": end_time.isoformat(),
-                                }
-                            }
-                        }
-                    ]
-                }
-            },
-            "aggs": {
-                "cpu_stats": {"stats": {"field": "cpu"}},
-                "memory_stats": {"stats": {"field": "memory"}},
-                "disk_read_stats": {"stats": {"field": "disk_read"}},
-                "disk_write_stats": {"stats": {"field": "disk_write"}},
-                "net_in_stats": {"stats": {"field": "net_in"}},
-                "net_out_stats": {"stats": {"field": "net_out"}},
-            },
-        }
-
-        if agent:
-            query["query"]["bool"]["must"].append({"term": {"agent": agent}})
+        must = [
+            {"term": {"scope": scope}},
+            {"range": {"timestamp": {"gte": start_time.isoformat(), "lte": end_time.isoformat()}}},
+        ]
+        if key:
+            must.append({"term": {"key": key}})
 
         try:
-            response = self.es.search(index=self.index_name, body=query, size=0)
-            aggs = response["aggregations"]
-            return {
-                "cpu": aggs["cpu_stats"],
-                "memory": aggs["memory_stats"],
-                "disk_read": aggs["disk_read_stats"],
-                "disk_write": aggs["disk_write_stats"],
-                "net_in": aggs["net_in_stats"],
-                "net_out": aggs["net_out_stats"],
-            }
+            query = {"query": {"bool": {"filter": must}}, "sort": [{"timestamp": {"order": "asc"}}]}
+            return self._search(query, size)
         except Exception as e:
-            print(f"Error getting aggregated stats: {e}")
-            return {}
+            logger.error(f"Error searching rollups: {e}")
+            return []
 
     def get_index_info(self) -> Dict[str, Any]:
         """
         Get information about the index
 
         Returns:
-            Dictionary with index information
+            Dictionary with index information (size summed over the indices behind an alias)
         """
         try:
             stats = self.es.indices.stats(index=self.index_name)
@@ -322,12 +663,75 @@ class ElasticsearchClient:
             return {
                 "index_name": self.index_name,
                 "document_count": count["count"],
-                "size": stats["indices"][self.index_name]["total"]["store"]["size_in_bytes"],
+                "size": stats["_all"]["total"]["store"]["size_in_bytes"],
             }
         except Exception as e:
-            print(f"Error getting index info: {e}")
+            logger.error(f"Error getting index info: {e}")
             return {}
 
+    def reindex_from(self, source_index: str, slices: Any = "auto", timeout: int = 3600) -> Dict[str, Any]:
+        """
+        Copy every document of another index into this one (server-side _reindex)
+
+        Document IDs are kept and documents are created with op_type=create,
+        so an interrupted migration can be run again.
+
+        Args:
+            source_index: Index or alias to copy from (must keep its values in _source)
+            slices: Parallel slices of the reindex ("auto": one per shard)
+            timeout: Request timeout in seconds
+
+        Returns:
+            Reindex response (total, created, version_conflicts, failures...)
+        """
+        body = {
+            "conflicts": "proceed",
+            "source": {"index": source_index},
+            "dest": {"index": self.index_name, "op_type": "create"},
+        }
+        response = self.es.reindex(
+            body=body, slices=slices, refresh=True, wait_for_completion=True, request_timeout=timeout
+        )
+        logger.info(
+            f"Reindexed {source_index} -> {self.index_name}: {response.get('created', 0)} created, "
+            f"{response.get('version_conflicts', 0)} already present"
+        )
+        return response
+
+    def point_alias(self, alias: str, replace_index: bool = False) -> bool:
+        """
+        Atomically point an alias at this index
+
+        An existing alias is moved off its current indices. When the name is a
+        concrete index (the layout before a migration), that index is deleted in
+        the same request if replace_index is set, otherwise nothing is changed.
+
+        Args:
+            alias: Alias name (e.g., agent-metrics)
+            replace_index: Delete a concrete index with the alias's name
+
+        Returns:
+            True if the alias now points at this index
+        """
+        actions = [{"add": {"index": self.index_name, "alias": alias}}]
+        try:
+            if self.es.indices.exists_alias(name=alias):
+                current = self.es.indices.get_alias(name=alias)
+                actions = [
+                    {"remove": {"index": name, "alias": alias}} for name in current if name != self.index_name
+                ] + actions
+            elif self.es.indices.exists(index=alias):
+                if not replace_index:
+                    logger.error(f"'{alias}' is an index; deleting it is required to use the name as an alias")
+                    return False
+                actions.append({"remove_index": {"index": alias}})
+            self.es.indices.update_aliases(body={"actions": actions})
+            logger.info(f"Alias {alias} -> {self.index_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating alias: {e}")
+            return False
+
     def delete_index(self) -> bool:
         """
         Delete the index (use with caution!)
@@ -337,10 +741,10 @@ class ElasticsearchClient:
         """
         try:
             self.es.indices.delete(index=self.index_name)
-            print(f"Deleted index: {self.index_name}")
+            logger.info(f"Deleted index: {self.index_name}")
             return True
         except Exception as e:
-            print(f"Error deleting index: {e}")
+            logger.error(f"Error deleting index: {e}")
             return False
 
 
@@ -0,0 +1,170 @@
+"""
+Index profiles - migrate agent-metrics to another mapping and compare the profiles' size and latency
+
+- migrate: create a new index with a profile's mapping, _reindex the current
+  index into it and point the old name at it as an alias
+- compare_profiles: load the same synthetic samples into one index per profile
+  and measure store size and the latency of the search client's queries
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from elk.elk_search import INDEX_PROFILES, ElasticsearchClient
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def migrate(
+    source: ElasticsearchClient,
+    target_index: str,
+    profile: str = "metrics-optimized",
+    alias: Optional[str] = None,
+    replace_index: bool = False,
+    slices: Any = "auto",
+) -> Dict[str, Any]:
+    """
+    Reindex an index into a new index of another profile
+
+    The source must keep its values in _source (the "default" profile does).
+    Running the migration again only copies documents that are still missing.
+
+    Args:
+        source: Client of the index to migrate
+        target_index: New index name (e.g., agent-metrics-v2)
+        profile: Profile of the new index (key of INDEX_PROFILES)
+        alias: Alias pointed at the new index once the copy is complete (None: no alias change)
+        replace_index: Delete the source index when alias names it (see ElasticsearchClient.point_alias)
+        slices: Parallel slices of the reindex ("auto": one per shard)
+
+    Returns:
+        {"source", "target", "source_count", "target_count", "created", "version_conflicts",
+         "failures", "seconds", "aliased"}
+    """
+    target = ElasticsearchClient(es=source.es, index_name=target_index, profile=profile)
+    source_count = source.es.count(index=source.index_name)["count"]
+    started = time.perf_counter()
+    response = target.reindex_from(source.index_name, slices=slices)
+    seconds = time.perf_counter() - started
+    target_count = target.es.count(index=target_index)["count"]
+
+    result = {
+        "source": source.index_name,
+        "target": target_index,
+        "source_count": source_count,
+        "target_count": target_count,
+        "created": response.get("created", 0),
+        "version_conflicts": response.get("version_conflicts", 0),
+        "failures": len(response.get("failures", [])),
+        "seconds": round(seconds, 2),
+        "aliased": False,
+    }
+    if result["failures"] or target_count < source_count:
+        logger.error(f"Migration incomplete ({target_count}/{source_count} documents), alias left unchanged")
+        return result
+    if alias:
+        result["aliased"] = target.point_alias(alias, replace_index=replace_index)
+    return result
+
+
+def _benchmark_docs(num_docs: int, num_agents: int, interval: float = 5.0) -> List[Dict[str, Any]]:
+    """Simulated samples ending now, one per agent per interval"""
+    from loadgen.simulator import FleetSimulator
+
+    simulator = FleetSimulator(num_agents, seed=7)
+    ticks = max(1, num_docs // num_agents)
+    now = time.time()
+    docs = []
+    for tick in range(ticks):
+        for agent, row in enumerate(simulator.tick(tick).tolist()):
+            docs.append(
+                {
+                    "agent": f"bench-{agent:05d}",
+                    "agent_id": agent,
+                    "timestamp": now - (ticks - tick) * interval,
+                    "cpu": row[0],
+                    "memory": row[1],
+                    "disk_read": row[4],
+                    "disk_write": row[5],
+                    "net_in": row[6],
+                    "net_out": row[7],
+                }
+            )
+    return docs
+
+
+def compare_profiles(
+    es,
+    index_prefix: str = "agent-metrics-bench",
+    num_docs: int = 200000,
+    num_agents: int = 500,
+    repeat: int = 20,
+    profiles: Optional[List[str]] = None,
+    keep: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Load the same samples into one index per profile and compare size and query latency
+
+    Each index is force-merged to one segment before measuring, so sizes are
+    comparable. Query latency is the client-side p50 of `repeat` runs.
+
+    Args:
+        es: Elasticsearch client (or compatible stand-in)
+        index_prefix: Indices are named <index_prefix>-<profile> (recreated if present)
+        num_docs: Samples loaded into each index
+        num_agents: Simulated agents
+        repeat: Runs per query
+        profiles: Profiles to compare (default: all)
+        keep: Keep the indices afterwards
+
+    Returns:
+        One {"profile", "index", "docs", "size", "bytes_per_doc", "<query>_ms"...} per profile
+    """
+    docs = _benchmark_docs(num_docs, num_agents)
+    end_time = datetime.now()
+    queries = {
+        "agent": lambda client: client.search_by_agent("bench-00042", size=100),
+        "agent_hour": lambda client: client.search_by_time_range(
+            end_time - timedelta(hours=1), end_time, size=100, agent="bench-00042"
+        ),
+        "threshold": lambda client: client.search_by_threshold("cpu", 80.0, size=100),
+        "stats": lambda client: client.search_aggregated_stats(
+            agent="bench-00042", start_time=end_time - timedelta(hours=1), end_time=end_time
+        ),
+    }
+
+    results = []
+    for profile in profiles or list(INDEX_PROFILES):
+        index = f"{index_prefix}-{profile}"
+        if es.indices.exists(index=index):
+            es.indices.delete(index=index)
+        client = ElasticsearchClient(es=es, index_name=index, profile=profile)
+        client.index_metrics_batch(docs, thread_count=4)
+        es.indices.refresh(index=index)
+        es.indices.forcemerge(index=index, max_num_segments=1, request_timeout=600)
+        es.indices.refresh(index=index)
+        info = client.get_index_info()
+
+        result = {
+            "profile": profile,
+            "index": index,
+            "docs": info.get("document_count", 0),
+            "size": info.get("size", 0),
+            "bytes_per_doc": round(info.get("size", 0) / max(1, info.get("document_count", 0)), 1),
+        }
+        for name, run in queries.items():
+            run(client)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run(client)
+                timings.append((time.perf_counter() - started) * 1000)
+            result[f"{name}_ms"] = round(statistics.median(timings), 2)
+        results.append(result)
+        logger.info(f"Profile {profile}: {result}")
+        if not keep:
+            client.delete_index()
+    return results
@@ -0,0 +1,534 @@
+"""
+Metric queries - index profiles, documents, request bodies and response parsing
+
+Shared by ElasticsearchClient (elk.elk_search) and AsyncElasticsearchClient
+(elk.async_search): the clients only send what MetricQueries builds and hand
+the responses back to it, so both return the same results.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from elk.rollup_schema import group_of
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+METRIC_FIELDS = ["cpu", "memory", "disk_read", "disk_write", "net_in", "net_out"]
+
+# Index body of the "default" profile: every value as float, full _source
+METRIC_MAPPINGS = {
+    "mappings": {
+        "properties": dict(
+            {
+                "agent": {"type": "keyword"},
+                "agent_id": {"type": "integer"},
+                "group": {"type": "keyword"},
+                "timestamp": {"type": "date"},
+            },
+            **{metric: {"type": "float"} for metric in METRIC_FIELDS},
+        )
+    }
+}
+
+# Index body of the "metrics-optimized" profile:
+# - segments sorted by agent then newest first, so an agent's samples are contiguous
+#   and agent + time-sorted searches can stop early
+# - DEFLATE instead of LZ4 for stored fields
+# - percentages as scaled_float with 0.01 resolution, rates as half_float (about 3 significant digits)
+# - only agent, group and timestamp kept in _source; the numbers are read from doc values. Documents of
+#   this profile cannot be reindexed or updated with their values (the _source does not hold them)
+OPTIMIZED_METRIC_MAPPINGS = {
+    "settings": {
+        "index": {
+            "sort.field": ["agent", "timestamp"],
+            "sort.order": ["asc", "desc"],
+            "codec": "best_compression",
+        }
+    },
+    "mappings": {
+        "_source": {"excludes": ["agent_id"] + METRIC_FIELDS},
+        "properties": {
+            "agent": {"type": "keyword"},
+            "agent_id": {"type": "integer"},
+            "group": {"type": "keyword"},
+            "timestamp": {"type": "date"},
+            "cpu": {"type": "scaled_float", "scaling_factor": 100},
+            "memory": {"type": "scaled_float", "scaling_factor": 100},
+            "disk_read": {"type": "half_float"},
+            "disk_write": {"type": "half_float"},
+            "net_in": {"type": "half_float"},
+            "net_out": {"type": "half_float"},
+        },
+    },
+}
+
+INDEX_PROFILES = {
+    "default": METRIC_MAPPINGS,
+    "metrics-optimized": OPTIMIZED_METRIC_MAPPINGS,
+}
+
+# Newest samples of one agent; matches the metrics-optimized index sort
+AGENT_SORT = [{"agent": {"order": "asc"}}, {"timestamp": {"order": "desc"}}]
+
+# Percentile estimators: t-digest (relative accuracy best at the tails, bounded memory) or
+# HDR histogram (faster, fixed relative error, non-negative values only)
+PERCENTILE_METHODS = {
+    "tdigest": {"compression": 100},
+    "hdr": {"number_of_significant_value_digits": 3},
+}
+
+
+def metric_document_id(agent: str, timestamp: float) -> str:
+    """
+    Deterministic ID of a metric document: agent plus source timestamp in milliseconds
+
+    Args:
+        agent: Agent name/identifier
+        timestamp: Unix timestamp of the sample
+
+    Returns:
+        Document ID (e.g., "web-01-1700000000000")
+    """
+    return f"{agent}-{int(round(timestamp * 1000))}"
+
+
+def is_agent_pattern(agent: str) -> bool:
+    """True if an agent argument is a glob (* or ?) rather than a name"""
+    return "*" in agent or "?" in agent
+
+
+def agent_query(agents: List[str]) -> Dict[str, Any]:
+    """
+    Query clause matching any of the given agent names or globs
+
+    Args:
+        agents: Agent names and/or glob patterns (e.g., ["db-01", "web-*"])
+
+    Returns:
+        terms query, wildcard query, or a bool/should of both
+    """
+    names = [agent for agent in agents if not is_agent_pattern(agent)]
+    clauses = [{"terms": {"agent": names}}] if names else []
+    clauses += [{"wildcard": {"agent": {"value": agent}}} for agent in agents if is_agent_pattern(agent)]
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"bool": {"should": clauses, "minimum_should_match": 1}}
+
+
+def time_window(
+    start_time: Optional[datetime] = None, end_time: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """Fill in the default time range: the hour before end_time, which defaults to now"""
+    if end_time is None:
+        end_time = datetime.now()
+    if start_time is None:
+        start_time = end_time - timedelta(hours=1)
+    return start_time, end_time
+
+
+def time_range_clause(start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> Dict[str, Any]:
+    """Range query on timestamp (open-ended where a bound is None)"""
+    bounds = {}
+    if start_time is not None:
+        bounds["gte"] = start_time.isoformat()
+    if end_time is not None:
+        bounds["lte"] = end_time.isoformat()
+    return {"range": {"timestamp": bounds}}
+
+
+def percentiles_agg(field: str, percents: List[float], method: str = "tdigest") -> Dict[str, Any]:
+    """percentiles aggregation of one field (method: key of PERCENTILE_METHODS)"""
+    return {"percentiles": dict(_estimator(field, method), percents=list(percents))}
+
+
+def percentile_ranks_agg(field: str, values: List[float], method: str = "tdigest") -> Dict[str, Any]:
+    """percentile_ranks aggregation of one field: the percentage of samples at or below each value"""
+    return {"percentile_ranks": dict(_estimator(field, method), values=list(values))}
+
+
+def _estimator(field: str, method: str) -> Dict[str, Any]:
+    if method not in PERCENTILE_METHODS:
+        raise ValueError(f"Unknown percentile method '{method}', expected one of {', '.join(PERCENTILE_METHODS)}")
+    return {"field": field, "keyed": False, method: PERCENTILE_METHODS[method]}
+
+
+def keyed_values(agg: Dict[str, Any]) -> Dict[float, Optional[float]]:
+    """{key: value} of a percentiles or percentile_ranks aggregation sent with keyed: false"""
+    return {float(item["key"]): item["value"] for item in agg["values"]}
+
+
+def metric_document(metric: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Document of one metric sample
+
+    Args:
+        metric: Dictionary with agent, agent_id, timestamp (Unix seconds) and the metric fields
+
+    Returns:
+        Document (timestamp as datetime, serialized as ISO by the client)
+    """
+    agent = metric.get("agent", "")
+    doc = {
+        "agent": agent,
+        "agent_id": metric.get("agent_id", 0),
+        "group": group_of(agent),
+        "timestamp": datetime.fromtimestamp(metric["timestamp"]),
+    }
+    for field in METRIC_FIELDS:
+        doc[field] = metric.get(field, 0.0)
+    return doc
+
+
+class MetricQueries:
+    """Index profile handling, request bodies and response parsing for the agent-metrics index"""
+
+    def __init__(
+        self,
+        index_name: str = "agent-metrics",
+        mappings: Optional[Dict[str, Any]] = None,
+        profile: Optional[str] = None,
+    ):
+        """
+        Initialize query builder
+
+        Args:
+            index_name: Name of the index to use (default: agent-metrics)
+            mappings: Index body used when creating the index (default: the profile's)
+            profile: Metric index profile, a key of INDEX_PROFILES (default: ES_INDEX_PROFILE env var)
+        """
+        if mappings is None:
+            profile = profile or Config.ES_INDEX_PROFILE
+            if profile not in INDEX_PROFILES:
+                raise ValueError(f"Unknown index profile '{profile}', expected one of {', '.join(INDEX_PROFILES)}")
+            mappings = INDEX_PROFILES[profile]
+        self.index_name = index_name
+        self.mappings = mappings
+        # Fields left out of _source are requested from doc values on every search
+        self.docvalue_fields = list(mappings.get("mappings", {}).get("_source", {}).get("excludes", []))
+
+    def _with_docvalues(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Request the fields trimmed from _source as doc values (search or top_hits body)"""
+        if self.docvalue_fields:
+            return dict(body, docvalue_fields=self.docvalue_fields)
+        return body
+
+    @staticmethod
+    def _documents(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn hits into documents, merging doc value fields into _source"""
+        docs = []
+        for hit in hits:
+            doc = hit.get("_source", {})
+            for field, values in hit.get("fields", {}).items():
+                doc[field] = values[0] if len(values) == 1 else values
+            docs.append(doc)
+        return docs
+
+    def _metric_actions(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Bulk create actions of metric samples with deterministic IDs (samples without a timestamp are skipped)"""
+        actions = []
+        for metric in metrics:
+            if not metric.get("timestamp"):
+                logger.warning(f"Skipping sample of {metric.get('agent', '')} without a timestamp")
+                continue
+            actions.append(
+                {
+                    "_op_type": "create",
+                    "_index": self.index_name,
+                    "_id": metric_document_id(metric.get("agent", ""), metric["timestamp"]),
+                    "_source": metric_document(metric),
+                }
+            )
+        return actions
+
+    @staticmethod
+    def _agent_body(
+        agent: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Newest samples of one agent, without counting the total so segments can stop early"""
+        must: List[Dict[str, Any]] = [{"term": {"agent": agent}}]
+        if start_time is not None or end_time is not None:
+            must.append(time_range_clause(start_time, end_time))
+        return {"query": {"bool": {"filter": must}}, "sort": AGENT_SORT, "track_total_hits": False}
+
+    @staticmethod
+    def _time_range_body(start_time: datetime, end_time: datetime, agent: Optional[str] = None) -> Dict[str, Any]:
+        query = {"query": time_range_clause(start_time, end_time), "sort": [{"timestamp": {"order": "asc"}}]}
+        if agent:
+            query["query"] = {"bool": {"must": [query["query"], {"term": {"agent": agent}}]}}
+        return query
+
+    @staticmethod
+    def _threshold_body(metric_name: str, threshold: float, operator: str) -> Dict[str, Any]:
+        return {
+            "query": {"range": {metric_name: {operator: threshold}}},
+            "sort": [{metric_name: {"order": "desc"}}],
+        }
+
+    @staticmethod
+    def _window_query(agent: Optional[str], start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        """Samples of the time range, optionally of one agent"""
+        must: List[Dict[str, Any]] = [time_range_clause(start_time, end_time)]
+        if agent:
+            must.append({"term": {"agent": agent}})
+        return {"bool": {"must": must}}
+
+    @classmethod
+    def _aggregated_stats_body(
+        cls,
+        agent: Optional[str],
+        start_time: datetime,
+        end_time: datetime,
+        percents: Optional[List[float]] = None,
+        method: str = "tdigest",
+    ) -> Dict[str, Any]:
+        aggs = {f"{metric}_stats": {"stats": {"field": metric}} for metric in METRIC_FIELDS}
+        if percents:
+            for metric in METRIC_FIELDS:
+                aggs[f"{metric}_percentiles"] = percentiles_agg(metric, percents, method)
+        return {"query": cls._window_query(agent, start_time, end_time), "aggs": aggs}
+
+    @staticmethod
+    def _parse_aggregated_stats(response: Dict[str, Any]) -> Dict[str, Any]:
+        aggs = response["aggregations"]
+        stats = {}
+        for metric in METRIC_FIELDS:
+            stats[metric] = dict(aggs[f"{metric}_stats"])
+            if f"{metric}_percentiles" in aggs:
+                stats[metric]["percentiles"] = keyed_values(aggs[f"{metric}_percentiles"])
+        return stats
+
+    @classmethod
+    def _percentile_ranks_body(
+        cls,
+        thresholds: Dict[str, List[float]],
+        agent: Optional[str],
+        start_time: datetime,
+        end_time: datetime,
+        method: str = "tdigest",
+    ) -> Dict[str, Any]:
+        aggs = {}
+        for metric, values in thresholds.items():
+            if metric not in METRIC_FIELDS:
+                raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRIC_FIELDS)}")
+            aggs[metric] = percentile_ranks_agg(metric, values, method)
+        return {"query": cls._window_query(agent, start_time, end_time), "aggs": aggs}
+
+    @staticmethod
+    def _parse_percentile_ranks(response: Dict[str, Any]) -> Dict[str, Dict[float, Optional[float]]]:
+        return {metric: keyed_values(agg) for metric, agg in response["aggregations"].items()}
+
+    @classmethod
+    def _histogram_body(
+        cls,
+        metric: str,
+        interval: float,
+        agent: Optional[str],
+        start_time: datetime,
+        end_time: datetime,
+        min_doc_count: int = 0,
+    ) -> Dict[str, Any]:
+        if metric not in METRIC_FIELDS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRIC_FIELDS)}")
+        if interval <= 0:
+            raise ValueError("Histogram interval must be positive")
+        return {
+            "query": cls._window_query(agent, start_time, end_time),
+            "aggs": {
+                "histogram": {"histogram": {"field": metric, "interval": interval, "min_doc_count": min_doc_count}}
+            },
+        }
+
+    @staticmethod
+    def _parse_histogram(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {"key": bucket["key"], "count": bucket["doc_count"]}
+            for bucket in response["aggregations"]["histogram"]["buckets"]
+        ]
+
+    @staticmethod
+    def _resolve_agents_body(patterns: List[str], max_agents: int) -> Dict[str, Any]:
+        return {
+            "query": agent_query(patterns),
+            "aggs": {"agents": {"terms": {"field": "agent", "size": max_agents, "order": {"_key": "asc"}}}},
+        }
+
+    def _agents_batch_lines(
+        self,
+        names: List[str],
+        size: int,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """_msearch header/body pairs, one search per agent"""
+        lines: List[Dict[str, Any]] = []
+        for agent in names:
+            body = dict(self._agent_body(agent, start_time, end_time), size=size)
+            lines.extend([{"index": self.index_name}, self._with_docvalues(body)])
+        return lines
+
+    def _parse_agents_batch(self, names: List[str], response: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        results = {}
+        for agent, item in zip(names, response["responses"]):
+            results[agent] = [] if "error" in item else self._documents(item["hits"]["hits"])
+        return results
+
+    @staticmethod
+    def _latest_body(agents: Optional[List[str]], start_time: datetime) -> Dict[str, Any]:
+        must: List[Dict[str, Any]] = [time_range_clause(start_time)]
+        if agents:
+            must.append(agent_query(agents))
+        return {
+            "query": {"bool": {"filter": must}},
+            "collapse": {"field": "agent"},
+            "sort": [{"timestamp": {"order": "desc"}}],
+            "track_total_hits": False,
+        }
+
+    def _top_agents_body(
+        self,
+        metric: str,
+        k: int,
+        stat: str,
+        agents: Optional[List[str]],
+        start_time: datetime,
+        end_time: datetime,
+    ) -> Dict[str, Any]:
+        sample_sorts = {
+            "max": [{metric: {"order": "desc"}}],
+            "min": [{metric: {"order": "asc"}}],
+            "avg": [{"timestamp": {"order": "desc"}}],
+        }
+        if stat not in sample_sorts:
+            raise ValueError(f"Unknown statistic '{stat}', expected max, avg or min")
+        must: List[Dict[str, Any]] = [time_range_clause(start_time, end_time)]
+        if agents:
+            must.append(agent_query(agents))
+        return {
+            "query": {"bool": {"filter": must}},
+            "aggs": {
+                "agents": {
+                    "terms": {"field": "agent", "size": k, "order": {"value": "desc"}},
+                    "aggs": {
+                        "value": {stat: {"field": metric}},
+                        "sample": {"top_hits": self._with_docvalues({"size": 1, "sort": sample_sorts[stat]})},
+                    },
+                }
+            },
+        }
+
+    def _parse_top_agents(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "agent": bucket["key"],
+                "value": bucket["value"]["value"],
+                "count": bucket["doc_count"],
+                "sample": (self._documents(bucket["sample"]["hits"]["hits"]) or [None])[0],
+            }
+            for bucket in response["aggregations"]["agents"]["buckets"]
+        ]
+
+    @staticmethod
+    def _grouped_stats_body(
+        by: str,
+        start_time: datetime,
+        end_time: datetime,
+        agents: Optional[List[str]],
+        metrics: List[str],
+        page_size: int,
+        percents: Optional[List[float]] = None,
+        method: str = "tdigest",
+    ) -> Dict[str, Any]:
+        """First page of a composite aggregation; later pages set aggs.keys.composite.after"""
+        if by not in ("agent", "group"):
+            raise ValueError(f"Unknown grouping '{by}', expected agent or group")
+        must: List[Dict[str, Any]] = [time_range_clause(start_time, end_time)]
+        if agents:
+            must.append(agent_query(agents))
+        aggs = {metric: {"stats": {"field": metric}} for metric in metrics}
+        if percents:
+            for metric in metrics:
+                aggs[f"{metric}_percentiles"] = percentiles_agg(metric, percents, method)
+        return {
+            "query": {"bool": {"filter": must}},
+            "aggs": {
+                "keys": {
+                    "composite": {
+                        "size": page_size,
+                        "sources": [{by: {"terms": {"field": by, "missing_bucket": by == "group"}}}],
+                    },
+                    "aggs": aggs,
+                }
+            },
+        }
+
+    @staticmethod
+    def _parse_grouped_page(
+        by: str, metrics: List[str], page_size: int, body: Dict[str, Any], response: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Records of one composite page; moves `body` to the next page or clears its aggs when done
+
+        Returns:
+            {by: key, "count", "<metric>": stats...} per key
+        """
+        page = response["aggregations"]["keys"]
+        records = []
+        for bucket in page["buckets"]:
+            record = {by: bucket["key"][by], "count": bucket["doc_count"]}
+            for metric in metrics:
+                record[metric] = dict(bucket[metric])
+                if f"{metric}_percentiles" in bucket:
+                    record[metric]["percentiles"] = keyed_values(bucket[f"{metric}_percentiles"])
+            records.append(record)
+        if len(page["buckets"]) < page_size or "after_key" not in page:
+            body.pop("aggs")
+        else:
+            body["aggs"]["keys"]["composite"]["after"] = page["after_key"]
+        return records
+
+    @staticmethod
+    def _downsample_body(
+        start_time: datetime, end_time: datetime, interval: int, agent: Optional[str], max_agents: int
+    ) -> Dict[str, Any]:
+        must: List[Dict[str, Any]] = [time_range_clause(start_time, end_time)]
+        if agent:
+            must.append({"term": {"agent": agent}})
+        return {
+            "query": {"bool": {"must": must}},
+            "aggs": {
+                "agents": {
+                    "terms": {"field": "agent", "size": max_agents},
+                    "aggs": {
+                        "buckets": {
+                            "date_histogram": {"field": "timestamp", "fixed_interval": f"{interval}s"},
+                            "aggs": {
+                                f"{metric}_{stat}": {stat: {"field": metric}}
+                                for metric in METRIC_FIELDS
+                                for stat in ("avg", "min", "max")
+                            },
+                        }
+                    },
+                }
+            },
+        }
+
+    @staticmethod
+    def _parse_downsampled(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        records = []
+        for agent_bucket in response["aggregations"]["agents"]["buckets"]:
+            for bucket in agent_bucket["buckets"]["buckets"]:
+                if not bucket["doc_count"]:
+                    continue
+                record = {
+                    "agent": agent_bucket["key"],
+                    "timestamp": int(bucket["key"] // 1000),
+                    "count": bucket["doc_count"],
+                }
+                for metric in METRIC_FIELDS:
+                    for stat in ("avg", "min", "max"):
+                        record[f"{metric}_{stat}"] = bucket[f"{metric}_{stat}"]["value"]
+                records.append(record)
+        records.sort(key=lambda r: (r["agent"], r["timestamp"]))
+        return records
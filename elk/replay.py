@@ -0,0 +1,449 @@
+"""
+Replay - rebuild an Elasticsearch index from a Kafka topic
+
+The replay is planned as one offset range per partition: time bounds are
+turned into offsets with offsets_for_times and clamped to the partition's
+watermarks. Partitions are read by parallel worker processes, each with its own
+assigned consumer (no consumer group, nothing committed), and written with
+concurrent bulk requests. Documents have deterministic IDs, so replaying a range
+that is already indexed is safe.
+"""
+
+import json
+import multiprocessing
+import queue
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from confluent_kafka import Consumer, TopicPartition
+
+from config import Config
+from elk.elasticsearch_indexer import parse_metric_data
+from elk.elk_search import ElasticsearchClient
+from elk.rollup import ROLLUP_MAPPINGS, ROLLUP_WINDOWS, rollup_topic
+from telemetry.log import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# Rollup topic -> window name
+ROLLUP_TOPICS = {rollup_topic(window): window for window in ROLLUP_WINDOWS}
+
+
+class PartitionRange(NamedTuple):
+    """Offsets [start, end) of one partition to replay"""
+
+    partition: int
+    start: int
+    end: int
+
+    @property
+    def messages(self) -> int:
+        return max(self.end - self.start, 0)
+
+
+def _replay_consumer(bootstrap_server: Optional[str] = None) -> Consumer:
+    """Consumer used with assign(): private group, no commits"""
+    return Consumer(
+        {
+            "bootstrap.servers": bootstrap_server or Config.KAFKA_BOOTSTRAP_SERVER,
+            "group.id": f"replay-{multiprocessing.current_process().pid}",
+            "enable.auto.commit": False,
+            "auto.offset.reset": "earliest",
+        }
+    )
+
+
+def plan_replay(
+    consumer,
+    topic: str,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    start_offset: Optional[int] = None,
+    end_offset: Optional[int] = None,
+    partitions: Optional[List[int]] = None,
+    timeout: float = 10.0,
+) -> List[PartitionRange]:
+    """
+    Offset range of every partition to replay
+
+    Args:
+        consumer: Kafka consumer (only metadata and offset lookups are used)
+        topic: Topic to replay
+        start_time: Replay messages with a timestamp >= this (epoch seconds)
+        end_time: Stop before the first message with a timestamp >= this (epoch seconds)
+        start_offset: Start offset in every partition (ignored when start_time is given)
+        end_offset: End offset (exclusive) in every partition (ignored when end_time is given)
+        partitions: Only these partitions (default: all)
+        timeout: Seconds per broker request
+
+    Returns:
+        List of PartitionRange, skipping empty ranges
+    """
+    metadata = consumer.list_topics(topic, timeout=timeout)
+    if topic not in metadata.topics or not metadata.topics[topic].partitions:
+        raise ValueError(f"Topic '{topic}' does not exist or has no partitions")
+    available = sorted(metadata.topics[topic].partitions)
+    if partitions is not None:
+        missing = sorted(set(partitions) - set(available))
+        if missing:
+            raise ValueError(f"Topic '{topic}' has no partitions {missing} (available: {available})")
+        available = sorted(partitions)
+
+    def _lookup(when: float) -> Dict[int, int]:
+        found = consumer.offsets_for_times(
+            [TopicPartition(topic, p, int(when * 1000)) for p in available], timeout=timeout
+        )
+        return {tp.partition: tp.offset for tp in found}
+
+    starts = _lookup(start_time) if start_time is not None else {}
+    ends = _lookup(end_time) if end_time is not None else {}
+
+    plan = []
+    for partition in available:
+        low, high = consumer.get_watermark_offsets(TopicPartition(topic, partition), timeout=timeout)
+        if start_time is not None:
+            # -1: no message at or after start_time
+            start = starts[partition] if starts[partition] >= 0 else high
+        else:
+            start = low if start_offset is None else start_offset
+        if end_time is not None:
+            end = ends[partition] if ends[partition] >= 0 else high
+        else:
+            end = high if end_offset is None else end_offset
+        start, end = max(start, low), min(end, high)
+        if end > start:
+            plan.append(PartitionRange(partition, start, end))
+    return plan
+
+
+def replay_partition(
+    consumer,
+    es_client: ElasticsearchClient,
+    topic: str,
+    task: PartitionRange,
+    batch_size: int = 5000,
+    bulk_threads: int = 2,
+    bulk_size: int = 1000,
+    idle_timeout: float = 30.0,
+    report: Optional[Callable[[int, int, int, int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Read one partition range and index it
+
+    Args:
+        consumer: Kafka consumer (assigned to the partition here)
+        es_client: Target index client
+        topic: Topic being replayed (rollup topics are indexed as rollup documents)
+        task: Partition range
+        batch_size: Maximum messages per poll
+        bulk_threads: Concurrent bulk requests
+        bulk_size: Documents per bulk request
+        idle_timeout: Give up when no message arrives for this many seconds
+        report: Called after every batch with (partition, messages read, documents indexed, next offset)
+
+    Returns:
+        Totals {"read", "indexed", "errors"}
+    """
+    consumer.assign([TopicPartition(topic, task.partition, task.start)])
+    rollup = topic in ROLLUP_TOPICS
+    position, read, indexed, errors = task.start, 0, 0, 0
+    last_message = time.monotonic()
+    while position < task.end:
+        messages = consumer.consume(num_messages=min(batch_size, task.end - position), timeout=1.0)
+        if not messages:
+            if time.monotonic() - last_message > idle_timeout:
+                logger.warning(
+                    f"Partition {task.partition}: no message for {idle_timeout:g}s at offset {position}, "
+                    f"stopping {task.end - position} messages short"
+                )
+                break
+            continue
+        last_message = time.monotonic()
+
+        docs = []
+        for msg in messages:
+            if msg.error():
+                errors += 1
+                logger.error(f"Consumer error: {msg.error()}")
+                continue
+            if msg.offset() >= task.end:
+                continue
+            position = max(position, msg.offset() + 1)
+            read += 1
+            try:
+                value = json.loads(msg.value())
+            except ValueError as e:
+                errors += 1
+                logger.error(f"Error decoding JSON: {e}")
+                continue
+            doc = value if rollup else parse_metric_data(value)
+            if doc is None:
+                errors += 1
+                continue
+            docs.append(doc)
+
+        if docs:
+            if rollup:
+                done = es_client.index_documents(
+                    docs, id_fields=["scope", "key", "timestamp"], thread_count=bulk_threads, chunk_size=bulk_size
+                )
+            else:
+                done = es_client.index_metrics_batch(docs, thread_count=bulk_threads, chunk_size=bulk_size)
+            indexed += done
+            errors += len(docs) - done
+        if report is not None:
+            report(task.partition, read, indexed, position)
+    return {"read": read, "indexed": indexed, "errors": errors}
+
+
+def _worker_main(task: PartitionRange, topic: str, options: Dict[str, Any], progress):
+    """Worker process: replay one partition range and post progress to the parent"""
+    setup_logging(options["log_level"])
+    consumer = _replay_consumer(options["kafka"])
+    es_client = ElasticsearchClient(
+        host=options["es_host"], port=options["es_port"], index_name=options["index"], mappings=options["mappings"]
+    )
+    try:
+        totals = replay_partition(
+            consumer,
+            es_client,
+            topic,
+            task,
+            batch_size=options["batch_size"],
+            bulk_threads=options["bulk_threads"],
+            bulk_size=options["bulk_size"],
+            report=lambda partition, read, indexed, offset: progress.put(("progress", partition, read, indexed)),
+        )
+        progress.put(("done", task.partition, totals["read"], totals["indexed"], totals["errors"]))
+    except Exception as e:
+        logger.error(f"Partition {task.partition} failed: {e}")
+        progress.put(("failed", task.partition, str(e)))
+    finally:
+        consumer.close()
+
+
+class ReplayRunner:
+    """Runs partition ranges in parallel worker processes and reports progress"""
+
+    def __init__(self, topic: str, plan: List[PartitionRange], workers: int, options: Dict[str, Any]):
+        """
+        Initialize replay runner
+
+        Args:
+            topic: Topic to replay
+            plan: Partition ranges (see plan_replay)
+            workers: Maximum concurrent worker processes (one partition each)
+            options: Worker settings (kafka, es_host, es_port, index, mappings, batch_size,
+                     bulk_threads, bulk_size, log_level)
+        """
+        self.topic = topic
+        self.plan = plan
+        self.workers = max(1, workers)
+        self.options = options
+        self.read: Dict[int, int] = {task.partition: 0 for task in plan}
+        self.indexed: Dict[int, int] = {task.partition: 0 for task in plan}
+        self.errors = 0
+        self.failed: List[int] = []
+
+    def _report(self, started: float, total: int):
+        read, indexed = sum(self.read.values()), sum(self.indexed.values())
+        elapsed = time.monotonic() - started
+        rate = indexed / elapsed if elapsed > 0 else 0.0
+        remaining = (total - read) / (read / elapsed) if read and elapsed > 0 else 0.0
+        logger.info(
+            f"Replay: {read}/{total} messages ({100.0 * read / max(total, 1):.1f}%), {indexed} indexed, "
+            f"{rate:,.0f} docs/s, ETA {remaining:.0f}s"
+        )
+
+    def run(self, progress_interval: float = 5.0) -> bool:
+        """
+        Replay every partition range
+
+        Args:
+            progress_interval: Seconds between progress lines
+
+        Returns:
+            True when every partition completed
+        """
+        context = multiprocessing.get_context("spawn")
+        progress = context.Queue()
+        pending = sorted(self.plan, key=lambda task: task.messages, reverse=True)
+        running: Dict[int, multiprocessing.Process] = {}
+        total = sum(task.messages for task in self.plan)
+        started = last_report = time.monotonic()
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    task = pending.pop(0)
+                    process = context.Process(
+                        target=_worker_main,
+                        args=(task, self.topic, self.options, progress),
+                        name=f"replay-{task.partition}",
+                        daemon=True,
+                    )
+                    process.start()
+                    running[task.partition] = process
+
+                try:
+                    event = progress.get(timeout=0.5)
+                except queue.Empty:
+                    event = None
+                if event is not None:
+                    kind, partition = event[0], event[1]
+                    if kind == "progress":
+                        self.read[partition], self.indexed[partition] = event[2], event[3]
+                    elif kind == "done":
+                        self.read[partition], self.indexed[partition] = event[2], event[3]
+                        self.errors += event[4]
+                        running.pop(partition).join()
+                    else:
+                        logger.error(f"Partition {partition} failed: {event[2]}")
+                        self.failed.append(partition)
+                        running.pop(partition).join()
+
+                for partition, process in list(running.items()):
+                    # A worker that exits cleanly has already posted its "done" event
+                    if process.exitcode not in (None, 0):
+                        logger.error(f"Worker for partition {partition} exited with code {process.exitcode}")
+                        self.failed.append(partition)
+                        del running[partition]
+
+                if time.monotonic() - last_report >= progress_interval:
+                    last_report = time.monotonic()
+                    self._report(started, total)
+        except KeyboardInterrupt:
+            logger.info("Replay interrupted, stopping workers...")
+            for process in running.values():
+                process.terminate()
+            for process in running.values():
+                process.join()
+            return False
+
+        self._report(started, total)
+        elapsed = time.monotonic() - started
+        logger.info(
+            f"Replay finished in {elapsed:.1f}s: {sum(self.indexed.values())} documents in "
+            f"'{self.options['index']}', {self.errors} errors, failed partitions: {self.failed or 'none'}"
+        )
+        return not self.failed
+
+
+def _parse_time(value: str) -> float:
+    """Epoch seconds from an epoch number or an ISO 8601 date/time (local time when no offset is given)"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Re-index a Kafka topic (or a time/offset range of it) into Elasticsearch"
+    )
+    parser.add_argument(
+        "--topic",
+        type=str,
+        default=Config.MONITORING_TOPIC,
+        help=f"Topic to replay: the metrics topic or a rollup topic (default: {Config.MONITORING_TOPIC})",
+    )
+    parser.add_argument("--from", dest="start_time", type=str, default=None, help="Start time (ISO 8601 or epoch)")
+    parser.add_argument("--to", dest="end_time", type=str, default=None, help="End time, exclusive (ISO 8601 or epoch)")
+    parser.add_argument("--start-offset", type=int, default=None, help="Start offset in every partition")
+    parser.add_argument("--end-offset", type=int, default=None, help="End offset (exclusive) in every partition")
+    parser.add_argument("--partitions", type=str, default=None, help="Comma-separated partitions (default: all)")
+    parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="Target index (default: agent-metrics, or agent-metrics-<window> for a rollup topic)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=Config.KAFKA_DEFAULT_PARTITION,
+        help=f"Parallel partition readers (default: {Config.KAFKA_DEFAULT_PARTITION})",
+    )
+    parser.add_argument(
+        "--bulk-threads",
+        type=int,
+        default=2,
+        help="Concurrent bulk requests per reader (Elasticsearch sees workers x bulk-threads requests)",
+    )
+    parser.add_argument("--bulk-size", type=int, default=1000, help="Documents per bulk request (default: 1000)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Maximum messages per poll (default: 5000)")
+    parser.add_argument("--progress", type=float, default=5.0, help="Seconds between progress lines (default: 5)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the per-partition plan and exit")
+    parser.add_argument(
+        "--kafka",
+        type=str,
+        default=None,
+        help=f"Kafka bootstrap server (default: {Config.KAFKA_BOOTSTRAP_SERVER})",
+    )
+    parser.add_argument("--es-host", type=str, default="localhost", help="Elasticsearch host (default: localhost)")
+    parser.add_argument("--es-port", type=int, default=9200, help="Elasticsearch port (default: 9200)")
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO)",
+    )
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    try:
+        start_time = _parse_time(args.start_time) if args.start_time else None
+        end_time = _parse_time(args.end_time) if args.end_time else None
+    except ValueError as e:
+        parser.error(f"invalid time: {e}")
+    partitions = [int(p) for p in args.partitions.split(",")] if args.partitions else None
+
+    window = ROLLUP_TOPICS.get(args.topic)
+    if args.topic != Config.MONITORING_TOPIC and window is None:
+        parser.error(f"--topic must be {Config.MONITORING_TOPIC} or one of {sorted(ROLLUP_TOPICS)}")
+    index = args.index or ("agent-metrics" if window is None else f"agent-metrics-{window}")
+
+    consumer = _replay_consumer(args.kafka)
+    try:
+        plan = plan_replay(consumer, args.topic, start_time, end_time, args.start_offset, args.end_offset, partitions)
+    except Exception as e:
+        logger.error(f"Cannot plan the replay: {e}")
+        return 1
+    finally:
+        consumer.close()
+
+    total = sum(task.messages for task in plan)
+    print(f"\nReplay of '{args.topic}' into '{index}': {total} messages in {len(plan)} partitions\n")
+    for task in plan:
+        print(f"  partition {task.partition:<4} offsets {task.start}..{task.end - 1} ({task.messages} messages)")
+    if args.dry_run or not plan:
+        return 0
+
+    mappings = ROLLUP_MAPPINGS if window is not None else None
+    # Create the index (with its mapping) once, before the workers start
+    ElasticsearchClient(host=args.es_host, port=args.es_port, index_name=index, mappings=mappings)
+    runner = ReplayRunner(
+        args.topic,
+        plan,
+        args.workers,
+        {
+            "kafka": args.kafka,
+            "es_host": args.es_host,
+            "es_port": args.es_port,
+            "index": index,
+            "mappings": mappings,
+            "batch_size": args.batch_size,
+            "bulk_threads": args.bulk_threads,
+            "bulk_size": args.bulk_size,
+            "log_level": args.log_level,
+        },
+    )
+    return 0 if runner.run(args.progress) else 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Rollups - per-host and per-group window aggregates computed over Kafka micro-batches
+
+Samples from the metrics topic are buffered as NumPy columns and aggregated in
+event time (the sample timestamp) into 10 s, 1 min and 5 min buckets. A bucket
+is emitted once the newest timestamp seen has passed its end by the allowed
+lateness; samples arriving after their bucket was emitted are counted per window
+and left out of that window.
+"""
+
+import json
+import math
+import signal
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for rollups. Install it with: pip install numpy"
+    )
+
+from config import Config
+from elk.rollup_schema import (  # noqa: F401 (re-exported)
+    ROLLUP_MAPPINGS,
+    ROLLUP_METRICS,
+    ROLLUP_STATS,
+    ROLLUP_WINDOWS,
+    SCOPE_GROUP,
+    SCOPE_HOST,
+    group_of,
+    payload_error,
+    rollup_topic,
+)
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def window_aggregates(codes: np.ndarray, buckets: np.ndarray, values: np.ndarray):
+    """
+    Aggregate rows grouped by (bucket, code)
+
+    Args:
+        codes: Integer key per row (host or group code)
+        buckets: Bucket start per row
+        values: Matrix (rows, metrics)
+
+    Returns:
+        Tuple of (group codes, group buckets, counts, avg, min, max, p95), one entry per group
+    """
+    order = np.lexsort((codes, buckets))
+    codes, buckets, values = codes[order], buckets[order], values[order]
+    n = len(codes)
+    change = np.flatnonzero((np.diff(buckets) != 0) | (np.diff(codes) != 0)) + 1
+    starts = np.concatenate(([0], change))
+    counts = np.diff(np.concatenate((starts, [n])))
+
+    sums = np.add.reduceat(values, starts, axis=0)
+    mins = np.minimum.reduceat(values, starts, axis=0)
+    maxs = np.maximum.reduceat(values, starts, axis=0)
+
+    # Nearest-rank p95: sort each column within its group, then index into each group
+    group_ids = np.repeat(np.arange(len(starts)), counts)
+    rank = starts + np.ceil(0.95 * counts).astype(np.int64) - 1
+    p95 = np.empty_like(sums)
+    for column in range(values.shape[1]):
+        within = np.lexsort((values[:, column], group_ids))
+        p95[:, column] = values[within, column][rank]
+
+    return codes[starts], buckets[starts], counts, sums / counts[:, None], mins, maxs, p95
+
+
+class RollupAggregator:
+    """Buffers samples and emits closed window aggregates for hosts and groups"""
+
+    def __init__(self, windows: Optional[Dict[str, int]] = None, lateness: float = 10.0):
+        """
+        Initialize rollup aggregator
+
+        Args:
+            windows: Window name -> seconds (default: ROLLUP_WINDOWS)
+            lateness: Seconds a bucket stays open after its end (in sample time)
+        """
+        self.windows = dict(windows or ROLLUP_WINDOWS)
+        self.lateness = lateness
+        self._host_codes: Dict[str, int] = {}
+        self._hosts: List[str] = []
+        self._group_codes: Dict[str, int] = {}
+        self._groups: List[str] = []
+        self._host_group: List[int] = []
+        self._chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._watermark = -math.inf
+        self._closed_until = {name: -math.inf for name in self.windows}
+        self.samples = 0
+        self.invalid = 0
+        self.late = {name: 0 for name in self.windows}
+
+    def _code(self, hostname: str) -> int:
+        code = self._host_codes.get(hostname)
+        if code is None:
+            code = self._host_codes[hostname] = len(self._hosts)
+            self._hosts.append(hostname)
+            group = group_of(hostname)
+            group_code = self._group_codes.get(group)
+            if group_code is None:
+                group_code = self._group_codes[group] = len(self._groups)
+                self._groups.append(group)
+            self._host_group.append(group_code)
+        return code
+
+    def add(self, payloads: Iterable[Dict[str, Any]]):
+        """
+        Buffer a micro-batch of metrics topic payloads
+
+        Payloads that are not metric samples, including samples without a
+        timestamp, are logged, counted in `invalid` and skipped.
+
+        Args:
+            payloads: Decoded messages ({"hostname", "timestamp", "metrics": {...}})
+        """
+        codes, timestamps, rows = [], [], []
+        fields = list(ROLLUP_METRICS.values())
+        for payload in payloads:
+            error = payload_error(payload, fields)
+            if error is not None:
+                self.invalid += 1
+                logger.error(f"Skipping invalid message: {error}")
+                continue
+            metrics = payload["metrics"]
+            codes.append(self._code(payload.get("hostname", "unknown")))
+            timestamps.append(payload["timestamp"])
+            rows.append([metrics.get(field, 0.0) for field in fields])
+        if not codes:
+            return
+        chunk_ts = np.asarray(timestamps, dtype=np.int64)
+        for name, closed_until in self._closed_until.items():
+            self.late[name] += int(np.count_nonzero(chunk_ts < closed_until))
+        self._chunks.append(
+            (np.asarray(codes, dtype=np.int64), chunk_ts, np.asarray(rows, dtype=np.float64))
+        )
+        self._watermark = max(self._watermark, float(chunk_ts.max()))
+        self.samples += len(codes)
+
+    def flush(self, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        Emit aggregates for every bucket that has closed
+
+        Args:
+            force: Close all buckets regardless of lateness (used on shutdown)
+
+        Returns:
+            Rollup records (flat dictionaries, see _records())
+        """
+        # No sample yet: nothing to close
+        if self._watermark == -math.inf:
+            return []
+        closing = {}
+        for name, size in self.windows.items():
+            if force:
+                close_until = (int(self._watermark) // size + 1) * size
+            else:
+                close_until = int((self._watermark - self.lateness) // size) * size
+            if close_until > self._closed_until[name]:
+                closing[name] = close_until
+        # Most micro-batches close nothing: skip touching the buffer
+        if not self._chunks or not closing:
+            return []
+
+        codes = np.concatenate([c[0] for c in self._chunks])
+        timestamps = np.concatenate([c[1] for c in self._chunks])
+        values = np.concatenate([c[2] for c in self._chunks])
+        host_group = np.asarray(self._host_group, dtype=np.int64)
+
+        records: List[Dict[str, Any]] = []
+        for name, close_until in closing.items():
+            size = self.windows[name]
+            closed_from = self._closed_until[name]
+            ready = (timestamps >= closed_from) & (timestamps < close_until)
+            if ready.any():
+                buckets = timestamps[ready] // size * size
+                for scope, scope_codes, names in (
+                    (SCOPE_HOST, codes[ready], self._hosts),
+                    (SCOPE_GROUP, host_group[codes[ready]], self._groups),
+                ):
+                    records.extend(
+                        self._records(name, size, scope, names, window_aggregates(scope_codes, buckets, values[ready]))
+                    )
+            self._closed_until[name] = close_until
+
+        # Keep only rows some window still needs
+        keep = timestamps >= min(self._closed_until.values())
+        self._chunks = [(codes[keep], timestamps[keep], values[keep])] if keep.any() else []
+        return records
+
+    def _records(self, window: str, size: int, scope: str, names: List[str], aggregates) -> List[Dict[str, Any]]:
+        """Turn aggregate arrays into flat records"""
+        keys, buckets, counts, avg, mins, maxs, p95 = aggregates
+        stats = {"avg": avg, "min": mins, "max": maxs, "p95": p95}
+        metrics = list(ROLLUP_METRICS)
+        records = []
+        for i, (code, start, count) in enumerate(zip(keys.tolist(), buckets.tolist(), counts.tolist())):
+            key = names[code]
+            record = {
+                "window": window,
+                "scope": scope,
+                "key": key,
+                "group": group_of(key) if scope == SCOPE_HOST else key,
+                "timestamp": start,
+                "end": start + size,
+                "count": count,
+            }
+            rows = {stat: array[i].tolist() for stat, array in stats.items()}
+            for j, metric in enumerate(metrics):
+                for stat in ROLLUP_STATS:
+                    record[f"{metric}_{stat}"] = rows[stat][j]
+            records.append(record)
+        return records
+
+
+class RollupService:
+    """Consumes the metrics topic in micro-batches and publishes rollups per window topic"""
+
+    def __init__(
+        self,
+        consumer=None,
+        producer=None,
+        windows: Optional[Dict[str, int]] = None,
+        lateness: float = 10.0,
+        batch_size: int = 5000,
+        consumer_group_id: str = "rollup",
+    ):
+        """
+        Initialize rollup service
+
+        Args:
+            consumer: Optional Kafka consumer (defaults to a confluent_kafka.Consumer in consumer_group_id)
+            producer: Optional Kafka producer (defaults to a confluent_kafka.Producer)
+            windows: Window name -> seconds (default: ROLLUP_WINDOWS)
+            lateness: Seconds a bucket stays open after its end
+            batch_size: Maximum messages per micro-batch
+            consumer_group_id: Kafka consumer group
+        """
+        if consumer is None or producer is None:
+            from confluent_kafka import Consumer, Producer
+
+            if consumer is None:
+                consumer = Consumer(
+                    {
+                        "bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER,
+                        "group.id": consumer_group_id,
+                        "auto.offset.reset": "latest",
+                        "enable.auto.commit": True,
+                    }
+                )
+            if producer is None:
+                producer = Producer({"bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER})
+        self.consumer = consumer
+        self.producer = producer
+        self.aggregator = RollupAggregator(windows, lateness)
+        self.batch_size = batch_size
+        self.running = False
+        self.published = 0
+        self.errors = 0
+
+    def publish(self, records: List[Dict[str, Any]]):
+        """
+        Produce rollup records to their window topics
+
+        Args:
+            records: Records from RollupAggregator.flush()
+        """
+        for record in records:
+            topic = rollup_topic(record["window"])
+            value = json.dumps(record).encode("utf-8")
+            try:
+                self.producer.produce(topic, key=record["key"].encode("utf-8"), value=value)
+            except BufferError:
+                self.producer.poll(0.5)
+                self.producer.produce(topic, key=record["key"].encode("utf-8"), value=value)
+            self.published += 1
+        self.producer.poll(0)
+
+    def process_batch(self, messages: List) -> int:
+        """
+        Aggregate one micro-batch and publish whatever closed
+
+        Args:
+            messages: Kafka messages from the metrics topic
+
+        Returns:
+            Number of rollup records published
+        """
+        payloads = []
+        for msg in messages:
+            if msg.error():
+                self.errors += 1
+                logger.error(f"Consumer error: {msg.error()}")
+                continue
+            try:
+                payloads.append(json.loads(msg.value()))
+            except ValueError as e:
+                self.errors += 1
+                logger.error(f"Error decoding JSON: {e}")
+        self.aggregator.add(payloads)
+        records = self.aggregator.flush()
+        self.publish(records)
+        return len(records)
+
+    def run(self):
+        """Consume until stopped"""
+        self.consumer.subscribe([Config.MONITORING_TOPIC])
+        self.running = True
+        logger.info(
+            f"Rolling up '{Config.MONITORING_TOPIC}' into "
+            + ", ".join(rollup_topic(name) for name in self.aggregator.windows)
+        )
+        last_report = time.monotonic()
+        try:
+            while self.running:
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=1.0)
+                if messages:
+                    try:
+                        self.process_batch(messages)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Error processing batch of {len(messages)} messages: {e}")
+                if time.monotonic() - last_report >= 60:
+                    last_report = time.monotonic()
+                    logger.info(
+                        f"Rollup: {self.aggregator.samples} samples ({self.aggregator.invalid} invalid), "
+                        f"{self.published} records published, "
+                        f"late samples per window {self.aggregator.late}"
+                    )
+        finally:
+            self.close()
+
+    def stop(self):
+        """Request the consume loop to stop"""
+        self.running = False
+
+    def close(self):
+        """Publish remaining buckets and release Kafka clients"""
+        self.publish(self.aggregator.flush(force=True))
+        self.producer.flush(10)
+        self.consumer.close()
+        logger.info(f"Rollup stopped: {self.published} records published")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    from telemetry.log import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description="Aggregate the metrics topic into per-host and per-group window rollups"
+    )
+    parser.add_argument(
+        "--windows",
+        type=str,
+        default=",".join(ROLLUP_WINDOWS),
+        help=f"Comma-separated windows out of {list(ROLLUP_WINDOWS)} (default: all)",
+    )
+    parser.add_argument("--lateness", type=float, default=10.0, help="Seconds a bucket waits for late samples")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Maximum messages per micro-batch")
+    parser.add_argument("--consumer-group", type=str, default="rollup", help="Kafka consumer group ID")
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO)",
+    )
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    names = [name.strip() for name in args.windows.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ROLLUP_WINDOWS]
+    if unknown:
+        parser.error(f"unknown windows {unknown}, expected some of {list(ROLLUP_WINDOWS)}")
+
+    service = RollupService(
+        windows={name: ROLLUP_WINDOWS[name] for name in names},
+        lateness=args.lateness,
+        batch_size=args.batch_size,
+        consumer_group_id=args.consumer_group,
+    )
+
+    def _signal_handler(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down gracefully...")
+        service.stop()
+
+    signal.signal(signal.SIGINT, _signal_handler)
+    signal.signal(signal.SIGTERM, _signal_handler)
+    service.run()
+
+
+if __name__ == "__main__":
+    main()
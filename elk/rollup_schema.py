@@ -0,0 +1,107 @@
+"""
+Rollup schema - windows, metrics, index mapping, topic names, host groups and payload checks
+
+Kept free of NumPy so the search CLI and the query builders can use it
+without loading the aggregation code in elk.rollup.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from config import Config
+
+# Window name -> length in seconds
+ROLLUP_WINDOWS: Dict[str, int] = {"10s": 10, "1m": 60, "5m": 300}
+
+# Output metric name -> field in the metrics topic payload
+ROLLUP_METRICS: Dict[str, str] = {
+    "cpu": "cpu_percent",
+    "memory": "memory_percent",
+    "disk_read": "disk_read_mb",
+    "disk_write": "disk_write_mb",
+    "net_in": "net_in_mb",
+    "net_out": "net_out_mb",
+}
+
+ROLLUP_STATS = ("avg", "min", "max", "p95")
+
+SCOPE_HOST = "host"
+SCOPE_GROUP = "group"
+
+ROLLUP_MAPPINGS = {
+    "mappings": {
+        "properties": dict(
+            {
+                "window": {"type": "keyword"},
+                "scope": {"type": "keyword"},
+                "key": {"type": "keyword"},
+                "group": {"type": "keyword"},
+                "timestamp": {"type": "date", "format": "epoch_second||strict_date_optional_time"},
+                "end": {"type": "date", "format": "epoch_second||strict_date_optional_time"},
+                "count": {"type": "integer"},
+            },
+            **{
+                f"{metric}_{stat}": {"type": "float"}
+                for metric in ROLLUP_METRICS
+                for stat in ROLLUP_STATS
+            },
+        )
+    }
+}
+
+
+def rollup_topic(window: str) -> str:
+    """
+    Kafka topic carrying one rollup window
+
+    Args:
+        window: Window name (e.g., "1m")
+
+    Returns:
+        Topic name (e.g., "metrics-1m")
+    """
+    return f"{Config.MONITORING_TOPIC}-{window}"
+
+
+def group_of(hostname: str) -> str:
+    """
+    Group of a host: its name without a trailing numeric suffix ("web-03" -> "web")
+
+    Args:
+        hostname: Agent hostname
+
+    Returns:
+        Group name (the hostname itself when it has no numeric suffix)
+    """
+    head, sep, tail = hostname.rpartition("-")
+    if sep and head and tail.isdigit():
+        return head
+    return hostname
+
+
+def payload_error(payload: Any, fields: Iterable[str] = ROLLUP_METRICS.values()) -> Optional[str]:
+    """
+    Why a decoded metrics topic message cannot be aggregated, if it cannot
+
+    Args:
+        payload: Decoded message value
+        fields: Metric fields read from payload["metrics"] (missing ones count as 0.0)
+
+    Returns:
+        Reason, or None for a usable payload: an object with a string hostname (if any),
+        a positive numeric timestamp and a metrics object of numbers
+    """
+    if not isinstance(payload, dict):
+        return f"expected a JSON object, got {type(payload).__name__}"
+    if not isinstance(payload.get("hostname", ""), str):
+        return "hostname is not a string"
+    timestamp = payload.get("timestamp")
+    if not isinstance(timestamp, (int, float)) or isinstance(timestamp, bool) or timestamp <= 0:
+        return "no timestamp"
+    metrics = payload.get("metrics")
+    if not isinstance(metrics, dict):
+        return "metrics is not an object"
+    for field in fields:
+        value = metrics.get(field, 0.0)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return f"metrics.{field} is not a number"
+    return None
@@ -0,0 +1,15 @@
+"""
+Fakes module - in-process stand-ins for external services used by load tests and benchmarks
+"""
+
+from fakes.elasticsearch import FakeAsyncElasticsearch, FakeElasticsearch
+from fakes.etcd import FakeEtcdClient
+from fakes.kafka import FakeConsumer, FakeProducer
+
+__all__ = [
+    "FakeAsyncElasticsearch",
+    "FakeConsumer",
+    "FakeElasticsearch",
+    "FakeEtcdClient",
+    "FakeProducer",
+]
@@ -0,0 +1,622 @@
+"""
+Elasticsearch stand-in - in-memory replacement for elasticsearch.Elasticsearch and AsyncElasticsearch
+"""
+
+import asyncio
+import fnmatch
+import itertools
+import json
+import math
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+from elasticsearch.exceptions import ConflictError, NotFoundError
+from elasticsearch.serializer import JSONSerializer
+
+
+def _comparable(value: Any) -> Any:
+    """Map a stored or queried value onto something orderable (dates become epoch seconds)"""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return value
+    return value
+
+
+def _matches(source: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the supported query subset (match_all, term, terms, wildcard, range, bool) against a document"""
+    if not query or "match_all" in query:
+        return True
+    if "term" in query:
+        field, expected = next(iter(query["term"].items()))
+        if isinstance(expected, dict):
+            expected = expected.get("value")
+        return source.get(field) == expected
+    if "terms" in query:
+        field, expected = next(iter(query["terms"].items()))
+        return source.get(field) in expected
+    if "wildcard" in query:
+        field, pattern = next(iter(query["wildcard"].items()))
+        if isinstance(pattern, dict):
+            pattern = pattern.get("value", pattern.get("wildcard"))
+        value = source.get(field)
+        return isinstance(value, str) and fnmatch.fnmatchcase(value, pattern)
+    if "range" in query:
+        field, bounds = next(iter(query["range"].items()))
+        value = source.get(field)
+        if value is None:
+            return False
+        value = _comparable(value)
+        for op, bound in bounds.items():
+            if op not in ("gt", "gte", "lt", "lte"):
+                continue
+            bound = _comparable(bound)
+            try:
+                if op == "gt" and not value > bound:
+                    return False
+                if op == "gte" and not value >= bound:
+                    return False
+                if op == "lt" and not value < bound:
+                    return False
+                if op == "lte" and not value <= bound:
+                    return False
+            except TypeError:
+                return False
+        return True
+    if "bool" in query:
+        clause = query["bool"]
+        for key in ("must", "filter"):
+            for sub in _as_list(clause.get(key)):
+                if not _matches(source, sub):
+                    return False
+        for sub in _as_list(clause.get("must_not")):
+            if _matches(source, sub):
+                return False
+        should = _as_list(clause.get("should"))
+        if should and not any(_matches(source, sub) for sub in should):
+            return False
+        return True
+    raise ValueError(f"Unsupported query in fake Elasticsearch: {list(query)}")
+
+
+def _as_list(value) -> List:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+_INTERVAL_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _interval_seconds(interval: str) -> float:
+    """Parse a fixed_interval such as 30s or 5m"""
+    for unit in sorted(_INTERVAL_UNITS, key=len, reverse=True):
+        if interval.endswith(unit):
+            return float(interval[: -len(unit)]) * _INTERVAL_UNITS[unit]
+    raise ValueError(f"Unsupported interval in fake Elasticsearch: {interval}")
+
+
+def _sort_sources(items: List, sort: Any, source_of=lambda item: item) -> List:
+    """Order documents by a search sort specification (missing values last)"""
+    for spec in reversed(_as_list(sort)):
+        if isinstance(spec, str):
+            field, order = spec, "asc"
+        else:
+            field, order = next(iter(spec.items()))
+            order = order.get("order", "asc") if isinstance(order, dict) else order
+        present = [item for item in items if source_of(item).get(field) is not None]
+        missing = [item for item in items if source_of(item).get(field) is None]
+        present.sort(key=lambda item: _comparable(source_of(item)[field]), reverse=order == "desc")
+        items = present + missing
+    return items
+
+
+def _top_hits(params: Dict[str, Any], sources: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compute a top_hits aggregation"""
+    fields = [spec if isinstance(spec, str) else spec["field"] for spec in params.get("docvalue_fields", [])]
+    hits = []
+    for source in _sort_sources(sources, params.get("sort"))[: params.get("size", 3)]:
+        hit = {"_score": None, "_source": source}
+        if fields:
+            hit["fields"] = {field: [source[field]] for field in fields if source.get(field) is not None}
+        hits.append(hit)
+    return {"hits": {"total": {"value": len(sources), "relation": "eq"}, "hits": hits}}
+
+
+def _bucket_aggregate(kind: str, params: Dict[str, Any], sources: List[Dict[str, Any]], sub_aggs) -> Dict[str, Any]:
+    """Compute the supported bucket aggregations (terms ordered by _count, _key or a sub-aggregation, histograms)"""
+    groups: Dict[Any, List[Dict[str, Any]]] = {}
+    sub_results: Dict[Any, Dict[str, Any]] = {}
+    field = params["field"]
+    if kind == "terms":
+        for source in sources:
+            if source.get(field) is not None:
+                groups.setdefault(source[field], []).append(source)
+        order = _as_list(params.get("order"))
+        by, direction = next(iter(order[0].items())) if order else ("_count", "desc")
+        if by == "_count":
+            keys = sorted(groups, key=lambda key: (-len(groups[key]) if direction == "desc" else len(groups[key]), key))
+        elif by == "_key":
+            keys = sorted(groups, reverse=direction == "desc")
+        else:
+            sub_results = {key: _aggregate(groups[key], sub_aggs) for key in groups}
+            missing = float("-inf") if direction == "desc" else float("inf")
+
+            def _value(key):
+                value = sub_results[key][by]["value"]
+                return missing if value is None else value
+
+            keys = sorted(sorted(groups), key=_value, reverse=direction == "desc")
+        keys = keys[: params.get("size", 10)]
+    elif kind == "histogram":
+        interval = params["interval"]
+        offset = params.get("offset", 0)
+        for source in sources:
+            if source.get(field) is not None:
+                key = math.floor((source[field] - offset) / interval) * interval + offset
+                groups.setdefault(key, []).append(source)
+        min_doc_count = params.get("min_doc_count", 0)
+        keys = [key for key in sorted(groups) if len(groups[key]) >= max(1, min_doc_count)]
+        if keys and not min_doc_count:
+            steps = round((keys[-1] - keys[0]) / interval)
+            keys = [keys[0] + step * interval for step in range(steps + 1)]
+            for key in keys:
+                groups.setdefault(key, [])
+    else:
+        interval = _interval_seconds(params.get("fixed_interval") or params["interval"])
+        for source in sources:
+            if source.get(field) is not None:
+                start = (_comparable(source[field]) // interval) * interval
+                groups.setdefault(int(start * 1000), []).append(source)
+        keys = sorted(groups)
+    buckets = []
+    for key in keys:
+        bucket = {"key": key, "doc_count": len(groups[key])}
+        if kind == "date_histogram":
+            bucket["key_as_string"] = datetime.utcfromtimestamp(key / 1000).isoformat() + "Z"
+        if sub_aggs:
+            bucket.update(sub_results.get(key) or _aggregate(groups[key], sub_aggs))
+        buckets.append(bucket)
+    return {"buckets": buckets}
+
+
+def _composite(params: Dict[str, Any], sources: List[Dict[str, Any]], sub_aggs) -> Dict[str, Any]:
+    """Compute one page of a composite aggregation over terms sources (nulls first, like missing_bucket)"""
+    names = [next(iter(source)) for source in params["sources"]]
+    fields = [source[name]["terms"]["field"] for source, name in zip(params["sources"], names)]
+    missing = [source[name]["terms"].get("missing_bucket", False) for source, name in zip(params["sources"], names)]
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for source in sources:
+        key = tuple(source.get(field) for field in fields)
+        if all(value is not None or allowed for value, allowed in zip(key, missing)):
+            groups.setdefault(key, []).append(source)
+
+    def _order(key):
+        return tuple((value is not None, value) for value in key)
+
+    keys = sorted(groups, key=_order)
+    if params.get("after"):
+        after = _order(tuple(params["after"].get(name) for name in names))
+        keys = [key for key in keys if _order(key) > after]
+    buckets = []
+    for key in keys[: params.get("size", 10)]:
+        bucket = {"key": dict(zip(names, key)), "doc_count": len(groups[key])}
+        if sub_aggs:
+            bucket.update(_aggregate(groups[key], sub_aggs))
+        buckets.append(bucket)
+    result: Dict[str, Any] = {"buckets": buckets}
+    if buckets:
+        result["after_key"] = buckets[-1]["key"]
+    return result
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    """Exact percentile of sorted values with linear interpolation (Elasticsearch estimates it)"""
+    if not values:
+        return None
+    rank = (len(values) - 1) * percent / 100.0
+    low = math.floor(rank)
+    high = min(low + 1, len(values) - 1)
+    return float(values[low] + (values[high] - values[low]) * (rank - low))
+
+
+def _keyed(params: Dict[str, Any], values: Dict[float, Optional[float]]) -> Dict[str, Any]:
+    """percentiles / percentile_ranks response, keyed by default or as a list with keyed: false"""
+    if params.get("keyed", True):
+        return {"values": {str(float(key)): value for key, value in values.items()}}
+    return {"values": [{"key": float(key), "value": value} for key, value in values.items()]}
+
+
+def _aggregate(sources: List[Dict[str, Any]], aggs: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the supported aggregations (stats and single values, exact percentiles, top_hits and the bucket ones)"""
+    results = {}
+    for name, spec in aggs.items():
+        sub_aggs = spec.get("aggs") or spec.get("aggregations")
+        kind, params = next((k, v) for k, v in spec.items() if k not in ("aggs", "aggregations"))
+        if kind in ("terms", "date_histogram", "histogram"):
+            results[name] = _bucket_aggregate(kind, params, sources, sub_aggs)
+            continue
+        if kind == "top_hits":
+            results[name] = _top_hits(params, sources)
+            continue
+        if kind == "composite":
+            results[name] = _composite(params, sources, sub_aggs)
+            continue
+        values = [
+            _comparable(source[params["field"]])
+            for source in sources
+            if source.get(params["field"]) is not None
+        ]
+        count = len(values)
+        total = float(sum(values)) if values else 0.0
+        stats = {
+            "count": count,
+            "min": min(values) if values else None,
+            "max": max(values) if values else None,
+            "avg": total / count if count else None,
+            "sum": total,
+        }
+        if kind == "stats":
+            results[name] = stats
+        elif kind in ("avg", "min", "max", "sum"):
+            results[name] = {"value": stats[kind]}
+        elif kind == "value_count":
+            results[name] = {"value": count}
+        elif kind == "percentiles":
+            results[name] = _keyed(params, {p: _percentile(sorted(values), p) for p in params["percents"]})
+        elif kind == "percentile_ranks":
+            ranks = {v: 100.0 * sum(1 for x in values if x <= v) / count if count else None for v in params["values"]}
+            results[name] = _keyed(params, ranks)
+        else:
+            raise ValueError(f"Unsupported aggregation in fake Elasticsearch: {kind}")
+    return results
+
+
+class _FakeIndices:
+    """The es.indices namespace"""
+
+    def __init__(self, es: "FakeElasticsearch"):
+        self._es = es
+
+    def exists(self, index: str, **kwargs) -> bool:
+        return index in self._es._indices or index in self._es._aliases
+
+    def exists_alias(self, name: str, **kwargs) -> bool:
+        return name in self._es._aliases
+
+    def get_alias(self, name: str, **kwargs) -> Dict[str, Any]:
+        if name not in self._es._aliases:
+            raise NotFoundError(404, "aliases_not_found_exception", {"alias": name})
+        return {index: {"aliases": {name: {}}} for index in sorted(self._es._aliases[name])}
+
+    def update_aliases(self, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Apply add, remove and remove_index actions (all checked before any is applied)"""
+        with self._es._lock:
+            for action in body["actions"]:
+                kind, params = next(iter(action.items()))
+                if params["index"] not in self._es._indices:
+                    raise NotFoundError(404, "index_not_found_exception", {"index": params["index"]})
+            for action in body["actions"]:
+                kind, params = next(iter(action.items()))
+                if kind == "add":
+                    self._es._aliases.setdefault(params["alias"], set()).add(params["index"])
+                elif kind == "remove":
+                    self._es._aliases.get(params["alias"], set()).discard(params["index"])
+                elif kind == "remove_index":
+                    self.delete(params["index"])
+                else:
+                    raise ValueError(f"Unsupported alias action in fake Elasticsearch: {kind}")
+            for alias in [alias for alias, indices in self._es._aliases.items() if not indices]:
+                del self._es._aliases[alias]
+        return {"acknowledged": True}
+
+    def create(self, index: str, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        with self._es._lock:
+            if index not in self._es._indices:
+                self._es._indices[index] = {}
+                self._es._settings[index] = body or {}
+        return {"acknowledged": True, "index": index}
+
+    def delete(self, index: str, **kwargs) -> Dict[str, Any]:
+        with self._es._lock:
+            if index not in self._es._indices:
+                raise NotFoundError(404, "index_not_found_exception", {"index": index})
+            del self._es._indices[index]
+            self._es._settings.pop(index, None)
+            for indices in self._es._aliases.values():
+                indices.discard(index)
+        return {"acknowledged": True}
+
+    def refresh(self, index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        return {"_shards": {"failed": 0}}
+
+    def forcemerge(self, index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        return {"_shards": {"failed": 0}}
+
+    def get_mapping(self, index: str, **kwargs) -> Dict[str, Any]:
+        return {index: {"mappings": self._es._settings.get(index, {}).get("mappings", {})}}
+
+    def stats(self, index: str, **kwargs) -> Dict[str, Any]:
+        """Document counts and size (JSON length of the stored _source, no compression modelled)"""
+        indices = {}
+        for name in self._es._resolve(index):
+            docs = self._es._indices[name]
+            size = sum(len(json.dumps(self._es._source_view(name, source))) for source in docs.values())
+            indices[name] = {"total": {"docs": {"count": len(docs)}, "store": {"size_in_bytes": size}}}
+        return {
+            "_all": {
+                "total": {
+                    "docs": {"count": sum(stats["total"]["docs"]["count"] for stats in indices.values())},
+                    "store": {"size_in_bytes": sum(s["total"]["store"]["size_in_bytes"] for s in indices.values())},
+                }
+            },
+            "indices": indices,
+        }
+
+
+class FakeElasticsearch:
+    """In-memory document store with the subset of the Elasticsearch 7.x client API used in this repo"""
+
+    def __init__(self, *args, **kwargs):
+        """Initialize empty fake cluster (arguments are accepted for signature compatibility)"""
+        self._indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._settings: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self.indices = _FakeIndices(self)
+        # helpers.bulk/streaming_bulk serialize actions through client.transport.serializer
+        self.transport = SimpleNamespace(serializer=JSONSerializer())
+        self.requests = 0
+
+    def ping(self, **kwargs) -> bool:
+        return True
+
+    def _resolve(self, index: str) -> List[str]:
+        patterns = index.split(",")
+        names = set()
+        for pattern in patterns:
+            names.update(name for name in self._indices if fnmatch.fnmatchcase(name, pattern))
+            for alias, indices in self._aliases.items():
+                if fnmatch.fnmatchcase(alias, pattern):
+                    names.update(indices)
+        return sorted(names)
+
+    def _write_index(self, index: str) -> str:
+        """Concrete index written through an index name or single-index alias"""
+        indices = self._aliases.get(index)
+        if not indices:
+            return index
+        if len(indices) > 1:
+            raise ValueError(f"Alias [{index}] has more than one index associated with it, can't write to it")
+        return next(iter(indices))
+
+    def _source_view(self, index: str, source: Dict[str, Any]) -> Dict[str, Any]:
+        """The _source as returned by the index (mapping _source.excludes applied)"""
+        excludes = self._settings.get(index, {}).get("mappings", {}).get("_source", {}).get("excludes")
+        if not excludes:
+            return source
+        return {field: value for field, value in source.items() if field not in excludes}
+
+    def _store(self, index: str, source: Any, doc_id: Optional[str], op_type: str) -> Dict[str, Any]:
+        """Store one document, returning its bulk/index response item"""
+        if isinstance(source, (bytes, str)):
+            source = json.loads(source)
+        else:
+            source = json.loads(self.transport.serializer.dumps(source))
+        with self._lock:
+            index = self._write_index(index)
+            docs = self._indices.setdefault(index, {})
+            if doc_id is None:
+                doc_id = f"fake-{next(self._ids)}"
+            doc_id = str(doc_id)
+            if op_type == "create" and doc_id in docs:
+                return {
+                    "_index": index,
+                    "_id": doc_id,
+                    "status": 409,
+                    "error": {
+                        "type": "version_conflict_engine_exception",
+                        "reason": f"[{doc_id}]: version conflict, document already exists",
+                    },
+                }
+            existed = doc_id in docs
+            docs[doc_id] = source
+        return {
+            "_index": index,
+            "_id": doc_id,
+            "result": "updated" if existed else "created",
+            "status": 200 if existed else 201,
+        }
+
+    def index(
+        self,
+        index: str,
+        document: Any = None,
+        body: Any = None,
+        id: Optional[str] = None,
+        op_type: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        self.requests += 1
+        item = self._store(index, document if document is not None else body, id, op_type or "index")
+        if item["status"] == 409:
+            raise ConflictError(409, item["error"]["type"], {"error": item["error"]})
+        return item
+
+    def create(self, index: str, id: str, document: Any = None, body: Any = None, **kwargs) -> Dict[str, Any]:
+        return self.index(index, document=document, body=body, id=id, op_type="create")
+
+    def bulk(self, body: Any, index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Apply an NDJSON (or list of lines) bulk body"""
+        self.requests += 1
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        lines: Iterable = body.splitlines() if isinstance(body, str) else body
+        lines = iter([line for line in lines if line])
+
+        items = []
+        for line in lines:
+            action = json.loads(line) if isinstance(line, (str, bytes)) else line
+            op_type, meta = next(iter(action.items()))
+            target = meta.get("_index", index)
+            if op_type == "delete":
+                with self._lock:
+                    found = self._indices.get(target, {}).pop(str(meta.get("_id")), None)
+                items.append({"delete": {"_index": target, "_id": meta.get("_id"), "status": 200 if found else 404}})
+                continue
+            source = next(lines)
+            items.append({op_type: self._store(target, source, meta.get("_id"), op_type)})
+        errors = any(next(iter(item.values()))["status"] >= 300 for item in items)
+        return {"took": 0, "errors": errors, "items": items}
+
+    def _select(self, index: str, query: Optional[Dict[str, Any]]) -> List[tuple]:
+        with self._lock:
+            docs = [
+                (name, doc_id, source)
+                for name in self._resolve(index)
+                for doc_id, source in self._indices[name].items()
+            ]
+        return [doc for doc in docs if _matches(doc[2], query)]
+
+    def search(
+        self, index: str, body: Optional[Dict[str, Any]] = None, size: Optional[int] = None, **kwargs
+    ) -> Dict[str, Any]:
+        self.requests += 1
+        body = dict(body or {})
+        for key in ("query", "sort", "aggs", "aggregations"):
+            if key in kwargs:
+                body[key] = kwargs[key]
+        if size is None:
+            size = body.get("size", 10)
+
+        return self._search(index, body, size)
+
+    def _search(self, index: str, body: Dict[str, Any], size: int) -> Dict[str, Any]:
+        matched = _sort_sources(self._select(index, body.get("query")), body.get("sort"), lambda doc: doc[2])
+        if "collapse" in body:
+            field, seen, collapsed = body["collapse"]["field"], set(), []
+            for doc in matched:
+                if doc[2].get(field) not in seen:
+                    seen.add(doc[2].get(field))
+                    collapsed.append(doc)
+            matched = collapsed
+
+        hits = []
+        for name, doc_id, source in matched[:size]:
+            hit = {"_index": name, "_id": doc_id, "_score": 1.0, "_source": self._source_view(name, source)}
+            fields = [spec if isinstance(spec, str) else spec["field"] for spec in body.get("docvalue_fields", [])]
+            if fields:
+                hit["fields"] = {field: [source[field]] for field in fields if source.get(field) is not None}
+            hits.append(hit)
+        response: Dict[str, Any] = {
+            "took": 0,
+            "timed_out": False,
+            "hits": {
+                "total": {"value": len(matched), "relation": "eq"},
+                "max_score": 1.0 if matched else None,
+                "hits": hits,
+            },
+        }
+        aggs = body.get("aggs") or body.get("aggregations")
+        if aggs:
+            response["aggregations"] = _aggregate([doc[2] for doc in matched], aggs)
+        return response
+
+    def msearch(self, body: Any, index: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Run header/body pairs (list or NDJSON) as one request"""
+        self.requests += 1
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        lines = [json.loads(line) for line in body.splitlines() if line] if isinstance(body, str) else list(body)
+        responses = []
+        for header, search in zip(lines[::2], lines[1::2]):
+            try:
+                response = self._search(header.get("index", index), search, search.get("size", 10))
+                response["status"] = 200
+            except Exception as e:
+                response = {"error": {"type": type(e).__name__, "reason": str(e)}, "status": 400}
+            responses.append(response)
+        return {"took": 0, "responses": responses}
+
+    def reindex(self, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Copy the _source of matching documents, keeping IDs (dest.op_type create skips existing IDs)"""
+        self.requests += 1
+        dest = body["dest"]
+        created = updated = conflicts = 0
+        for name, doc_id, source in self._select(body["source"]["index"], body["source"].get("query")):
+            item = self._store(dest["index"], self._source_view(name, source), doc_id, dest.get("op_type", "index"))
+            if item["status"] == 409:
+                conflicts += 1
+            elif item["result"] == "created":
+                created += 1
+            else:
+                updated += 1
+        return {
+            "took": 0,
+            "timed_out": False,
+            "total": created + updated + conflicts,
+            "created": created,
+            "updated": updated,
+            "version_conflicts": conflicts,
+            "failures": [],
+        }
+
+    def count(self, index: str, body: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        self.requests += 1
+        query = (body or {}).get("query", kwargs.get("query"))
+        return {"count": len(self._select(index, query))}
+
+    def close(self):
+        pass
+
+
+class _AsyncNamespace:
+    """Exposes the methods of a synchronous fake as coroutines taking `latency` seconds"""
+
+    def __init__(self, target, owner: "FakeAsyncElasticsearch"):
+        self._target = target
+        self._owner = owner
+
+    def __getattr__(self, name: str):
+        method = getattr(self._target, name)
+        if not callable(method):
+            return method
+        owner = self._owner
+
+        async def call(*args, **kwargs):
+            owner.in_flight += 1
+            owner.max_in_flight = max(owner.max_in_flight, owner.in_flight)
+            try:
+                await asyncio.sleep(owner.latency)
+                return method(*args, **kwargs)
+            finally:
+                owner.in_flight -= 1
+
+        return call
+
+
+class FakeAsyncElasticsearch(_AsyncNamespace):
+    """Async face of a FakeElasticsearch, with a simulated round-trip time and in-flight request counts"""
+
+    def __init__(self, es: Optional[FakeElasticsearch] = None, latency: float = 0.0):
+        """
+        Initialize fake async cluster
+
+        Args:
+            es: Fake cluster holding the data (default: a new one)
+            latency: Seconds each request takes, during which other requests can run
+        """
+        self.sync = es or FakeElasticsearch()
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        super().__init__(self.sync, self)
+        self.indices = _AsyncNamespace(self.sync.indices, self)
@@ -0,0 +1,205 @@
+"""
+etcd stand-in - in-memory replacement for the etcd3 client
+"""
+
+import operator
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class FakeEtcdClient:
+    """In-memory key-value store with the subset of the etcd3 client API used in this repo"""
+
+    def __init__(self, host: str = "localhost", port: int = 2379):
+        """
+        Initialize fake etcd client
+
+        Args:
+            host: Ignored (accepted for signature compatibility with etcd3.client)
+            port: Ignored (accepted for signature compatibility with etcd3.client)
+        """
+        self._data: Dict[str, SimpleNamespace] = {}
+        self._lock = threading.RLock()
+        self._watches: Dict[int, Tuple[str, Optional[str], Callable]] = {}
+        self._next_watch_id = 0
+        self.revision = 1
+        self.puts = 0
+        self.txns = 0
+        self._transactions = None
+
+    @staticmethod
+    def _key(key) -> str:
+        return key.decode("utf-8") if isinstance(key, bytes) else key
+
+    @staticmethod
+    def _value(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    def _metadata(self, key: str, kv: SimpleNamespace) -> SimpleNamespace:
+        return SimpleNamespace(
+            key=key.encode("utf-8"),
+            create_revision=kv.create_revision,
+            mod_revision=kv.mod_revision,
+            version=kv.version,
+            lease_id=0,
+            response_header=SimpleNamespace(revision=self.revision),
+        )
+
+    def get(self, key) -> Tuple[Optional[bytes], Optional[SimpleNamespace]]:
+        key = self._key(key)
+        with self._lock:
+            kv = self._data.get(key)
+            if kv is None:
+                return None, None
+            return kv.value, self._metadata(key, kv)
+
+    def get_prefix(self, prefix, **kwargs) -> Iterator[Tuple[bytes, SimpleNamespace]]:
+        prefix = self._key(prefix)
+        with self._lock:
+            items = [
+                (kv.value, self._metadata(key, kv))
+                for key, kv in sorted(self._data.items())
+                if key.startswith(prefix)
+            ]
+        return iter(items)
+
+    def _put(self, key: str, value) -> SimpleNamespace:
+        """Store a value at the current revision (caller holds the lock and bumps the revision)"""
+        self.puts += 1
+        previous = self._data.get(key)
+        kv = SimpleNamespace(
+            key=key.encode("utf-8"),
+            value=self._value(value),
+            create_revision=previous.create_revision if previous else self.revision,
+            mod_revision=self.revision,
+            version=previous.version + 1 if previous else 1,
+            lease=0,
+        )
+        self._data[key] = kv
+        return kv
+
+    def _delete(self, key: str) -> Optional[SimpleNamespace]:
+        """Remove a key at the current revision (caller holds the lock and bumps the revision)"""
+        kv = self._data.pop(key, None)
+        if kv is None:
+            return None
+        deleted = SimpleNamespace(**vars(kv))
+        deleted.value = b""
+        deleted.mod_revision = self.revision
+        return deleted
+
+    def put(self, key, value, lease=None, prev_kv=False):
+        key = self._key(key)
+        with self._lock:
+            self.revision += 1
+            kv = self._put(key, value)
+        self._notify(key, kv, deleted=False)
+
+    def delete(self, key, prev_kv=False, return_response=False) -> bool:
+        key = self._key(key)
+        with self._lock:
+            if key not in self._data:
+                return False
+            self.revision += 1
+            deleted = self._delete(key)
+        self._notify(key, deleted, deleted=True)
+        return True
+
+    @property
+    def transactions(self):
+        """Compare and operation builders (the etcd3 classes, so callers build them as for a real client)"""
+        if self._transactions is None:
+            from etcd3.client import Transactions
+
+            self._transactions = Transactions()
+        return self._transactions
+
+    def _compare(self, compare) -> bool:
+        from etcd3.etcdrpc import Compare
+
+        kv = self._data.get(self._key(compare.key))
+        target = type(compare).__name__
+        if target == "Value":
+            actual, expected = (kv.value if kv else None), self._value(compare.value)
+        else:
+            field = {"Version": "version", "Create": "create_revision", "Mod": "mod_revision"}[target]
+            actual, expected = (getattr(kv, field) if kv else 0), int(compare.value)
+        if actual is None:
+            return False
+        ops = {
+            Compare.EQUAL: operator.eq,
+            Compare.NOT_EQUAL: operator.ne,
+            Compare.LESS: operator.lt,
+            Compare.GREATER: operator.gt,
+        }
+        return ops[compare.op](actual, expected)
+
+    def transaction(self, compare, success=None, failure=None) -> Tuple[bool, List[Any]]:
+        """Apply success or failure ops atomically depending on the comparisons (all writes share one revision)"""
+        events = []
+        responses: List[Any] = []
+        with self._lock:
+            self.txns += 1
+            succeeded = all(self._compare(c) for c in compare)
+            ops = (success if succeeded else failure) or []
+            if any(type(op).__name__ in ("Put", "Delete") for op in ops):
+                self.revision += 1
+            for op in ops:
+                kind = type(op).__name__
+                key = self._key(op.key)
+                if kind == "Put":
+                    events.append((key, self._put(key, op.value), False))
+                    header = SimpleNamespace(revision=self.revision)
+                    responses.append(SimpleNamespace(response_put=SimpleNamespace(header=header)))
+                elif kind == "Delete":
+                    deleted = self._delete(key)
+                    if deleted is not None:
+                        events.append((key, deleted, True))
+                    deleted_count = SimpleNamespace(deleted=int(deleted is not None))
+                    responses.append(SimpleNamespace(response_delete_range=deleted_count))
+                elif kind == "Get":
+                    if op.range_end is None:
+                        keys = [key] if key in self._data else []
+                    else:
+                        end = self._key(op.range_end)
+                        keys = [k for k in sorted(self._data) if key <= k < end]
+                    responses.append([(self._data[k].value, self._metadata(k, self._data[k])) for k in keys])
+                else:
+                    raise ValueError(f"Unsupported transaction operation in fake etcd: {kind}")
+        for key, kv, deleted in events:
+            self._notify(key, kv, deleted=deleted)
+        return succeeded, responses
+
+    def _notify(self, key: str, kv: SimpleNamespace, deleted: bool):
+        from etcd3.events import DeleteEvent, PutEvent
+
+        with self._lock:
+            watches = list(self._watches.values())
+        event_cls = DeleteEvent if deleted else PutEvent
+        for start, range_end, callback in watches:
+            matches = key == start if range_end is None else start <= key < range_end
+            if matches:
+                event = event_cls(SimpleNamespace(kv=kv, prev_kv=None))
+                callback(SimpleNamespace(events=[event], header=SimpleNamespace(revision=kv.mod_revision)))
+
+    def add_watch_callback(self, key, callback: Callable, range_end=None, **kwargs) -> int:
+        with self._lock:
+            watch_id = self._next_watch_id
+            self._next_watch_id += 1
+            end = self._key(range_end) if range_end is not None else None
+            self._watches[watch_id] = (self._key(key), end, callback)
+            return watch_id
+
+    def add_watch_prefix_callback(self, key_prefix, callback: Callable, **kwargs) -> int:
+        prefix = self._key(key_prefix)
+        range_end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return self.add_watch_callback(prefix, callback, range_end=range_end)
+
+    def cancel_watch(self, watch_id: int):
+        with self._lock:
+            self._watches.pop(watch_id, None)
+
+    def close(self):
+        with self._lock:
+            self._watches.clear()
@@ -0,0 +1,244 @@
+"""
+Kafka stand-in - in-memory replacements for confluent_kafka.Producer and Consumer
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class FakeMessage:
+    """Minimal confluent_kafka.Message look-alike"""
+
+    def __init__(
+        self,
+        topic: str,
+        partition: int,
+        offset: int,
+        key: Optional[bytes],
+        value: Optional[bytes],
+        headers: Optional[List] = None,
+        timestamp_ms: Optional[int] = None,
+    ):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._headers = headers
+        self._timestamp_ms = timestamp_ms or int(time.time() * 1000)
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return self._partition
+
+    def offset(self) -> int:
+        return self._offset
+
+    def key(self) -> Optional[bytes]:
+        return self._key
+
+    def value(self) -> Optional[bytes]:
+        return self._value
+
+    def headers(self) -> Optional[List]:
+        return self._headers
+
+    def timestamp(self):
+        # (TIMESTAMP_CREATE_TIME, ms)
+        return (1, self._timestamp_ms)
+
+    def error(self):
+        return None
+
+
+class FakeProducer:
+    """In-memory producer with the subset of the confluent_kafka.Producer API used in this repo"""
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        retain: int = 0,
+        partitions: int = 3,
+    ):
+        """
+        Initialize fake producer
+
+        Args:
+            config: Ignored producer configuration (accepted for signature compatibility)
+            retain: Number of most recent messages kept per topic (0 keeps none)
+            partitions: Partition count used for key hashing
+        """
+        self.config = config or {}
+        self.partitions = partitions
+        self._lock = threading.Lock()
+        self._offsets: Dict[tuple, int] = defaultdict(int)
+        self._pending: List[Callable] = []
+        self.messages: Dict[str, deque] = defaultdict(lambda: deque(maxlen=retain or None))
+        self.retain = retain
+        self.produced = defaultdict(int)
+        self.bytes_produced = defaultdict(int)
+
+    def produce(
+        self,
+        topic: str,
+        value: Optional[bytes] = None,
+        key: Optional[bytes] = None,
+        partition: int = -1,
+        on_delivery: Optional[Callable] = None,
+        callback: Optional[Callable] = None,
+        headers: Optional[List] = None,
+        timestamp: int = 0,
+    ):
+        """Record a message and queue its delivery callback for the next poll()/flush()"""
+        if partition < 0:
+            partition = hash(key) % self.partitions if key is not None else 0
+        with self._lock:
+            offset = self._offsets[(topic, partition)]
+            self._offsets[(topic, partition)] = offset + 1
+            self.produced[topic] += 1
+            self.bytes_produced[topic] += len(value or b"")
+            message = FakeMessage(
+                topic, partition, offset, key, value, headers, timestamp or None
+            )
+            if self.retain:
+                self.messages[topic].append(message)
+            delivery = on_delivery or callback
+            if delivery is not None:
+                self._pending.append(lambda: delivery(None, message))
+
+    def _deliver(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for deliver in pending:
+            deliver()
+        return len(pending)
+
+    def poll(self, timeout: float = 0) -> int:
+        """Serve queued delivery callbacks"""
+        return self._deliver()
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Serve queued delivery callbacks; nothing is ever left in flight"""
+        self._deliver()
+        return 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+class FakeConsumer:
+    """In-memory consumer replaying a fixed list of messages"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, messages: Optional[List] = None):
+        """
+        Initialize fake consumer
+
+        Args:
+            config: Ignored consumer configuration (accepted for signature compatibility)
+            messages: Messages returned by poll()/consume() in order
+        """
+        self.config = config or {}
+        self._messages = deque(messages or [])
+        self._log = list(messages or [])
+        self._lock = threading.Lock()
+        self.topics: List[str] = []
+        self.closed = False
+
+    @classmethod
+    def from_producer(cls, producer: FakeProducer, topic: str) -> "FakeConsumer":
+        """
+        Build a consumer over the messages a FakeProducer retained for a topic
+
+        Args:
+            producer: FakeProducer created with retain > 0
+            topic: Topic to replay
+
+        Returns:
+            FakeConsumer
+        """
+        return cls(messages=list(producer.messages[topic]))
+
+    def add_messages(self, messages: List):
+        """Append messages to the replay queue"""
+        with self._lock:
+            self._messages.extend(messages)
+            self._log.extend(messages)
+
+    def _partition_log(self, topic: str, partition: int) -> List:
+        return [m for m in self._log if m.topic() == topic and m.partition() == partition]
+
+    def list_topics(self, topic: Optional[str] = None, timeout: float = -1):
+        """Cluster metadata with the topics and partitions present in the messages"""
+        topics: Dict[str, Dict[int, Any]] = defaultdict(dict)
+        with self._lock:
+            for message in self._log:
+                topics[message.topic()][message.partition()] = SimpleNamespace(id=message.partition())
+        if topic is not None:
+            topics = {topic: topics.get(topic, {})}
+        return SimpleNamespace(
+            topics={name: SimpleNamespace(topic=name, partitions=parts) for name, parts in topics.items()}
+        )
+
+    def get_watermark_offsets(
+        self, partition, timeout: Optional[float] = None, cached: bool = False
+    ) -> Tuple[int, int]:
+        """(low, high) offsets of a partition"""
+        with self._lock:
+            offsets = [m.offset() for m in self._partition_log(partition.topic, partition.partition)]
+        return (min(offsets), max(offsets) + 1) if offsets else (0, 0)
+
+    def offsets_for_times(self, partitions: List, timeout: Optional[float] = None) -> List:
+        """Earliest offset whose timestamp is >= the partition's offset field (in ms), -1 if none"""
+        from confluent_kafka import TopicPartition
+
+        results = []
+        with self._lock:
+            for partition in partitions:
+                log = self._partition_log(partition.topic, partition.partition)
+                offset = next((m.offset() for m in log if m.timestamp()[1] >= partition.offset), -1)
+                results.append(TopicPartition(partition.topic, partition.partition, offset))
+        return results
+
+    def assign(self, partitions: List):
+        """Replay the given partitions from their offsets, replacing the current queue"""
+        starts = {(p.topic, p.partition): max(p.offset, 0) for p in partitions}
+        with self._lock:
+            self._messages = deque(
+                m for m in self._log if m.offset() >= starts.get((m.topic(), m.partition()), float("inf"))
+            )
+
+    def subscribe(self, topics: List[str], **kwargs):
+        self.topics = list(topics)
+
+    def poll(self, timeout: Optional[float] = None):
+        with self._lock:
+            if self._messages:
+                return self._messages.popleft()
+        # Like the real consumer, an empty poll waits out its timeout
+        if timeout:
+            time.sleep(timeout)
+        return None
+
+    def consume(self, num_messages: int = 1, timeout: Optional[float] = None) -> List:
+        with self._lock:
+            count = min(num_messages, len(self._messages))
+            batch = [self._messages.popleft() for _ in range(count)]
+        if not batch and timeout:
+            time.sleep(timeout)
+        return batch
+
+    def commit(self, *args, **kwargs):
+        return None
+
+    def close(self):
+        self.closed = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._messages)
@@ -0,0 +1,397 @@
+"""
+Anomaly detection - per-host EWMA baselines scored over the whole fleet in one pass
+
+The detector keeps an exponentially weighted mean and variance per host and
+metric in NumPy arrays indexed by FleetTable slot. The monitor periodically
+takes every host updated since its previous pass (one micro-batch), scores the
+batch against the baselines, folds it into them, and reports samples that are
+more than `threshold` standard deviations away.
+"""
+
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for anomaly detection. Install it with: pip install numpy"
+    )
+
+from google.protobuf.struct_pb2 import Struct
+
+from config import Config
+from grpc_server.fleet import FIELD_INDEX, FleetTable
+from protobuf import monitoring_pb2
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+DETECTED_FIELDS = (
+    "cpu_percent",
+    "memory_percent",
+    "disk_read_mb",
+    "disk_write_mb",
+    "net_in_mb",
+    "net_out_mb",
+)
+
+# Standard deviation floor per metric: a flat series must not turn noise into huge scores
+MIN_STD = {
+    "cpu_percent": 2.0,
+    "memory_percent": 1.0,
+    "disk_read_mb": 0.5,
+    "disk_write_mb": 0.5,
+    "net_in_mb": 0.5,
+    "net_out_mb": 0.5,
+}
+
+HOURS_PER_DAY = 24
+
+# Rows scored per block (keeps each temporary within a few hundred KB)
+SCORE_BLOCK = 4096
+
+
+class EwmaDetector:
+    """
+    Per-slot EWMA mean/variance with optional hour-of-day baselines
+
+    With seasonal baselines enabled, every host also keeps one slow EWMA per
+    UTC hour of day; once an hour has seen `seasonal_warmup` samples it is
+    used instead of the fast baseline, so a nightly batch job is compared with
+    previous nights rather than with the quiet evening before it.
+    """
+
+    def __init__(
+        self,
+        fields: Sequence[str] = DETECTED_FIELDS,
+        alpha: float = 0.05,
+        threshold: float = 4.0,
+        warmup: int = 30,
+        seasonal: bool = False,
+        seasonal_alpha: float = 0.002,
+        seasonal_warmup: int = 360,
+        min_std: Optional[Dict[str, float]] = None,
+        capacity: int = 1024,
+    ):
+        """
+        Initialize detector
+
+        Args:
+            fields: SystemMetrics fields to watch
+            alpha: EWMA weight of a new sample
+            threshold: Absolute z-score at which a sample is anomalous
+            warmup: Samples a host needs before it is scored
+            seasonal: Keep hour-of-day baselines (24x the state memory)
+            seasonal_alpha: EWMA weight of a new sample in its hour-of-day baseline
+            seasonal_warmup: Samples an hour-of-day baseline needs before it is used
+            min_std: Standard deviation floor per field (default: MIN_STD)
+            capacity: Initial number of slots (grows with the fleet table)
+        """
+        unknown = [field for field in fields if field not in FIELD_INDEX]
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}, expected some of {list(FIELD_INDEX)}")
+        self.fields = tuple(fields)
+        self.columns = np.array([FIELD_INDEX[field] for field in self.fields])
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.seasonal = seasonal
+        self.seasonal_alpha = seasonal_alpha
+        self.seasonal_warmup = seasonal_warmup
+        floors = dict(MIN_STD, **(min_std or {}))
+        self.min_var = np.array([floors.get(field, 0.0) ** 2 for field in self.fields])
+
+        m = len(self.fields)
+        self.generation = np.zeros(capacity, dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.mean = np.zeros((capacity, m))
+        self.var = np.zeros((capacity, m))
+        if seasonal:
+            self.season_count = np.zeros((HOURS_PER_DAY, capacity), dtype=np.int64)
+            self.season_mean = np.zeros((HOURS_PER_DAY, capacity, m))
+            self.season_var = np.zeros((HOURS_PER_DAY, capacity, m))
+
+    def _ensure_capacity(self, size: int):
+        """Grow state arrays to hold slot indices below size"""
+        capacity = len(self.count)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        extra = capacity - len(self.count)
+        m = len(self.fields)
+        self.generation = np.concatenate([self.generation, np.zeros(extra, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.mean = np.concatenate([self.mean, np.zeros((extra, m))])
+        self.var = np.concatenate([self.var, np.zeros((extra, m))])
+        if self.seasonal:
+            self.season_count = np.concatenate(
+                [self.season_count, np.zeros((HOURS_PER_DAY, extra), dtype=np.int64)], axis=1
+            )
+            self.season_mean = np.concatenate([self.season_mean, np.zeros((HOURS_PER_DAY, extra, m))], axis=1)
+            self.season_var = np.concatenate([self.season_var, np.zeros((HOURS_PER_DAY, extra, m))], axis=1)
+
+    def score(
+        self,
+        slots: np.ndarray,
+        generations: np.ndarray,
+        values: np.ndarray,
+        timestamps: np.ndarray,
+    ):
+        """
+        Score a micro-batch against the baselines, then update them with it
+
+        Args:
+            slots: FleetTable slots (each at most once)
+            generations: FleetTable generation of each slot (a change resets the slot)
+            values: Matrix (batch, FLEET_FIELDS) of samples
+            timestamps: Sample timestamps (epoch seconds, used for the hour of day)
+
+        Returns:
+            Tuple of (rows, columns, zscores, baselines, stds) for the anomalous entries
+            only: row indexes the batch, column indexes self.fields
+        """
+        if len(slots) == 0:
+            empty = np.zeros(0)
+            return empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty
+        self._ensure_capacity(int(slots.max()) + 1)
+        x = values[:, self.columns]
+
+        # Slots handed to a different host start from scratch
+        reused = self.generation[slots] != generations
+        if reused.any():
+            fresh = slots[reused]
+            self.generation[fresh] = generations[reused]
+            self.count[fresh] = 0
+            self.mean[fresh] = x[reused]
+            self.var[fresh] = 0.0
+            if self.seasonal:
+                self.season_count[:, fresh] = 0
+
+        # Work in cache-sized blocks: whole-batch temporaries would spill out of cache
+        results = [
+            self._score_block(slots[i:i + SCORE_BLOCK], x[i:i + SCORE_BLOCK], timestamps[i:i + SCORE_BLOCK])
+            for i in range(0, len(slots), SCORE_BLOCK)
+        ]
+        if len(results) == 1:
+            return results[0]
+        offsets = range(0, len(slots), SCORE_BLOCK)
+        return (
+            np.concatenate([r[0] + offset for r, offset in zip(results, offsets)]),
+            *(np.concatenate([r[i] for r in results]) for i in range(1, 5)),
+        )
+
+    def _score_block(self, slots: np.ndarray, x: np.ndarray, timestamps: np.ndarray):
+        """Score and update one block of score() (x holds only the watched fields)"""
+        count = self.count.take(slots)
+        mean = self.mean.take(slots, axis=0)
+        var = self.var.take(slots, axis=0)
+        diff = x - mean
+        diff2 = np.square(diff)
+
+        if self.seasonal:
+            hours = (timestamps // 3600) % HOURS_PER_DAY
+            s_count = self.season_count[hours, slots]
+            s_mean = self.season_mean[hours, slots]
+            s_var = self.season_var[hours, slots]
+            s_diff = x - s_mean
+            s_diff2 = np.square(s_diff)
+            use_season = (s_count >= self.seasonal_warmup)[:, None]
+            base_mean = np.where(use_season, s_mean, mean)
+            base_var = np.where(use_season, s_var, var)
+            base_diff2 = np.where(use_season, s_diff2, diff2)
+        else:
+            base_mean, base_var, base_diff2 = mean, var, diff2
+
+        # Compare squared deviations: square roots are only taken for the few hits
+        base_var = np.maximum(base_var, self.min_var)
+        hits = base_diff2 >= (self.threshold * self.threshold) * base_var
+        ready = count >= self.warmup
+        if not ready.all():
+            hits &= ready[:, None]
+        # flatnonzero is far cheaper than a 2-D nonzero on a mostly-False mask
+        rows, cols = np.divmod(np.flatnonzero(hits), hits.shape[1])
+        std = np.sqrt(base_var[rows, cols])
+        baseline = base_mean[rows, cols]
+        z = (x[rows, cols] - baseline) / std
+
+        # Incremental EWMA: mean' = mean + a * diff, var' = (1 - a) * (var + a * diff^2)
+        a = self.alpha
+        new_mean = mean + a * diff
+        new_var = (1.0 - a) * (var + a * diff2)
+        first = count == 0
+        if first.any():
+            new_mean[first] = x[first]
+            new_var[first] = 0.0
+        self.mean[slots] = new_mean
+        self.var[slots] = new_var
+        self.count[slots] = count + 1
+
+        if self.seasonal:
+            a = self.seasonal_alpha
+            new_mean = s_mean + a * s_diff
+            new_var = (1.0 - a) * (s_var + a * s_diff2)
+            first = s_count == 0
+            if first.any():
+                new_mean[first] = x[first]
+                new_var[first] = 0.0
+            self.season_mean[hours, slots] = new_mean
+            self.season_var[hours, slots] = new_var
+            self.season_count[hours, slots] = s_count + 1
+
+        return rows, cols, z, baseline, std
+
+
+class AnomalyMonitor:
+    """Scans the fleet table on an interval, publishes anomaly events and optionally diagnoses hosts"""
+
+    def __init__(
+        self,
+        fleet: FleetTable,
+        detector: Optional[EwmaDetector] = None,
+        producer=None,
+        registry=None,
+        counters=None,
+        interval: float = 1.0,
+        topic: str = Config.ANOMALY_TOPIC,
+        diagnostics: bool = False,
+        diagnostic_cooldown: float = Config.DIAGNOSTIC_COOLDOWN_SECONDS,
+        clock=time.monotonic,
+    ):
+        """
+        Initialize anomaly monitor
+
+        Args:
+            fleet: FleetTable the server updates with every sample
+            detector: Optional EwmaDetector (defaults to the ANOMALY_* settings)
+            producer: Optional Kafka producer anomaly events are published with (None: log only)
+            registry: Optional StreamRegistry used to send DIAGNOSTIC commands
+            counters: Optional ServerCounters ("anomalies" is incremented per event)
+            interval: Seconds between scans (the micro-batch length)
+            topic: Kafka topic for anomaly events
+            diagnostics: Send a DIAGNOSTIC command to anomalous hosts
+            diagnostic_cooldown: Minimum seconds between diagnostics to one host
+            clock: Monotonic time source
+        """
+        if detector is None:
+            detector = EwmaDetector(
+                alpha=Config.ANOMALY_ALPHA,
+                threshold=Config.ANOMALY_THRESHOLD,
+                seasonal=Config.ANOMALY_SEASONAL,
+            )
+        self.fleet = fleet
+        self.detector = detector
+        self.producer = producer
+        self.registry = registry
+        self.counters = counters
+        self.interval = interval
+        self.topic = topic
+        self.diagnostics = diagnostics
+        self.diagnostic_cooldown = diagnostic_cooldown
+        self.clock = clock
+        self._sequence = 0
+        self._last_diagnostic: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.scanned = 0
+        self.events = 0
+        self.last_scan_ms = 0.0
+
+    def scan(self) -> List[Dict]:
+        """
+        Score every host updated since the previous scan
+
+        Returns:
+            Anomaly events of this scan
+        """
+        started = time.perf_counter()
+        slots, generations, values, timestamps, hostnames, self._sequence = self.fleet.changed_since(self._sequence)
+        rows, cols, z, baseline, std = self.detector.score(slots, generations, values, timestamps)
+        self.scanned += len(slots)
+        self.last_scan_ms = (time.perf_counter() - started) * 1000.0
+
+        events = []
+        for i, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+            field = self.detector.fields[col]
+            events.append(
+                {
+                    "hostname": hostnames[row],
+                    "timestamp": int(timestamps[row]),
+                    "metric": field,
+                    "value": float(values[row, FIELD_INDEX[field]]),
+                    "baseline": float(baseline[i]),
+                    "std": float(std[i]),
+                    "zscore": float(z[i]),
+                }
+            )
+        if events:
+            self._emit(events)
+        return events
+
+    def _emit(self, events: List[Dict]):
+        """Publish events and send diagnostics"""
+        self.events += len(events)
+        if self.counters is not None:
+            self.counters.incr("anomalies", len(events))
+        for event in events:
+            logger.info(
+                "Anomaly on %s: %s=%.2f (baseline %.2f, z=%.1f)",
+                event["hostname"],
+                event["metric"],
+                event["value"],
+                event["baseline"],
+                event["zscore"],
+            )
+            if self.producer is not None:
+                self.producer.produce(
+                    self.topic, key=event["hostname"].encode("utf-8"), value=json.dumps(event).encode("utf-8")
+                )
+        if self.producer is not None:
+            self.producer.poll(0)
+
+        if self.diagnostics and self.registry is not None:
+            now = self.clock()
+            strongest: Dict[str, Dict] = {}
+            for event in events:
+                best = strongest.get(event["hostname"])
+                if best is None or abs(event["zscore"]) > abs(best["zscore"]):
+                    strongest[event["hostname"]] = event
+            for hostname, event in strongest.items():
+                last = self._last_diagnostic.get(hostname)
+                if last is not None and now - last < self.diagnostic_cooldown:
+                    continue
+                self._last_diagnostic[hostname] = now
+                # The agent can only rank processes by CPU or memory
+                key = "memory_percent" if event["metric"] == "memory_percent" else "cpu_percent"
+                params = Struct()
+                params.update({"key": key})
+                command = monitoring_pb2.Command(type=monitoring_pb2.CommandType.DIAGNOSTIC, params=params)
+                self.registry.dispatch([hostname], command)
+
+    def _loop(self):
+        """Scan until stopped"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error(f"Anomaly scan failed: {e}")
+
+    def start(self):
+        """Start scanning in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="anomaly-monitor", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Anomaly detection on {list(self.detector.fields)} (z >= {self.detector.threshold}, "
+            f"seasonal={self.detector.seasonal}, diagnostics={self.diagnostics}) -> topic '{self.topic}'"
+        )
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,76 @@
+"""
+Server counters - per-process ingest counters, optionally backed by shared memory
+"""
+
+import threading
+from typing import Dict
+
+COUNTERS = (
+    "streams_opened",
+    "streams_active",
+    "requests",
+    "produced",
+    "delivery_errors",
+    "buffer_full",
+    "commands_routed",
+    "anomalies",
+)
+
+
+class ServerCounters:
+    """
+    Ingest counters for one server process
+
+    Backed by a slot of a multiprocessing.Array when run under the supervisor
+    (the worker is the only writer of its slot, so a process-local lock suffices),
+    or by a private list otherwise.
+    """
+
+    def __init__(self, shared=None, slot: int = 0):
+        """
+        Initialize server counters
+
+        Args:
+            shared: Optional multiprocessing.Array of len(COUNTERS) * workers signed 64-bit ints
+            slot: Worker index owning a slice of the shared array
+        """
+        self._values = shared if shared is not None else [0] * len(COUNTERS)
+        self._offset = slot * len(COUNTERS) if shared is not None else 0
+        self._index = {name: self._offset + i for i, name in enumerate(COUNTERS)}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: int = 1):
+        """
+        Add to a counter
+
+        Args:
+            name: Counter name (one of COUNTERS)
+            amount: Increment (negative to decrement a gauge such as streams_active)
+        """
+        index = self._index[name]
+        with self._lock:
+            self._values[index] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        """Current values keyed by counter name"""
+        return {name: self._values[index] for name, index in self._index.items()}
+
+
+def aggregate(shared, workers: int) -> Dict[str, int]:
+    """
+    Sum counters over the worker slots of a shared array
+
+    Args:
+        shared: multiprocessing.Array written by ServerCounters
+        workers: Number of worker slots
+
+    Returns:
+        Totals keyed by counter name
+    """
+    width = len(COUNTERS)
+    values = shared[:]
+    totals = dict.fromkeys(COUNTERS, 0)
+    for slot in range(workers):
+        for i, name in enumerate(COUNTERS):
+            totals[name] += values[slot * width + i]
+    return totals
@@ -0,0 +1,296 @@
+"""
+Fleet table - array-backed latest sample per agent, queried without touching Elasticsearch
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for the fleet table. Install it with: pip install numpy"
+    )
+
+from protobuf import monitoring_pb2
+
+# Column order of the value matrix (SystemMetrics field order)
+FLEET_FIELDS = tuple(field.name for field in monitoring_pb2.SystemMetrics.DESCRIPTOR.fields)
+FIELD_INDEX = {name: i for i, name in enumerate(FLEET_FIELDS)}
+
+# (metric, min, max) with None for an open bound
+MetricRange = Tuple[str, Optional[float], Optional[float]]
+
+
+class FleetTable:
+    """
+    Latest sample per hostname in preallocated NumPy arrays
+
+    Each hostname owns a row (slot) for its lifetime in the table; rows of
+    expired hosts are recycled. Queries filter and rank whole columns at once.
+    """
+
+    def __init__(self, capacity: int = 1024, clock=time.time):
+        """
+        Initialize fleet table
+
+        Args:
+            capacity: Initial number of rows (grows by doubling)
+            clock: Wall-clock time source used for sample ages
+        """
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._hostnames: List[Optional[str]] = [None] * capacity
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self.values = np.zeros((capacity, len(FLEET_FIELDS)), dtype=np.float64)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.received = np.zeros(capacity, dtype=np.float64)
+        self.active = np.zeros(capacity, dtype=bool)
+        # Bumped whenever a row is given to a new host, so per-slot state kept elsewhere can reset
+        self.generation = np.zeros(capacity, dtype=np.int64)
+        # Update counter value of each row's latest sample (see changed_since())
+        self.sequence = np.zeros(capacity, dtype=np.int64)
+        self._next_sequence = 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._slots)
+
+    def _grow(self):
+        """Double the row capacity (caller holds the lock)"""
+        old = len(self._hostnames)
+        new = old * 2
+        self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        self.timestamps = np.concatenate([self.timestamps, np.zeros(old, dtype=np.int64)])
+        self.received = np.concatenate([self.received, np.zeros(old)])
+        self.active = np.concatenate([self.active, np.zeros(old, dtype=bool)])
+        self.generation = np.concatenate([self.generation, np.zeros(old, dtype=np.int64)])
+        self.sequence = np.concatenate([self.sequence, np.zeros(old, dtype=np.int64)])
+        self._hostnames.extend([None] * old)
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def slot(self, hostname: str) -> int:
+        """
+        Get the row of a hostname, allocating one if needed
+
+        Args:
+            hostname: Agent hostname
+
+        Returns:
+            Row index (stable until the host is removed)
+        """
+        with self._lock:
+            return self._slot_locked(hostname)
+
+    def _slot_locked(self, hostname: str) -> int:
+        slot = self._slots.get(hostname)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[hostname] = slot
+            self._hostnames[slot] = hostname
+            self.generation[slot] += 1
+        return slot
+
+    def update(self, request: monitoring_pb2.MetricsRequest) -> int:
+        """
+        Store a sample as the latest for its host
+
+        Args:
+            request: Incoming MetricsRequest
+
+        Returns:
+            Row index of the host
+        """
+        m = request.metrics
+        row = (
+            m.cpu_percent,
+            m.memory_percent,
+            m.memory_used_mb,
+            m.memory_total_mb,
+            m.disk_read_mb,
+            m.disk_write_mb,
+            m.net_in_mb,
+            m.net_out_mb,
+        )
+        now = self.clock()
+        with self._lock:
+            slot = self._slot_locked(request.hostname)
+            self.values[slot] = row
+            self.timestamps[slot] = request.timestamp
+            self.received[slot] = now
+            self.active[slot] = True
+            self.sequence[slot] = self._next_sequence
+            self._next_sequence += 1
+        return slot
+
+    def remove(self, hostname: str):
+        """
+        Drop a host and recycle its row
+
+        Args:
+            hostname: Agent hostname
+        """
+        with self._lock:
+            slot = self._slots.pop(hostname, None)
+            if slot is not None:
+                self.active[slot] = False
+                self._hostnames[slot] = None
+                self._free.append(slot)
+
+    def expire(self, max_age: float) -> int:
+        """
+        Drop hosts whose latest sample is older than max_age seconds
+
+        Args:
+            max_age: Age limit in seconds
+
+        Returns:
+            Number of hosts removed
+        """
+        cutoff = self.clock() - max_age
+        with self._lock:
+            stale = np.flatnonzero(self.active & (self.received < cutoff))
+            for slot in stale.tolist():
+                del self._slots[self._hostnames[slot]]
+                self._hostnames[slot] = None
+                self.active[slot] = False
+                self._free.append(slot)
+        return len(stale)
+
+    def get(self, hostname: str) -> Optional[Dict[str, float]]:
+        """
+        Latest sample of one host
+
+        Args:
+            hostname: Agent hostname
+
+        Returns:
+            Dictionary keyed by SystemMetrics field name, or None if unknown
+        """
+        with self._lock:
+            slot = self._slots.get(hostname)
+            if slot is None:
+                return None
+            return dict(zip(FLEET_FIELDS, self.values[slot].tolist()))
+
+    def changed_since(self, sequence: int):
+        """
+        Rows updated since a previous call, for incremental scans
+
+        Args:
+            sequence: Value returned by the previous call (0 for everything)
+
+        Returns:
+            Tuple of (slots, generations, values, timestamps, hostnames, next sequence);
+            arrays are copies and each host appears once with its latest sample
+        """
+        with self._lock:
+            slots = np.flatnonzero(self.active & (self.sequence >= sequence))
+            return (
+                slots,
+                self.generation[slots],
+                self.values[slots],
+                self.timestamps[slots],
+                [self._hostnames[slot] for slot in slots.tolist()],
+                self._next_sequence,
+            )
+
+    def column(self, metric: str) -> np.ndarray:
+        """
+        Latest values of one metric for every active host
+
+        Args:
+            metric: SystemMetrics field name
+
+        Returns:
+            1-D array (order is unspecified)
+        """
+        index = FIELD_INDEX[metric]
+        with self._lock:
+            return self.values[self.active, index].copy()
+
+    def query(
+        self,
+        hostname_prefix: str = "",
+        ranges: Sequence[MetricRange] = (),
+        max_age: float = 0.0,
+        sort_by: str = "",
+        ascending: bool = False,
+        top_k: int = 0,
+        offset: int = 0,
+        limit: int = 0,
+    ) -> Tuple[List[Tuple[str, List[float], int, float]], int]:
+        """
+        Filter, rank and page the latest samples
+
+        Args:
+            hostname_prefix: Only hosts whose name starts with this
+            ranges: (metric, min, max) bounds, inclusive, None for open
+            max_age: Only samples received within this many seconds (0 for any)
+            sort_by: Metric to order by (empty orders by hostname)
+            ascending: Sort direction for sort_by
+            top_k: Keep only the first k after ordering (0 for all)
+            offset: Rows to skip (pagination)
+            limit: Rows to return (0 for all)
+
+        Returns:
+            Tuple of (rows, total matched before paging) where a row is
+            (hostname, values in FLEET_FIELDS order, sample timestamp, age seconds)
+        """
+        for metric, _, _ in ranges:
+            if metric not in FIELD_INDEX:
+                raise ValueError(f"Unknown metric '{metric}', expected one of {FLEET_FIELDS}")
+        if sort_by and sort_by not in FIELD_INDEX:
+            raise ValueError(f"Unknown metric '{sort_by}', expected one of {FLEET_FIELDS}")
+
+        now = self.clock()
+        with self._lock:
+            mask = self.active.copy()
+            for metric, low, high in ranges:
+                column = self.values[:, FIELD_INDEX[metric]]
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            if max_age > 0:
+                mask &= self.received >= now - max_age
+            if hostname_prefix:
+                mask &= np.fromiter(
+                    (h is not None and h.startswith(hostname_prefix) for h in self._hostnames),
+                    dtype=bool,
+                    count=len(self._hostnames),
+                )
+            slots = np.flatnonzero(mask)
+
+            if sort_by:
+                keys = self.values[slots, FIELD_INDEX[sort_by]]
+                if not ascending:
+                    keys = -keys
+                if top_k and top_k < len(slots):
+                    # Partial selection: O(n) to find the k best, then sort only those
+                    best = np.argpartition(keys, top_k - 1)[:top_k]
+                    slots = slots[best[np.argsort(keys[best], kind="stable")]]
+                else:
+                    slots = slots[np.argsort(keys, kind="stable")]
+            else:
+                slots = np.array(sorted(slots.tolist(), key=self._hostnames.__getitem__), dtype=np.int64)
+                if top_k:
+                    slots = slots[:top_k]
+
+            total = len(slots)
+            end = offset + limit if limit else total
+            page = slots[offset:end]
+            rows = [
+                (
+                    self._hostnames[slot],
+                    self.values[slot].tolist(),
+                    int(self.timestamps[slot]),
+                    now - float(self.received[slot]),
+                )
+                for slot in page.tolist()
+            ]
+        return rows, total
@@ -0,0 +1,308 @@
+"""
+Command policy - per-agent session state and change-only command decisions
+
+A policy states what each agent *should* be doing (desired config, diagnostics
+to run). The engine compares that with what the agent last reported and only
+emits a command when they differ, rate-limited per agent by cooldowns.
+"""
+
+import importlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.struct_pb2 import Struct
+
+from protobuf import monitoring_pb2
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+# Config keys agents echo back in MetricsRequest.metadata
+REPORTED_KEYS = ("interval",)
+
+
+class AgentSession:
+    """Server-side state for one connected agent"""
+
+    def __init__(self, hostname: str):
+        """
+        Initialize agent session
+
+        Args:
+            hostname: Agent hostname
+        """
+        self.hostname = hostname
+        self.reported: Dict[str, Any] = {}
+        self.samples = 0
+        self.last_seen = 0.0
+        self.last_metrics: Optional[monitoring_pb2.SystemMetrics] = None
+        # Last CONFIG sent and when, so an unacknowledged change is not resent every sample
+        self.pending_config: Dict[str, Any] = {}
+        self.last_config_at = float("-inf")
+        # Diagnostic key -> time last requested
+        self.last_diagnostic_at: Dict[str, float] = {}
+        self.commands_sent = 0
+        # Stream currently using the session (a reconnecting agent's new stream takes it over)
+        self.owner: Any = None
+
+    def observe(self, request: monitoring_pb2.MetricsRequest, now: float):
+        """
+        Record a sample and the config state the agent reported with it
+
+        Args:
+            request: Incoming MetricsRequest
+            now: Monotonic timestamp
+        """
+        self.samples += 1
+        self.last_seen = now
+        self.last_metrics = request.metrics
+        if request.HasField("metadata"):
+            metadata = MessageToDict(request.metadata)
+            for key in REPORTED_KEYS:
+                if key in metadata:
+                    self.reported[key] = metadata[key]
+        # Drop pending entries the agent has now confirmed
+        for key, value in list(self.pending_config.items()):
+            if key in self.reported and _same(self.reported[key], value):
+                del self.pending_config[key]
+
+    def effective(self, key: str) -> Any:
+        """Value the agent is believed to use: pending command, else last report"""
+        if key in self.pending_config:
+            return self.pending_config[key]
+        return self.reported.get(key)
+
+
+def _same(left: Any, right: Any) -> bool:
+    """Compare config values, treating 2 and 2.0 as equal (Struct numbers are doubles)"""
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return float(left) == float(right)
+    return left == right
+
+
+class CommandPolicy(ABC):
+    """
+    Decides the desired state of an agent from its latest sample
+
+    The engine sets self.fleet to the server's FleetTable, so policies can
+    compare an agent against the latest samples of the whole fleet.
+    """
+
+    fleet = None
+
+    def initialize(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize policy with optional configuration
+
+        Args:
+            config: Configuration dictionary
+        """
+        pass
+
+    @abstractmethod
+    def desired_config(self, session: AgentSession) -> Dict[str, Any]:
+        """
+        Config values the agent should be running with
+
+        Args:
+            session: Agent session (session.last_metrics is the latest sample)
+
+        Returns:
+            Dictionary of desired config values (empty for no opinion)
+        """
+        pass
+
+    def diagnostic(self, session: AgentSession) -> Optional[str]:
+        """
+        Diagnostic the agent should run now
+
+        Args:
+            session: Agent session
+
+        Returns:
+            Process sort key for a DIAGNOSTIC command, or None
+        """
+        return None
+
+
+class CpuIntervalPolicy(CommandPolicy):
+    """Sample idle hosts faster, busy hosts slower, and diagnose hosts over the CPU limit"""
+
+    def __init__(self):
+        """Initialize CPU interval policy"""
+        self.idle_cpu = 40.0
+        self.idle_interval = 2
+        self.busy_cpu = 70.0
+        self.busy_interval = 10
+        self.diagnostic_cpu = 80.0
+
+    def initialize(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize policy with optional configuration
+
+        Args:
+            config: Optional keys idle_cpu, idle_interval, busy_cpu, busy_interval, diagnostic_cpu
+        """
+        for key, value in (config or {}).items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    def desired_config(self, session: AgentSession) -> Dict[str, Any]:
+        cpu = session.last_metrics.cpu_percent
+        if cpu <= self.idle_cpu:
+            return {"interval": self.idle_interval}
+        if self.busy_cpu < cpu < self.diagnostic_cpu:
+            return {"interval": self.busy_interval}
+        return {}
+
+    def diagnostic(self, session: AgentSession) -> Optional[str]:
+        if session.last_metrics.cpu_percent >= self.diagnostic_cpu:
+            return "cpu_percent"
+        return None
+
+
+class PolicyEngine:
+    """Tracks agent sessions and turns policy decisions into change-only commands"""
+
+    def __init__(
+        self,
+        policy: CommandPolicy,
+        config_cooldown: float = 30.0,
+        diagnostic_cooldown: float = 300.0,
+        clock=time.monotonic,
+        fleet=None,
+    ):
+        """
+        Initialize policy engine
+
+        Args:
+            policy: Policy deciding desired agent state
+            config_cooldown: Minimum seconds between CONFIG commands to one agent
+            diagnostic_cooldown: Minimum seconds between identical DIAGNOSTIC commands to one agent
+            clock: Monotonic time source
+            fleet: Optional FleetTable made available to the policy as policy.fleet
+        """
+        self.policy = policy
+        if fleet is not None:
+            policy.fleet = fleet
+        self.config_cooldown = config_cooldown
+        self.diagnostic_cooldown = diagnostic_cooldown
+        self.clock = clock
+        self._sessions: Dict[str, AgentSession] = {}
+        self._lock = threading.Lock()
+        self.commands = {"ACK": 0, "CONFIG": 0, "DIAGNOSTIC": 0}
+
+    def open_session(self, hostname: str, owner: Any = None) -> AgentSession:
+        """
+        Get or create the session for an agent
+
+        Args:
+            hostname: Agent hostname
+            owner: Stream opening the session; it becomes the session's owner
+
+        Returns:
+            AgentSession
+        """
+        with self._lock:
+            session = self._sessions.get(hostname)
+            if session is None:
+                session = self._sessions[hostname] = AgentSession(hostname)
+            session.owner = owner
+            return session
+
+    def close_session(self, hostname: str, owner: Any = None):
+        """
+        Forget an agent (its stream ended)
+
+        A stream that lost the session to a newer stream of the same agent
+        (a reconnect before the old stream ended) leaves it in place.
+
+        Args:
+            hostname: Agent hostname
+            owner: Stream closing the session (None: close regardless of owner)
+        """
+        with self._lock:
+            session = self._sessions.get(hostname)
+            if session is not None and (owner is None or session.owner is owner):
+                del self._sessions[hostname]
+
+    def sessions(self) -> Dict[str, AgentSession]:
+        """Snapshot of the current sessions keyed by hostname"""
+        with self._lock:
+            return dict(self._sessions)
+
+    def _decide(self, session: AgentSession, now: float) -> Tuple[int, Dict[str, Any]]:
+        """Pick the command for the latest sample"""
+        key = self.policy.diagnostic(session)
+        if key is not None:
+            last = session.last_diagnostic_at.get(key)
+            if last is None or now - last >= self.diagnostic_cooldown:
+                session.last_diagnostic_at[key] = now
+                return monitoring_pb2.CommandType.DIAGNOSTIC, {"key": key}
+
+        # A change the agent has not confirmed within the cooldown is retried
+        if now - session.last_config_at >= self.config_cooldown:
+            for name in list(session.pending_config):
+                if name in session.reported:
+                    del session.pending_config[name]
+
+        desired = self.policy.desired_config(session)
+        changes = {
+            name: value
+            for name, value in desired.items()
+            if not _same(session.effective(name), value)
+        }
+        if changes and now - session.last_config_at >= self.config_cooldown:
+            session.pending_config.update(changes)
+            session.last_config_at = now
+            return monitoring_pb2.CommandType.CONFIG, changes
+
+        return monitoring_pb2.CommandType.ACK, {}
+
+    def evaluate(self, session: AgentSession, request: monitoring_pb2.MetricsRequest) -> monitoring_pb2.Command:
+        """
+        Update session state from a sample and build the reply command
+
+        Args:
+            session: Session of the agent that sent the request
+            request: Incoming MetricsRequest
+
+        Returns:
+            Command (ACK unless the desired state differs and cooldowns allow)
+        """
+        now = self.clock()
+        session.observe(request, now)
+        try:
+            cmd_type, values = self._decide(session, now)
+        except Exception as e:
+            logger.error(f"Command policy failed for {session.hostname}: {e}")
+            cmd_type, values = monitoring_pb2.CommandType.ACK, {}
+
+        params = Struct()
+        if values:
+            params.update(values)
+            session.commands_sent += 1
+            logger.debug("Command %s %s -> %s", monitoring_pb2.CommandType.Name(cmd_type), values, session.hostname)
+        self.commands[monitoring_pb2.CommandType.Name(cmd_type)] += 1
+        return monitoring_pb2.Command(type=cmd_type, params=params)
+
+
+def load_policy(cls_path: str, config: Optional[Dict[str, Any]] = None) -> CommandPolicy:
+    """
+    Instantiate a policy from its class path
+
+    Args:
+        cls_path: Full path to policy class (e.g., "grpc_server.policy.CpuIntervalPolicy")
+        config: Optional configuration passed to initialize()
+
+    Returns:
+        Initialized policy
+    """
+    module_name, class_name = cls_path.rsplit(".", 1)
+    policy_cls = getattr(importlib.import_module(module_name), class_name)
+    policy = policy_cls()
+    policy.initialize(config)
+    return policy
@@ -0,0 +1,264 @@
+"""
+Stream registry - routes commands from the command topic to open agent streams
+
+Every server instance consumes the command topic with its own consumer group,
+so each command reaches all instances and is delivered by whichever instance
+holds the addressed agent's stream.
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.protobuf.struct_pb2 import Struct
+
+from config import Config
+from protobuf import monitoring_pb2
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+# Sentinel closing an outbound stream queue
+STREAM_CLOSED = object()
+
+# Hostname list matching every connected agent
+ALL_AGENTS = "*"
+
+
+class AgentStream:
+    """Outbound side of one agent's StreamMetrics call"""
+
+    def __init__(self, hostname: str, maxsize: int = 1000):
+        """
+        Initialize agent stream
+
+        Args:
+            hostname: Agent hostname
+            maxsize: Commands buffered before new ones are dropped
+        """
+        self.hostname = hostname
+        self.outbound: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def send(self, command: monitoring_pb2.Command) -> bool:
+        """
+        Queue a command for the agent without blocking
+
+        Args:
+            command: Command to deliver
+
+        Returns:
+            True if queued, False if the buffer was full
+        """
+        try:
+            self.outbound.put_nowait(command)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self):
+        """Signal the sender that the stream is finished"""
+        while True:
+            try:
+                self.outbound.put_nowait(STREAM_CLOSED)
+                return
+            except queue.Full:
+                # Make room: the stream is ending, pending commands are moot
+                try:
+                    self.outbound.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class StreamRegistry:
+    """Thread-safe map of hostname to its open stream"""
+
+    def __init__(self):
+        """Initialize empty registry"""
+        self._streams: Dict[str, AgentStream] = {}
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.undeliverable = 0
+
+    def register(self, stream: AgentStream):
+        """
+        Register a stream (a reconnecting agent replaces its previous stream)
+
+        Args:
+            stream: Agent stream
+        """
+        with self._lock:
+            self._streams[stream.hostname] = stream
+
+    def unregister(self, stream: AgentStream):
+        """
+        Remove a stream if it is still the registered one for its hostname
+
+        Args:
+            stream: Agent stream
+        """
+        with self._lock:
+            if self._streams.get(stream.hostname) is stream:
+                del self._streams[stream.hostname]
+
+    def hostnames(self) -> List[str]:
+        """Hostnames with an open stream on this instance"""
+        with self._lock:
+            return list(self._streams)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._streams)
+
+    def dispatch(self, hostnames: Iterable[str], command: monitoring_pb2.Command) -> int:
+        """
+        Deliver a command to the addressed agents connected to this instance
+
+        Args:
+            hostnames: Target hostnames (or ["*"] for every connected agent)
+            command: Command to deliver
+
+        Returns:
+            Number of streams the command was queued on
+        """
+        with self._lock:
+            if ALL_AGENTS in hostnames:
+                targets = list(self._streams.values())
+            else:
+                targets = [self._streams[h] for h in hostnames if h in self._streams]
+        delivered = sum(1 for stream in targets if stream.send(command))
+        self.delivered += delivered
+        self.undeliverable += len(targets) - delivered
+        return delivered
+
+
+def parse_command(payload: Dict[str, Any]):
+    """
+    Parse a command topic message
+
+    Args:
+        payload: {"hostnames": [...] | "*", "type": "CONFIG" | "DIAGNOSTIC" | "ACK", "params": {...}}
+
+    Returns:
+        Tuple of (hostnames, Command)
+    """
+    hostnames = payload.get("hostnames", [])
+    if isinstance(hostnames, str):
+        hostnames = [hostnames]
+    params = Struct()
+    params.update(payload.get("params") or {})
+    command = monitoring_pb2.Command(
+        type=monitoring_pb2.CommandType.Value(payload["type"].upper()),
+        params=params,
+    )
+    return hostnames, command
+
+
+class CommandRouter:
+    """Consumes the command topic in batches and dispatches to the stream registry"""
+
+    def __init__(
+        self,
+        registry: StreamRegistry,
+        consumer=None,
+        topic: str = Config.COMMAND_TOPIC,
+        batch_size: int = 500,
+        counters=None,
+    ):
+        """
+        Initialize command router
+
+        Args:
+            registry: Registry of open agent streams
+            consumer: Optional Kafka consumer (defaults to a confluent_kafka.Consumer with
+                      a group unique to this instance, starting at the latest offset)
+            topic: Command topic
+            batch_size: Maximum messages taken per consume() call
+            counters: Optional ServerCounters credited with routed deliveries
+        """
+        if consumer is None:
+            from confluent_kafka import Consumer
+
+            consumer = Consumer(
+                {
+                    "bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER,
+                    # One group per instance: every instance sees every command
+                    "group.id": f"{Config.COMMAND_GROUP_ID}-{socket.gethostname()}-{os.getpid()}",
+                    "auto.offset.reset": "latest",
+                    "enable.auto.commit": False,
+                }
+            )
+        self.registry = registry
+        self.consumer = consumer
+        self.topic = topic
+        self.batch_size = batch_size
+        self.counters = counters
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.errors = 0
+
+    def start(self):
+        """Subscribe and start the routing thread"""
+        self.consumer.subscribe([self.topic])
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="command-router", daemon=True)
+        self._thread.start()
+        logger.info(f"Routing commands from topic '{self.topic}'")
+
+    def stop(self):
+        """Stop the routing thread and close the consumer"""
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.consumer.close()
+
+    def handle(self, value: bytes) -> int:
+        """
+        Dispatch one command topic message
+
+        Args:
+            value: JSON-encoded command message
+
+        Returns:
+            Number of local streams the command was delivered to
+        """
+        try:
+            hostnames, command = parse_command(json.loads(value))
+        except (ValueError, KeyError, TypeError) as e:
+            self.errors += 1
+            logger.error(f"Invalid command message: {e}")
+            return 0
+        self.received += 1
+        delivered = self.registry.dispatch(hostnames, command)
+        if self.counters is not None:
+            self.counters.incr("commands_routed", delivered)
+        logger.debug(
+            "Command %s for %d host(s) delivered to %d local stream(s)",
+            monitoring_pb2.CommandType.Name(command.type),
+            len(hostnames),
+            delivered,
+        )
+        return delivered
+
+    def _loop(self):
+        while self.running:
+            try:
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=0.1)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error consuming commands: {e}")
+                continue
+            if not messages:
+                continue
+            for msg in messages:
+                if msg.error():
+                    self.errors += 1
+                    logger.error(f"Command consumer error: {msg.error()}")
+                    continue
+                self.handle(msg.value())
@@ -7,103 +7,319 @@ gRPC Server - Broker between Agents and Kafka
 import grpc
 import threading
 import json
+import time
 from concurrent import futures
+from typing import Optional
 from config import Config
 from protobuf import monitoring_pb2, monitoring_pb2_grpc
 from confluent_kafka import Producer
-from google.protobuf.struct_pb2 import Struct
 from google.protobuf.json_format import MessageToDict
+from grpc_server.anomaly import AnomalyMonitor
+from grpc_server.counters import ServerCounters
+from grpc_server.fleet import FLEET_FIELDS, FleetTable
+from grpc_server.policy import PolicyEngine, load_policy
+from grpc_server.registry import STREAM_CLOSED, AgentStream, CommandRouter, StreamRegistry
+from telemetry.exporter import MetricsRegistry, StatsServer
+from telemetry.log import get_logger
+from telemetry.tracing import HopTracer, trace_from_metadata, trace_header
+
+logger = get_logger(__name__)
 
 
 class MonitoringServicer(monitoring_pb2_grpc.MonitoringServicer):
     """gRPC service implementation for receiving monitoring data from agents"""
 
-    def __init__(self):
+    def __init__(
+        self, producer=None, engine=None, registry=None, counters=None, fleet=None, tracer=None, worker=0, workers=1
+    ):
         """
         Initialize the monitoring service
 
         Args:
-            kafka_producer: Kafka producer service for forwarding data
-            kafka_bootstrap_servers: Kafka bootstrap servers
+            producer: Optional Kafka producer (defaults to a confluent_kafka.Producer
+                      for KAFKA_BOOTSTRAP_SERVERS; load tests pass an in-process stand-in)
+            engine: Optional PolicyEngine (defaults to COMMAND_POLICY with the configured cooldowns)
+            registry: Optional StreamRegistry open streams are registered in for command routing
+            counters: Optional ServerCounters (shared-memory backed under the supervisor)
+            fleet: Optional FleetTable holding the latest sample per agent
+            tracer: Optional HopTracer stamping the received and produced hops
+                    (defaults to one when TRACING is on)
+            worker: Index of this worker process under the supervisor
+            workers: Number of worker processes; with more than one, fleet snapshots are marked partial
         """
-        self.producer = Producer(
-            {
-                "bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER,
-            }
-        )
+        if producer is None:
+            producer = Producer(
+                {
+                    "bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER,
+                }
+            )
+        self.producer = producer
+        self.fleet = fleet if fleet is not None else FleetTable()
+        if engine is None:
+            engine = PolicyEngine(
+                load_policy(Config.COMMAND_POLICY),
+                config_cooldown=Config.COMMAND_COOLDOWN_SECONDS,
+                diagnostic_cooldown=Config.DIAGNOSTIC_COOLDOWN_SECONDS,
+                fleet=self.fleet,
+            )
+        self.engine = engine
+        self.registry = registry if registry is not None else StreamRegistry()
+        self.counters = counters if counters is not None else ServerCounters()
+        self.tracer = tracer if tracer is not None else (HopTracer() if Config.TRACING else None)
+        self.worker = worker
+        self.workers = workers
         self.lock = threading.Lock()
+        self._last_expiry = 0.0
 
     def StreamMetrics(self, request_iterator, context):
         """
         Client streaming: Agent sends metrics
         - Receives: stream MetricsRequest (periodic data from agent)
         - Forwards metrics to Kafka
+        - Replies ACK, or a command when the policy wants the agent's state changed
+        - Pushes commands routed to this agent from the command topic at any time
+
+        Requests are read on a separate thread so routed commands do not wait
+        for the agent's next sample; this generator only drains the outbound queue.
+        """
+        stream = AgentStream(hostname="")
+        reader = threading.Thread(
+            target=self._receive, args=(request_iterator, stream), name="stream-reader", daemon=True
+        )
+        reader.start()
+        while True:
+            command = stream.outbound.get()
+            if command is STREAM_CLOSED:
+                break
+            yield command
+
+    def _receive(self, request_iterator, stream: AgentStream):
         """
+        Inbound side of a stream: forward samples and queue the policy reply
+
+        Args:
+            request_iterator: Incoming MetricsRequest stream
+            stream: Outbound stream of the same call
+        """
+        session = None
         try:
             for request in request_iterator:
-                self.producer.produce(
-                    Config.MONITORING_TOPIC,
-                    key=request.hostname.encode("utf-8"),
-                    value=json.dumps(
-                        {
-                            "hostname": request.hostname,
-                            "timestamp": request.timestamp,
-                            "metrics": {
-                                "cpu_percent": request.metrics.cpu_percent,
-                                "memory_percent": request.metrics.memory_percent,
-                                "memory_used_mb": request.metrics.memory_used_mb,
-                                "memory_total_mb": request.metrics.memory_total_mb,
-                                "disk_read_mb": request.metrics.disk_read_mb,
-                                "disk_write_mb": request.metrics.disk_write_mb,
-                                "net_in_mb": request.metrics.net_in_mb,
-                                "net_out_mb": request.metrics.net_out_mb,
-                            },
-                            "metadata": MessageToDict(request.metadata),
-                        }
-                    ).encode("utf-8"),
-                )
-                self.producer.flush()
-
-                cmd_type = monitoring_pb2.CommandType.ACK
-                params = Struct()
-                cpu_percent = request.metrics.cpu_percent
-                if cpu_percent <= 40.0:
-                    cmd_type = monitoring_pb2.CommandType.CONFIG
-                    params.update({"interval": 2})
-                elif cpu_percent > 70.0 and cpu_percent < 80.0:
-                    cmd_type = monitoring_pb2.CommandType.CONFIG
-                    params.update({"interval": 10})
-                elif cpu_percent >= 80.0:
-                    cmd_type = monitoring_pb2.CommandType.DIAGNOSTIC
-                    params.update({"key": "cpu_percent"})
-
-                yield monitoring_pb2.Command(type=cmd_type, params=params)
+                received_at = time.time()
+                if session is None:
+                    stream.hostname = request.hostname
+                    self.registry.register(stream)
+                    session = self.engine.open_session(request.hostname, owner=stream)
+                    self.counters.incr("streams_opened")
+                    self.counters.incr("streams_active")
+                self.counters.incr("requests")
+                self.fleet.update(request)
+                self._forward(request, received_at)
+                stream.send(self.engine.evaluate(session, request))
 
         except Exception as e:
-            pass
+            logger.error(f"Error in metrics stream: {e}")
+        finally:
+            if session is not None:
+                self.engine.close_session(session.hostname, owner=stream)
+                self.registry.unregister(stream)
+                self.counters.incr("streams_active", -1)
+            stream.close()
+
+    def _forward(self, request: monitoring_pb2.MetricsRequest, received_at: Optional[float] = None):
+        """
+        Produce one sample to the monitoring topic
+
+        Delivery is asynchronous: the producer batches in the background and
+        poll(0) serves completed delivery callbacks without waiting. With
+        tracing, the sample's hop timestamps go along in the "trace" header.
+
+        Args:
+            request: Incoming MetricsRequest
+            received_at: Time the request was read off the stream (the received hop)
+        """
+        key = request.hostname.encode("utf-8")
+        metadata = MessageToDict(request.metadata)
+        value = json.dumps(
+            {
+                "hostname": request.hostname,
+                "timestamp": request.timestamp,
+                "timestamp_ms": request.timestamp_ms,
+                "metrics": {
+                    "cpu_percent": request.metrics.cpu_percent,
+                    "memory_percent": request.metrics.memory_percent,
+                    "memory_used_mb": request.metrics.memory_used_mb,
+                    "memory_total_mb": request.metrics.memory_total_mb,
+                    "disk_read_mb": request.metrics.disk_read_mb,
+                    "disk_write_mb": request.metrics.disk_write_mb,
+                    "net_in_mb": request.metrics.net_in_mb,
+                    "net_out_mb": request.metrics.net_out_mb,
+                },
+                "metadata": metadata,
+            }
+        ).encode("utf-8")
+        extra = {}
+        if self.tracer is not None:
+            trace = trace_from_metadata(metadata)
+            self.tracer.stamp(trace, "received", received_at)
+            extra["headers"] = [trace_header(self.tracer.stamp(trace, "produced"))]
+        try:
+            self.producer.produce(
+                Config.MONITORING_TOPIC, key=key, value=value, on_delivery=self._on_delivery, **extra
+            )
+        except BufferError:
+            # Local queue full: wait briefly for deliveries to drain, then retry once
+            self.counters.incr("buffer_full")
+            self.producer.poll(0.5)
+            self.producer.produce(
+                Config.MONITORING_TOPIC, key=key, value=value, on_delivery=self._on_delivery, **extra
+            )
+        self.producer.poll(0)
+
+    def GetFleetSnapshot(self, request, context):
+        """
+        Unary: latest sample per agent from memory
+        - Filters by hostname prefix, metric ranges and sample age
+        - Orders by a metric (top-K) or by hostname, then pages with an offset token
+        - Under several worker processes, only covers this worker's agents (partial=True)
+        """
+        now = time.monotonic()
+        if now - self._last_expiry >= 60.0:
+            self._last_expiry = now
+            self.fleet.expire(Config.FLEET_MAX_AGE_SECONDS)
+
+        try:
+            offset = int(request.page_token) if request.page_token else 0
+        except ValueError:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Invalid page_token '{request.page_token}'")
+        page_size = min(request.page_size or 100, 10000)
+        ranges = [
+            (
+                r.metric,
+                r.min if r.HasField("min") else None,
+                r.max if r.HasField("max") else None,
+            )
+            for r in request.ranges
+        ]
+        try:
+            rows, total = self.fleet.query(
+                hostname_prefix=request.hostname_prefix,
+                ranges=ranges,
+                max_age=request.max_age_seconds,
+                sort_by=request.sort_by,
+                ascending=request.ascending,
+                top_k=request.top_k,
+                offset=offset,
+                limit=page_size,
+            )
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        response = monitoring_pb2.FleetSnapshotResponse(
+            total_matched=total,
+            fleet_size=len(self.fleet),
+            next_page_token=str(offset + page_size) if offset + page_size < total else "",
+            partial=self.workers > 1,
+            worker=self.worker,
+            workers=self.workers,
+        )
+        for hostname, values, timestamp, age in rows:
+            response.hosts.add(
+                hostname=hostname,
+                metrics=monitoring_pb2.SystemMetrics(**dict(zip(FLEET_FIELDS, values))),
+                timestamp=timestamp,
+                age_seconds=age,
+            )
+        return response
 
+    def _on_delivery(self, err, msg):
+        """Producer delivery callback"""
+        if err is not None:
+            self.counters.incr("delivery_errors")
+            logger.error(f"Kafka delivery failed: {err}")
+        else:
+            self.counters.incr("produced")
 
-def serve(port):
+
+def serve(
+    port,
+    max_workers=None,
+    producer=None,
+    command_consumer=None,
+    counters=None,
+    reuse_port=False,
+    stats_port=None,
+    worker=0,
+    workers=1,
+):
     """
     Start the gRPC server
 
+    Every open agent stream occupies one worker thread for its whole lifetime
+    (plus a reader thread outside the pool), so max_workers caps the number of
+    concurrently connected agents. Commands published to COMMAND_TOPIC are
+    routed to the addressed agents' open streams.
+
     Args:
         port: Port to listen on (defaults to GRPC_SERVER_PORT env var or 50051)
-        kafka_bootstrap_servers: Kafka bootstrap servers (defaults to KAFKA_BOOTSTRAP_SERVERS env var or localhost:9092)
+        max_workers: Worker threads (defaults to GRPC_MAX_WORKERS env var or 10)
+        producer: Optional Kafka producer stand-in (see MonitoringServicer)
+        command_consumer: Optional command topic consumer stand-in (see CommandRouter)
+        counters: Optional ServerCounters (the supervisor passes a shared-memory slot)
+        reuse_port: Bind with SO_REUSEPORT so several worker processes share the port
+        stats_port: Local port of the Prometheus-text stats endpoint with the hop latencies
+                    (defaults to SERVER_STATS_PORT env var, 0 disables)
+        worker: Index of this worker process under the supervisor
+        workers: Number of worker processes sharing the port
     """
 
     # Create gRPC server
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    _server_servicer = MonitoringServicer()
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers or Config.GRPC_MAX_WORKERS),
+        options=[("grpc.so_reuseport", 1 if reuse_port else 0)],
+    )
+    counters = counters if counters is not None else ServerCounters()
+    registry = StreamRegistry()
+    router = CommandRouter(registry, consumer=command_consumer, counters=counters)
+    _server_servicer = MonitoringServicer(
+        producer=producer, registry=registry, counters=counters, worker=worker, workers=workers
+    )
     monitoring_pb2_grpc.add_MonitoringServicer_to_server(_server_servicer, server)
     server.add_insecure_port(f"[::]:{port}")
+    monitor = None
+    if Config.ANOMALY_DETECTION:
+        monitor = AnomalyMonitor(
+            _server_servicer.fleet,
+            producer=_server_servicer.producer,
+            registry=registry,
+            counters=counters,
+            diagnostics=Config.ANOMALY_DIAGNOSTICS,
+        )
+
+    stats_port = Config.SERVER_STATS_PORT if stats_port is None else stats_port
+    stats_server = None
+    if stats_port and _server_servicer.tracer is not None:
+        stats_registry = MetricsRegistry()
+        stats_registry.register(_server_servicer.tracer.render)
+        stats_server = StatsServer(stats_registry, stats_port)
 
     server.start()
-    print(f"gRPC Server running on port {port}")
-    print(f"Kafka: {Config.KAFKA_BOOTSTRAP_SERVER}")
+    router.start()
+    if monitor is not None:
+        monitor.start()
+    if stats_server is not None:
+        stats_server.start()
+    logger.info(f"gRPC Server running on port {port}")
+    logger.info(f"Kafka: {Config.KAFKA_BOOTSTRAP_SERVER}")
 
     try:
         server.wait_for_termination()
     except KeyboardInterrupt:
-        print("\n\nShutting down server...")
+        logger.info("Shutting down server...")
         server.stop(0)
+    finally:
+        if stats_server is not None:
+            stats_server.stop()
+        if monitor is not None:
+            monitor.stop()
+        router.stop()
+        _server_servicer.producer.flush(5)
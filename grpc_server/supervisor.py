@@ -0,0 +1,230 @@
+"""
+Server supervisor - runs N gRPC worker processes on one port and restarts them
+
+Each worker binds the same port with SO_REUSEPORT (the kernel spreads new
+connections across them), owns its own Kafka producer and command router, and
+writes its counters to a slot of a shared-memory array the supervisor sums.
+"""
+
+import ctypes
+import multiprocessing
+import signal
+import time
+from typing import Dict, List, Optional
+
+from config import Config
+from grpc_server.counters import COUNTERS, ServerCounters, aggregate
+from telemetry.log import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+
+def _worker_main(
+    slot: int,
+    port: int,
+    max_workers: Optional[int],
+    shared,
+    log_level: Optional[str],
+    stats_port: int = 0,
+    workers: int = 1,
+):
+    """
+    Worker process entry point
+
+    Args:
+        slot: Worker index (its slot in the shared counter array)
+        port: Shared listening port
+        max_workers: gRPC worker threads in this process
+        shared: Shared counter array
+        log_level: Log level for the worker
+        stats_port: Stats endpoint port of this worker (0 disables)
+        workers: Number of worker processes
+    """
+    from grpc_server.server import serve
+
+    setup_logging(log_level)
+
+    def _terminate(signum, frame):
+        # Only the first signal interrupts; let the producer flush undisturbed
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise KeyboardInterrupt
+
+    # The supervisor stops workers with SIGTERM; shut down like on Ctrl+C
+    signal.signal(signal.SIGTERM, _terminate)
+    logger.info(f"Worker {slot} started")
+    serve(
+        port,
+        max_workers=max_workers,
+        counters=ServerCounters(shared, slot),
+        reuse_port=True,
+        stats_port=stats_port,
+        worker=slot,
+        workers=workers,
+    )
+
+
+class Supervisor:
+    """Starts, watches and restarts server worker processes"""
+
+    def __init__(
+        self,
+        port: int,
+        processes: int,
+        max_workers: Optional[int] = None,
+        stats_interval: float = 30.0,
+        log_level: Optional[str] = None,
+        stats_port: int = 0,
+    ):
+        """
+        Initialize supervisor
+
+        Args:
+            port: Port every worker binds
+            processes: Number of worker processes
+            max_workers: gRPC worker threads per process (defaults to GRPC_MAX_WORKERS)
+            stats_interval: Seconds between aggregated counter log lines (0 disables)
+            log_level: Log level passed to workers
+            stats_port: Stats endpoint port of worker 0; worker N listens on stats_port + N (0 disables)
+        """
+        self.port = port
+        self.processes = processes
+        self.max_workers = max_workers
+        self.stats_interval = stats_interval
+        self.log_level = log_level
+        self.stats_port = stats_port
+        # Workers are spawned, not forked: gRPC must not be initialized across fork()
+        self._context = multiprocessing.get_context("spawn")
+        self.shared = self._context.Array(ctypes.c_longlong, processes * len(COUNTERS), lock=False)
+        self._workers: List[Optional[multiprocessing.Process]] = [None] * processes
+        self._started_at = [0.0] * processes
+        self._backoff = [1.0] * processes
+        self._restart_at = [0.0] * processes
+        self.restarts = 0
+        self.running = False
+
+    def _start_worker(self, slot: int):
+        """Start (or restart) the worker for a slot"""
+        # A dead worker's open streams are gone with it
+        self.shared[slot * len(COUNTERS) + COUNTERS.index("streams_active")] = 0
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                slot,
+                self.port,
+                self.max_workers,
+                self.shared,
+                self.log_level,
+                self.stats_port + slot if self.stats_port else 0,
+                self.processes,
+            ),
+            name=f"grpc-worker-{slot}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[slot] = process
+        self._started_at[slot] = time.monotonic()
+
+    def totals(self) -> Dict[str, int]:
+        """
+        Counters summed over all workers
+
+        Returns:
+            Totals keyed by counter name
+        """
+        return aggregate(self.shared, self.processes)
+
+    def _check_workers(self):
+        """Restart exited workers with exponential backoff"""
+        now = time.monotonic()
+        for slot, process in enumerate(self._workers):
+            if process is None or process.is_alive():
+                continue
+            if self._restart_at[slot] == 0.0:
+                # Workers that ran for a while get a fresh backoff
+                if now - self._started_at[slot] > 60.0:
+                    self._backoff[slot] = 1.0
+                self._restart_at[slot] = now + self._backoff[slot]
+                logger.warning(
+                    f"Worker {slot} exited with code {process.exitcode}, restarting in {self._backoff[slot]:.0f}s"
+                )
+                self._backoff[slot] = min(self._backoff[slot] * 2, 30.0)
+            elif now >= self._restart_at[slot]:
+                self._restart_at[slot] = 0.0
+                self.restarts += 1
+                self._start_worker(slot)
+
+    def run(self):
+        """Run workers until interrupted"""
+        self.running = True
+        for slot in range(self.processes):
+            self._start_worker(slot)
+        logger.info(f"Supervisor started {self.processes} workers on port {self.port}")
+
+        def _terminate(signum, frame):
+            self.running = False
+
+        signal.signal(signal.SIGTERM, _terminate)
+
+        last_report = time.monotonic()
+        try:
+            while self.running:
+                time.sleep(0.5)
+                self._check_workers()
+                if self.stats_interval and time.monotonic() - last_report >= self.stats_interval:
+                    last_report = time.monotonic()
+                    totals = self.totals()
+                    logger.info(
+                        "Workers: %d alive, %d restarts | streams %d active | requests %d | produced %d | "
+                        "delivery errors %d | commands routed %d | anomalies %d",
+                        sum(1 for p in self._workers if p is not None and p.is_alive()),
+                        self.restarts,
+                        totals["streams_active"],
+                        totals["requests"],
+                        totals["produced"],
+                        totals["delivery_errors"],
+                        totals["commands_routed"],
+                        totals["anomalies"],
+                    )
+        except KeyboardInterrupt:
+            logger.info("Shutting down workers...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop all workers"""
+        self.running = False
+        for process in self._workers:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._workers:
+            if process is not None:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.kill()
+        logger.info(f"Supervisor stopped; totals: {self.totals()}")
+
+
+def serve_processes(
+    port: int,
+    processes: int,
+    max_workers: Optional[int] = None,
+    log_level: Optional[str] = None,
+    stats_port: int = 0,
+):
+    """
+    Run the server as several worker processes sharing one port
+
+    Args:
+        port: Port to listen on
+        processes: Number of worker processes
+        max_workers: gRPC worker threads per process (defaults to GRPC_MAX_WORKERS)
+        log_level: Log level for supervisor and workers
+        stats_port: Stats endpoint port of worker 0; worker N listens on stats_port + N (0 disables)
+    """
+    Supervisor(
+        port,
+        processes,
+        max_workers=max_workers or Config.GRPC_MAX_WORKERS,
+        log_level=log_level,
+        stats_port=stats_port,
+    ).run()
@@ -0,0 +1,12 @@
+"""
+Load generator module - simulates many agents against the gRPC server
+"""
+
+from loadgen.simulator import FleetSimulator
+from loadgen.runner import LoadGenerator, run_load
+
+__all__ = [
+    "FleetSimulator",
+    "LoadGenerator",
+    "run_load",
+]
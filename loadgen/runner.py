@@ -0,0 +1,227 @@
+"""
+Load generator - drives many simulated agents over asyncio gRPC streams
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+import grpc
+
+from loadgen.simulator import FleetSimulator
+from protobuf import monitoring_pb2, monitoring_pb2_grpc
+from telemetry.histogram import LatencyHistogram
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+PATTERN_STEADY = "steady"
+PATTERN_SYNC = "sync"
+PATTERN_BURST = "burst"
+PATTERNS = (PATTERN_STEADY, PATTERN_SYNC, PATTERN_BURST)
+
+REPORT_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class LoadGenerator:
+    """Simulates N agents in one process, each with its own StreamMetrics stream"""
+
+    def __init__(
+        self,
+        server_address: str,
+        num_agents: int,
+        interval: float = 5.0,
+        duration: float = 60.0,
+        pattern: str = PATTERN_STEADY,
+        burst_factor: float = 10.0,
+        burst_period: float = 60.0,
+        burst_duration: float = 10.0,
+        channels: int = 8,
+        hostname_prefix: str = "sim",
+        seed: int = 0,
+    ):
+        """
+        Initialize load generator
+
+        Args:
+            server_address: gRPC server address
+            num_agents: Number of simulated agents
+            interval: Seconds between samples per agent
+            duration: Length of the run in seconds
+            pattern: "steady" (agents spread over the interval), "sync" (all agents tick
+                     together) or "burst" (periodic windows sending burst_factor times faster)
+            burst_factor: Rate multiplier inside a burst window
+            burst_period: Seconds between the starts of burst windows
+            burst_duration: Length of each burst window in seconds
+            channels: Number of gRPC connections the agent streams are spread over
+            hostname_prefix: Simulated hostnames are <prefix>-<index>
+            seed: Random seed for the metric series
+        """
+        if pattern not in PATTERNS:
+            raise ValueError(f"Unknown pattern '{pattern}', expected one of {PATTERNS}")
+        self.server_address = server_address
+        self.num_agents = num_agents
+        self.interval = interval
+        self.duration = duration
+        self.pattern = pattern
+        self.burst_factor = burst_factor
+        self.burst_period = burst_period
+        self.burst_duration = burst_duration
+        self.channels = max(1, channels)
+        self.hostname_prefix = hostname_prefix
+
+        self.simulator = FleetSimulator(num_agents, seed=seed)
+        self.latency = LatencyHistogram()
+        self.sent = 0
+        self.acked = 0
+        self.stream_errors = 0
+        self.commands = Counter()
+        self._started_at = 0.0
+
+    def _current_interval(self, now: float) -> float:
+        """Interval to the next sample given the burst pattern"""
+        if self.pattern == PATTERN_BURST:
+            elapsed = now - self._started_at
+            if elapsed % self.burst_period < self.burst_duration:
+                return self.interval / self.burst_factor
+        return self.interval
+
+    async def _read_acks(self, call, sent_times: deque):
+        """Match each server Command to the oldest unacknowledged request"""
+        async for command in call:
+            received = time.perf_counter()
+            if sent_times:
+                self.latency.record(received - sent_times.popleft())
+            self.acked += 1
+            self.commands[monitoring_pb2.CommandType.Name(command.type)] += 1
+
+    async def _run_agent(self, index: int, channel, deadline: float):
+        """Stream samples for one simulated agent until the deadline"""
+        hostname = f"{self.hostname_prefix}-{index:05d}"
+        stub = monitoring_pb2_grpc.MonitoringStub(channel)
+        loop = asyncio.get_running_loop()
+
+        if self.pattern != PATTERN_SYNC:
+            await asyncio.sleep(self.interval * index / self.num_agents)
+
+        call = stub.StreamMetrics()
+        sent_times: deque = deque()
+        reader = asyncio.create_task(self._read_acks(call, sent_times))
+        tick = 0
+        next_send = loop.time()
+        try:
+            while next_send < deadline:
+                sample = self.simulator.sample(tick, index)
+                now = time.time()
+                request = monitoring_pb2.MetricsRequest(
+                    hostname=hostname,
+                    timestamp=int(now),
+                    timestamp_ms=int(now * 1000),
+                    metrics=monitoring_pb2.SystemMetrics(**sample),
+                )
+                sent_times.append(time.perf_counter())
+                await call.write(request)
+                self.sent += 1
+                tick += 1
+
+                next_send += self._current_interval(next_send)
+                delay = next_send - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await call.done_writing()
+            await reader
+        except grpc.aio.AioRpcError as e:
+            self.stream_errors += 1
+            logger.debug("Stream %s failed: %s", hostname, e.code())
+            reader.cancel()
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run the load test
+
+        Returns:
+            Report dictionary (see report())
+        """
+        channel_options = [("grpc.use_local_subchannel_pool", 1)]
+        channels = [
+            grpc.aio.insecure_channel(self.server_address, options=channel_options)
+            for _ in range(self.channels)
+        ]
+        try:
+            loop = asyncio.get_running_loop()
+            self._started_at = loop.time()
+            deadline = self._started_at + self.duration
+            await asyncio.gather(
+                *(
+                    self._run_agent(i, channels[i % self.channels], deadline)
+                    for i in range(self.num_agents)
+                )
+            )
+            elapsed = loop.time() - self._started_at
+        finally:
+            for channel in channels:
+                await channel.close()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        """
+        Build the run report
+
+        Args:
+            elapsed: Wall-clock run time in seconds
+
+        Returns:
+            Dictionary with counts, sustained throughput and ack latency percentiles
+        """
+        latency_ms = {
+            f"p{p:g}": value * 1000
+            for p, value in self.latency.percentiles(REPORT_PERCENTILES).items()
+        }
+        latency_ms["max"] = self.latency.max_seconds * 1000
+        return {
+            "agents": self.num_agents,
+            "pattern": self.pattern,
+            "interval_s": self.interval,
+            "elapsed_s": elapsed,
+            "sent": self.sent,
+            "acked": self.acked,
+            "stream_errors": self.stream_errors,
+            "sent_per_s": self.sent / elapsed if elapsed else 0.0,
+            "acked_per_s": self.acked / elapsed if elapsed else 0.0,
+            "ack_latency_ms": latency_ms,
+            "commands": dict(self.commands),
+        }
+
+
+def run_load(generator: LoadGenerator) -> Dict[str, Any]:
+    """
+    Run a load generator to completion on a fresh event loop
+
+    Args:
+        generator: Configured LoadGenerator
+
+    Returns:
+        Run report
+    """
+    return asyncio.run(generator.run())
+
+
+def serve_local(port: int, max_workers: int, retain: Optional[int] = 0):
+    """
+    Run MonitoringServicer in this process against an in-memory Kafka stand-in
+
+    Args:
+        port: Port to listen on
+        max_workers: gRPC worker threads (one per concurrent agent stream)
+        retain: Messages kept per topic by the stand-in producer
+    """
+    from fakes.kafka import FakeConsumer, FakeProducer
+    from grpc_server.server import serve
+
+    serve(
+        port,
+        max_workers=max_workers,
+        producer=FakeProducer(retain=retain or 0),
+        command_consumer=FakeConsumer(),
+    )
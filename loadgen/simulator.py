@@ -0,0 +1,134 @@
+"""
+Fleet simulator - vectorized generation of realistic metric series for many agents
+"""
+
+from typing import Dict
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for the load generator. Install it with: pip install numpy"
+    )
+
+# Column order of the generated sample matrix (matches SystemMetrics fields)
+METRIC_FIELDS = (
+    "cpu_percent",
+    "memory_percent",
+    "memory_used_mb",
+    "memory_total_mb",
+    "disk_read_mb",
+    "disk_write_mb",
+    "net_in_mb",
+    "net_out_mb",
+)
+
+MEMORY_SIZES_MB = np.array([4096.0, 8192.0, 16384.0, 32768.0, 65536.0])
+
+
+class FleetSimulator:
+    """Generates one sample per agent per tick for the whole fleet in a single NumPy pass"""
+
+    def __init__(
+        self,
+        num_agents: int,
+        seed: int = 0,
+        diurnal_period_ticks: int = 720,
+        spike_probability: float = 0.002,
+        cache_ticks: int = 8,
+    ):
+        """
+        Initialize fleet simulator
+
+        Args:
+            num_agents: Number of simulated agents
+            seed: Random seed for reproducible runs
+            diurnal_period_ticks: Length of the simulated day in ticks
+            spike_probability: Per-agent, per-tick probability of a CPU spike
+            cache_ticks: Number of generated ticks kept for agents lagging behind
+        """
+        self.num_agents = num_agents
+        self.rng = np.random.default_rng(seed)
+        self.diurnal_period_ticks = diurnal_period_ticks
+        self.spike_probability = spike_probability
+        self.cache_ticks = cache_ticks
+
+        n = num_agents
+        self.cpu_base = self.rng.uniform(5.0, 55.0, n)
+        self.cpu_amplitude = self.rng.uniform(2.0, 20.0, n)
+        self.phase = self.rng.uniform(0.0, 2 * np.pi, n)
+        self.memory_total = self.rng.choice(MEMORY_SIZES_MB, n)
+        self.memory_percent = self.rng.uniform(20.0, 70.0, n)
+        self.io_scale = self.rng.lognormal(0.0, 1.0, n)
+        self.cpu_noise = np.zeros(n)
+
+        self._ticks: Dict[int, np.ndarray] = {}
+        self._next_tick = 0
+
+    def _generate(self) -> np.ndarray:
+        """Advance every agent by one tick"""
+        n = self.num_agents
+        t = self._next_tick
+        rng = self.rng
+
+        # AR(1) noise around a per-agent diurnal curve, plus rare spikes
+        self.cpu_noise = 0.8 * self.cpu_noise + rng.normal(0.0, 3.0, n)
+        diurnal = np.sin(2 * np.pi * t / self.diurnal_period_ticks + self.phase)
+        spikes = (rng.random(n) < self.spike_probability) * rng.uniform(30.0, 60.0, n)
+        cpu = np.clip(
+            self.cpu_base + self.cpu_amplitude * diurnal + self.cpu_noise + spikes,
+            0.0,
+            100.0,
+        )
+
+        # Memory drifts slowly as a bounded random walk
+        self.memory_percent = np.clip(
+            self.memory_percent + rng.normal(0.0, 0.3, n), 5.0, 98.0
+        )
+        memory_used = self.memory_total * self.memory_percent / 100.0
+
+        # Disk and network rates are heavy-tailed and loosely follow CPU
+        load = (cpu / 100.0 + 0.1)[:, None]
+        io = rng.lognormal(0.0, 0.8, (n, 4)) * self.io_scale[:, None] * load
+
+        samples = np.empty((n, len(METRIC_FIELDS)))
+        samples[:, 0] = cpu
+        samples[:, 1] = self.memory_percent
+        samples[:, 2] = memory_used
+        samples[:, 3] = self.memory_total
+        samples[:, 4:8] = io
+        return samples
+
+    def tick(self, index: int) -> np.ndarray:
+        """
+        Get the fleet sample matrix for a tick, generating ticks up to it if needed
+
+        Args:
+            index: Tick number
+
+        Returns:
+            Array of shape (num_agents, len(METRIC_FIELDS))
+        """
+        while self._next_tick <= index:
+            self._ticks[self._next_tick] = self._generate()
+            self._ticks.pop(self._next_tick - self.cache_ticks, None)
+            self._next_tick += 1
+        samples = self._ticks.get(index)
+        if samples is None:
+            # Agent fell further behind than the cache; serve the oldest kept tick
+            samples = self._ticks[min(self._ticks)]
+        return samples
+
+    def sample(self, index: int, agent: int) -> Dict[str, float]:
+        """
+        Get one agent's sample for a tick
+
+        Args:
+            index: Tick number
+            agent: Agent index
+
+        Returns:
+            Dictionary keyed by SystemMetrics field name
+        """
+        row = self.tick(index)[agent]
+        return dict(zip(METRIC_FIELDS, row.tolist()))
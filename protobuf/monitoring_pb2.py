@@ -25,21 +25,29 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import struct_pb2 as google_dot_protobuf_dot_struct__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x19protobuf/monitoring.proto\x12\nmonitoring\x1a\x1cgoogle/protobuf/struct.proto\"\xc1\x01\n\rSystemMetrics\x12\x13\n\x0b\x63pu_percent\x18\x01 \x01(\x01\x12\x16\n\x0ememory_percent\x18\x02 \x01(\x01\x12\x16\n\x0ememory_used_mb\x18\x03 \x01(\x01\x12\x17\n\x0fmemory_total_mb\x18\x04 \x01(\x01\x12\x14\n\x0c\x64isk_read_mb\x18\x05 \x01(\x01\x12\x15\n\rdisk_write_mb\x18\x06 \x01(\x01\x12\x11\n\tnet_in_mb\x18\x07 \x01(\x01\x12\x12\n\nnet_out_mb\x18\x08 \x01(\x01\"\x8c\x01\n\x0eMetricsRequest\x12\x10\n\x08hostname\x18\x01 \x01(\t\x12*\n\x07metrics\x18\x02 \x01(\x0b\x32\x19.monitoring.SystemMetrics\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12)\n\x08metadata\x18\x04 \x01(\x0b\x32\x17.google.protobuf.Struct\"Y\n\x07\x43ommand\x12%\n\x04type\x18\x01 \x01(\x0e\x32\x17.monitoring.CommandType\x12\'\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct*2\n\x0b\x43ommandType\x12\x07\n\x03\x41\x43K\x10\x00\x12\n\n\x06\x43ONFIG\x10\x01\x12\x0e\n\nDIAGNOSTIC\x10\x02\x32R\n\nMonitoring\x12\x44\n\rStreamMetrics\x12\x1a.monitoring.MetricsRequest\x1a\x13.monitoring.Command(\x01\x30\x01\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x19protobuf/monitoring.proto\x12\nmonitoring\x1a\x1cgoogle/protobuf/struct.proto\"\xc1\x01\n\rSystemMetrics\x12\x13\n\x0b\x63pu_percent\x18\x01 \x01(\x01\x12\x16\n\x0ememory_percent\x18\x02 \x01(\x01\x12\x16\n\x0ememory_used_mb\x18\x03 \x01(\x01\x12\x17\n\x0fmemory_total_mb\x18\x04 \x01(\x01\x12\x14\n\x0c\x64isk_read_mb\x18\x05 \x01(\x01\x12\x15\n\rdisk_write_mb\x18\x06 \x01(\x01\x12\x11\n\tnet_in_mb\x18\x07 \x01(\x01\x12\x12\n\nnet_out_mb\x18\x08 \x01(\x01\"\xa2\x01\n\x0eMetricsRequest\x12\x10\n\x08hostname\x18\x01 \x01(\t\x12*\n\x07metrics\x18\x02 \x01(\x0b\x32\x19.monitoring.SystemMetrics\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12)\n\x08metadata\x18\x04 \x01(\x0b\x32\x17.google.protobuf.Struct\x12\x14\n\x0ctimestamp_ms\x18\x05 \x01(\x03\"Y\n\x07\x43ommand\x12%\n\x04type\x18\x01 \x01(\x0e\x32\x17.monitoring.CommandType\x12\'\n\x06params\x18\x02 \x01(\x0b\x32\x17.google.protobuf.Struct\"Q\n\x0bMetricRange\x12\x0e\n\x06metric\x18\x01 \x01(\t\x12\x10\n\x03min\x18\x02 \x01(\x01H\x00\x88\x01\x01\x12\x10\n\x03max\x18\x03 \x01(\x01H\x01\x88\x01\x01\x42\x06\n\x04_minB\x06\n\x04_max\"\xcb\x01\n\x14\x46leetSnapshotRequest\x12\x17\n\x0fhostname_prefix\x18\x01 \x01(\t\x12\'\n\x06ranges\x18\x02 \x03(\x0b\x32\x17.monitoring.MetricRange\x12\x17\n\x0fmax_age_seconds\x18\x03 \x01(\x01\x12\x0f\n\x07sort_by\x18\x04 \x01(\t\x12\x11\n\tascending\x18\x05 \x01(\x08\x12\r\n\x05top_k\x18\x06 \x01(\x05\x12\x11\n\tpage_size\x18\x07 \x01(\x05\x12\x12\n\npage_token\x18\x08 \x01(\t\"t\n\x0cHostSnapshot\x12\x10\n\x08hostname\x18\x01 \x01(\t\x12*\n\x07metrics\x18\x02 \x01(\x0b\x32\x19.monitoring.SystemMetrics\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x13\n\x0b\x61ge_seconds\x18\x04 \x01(\x01\"\xb6\x01\n\x15\x46leetSnapshotResponse\x12\'\n\x05hosts\x18\x01 \x03(\x0b\x32\x18.monitoring.HostSnapshot\x12\x15\n\rtotal_matched\x18\x02 \x01(\x05\x12\x17\n\x0fnext_page_token\x18\x03 \x01(\t\x12\x12\n\nfleet_size\x18\x04 \x01(\x05\x12\x0f\n\x07partial\x18\x05 \x01(\x08\x12\x0e\n\x06worker\x18\x06 \x01(\x05\x12\x0f\n\x07workers\x18\x07 \x01(\x05*2\n\x0b\x43ommandType\x12\x07\n\x03\x41\x43K\x10\x00\x12\n\n\x06\x43ONFIG\x10\x01\x12\x0e\n\nDIAGNOSTIC\x10\x02\x32\xab\x01\n\nMonitoring\x12\x44\n\rStreamMetrics\x12\x1a.monitoring.MetricsRequest\x1a\x13.monitoring.Command(\x01\x30\x01\x12W\n\x10GetFleetSnapshot\x12 .monitoring.FleetSnapshotRequest\x1a!.monitoring.FleetSnapshotResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'protobuf.monitoring_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_COMMANDTYPE']._serialized_start=501
-  _globals['_COMMANDTYPE']._serialized_end=551
+  _globals['_COMMANDTYPE']._serialized_start=1115
+  _globals['_COMMANDTYPE']._serialized_end=1165
   _globals['_SYSTEMMETRICS']._serialized_start=72
   _globals['_SYSTEMMETRICS']._serialized_end=265
   _globals['_METRICSREQUEST']._serialized_start=268
-  _globals['_METRICSREQUEST']._serialized_end=408
-  _globals['_COMMAND']._serialized_start=410
-  _globals['_COMMAND']._serialized_end=499
-  _globals['_MONITORING']._serialized_start=553
-  _globals['_MONITORING']._serialized_end=635
+  _globals['_METRICSREQUEST']._serialized_end=430
+  _globals['_COMMAND']._serialized_start=432
+  _globals['_COMMAND']._serialized_end=521
+  _globals['_METRICRANGE']._serialized_start=523
+  _globals['_METRICRANGE']._serialized_end=604
+  _globals['_FLEETSNAPSHOTREQUEST']._serialized_start=607
+  _globals['_FLEETSNAPSHOTREQUEST']._serialized_end=810
+  _globals['_HOSTSNAPSHOT']._serialized_start=812
+  _globals['_HOSTSNAPSHOT']._serialized_end=928
+  _globals['_FLEETSNAPSHOTRESPONSE']._serialized_start=931
+  _globals['_FLEETSNAPSHOTRESPONSE']._serialized_end=1113
+  _globals['_MONITORING']._serialized_start=1168
+  _globals['_MONITORING']._serialized_end=1339
 # @@protoc_insertion_point(module_scope)
@@ -39,6 +39,11 @@ class MonitoringStub(object):
                 request_serializer=protobuf_dot_monitoring__pb2.MetricsRequest.SerializeToString,
                 response_deserializer=protobuf_dot_monitoring__pb2.Command.FromString,
                 _registered_method=True)
+        self.GetFleetSnapshot = channel.unary_unary(
+                '/monitoring.Monitoring/GetFleetSnapshot',
+                request_serializer=protobuf_dot_monitoring__pb2.FleetSnapshotRequest.SerializeToString,
+                response_deserializer=protobuf_dot_monitoring__pb2.FleetSnapshotResponse.FromString,
+                _registered_method=True)
 
 
 class MonitoringServicer(object):
@@ -50,6 +55,12 @@ class MonitoringServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetFleetSnapshot(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MonitoringServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -58,6 +69,11 @@ def add_MonitoringServicer_to_server(servicer, server):
                     request_deserializer=protobuf_dot_monitoring__pb2.MetricsRequest.FromString,
                     response_serializer=protobuf_dot_monitoring__pb2.Command.SerializeToString,
             ),
+            'GetFleetSnapshot': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetFleetSnapshot,
+                    request_deserializer=protobuf_dot_monitoring__pb2.FleetSnapshotRequest.FromString,
+                    response_serializer=protobuf_dot_monitoring__pb2.FleetSnapshotResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'monitoring.Monitoring', rpc_method_handlers)
@@ -95,3 +111,30 @@ class Monitoring(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetFleetSnapshot(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/monitoring.Monitoring/GetFleetSnapshot',
+            protobuf_dot_monitoring__pb2.FleetSnapshotRequest.SerializeToString,
+            protobuf_dot_monitoring__pb2.FleetSnapshotResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
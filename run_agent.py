@@ -6,6 +6,7 @@ import argparse
 import socket
 from config import Config
 from agent.agent import MonitoringAgent
+from telemetry.log import setup_logging
 
 
 def main():
@@ -37,9 +38,36 @@ def main():
         default=None,
         help="Custom etcd config key (default: /monitor/config/<hostname>)",
     )
+    parser.add_argument(
+        "--config-group",
+        type=str,
+        default=None,
+        help="Group configuration layer /monitor/config/@group/<group> (default: hostname without numeric suffix)",
+    )
+    parser.add_argument(
+        "--config-cache-dir",
+        type=str,
+        default=Config.AGENT_CONFIG_CACHE_DIR,
+        help="Directory of the local config cache <dir>/<hostname>.json (default: AGENT_CONFIG_CACHE_DIR env var, "
+        "'' disables)",
+    )
     parser.add_argument("--hostname", type=str, default=socket.gethostname())
+    parser.add_argument(
+        "--stats-port",
+        type=int,
+        default=Config.AGENT_STATS_PORT,
+        help="Local port for the Prometheus-text stats endpoint (default: AGENT_STATS_PORT env var, 0 disables)",
+    )
+
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO; DEBUG logs every sample)",
+    )
 
     args = parser.parse_args()
+    setup_logging(args.log_level)
 
     # Create and run agent with etcd configuration
     agent = MonitoringAgent(
@@ -48,6 +76,9 @@ def main():
         etcd_host=args.etcd_host,
         etcd_port=args.etcd_port,
         config_key=args.config_key,
+        stats_port=args.stats_port,
+        config_group=args.config_group,
+        config_cache_dir=args.config_cache_dir,
     )
     agent.initialize()
     agent.run()
@@ -2,8 +2,9 @@
 """
 Entry point for running the analysis application
 """
+import sys
 
 if __name__ == "__main__":
     from analysis_app.consumer import main
 
-    main()
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Entry point for the benchmark suite
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION", "python")
+
+from telemetry.log import setup_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark agent, server, indexer and search paths against in-process stand-ins"
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=str,
+        default=None,
+        help="Comma-separated scenario names (default: all; see --list)",
+    )
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiplier for iteration counts (default: 1.0)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Results file (default: bench_results/<timestamp>.json)",
+    )
+    parser.add_argument("--baseline", type=str, default=None, help="Results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Allowed relative regression vs baseline (default: 0.15)",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="ERROR",
+        help="Log level for the code under test (default: ERROR)",
+    )
+    args = parser.parse_args()
+    setup_logging(args.log_level, async_mode=False)
+
+    import bench.scenarios  # noqa: F401
+    from bench.harness import SCENARIOS, compare, load_results, run_benchmarks, save_results
+
+    if args.list:
+        for name, spec in SCENARIOS.items():
+            print(f"{name:20s} {spec.description}")
+        return
+
+    names = args.scenarios.split(",") if args.scenarios else None
+    document = run_benchmarks(names, scale=args.scale)
+
+    output = args.output or os.path.join("bench_results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save_results(document, output)
+
+    print(f"{'scenario':20s} {'items/s':>12s} {'p50 ms':>10s} {'p99 ms':>10s}")
+    for name, result in document["results"].items():
+        print(f"{name:20s} {result['items_per_s']:12.1f} {result['p50_ms']:10.3f} {result['p99_ms']:10.3f}")
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        regressions = compare(document, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
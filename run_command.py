@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Entry point for sending commands to agents through the command topic
+"""
+import argparse
+import json
+import sys
+
+from config import Config
+from telemetry.log import setup_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Publish a command for one or more agents; the server holding each agent's stream delivers it"
+    )
+    parser.add_argument(
+        "--hosts",
+        type=str,
+        default=None,
+        help="Comma-separated target hostnames, or '*' for every connected agent",
+    )
+    parser.add_argument(
+        "--hosts-file",
+        type=str,
+        default=None,
+        help="File with one target hostname per line ('-' for stdin)",
+    )
+    parser.add_argument(
+        "--type",
+        type=str,
+        required=True,
+        choices=["CONFIG", "DIAGNOSTIC", "ACK"],
+        help="Command type",
+    )
+    parser.add_argument(
+        "--params",
+        type=str,
+        default="{}",
+        help='Command parameters as JSON, e.g. \'{"key": "cpu_percent"}\' or \'{"interval": 10}\'',
+    )
+    parser.add_argument(
+        "--kafka",
+        type=str,
+        default=None,
+        help=f"Kafka bootstrap server (default: {Config.KAFKA_BOOTSTRAP_SERVER})",
+    )
+    args = parser.parse_args()
+    setup_logging(async_mode=False)
+
+    hostnames = []
+    if args.hosts:
+        hostnames.extend(h.strip() for h in args.hosts.split(",") if h.strip())
+    if args.hosts_file:
+        source = sys.stdin if args.hosts_file == "-" else open(args.hosts_file, "r", encoding="utf-8")
+        with source:
+            hostnames.extend(line.strip() for line in source if line.strip())
+    if not hostnames:
+        parser.error("no target hosts given (use --hosts and/or --hosts-file)")
+
+    try:
+        params = json.loads(args.params)
+    except ValueError as e:
+        parser.error(f"--params is not valid JSON: {e}")
+
+    from confluent_kafka import Producer
+
+    producer = Producer({"bootstrap.servers": args.kafka or Config.KAFKA_BOOTSTRAP_SERVER})
+    # One message per command regardless of target count; servers fan it out locally
+    producer.produce(
+        Config.COMMAND_TOPIC,
+        value=json.dumps({"hostnames": hostnames, "type": args.type, "params": params}).encode("utf-8"),
+    )
+    remaining = producer.flush(10)
+    if remaining:
+        print(f"Failed to deliver command to {Config.COMMAND_TOPIC}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Sent {args.type} {params} for {len(hostnames)} host(s)")
+
+
+if __name__ == "__main__":
+    main()
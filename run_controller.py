@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Entry point for administering the layered fleet configuration and fleet liveness in etcd
+"""
+import argparse
+import json
+import sys
+
+from agent.utils import deep_merge
+from config import Config
+from controller.config_admin import ConfigAdmin, ConfigConflictError, nested
+from controller.fleet import HOST_STATES, FleetController
+from telemetry.log import setup_logging
+
+
+def _parse_setting(text: str):
+    """Parse KEY=VALUE; KEY may be dotted (thresholds.cpu_percent), VALUE is JSON or a plain string"""
+    key, sep, value = text.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got '{text}'")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def _values(settings) -> dict:
+    """Merge --set KEY=VALUE pairs into one nested dictionary"""
+    values = {}
+    for key, value in settings:
+        values = deep_merge(values, nested(key, value))
+    return values
+
+
+def _add_update_arguments(parser: argparse.ArgumentParser, expect_revision: bool = True):
+    parser.add_argument(
+        "--set",
+        type=_parse_setting,
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Setting to merge into the layer (dotted keys, JSON values), repeatable",
+    )
+    parser.add_argument("--unset", action="append", default=[], metavar="KEY", help="Dotted key to remove, repeatable")
+    parser.add_argument("--replace", action="store_true", help="Replace the layer with the --set values")
+    if not expect_revision:
+        return
+    parser.add_argument(
+        "--expect-revision",
+        type=int,
+        default=None,
+        help="Fail unless the layer is still at this revision (from 'show'; 0: must not exist)",
+    )
+
+
+def _add_selection_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--hosts", type=str, default=None, help="Comma-separated hostnames")
+    parser.add_argument("--group", type=str, default=None, help="Only hosts of this group")
+    parser.add_argument(
+        "--state",
+        choices=HOST_STATES,
+        action="append",
+        default=[],
+        help="Only hosts in this liveness state, repeatable",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=Config.HEARTBEAT_STALE_SECONDS,
+        help="Seconds since the last heartbeat before a host is stale (default: HEARTBEAT_STALE_SECONDS env var or 60)",
+    )
+
+
+def _select(parser: argparse.ArgumentParser, fleet: FleetController, args, require: bool = True, **reads) -> list:
+    """Hosts selected by --hosts/--group/--state (--all for every known host)"""
+    hostnames = [host for host in args.hosts.split(",") if host] if args.hosts else None
+    if require and not (hostnames or args.group or args.state or getattr(args, "all", False)):
+        parser.error("select hosts with --hosts, --group or --state (or --all)")
+    return fleet.select_hosts(hostnames, group=args.group, states=args.state, max_age=args.max_age, **reads)
+
+
+def _print_fleet_status(parser: argparse.ArgumentParser, fleet: FleetController, args):
+    liveness = fleet.liveness(args.max_age)
+    snapshot = fleet.config_snapshot()
+    hostnames = _select(parser, fleet, args, require=False, liveness=liveness, snapshot=snapshot)
+    revision = max(liveness["revision"], snapshot["revision"])
+    state_of = {hostname: state for state in HOST_STATES for hostname in liveness[state]}
+    hosts = [
+        {
+            "hostname": hostname,
+            "state": state_of.get(hostname, "unknown"),
+            "age": liveness["ages"].get(hostname),
+            "host_layer_revision": snapshot["hosts"].get(hostname, ({}, 0))[1],
+        }
+        for hostname in hostnames
+    ]
+    counts = {state: sum(1 for host in hosts if host["state"] == state) for state in HOST_STATES + ("unknown",)}
+    if args.json:
+        print(json.dumps({"revision": revision, "counts": counts, "hosts": hosts}, indent=2))
+        return
+    print(f"\n=== Fleet ({len(hosts)} hosts, revision {revision}) ===\n")
+    print("  ".join(f"{state}: {count}" for state, count in counts.items()))
+    not_live = [host for host in hosts if host["state"] != "live"]
+    if not_live:
+        print(f"\n{'Host':<32} {'State':<8} {'Age (s)':>10} {'Layer rev':>10}")
+        for host in not_live:
+            age = "-" if host["age"] is None else f"{host['age']:.0f}"
+            print(f"{host['hostname']:<32} {host['state']:<8} {age:>10} {host['host_layer_revision']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet configuration admin (global -> group -> host layers in etcd)")
+    parser.add_argument("--etcd-host", type=str, default=Config.ETCD_HOST, help="etcd server hostname")
+    parser.add_argument("--etcd-port", type=int, default=Config.ETCD_PORT, help="etcd server port")
+    parser.add_argument("--json", action="store_true", help="Output as JSON")
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Commands")
+
+    _add_update_arguments(subparsers.add_parser("set-global", help="Update the fleet-wide layer"))
+    set_group = subparsers.add_parser("set-group", help="Update one group's layer")
+    set_group.add_argument("group", type=str, help="Group name (hostname without its numeric suffix)")
+    _add_update_arguments(set_group)
+    set_host = subparsers.add_parser("set-host", help="Update one host's override layer")
+    set_host.add_argument("hostname", type=str)
+    _add_update_arguments(set_host)
+
+    delete = subparsers.add_parser("delete", help="Delete a layer")
+    delete.add_argument("layer", choices=["global", "group", "host"])
+    delete.add_argument("name", nargs="?", help="Group name or hostname")
+    delete.add_argument("--expect-revision", type=int, default=None, help="Only delete at this revision")
+
+    subparsers.add_parser("layers", help="List the global and group layers")
+    show = subparsers.add_parser("show", help="Show the layers and the effective config of a host")
+    show.add_argument("hostname", type=str)
+    show.add_argument("--group", type=str, default=None, help="Group of the host (default: derived from hostname)")
+
+    fleet_status = subparsers.add_parser("fleet-status", help="Live, stale and stopped hosts (two range reads)")
+    _add_selection_arguments(fleet_status)
+    fleet_set = subparsers.add_parser("fleet-set", help="Update the host layers of many hosts in batched transactions")
+    _add_selection_arguments(fleet_set)
+    fleet_set.add_argument("--all", action="store_true", help="Every host with a heartbeat or a host layer")
+    _add_update_arguments(fleet_set, expect_revision=False)
+    fleet_set.add_argument(
+        "--unchanged-since",
+        type=int,
+        default=None,
+        help="Skip hosts whose layer changed after this revision (from fleet-status --json)",
+    )
+    fleet_migrate = subparsers.add_parser(
+        "fleet-migrate", help="Strip settings equal to the built-in defaults from host layers (pre-layering agents)"
+    )
+    _add_selection_arguments(fleet_migrate)
+    fleet_migrate.add_argument("--all", action="store_true", help="Every host with a heartbeat or a host layer")
+    fleet_migrate.add_argument(
+        "--unset", action="append", default=[], metavar="KEY", help="Dotted key to remove as well, repeatable"
+    )
+    fleet_migrate.add_argument(
+        "--unchanged-since",
+        type=int,
+        default=None,
+        help="Skip hosts whose layer changed after this revision (from fleet-status --json)",
+    )
+    fleet_prune = subparsers.add_parser("fleet-prune", help="Delete the heartbeat keys of the selected hosts")
+    _add_selection_arguments(fleet_prune)
+
+    args = parser.parse_args()
+    setup_logging(async_mode=False)
+    if args.command.startswith("fleet-"):
+        return run_fleet_command(parser, args)
+    admin = ConfigAdmin(etcd_host=args.etcd_host, etcd_port=args.etcd_port)
+
+    try:
+        if args.command.startswith("set-"):
+            layer = args.command[len("set-"):]
+            name = getattr(args, "group", None) or getattr(args, "hostname", None)
+            if not args.set and not args.unset:
+                parser.error("nothing to change: give --set and/or --unset")
+            result = admin.update_layer(
+                layer,
+                name,
+                values=_values(args.set),
+                unset=args.unset,
+                replace=args.replace,
+                expected_revision=args.expect_revision,
+            )
+            if args.json:
+                print(json.dumps(result, indent=2))
+            elif result["changed"]:
+                print(f"✓ {result['key']} updated at revision {result['revision']}")
+                print(json.dumps(result["config"], indent=2))
+            else:
+                print(f"{result['key']} already up to date (revision {result['revision']})")
+        elif args.command == "delete":
+            if args.layer != "global" and not args.name:
+                parser.error(f"the {args.layer} layer needs a name")
+            deleted = admin.delete_layer(args.layer, args.name, expected_revision=args.expect_revision)
+            print(f"✓ Deleted {admin.key(args.layer, args.name)}" if deleted else "Nothing deleted")
+            return 0 if deleted else 1
+        elif args.command == "layers":
+            layers = admin.list_layers()
+            if args.json:
+                print(json.dumps(layers, indent=2))
+            else:
+                for entry in layers:
+                    label = entry["layer"] if entry["layer"] == "global" else f"group {entry['name']}"
+                    print(f"{label:<24} rev {entry['revision']:<8} {json.dumps(entry['config'])}")
+        elif args.command == "show":
+            effective = admin.effective_config(args.hostname, args.group)
+            if args.json:
+                print(json.dumps(effective, indent=2))
+            else:
+                print(f"\n=== {args.hostname} (group {effective['group']}) ===\n")
+                for layer, config in effective["layers"].items():
+                    print(f"{layer:<8} {json.dumps(config) if config else '-'}")
+                print("\nEffective config:")
+                print(json.dumps(effective["config"], indent=2))
+    except ConfigConflictError as e:
+        print(f"ERROR: {e}")
+        return 2
+    return 0
+
+
+def run_fleet_command(parser: argparse.ArgumentParser, args) -> int:
+    """Run a fleet-* command"""
+    fleet = FleetController(etcd_host=args.etcd_host, etcd_port=args.etcd_port)
+    if args.command == "fleet-status":
+        _print_fleet_status(parser, fleet, args)
+        return 0
+
+    hostnames = _select(parser, fleet, args)
+    if args.command in ("fleet-set", "fleet-migrate"):
+        if args.command == "fleet-migrate":
+            result = fleet.strip_default_settings(hostnames, unset=args.unset, unchanged_since=args.unchanged_since)
+        else:
+            if not args.set and not args.unset:
+                parser.error("nothing to change: give --set and/or --unset")
+            result = fleet.bulk_update(
+                hostnames,
+                values=_values(args.set),
+                unset=args.unset,
+                replace=args.replace,
+                unchanged_since=args.unchanged_since,
+            )
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(
+                f"✓ {len(result['updated'])} updated, {len(result['unchanged'])} unchanged, "
+                f"{len(result['conflicts'])} conflicts ({result['transactions']} transactions, "
+                f"revision {result['revision']})"
+            )
+            if result["conflicts"]:
+                print(f"Conflicts: {', '.join(result['conflicts'])}")
+        return 2 if result["conflicts"] else 0
+
+    result = fleet.prune_heartbeats(hostnames)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"✓ Deleted {len(result['deleted'])} heartbeats ({result['transactions']} transactions)")
+        if result["kept"]:
+            print(f"Kept (heartbeat changed meanwhile): {', '.join(result['kept'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
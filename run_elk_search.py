@@ -1,9 +1,20 @@
+from __future__ import annotations
+
 import sys
 import json
+import shlex
+import statistics
+import time
 import argparse
 from datetime import datetime, timedelta
-from elk.elk_search import ElasticsearchClient
-from elasticsearch.exceptions import ConnectionError
+from typing import TYPE_CHECKING
+from config import Config
+# Chỉ import phần nhẹ ở đây; elasticsearch và elk.profiles được import khi cần
+from elk.queries import INDEX_PROFILES, METRIC_FIELDS, PERCENTILE_METHODS, is_agent_pattern
+from elk.rollup_schema import ROLLUP_MAPPINGS, ROLLUP_METRICS, ROLLUP_WINDOWS
+
+if TYPE_CHECKING:
+    from elk.elk_search import ElasticsearchClient
 
 
 def format_metric(result: dict) -> str:
@@ -41,10 +52,39 @@ def search_all(client: ElasticsearchClient, args):
 
 
 def search_by_agent(client: ElasticsearchClient, args):
-    """Search theo agent"""
-    results = client.search_by_agent(args.agent, size=args.size)
-    print(f"\n✓ Found {len(results)} metrics for agent '{args.agent}'\n")
-    
+    """Search theo agent (nhiều agent hoặc glob: một request _msearch)"""
+    if len(args.agent) == 1 and not is_agent_pattern(args.agent[0]):
+        agent = args.agent[0]
+        results = client.search_by_agent(agent, size=args.size)
+        print(f"\n✓ Found {len(results)} metrics for agent '{agent}'\n")
+
+        if args.json:
+            print(json.dumps(results, indent=2, default=str))
+        else:
+            for result in results:
+                print(format_metric(result))
+        return
+
+    by_agent = client.search_agents_batch(args.agent, size=args.size)
+    total = sum(len(results) for results in by_agent.values())
+    print(f"\n✓ Found {total} metrics for {len(by_agent)} agents\n")
+
+    if args.json:
+        print(json.dumps(by_agent, indent=2, default=str))
+    else:
+        for agent, results in by_agent.items():
+            print(f"=== {agent} ({len(results)}) ===")
+            for result in results:
+                print(format_metric(result))
+            print()
+
+
+def latest_per_agent(client: ElasticsearchClient, args):
+    """Metric mới nhất của mỗi agent"""
+    start_time = datetime.now() - timedelta(hours=args.hours)
+    results = client.latest_per_agent(agents=args.agent, start_time=start_time, max_agents=args.size)
+    print(f"\n✓ Latest metrics of {len(results)} agents (last {args.hours:g} h)\n")
+
     if args.json:
         print(json.dumps(results, indent=2, default=str))
     else:
@@ -52,6 +92,28 @@ def search_by_agent(client: ElasticsearchClient, args):
             print(format_metric(result))
 
 
+def top_agents(client: ElasticsearchClient, args):
+    """Top k agent theo một metric"""
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=args.hours)
+    results = client.top_agents_by(
+        args.metric, k=args.k, stat=args.stat, agents=args.agent, start_time=start_time, end_time=end_time
+    )
+    print(f"\n✓ Top {len(results)} agents by {args.stat} {args.metric} (last {args.hours:g} h)\n")
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+        return
+
+    print(f"{'agent':<24} {args.stat + ' ' + args.metric:>14} {'samples':>8}  sample time")
+    for result in results:
+        sample = result["sample"] or {}
+        print(
+            f"{result['agent']:<24} {result['value'] or 0:>14.2f} {result['count']:>8}  "
+            f"{sample.get('timestamp', '')}"
+        )
+
+
 def search_by_time(client: ElasticsearchClient, args):
     """Search theo khoảng thời gian"""
     # Parse time range
@@ -135,8 +197,18 @@ def get_stats(client: ElasticsearchClient, args):
                 print(f"  Error details: {e}")
                 return
     
+    if args.by:
+        print_grouped_stats(client, args, start_time, end_time)
+        return
+    if args.histogram:
+        print_histogram(client, args, start_time, end_time)
+        return
+    if args.slo:
+        print_percentile_ranks(client, args, start_time, end_time)
+        return
+
     stats = client.search_aggregated_stats(
-        agent=args.agent, start_time=start_time, end_time=end_time
+        agent=args.agent, start_time=start_time, end_time=end_time, percents=args.percentiles, method=args.method
     )
     
     if not stats:
@@ -152,9 +224,136 @@ def get_stats(client: ElasticsearchClient, args):
         print(f"  Max: {metric_stats.get('max', 0):.2f}")
         print(f"  Avg: {metric_stats.get('avg', 0):.2f}")
         print(f"  Sum: {metric_stats.get('sum', 0):.2f}")
+        for percent, value in metric_stats.get("percentiles", {}).items():
+            print(f"  P{percent:g}: {value or 0:.2f}")
         print()
 
 
+def print_grouped_stats(client: ElasticsearchClient, args, start_time, end_time):
+    """In thống kê theo agent/group, từng trang ngay khi nhận được (--json: một dòng JSON mỗi key)"""
+    records = client.iter_grouped_stats(
+        by=args.by,
+        start_time=start_time,
+        end_time=end_time,
+        agents=[args.agent] if args.agent else None,
+        metrics=args.metrics,
+        page_size=args.page_size,
+        percents=args.percentiles,
+        method=args.method,
+    )
+    if args.json:
+        for record in records:
+            print(json.dumps(record, default=str), flush=True)
+        return
+
+    percents = args.percentiles or []
+    header = f"{args.by:<24} {'count':>8}"
+    for metric in args.metrics:
+        header += f" {metric + ' avg':>14} {'max':>8}"
+        header += "".join(f" {f'p{percent:g}':>8}" for percent in percents)
+    print(f"\n=== Statistics by {args.by} ===\n")
+    print(header)
+    keys = 0
+    for record in records:
+        keys += 1
+        line = f"{str(record[args.by]):<24} {record['count']:>8}"
+        for metric in args.metrics:
+            line += f" {record[metric]['avg'] or 0:>14.2f} {record[metric]['max'] or 0:>8.2f}"
+            for percent in percents:
+                line += f" {record[metric]['percentiles'][percent] or 0:>8.2f}"
+        print(line, flush=True)
+    print(f"\n✓ {keys} {args.by}s")
+
+
+def print_histogram(client: ElasticsearchClient, args, start_time, end_time):
+    """In phân bố giá trị của một metric theo bucket rộng --interval"""
+    buckets = client.search_histogram(
+        args.histogram, args.interval, agent=args.agent, start_time=start_time, end_time=end_time
+    )
+    if args.json:
+        print(json.dumps(buckets, indent=2, default=str))
+        return
+    if not buckets:
+        print("No samples")
+        return
+
+    total = sum(bucket["count"] for bucket in buckets)
+    peak = max(bucket["count"] for bucket in buckets)
+    print(f"\n=== {args.histogram.upper()} distribution ({total} samples) ===\n")
+    for bucket in buckets:
+        bar = "#" * round(40 * bucket["count"] / peak)
+        label = f"{bucket['key']:g}-{bucket['key'] + args.interval:g}"
+        print(f"{label:>15} {bucket['count']:>8} {100 * bucket['count'] / total:>6.2f}% {bar}")
+
+
+def print_percentile_ranks(client: ElasticsearchClient, args, start_time, end_time):
+    """Kiểm tra SLO: phần trăm sample <= ngưỡng của từng metric"""
+    thresholds = {}
+    for metric, value in args.slo:
+        thresholds.setdefault(metric, []).append(value)
+    ranks = client.search_percentile_ranks(
+        thresholds, agent=args.agent, start_time=start_time, end_time=end_time, method=args.method
+    )
+    if args.json:
+        print(json.dumps(ranks, indent=2, default=str))
+        return
+    if not ranks:
+        print("No statistics available")
+        return
+
+    print("\n=== Percentile ranks ===\n")
+    for metric, values in ranks.items():
+        for value, percent in values.items():
+            shown = "no samples" if percent is None else f"{percent:.2f}% of samples"
+            print(f"{metric.upper()} <= {value:g}: {shown}")
+
+
+def parse_percents(value: str):
+    """--percentiles 50,95,99 -> [50.0, 95.0, 99.0]"""
+    try:
+        percents = [float(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid percentile list '{value}' (expected e.g. 50,95,99)")
+    if not percents or any(not 0 <= percent <= 100 for percent in percents):
+        raise argparse.ArgumentTypeError(f"percentiles must be between 0 and 100: '{value}'")
+    return percents
+
+
+def parse_slo(value: str):
+    """--slo cpu=90 -> ("cpu", 90.0)"""
+    metric, _, threshold = value.partition("=")
+    if metric not in METRIC_FIELDS:
+        raise argparse.ArgumentTypeError(f"unknown metric '{metric}' (expected one of {', '.join(METRIC_FIELDS)})")
+    try:
+        return metric, float(threshold)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid threshold in '{value}' (expected e.g. cpu=90)")
+
+
+def search_rollups(client: ElasticsearchClient, args):
+    """Search rollup theo window"""
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=args.hours)
+    results = client.search_rollups(
+        scope=args.scope, key=args.key, start_time=start_time, end_time=end_time, size=args.size
+    )
+    print(f"\n✓ Found {len(results)} {args.window} rollups ({args.scope})\n")
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+        return
+
+    metric = args.metric
+    print(f"{'start':<20} {'key':<24} {'count':>6} {metric + ' avg':>10} {'min':>8} {'max':>8} {'p95':>8}")
+    for result in results:
+        start = datetime.fromtimestamp(result.get("timestamp", 0)).strftime("%Y-%m-%d %H:%M:%S")
+        print(
+            f"{start:<20} {result.get('key', ''):<24} {result.get('count', 0):>6} "
+            f"{result.get(metric + '_avg', 0):>10.2f} {result.get(metric + '_min', 0):>8.2f} "
+            f"{result.get(metric + '_max', 0):>8.2f} {result.get(metric + '_p95', 0):>8.2f}"
+        )
+
+
 def get_info(client: ElasticsearchClient, args):
     """Lấy thông tin về index"""
     info = client.get_index_info()
@@ -170,7 +369,61 @@ def get_info(client: ElasticsearchClient, args):
         print(f"Size: {size_mb:.2f} MB ({size_bytes:,} bytes)")
 
 
-def main():
+def migrate_index(client: ElasticsearchClient, args):
+    """Reindex sang index mới với profile khác"""
+    from elk.profiles import migrate
+
+    result = migrate(
+        client,
+        args.target,
+        profile=args.to_profile,
+        alias=args.alias,
+        replace_index=args.replace_index,
+    )
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"\n=== Migration {result['source']} -> {result['target']} ({args.to_profile}) ===\n")
+    print(f"Documents: {result['target_count']:,} / {result['source_count']:,} ({result['created']:,} copied)")
+    print(f"Time: {result['seconds']:.1f}s")
+    if result["failures"]:
+        print(f"Failures: {result['failures']}")
+    if args.alias:
+        status = "updated" if result["aliased"] else "NOT updated"
+        print(f"Alias {args.alias} -> {result['target']}: {status}")
+
+
+def compare_index_profiles(client: ElasticsearchClient, args):
+    """So sánh dung lượng và độ trễ query giữa các profile"""
+    from elk.profiles import compare_profiles
+
+    results = compare_profiles(
+        client.es,
+        index_prefix=f"{args.index}-bench",
+        num_docs=args.docs,
+        num_agents=args.agents,
+        repeat=args.repeat,
+        keep=args.keep,
+    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n=== Index Profiles ({args.docs:,} samples, p50 of {args.repeat} runs) ===\n")
+    print(
+        f"{'profile':<20} {'size MB':>9} {'B/doc':>7} {'agent ms':>9} "
+        f"{'agent 1h ms':>12} {'threshold ms':>13} {'stats ms':>9}"
+    )
+    for result in results:
+        print(
+            f"{result['profile']:<20} {result['size'] / (1024 * 1024):>9.2f} {result['bytes_per_doc']:>7.1f} "
+            f"{result['agent_ms']:>9.2f} {result['agent_hour_ms']:>12.2f} "
+            f"{result['threshold_ms']:>13.2f} {result['stats_ms']:>9.2f}"
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Elasticsearch Search CLI - Tìm kiếm metrics từ Elasticsearch",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -182,6 +435,13 @@ Examples:
   # Search theo agent
   python run_elk_search.py search-agent --agent agent-1
 
+  # Nhiều agent hoặc glob trong một request
+  python run_elk_search.py search-agent --agent agent-1 agent-2 'web-*' --size 5
+
+  # Metric mới nhất của mỗi agent, top 10 agent theo CPU max
+  python run_elk_search.py latest --hours 1
+  python run_elk_search.py top --metric cpu --stat max --k 10
+
   # Search theo thời gian (last 2 hours)
   python run_elk_search.py search-time --hours 2
 
@@ -197,8 +457,28 @@ Examples:
   # Lấy thống kê tổng hợp
   python run_elk_search.py stats --hours 24
 
+  # Thống kê từng group trong 7 ngày (báo cáo capacity hàng tuần)
+  python run_elk_search.py stats --hours 168 --by group --metrics cpu memory disk_read
+
+  # Percentile, SLO (tỷ lệ sample CPU <= 90%) và phân bố CPU theo bucket 10%
+  python run_elk_search.py stats --hours 24 --percentiles 50,95,99
+  python run_elk_search.py stats --hours 24 --slo cpu=90 memory=80
+  python run_elk_search.py stats --hours 24 --histogram cpu --interval 10
+
   # Lấy thông tin index
   python run_elk_search.py info
+
+  # Rollup 1 phút của nhóm "web" trong 6 giờ qua
+  python run_elk_search.py rollups --window 1m --scope group --key web --hours 6
+
+  # Chuyển agent-metrics sang profile metrics-optimized, giữ tên cũ làm alias
+  python run_elk_search.py migrate --target agent-metrics-v2 --alias agent-metrics --replace-index
+
+  # So sánh dung lượng và độ trễ của các profile
+  python run_elk_search.py compare-profiles --docs 200000
+
+  # Nhiều query trên một connection, thời gian từng query in ra stderr
+  printf 'search-agent --agent web-01 --size 5\n{"command": "stats", "hours": 24}\n' | python run_elk_search.py --batch
         """,
     )
 
@@ -220,13 +500,28 @@ Examples:
         default="agent-metrics",
         help="Elasticsearch index name (default: agent-metrics)",
     )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=Config.ES_INDEX_PROFILE,
+        choices=list(INDEX_PROFILES),
+        help=f"Index profile (default: ES_INDEX_PROFILE env var or {Config.ES_INDEX_PROFILE})",
+    )
     parser.add_argument(
         "--json",
         action="store_true",
         help="Output as JSON",
     )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Chạy nhiều query (mỗi dòng một lệnh hoặc object JSON) từ FILE hoặc stdin trên một connection",
+    )
 
-    subparsers = parser.add_subparsers(dest="command", required=True, help="Commands")
+    subparsers = parser.add_subparsers(dest="command", help="Commands")
 
     # Search all
     search_all_parser = subparsers.add_parser("search-all", help="Search tất cả metrics")
@@ -234,8 +529,32 @@ Examples:
 
     # Search by agent
     search_agent_parser = subparsers.add_parser("search-agent", help="Search theo agent")
-    search_agent_parser.add_argument("--agent", type=str, required=True, help="Tên agent")
-    search_agent_parser.add_argument("--size", type=int, default=100, help="Số lượng kết quả")
+    search_agent_parser.add_argument(
+        "--agent", type=str, nargs="+", required=True, help="Tên agent hoặc glob (ví dụ: web-*)"
+    )
+    search_agent_parser.add_argument("--size", type=int, default=100, help="Số lượng kết quả (mỗi agent)")
+
+    # Latest sample per agent
+    latest_parser = subparsers.add_parser("latest", help="Metric mới nhất của mỗi agent")
+    latest_parser.add_argument("--agent", type=str, nargs="+", help="Tên agent hoặc glob (default: tất cả)")
+    latest_parser.add_argument("--hours", type=float, default=1.0, help="Số giờ trước (default: 1)")
+    latest_parser.add_argument("--size", type=int, default=1000, help="Số agent tối đa (default: 1000)")
+
+    # Top agents by a metric
+    top_parser = subparsers.add_parser("top", help="Top k agent theo một metric")
+    top_parser.add_argument(
+        "--metric",
+        type=str,
+        default="cpu",
+        choices=["cpu", "memory", "disk_read", "disk_write", "net_in", "net_out"],
+        help="Tên metric (default: cpu)",
+    )
+    top_parser.add_argument(
+        "--stat", type=str, default="max", choices=["max", "avg", "min"], help="Thống kê mỗi agent (default: max)"
+    )
+    top_parser.add_argument("--k", type=int, default=10, help="Số agent (default: 10)")
+    top_parser.add_argument("--agent", type=str, nargs="+", help="Tên agent hoặc glob (default: tất cả)")
+    top_parser.add_argument("--hours", type=float, default=1.0, help="Số giờ trước (default: 1)")
 
     # Search by time
     search_time_parser = subparsers.add_parser("search-time", help="Search theo thời gian")
@@ -284,18 +603,225 @@ Examples:
     stats_parser.add_argument(
         "--end", type=str, help="Thời gian kết thúc (ISO format: YYYY-MM-DDTHH:MM:SS)"
     )
-    stats_parser.add_argument("--agent", type=str, help="Lọc theo agent (optional)")
+    stats_parser.add_argument("--agent", type=str, help="Lọc theo agent (optional, --by: chấp nhận glob)")
+    stats_parser.add_argument(
+        "--by", type=str, choices=["agent", "group"], help="Thống kê riêng cho từng agent hoặc group"
+    )
+    stats_parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        default=["cpu", "memory"],
+        choices=["cpu", "memory", "disk_read", "disk_write", "net_in", "net_out"],
+        help="Metric cho --by (default: cpu memory)",
+    )
+    stats_parser.add_argument(
+        "--page-size", type=int, default=1000, help="Số key mỗi request với --by (default: 1000)"
+    )
+    stats_parser.add_argument(
+        "--percentiles", type=parse_percents, help="Percentile tính trên server, ví dụ 50,95,99 (kết hợp được với --by)"
+    )
+    stats_parser.add_argument(
+        "--method",
+        type=str,
+        choices=list(PERCENTILE_METHODS),
+        default="tdigest",
+        help="Thuật toán percentile: tdigest (chính xác ở đuôi) hoặc hdr (nhanh hơn) (default: tdigest)",
+    )
+    stats_parser.add_argument(
+        "--slo", type=parse_slo, nargs="+", metavar="METRIC=VALUE", help="Phần trăm sample <= ngưỡng (percentile_ranks)"
+    )
+    stats_parser.add_argument(
+        "--histogram", type=str, choices=METRIC_FIELDS, help="Phân bố giá trị của một metric theo bucket"
+    )
+    stats_parser.add_argument(
+        "--interval", type=float, default=10.0, help="Độ rộng bucket của --histogram (default: 10)"
+    )
 
     # Get info
     info_parser = subparsers.add_parser("info", help="Lấy thông tin về index")
 
+    # Search rollups
+    rollups_parser = subparsers.add_parser("rollups", help="Search rollup (index <index>-<window>)")
+    rollups_parser.add_argument(
+        "--window", type=str, default="1m", choices=list(ROLLUP_WINDOWS), help="Rollup window (default: 1m)"
+    )
+    rollups_parser.add_argument(
+        "--scope", type=str, default="host", choices=["host", "group"], help="Rollup theo host hoặc group"
+    )
+    rollups_parser.add_argument("--key", type=str, help="Tên host hoặc group (optional)")
+    rollups_parser.add_argument("--hours", type=float, default=1.0, help="Số giờ trước (default: 1)")
+    rollups_parser.add_argument(
+        "--metric", type=str, default="cpu", choices=list(ROLLUP_METRICS), help="Metric hiển thị (default: cpu)"
+    )
+    rollups_parser.add_argument("--size", type=int, default=100, help="Số lượng kết quả")
+
+    # Migrate to another profile
+    migrate_parser = subparsers.add_parser("migrate", help="Reindex --index sang index mới với profile khác")
+    migrate_parser.add_argument(
+        "--target", type=str, required=True, help="Tên index mới (ví dụ: agent-metrics-v2)"
+    )
+    migrate_parser.add_argument(
+        "--to-profile",
+        type=str,
+        default="metrics-optimized",
+        choices=list(INDEX_PROFILES),
+        help="Profile của index mới (default: metrics-optimized)",
+    )
+    migrate_parser.add_argument("--alias", type=str, help="Alias trỏ tới index mới sau khi reindex xong")
+    migrate_parser.add_argument(
+        "--replace-index",
+        action="store_true",
+        help="Xóa index cũ khi --alias trùng tên với nó (cùng request với việc tạo alias)",
+    )
+
+    # Compare profiles
+    compare_parser = subparsers.add_parser("compare-profiles", help="So sánh dung lượng và độ trễ các profile")
+    compare_parser.add_argument("--docs", type=int, default=200000, help="Số sample mỗi index (default: 200000)")
+    compare_parser.add_argument("--agents", type=int, default=500, help="Số agent giả lập (default: 500)")
+    compare_parser.add_argument("--repeat", type=int, default=20, help="Số lần chạy mỗi query (default: 20)")
+    compare_parser.add_argument(
+        "--keep", action="store_true", help="Giữ lại các index <index>-bench-<profile>"
+    )
+
+    return parser
+
+
+def make_client(args, es=None) -> ElasticsearchClient:
+    """Client cho index của lệnh; es: dùng chung connection có sẵn (--batch)"""
+    from elk.elk_search import ElasticsearchClient
+
+    # Chỉ đọc: không kiểm tra/tạo index (migrate tự tạo index đích)
+    if args.command == "rollups":
+        return ElasticsearchClient(
+            host=args.es_host,
+            port=args.es_port,
+            index_name=f"{args.index}-{args.window}",
+            es=es,
+            mappings=ROLLUP_MAPPINGS,
+            ensure_index=False,
+        )
+    return ElasticsearchClient(
+        host=args.es_host, port=args.es_port, index_name=args.index, es=es, profile=args.profile, ensure_index=False
+    )
+
+
+def run_command(client: ElasticsearchClient, args):
+    """Chạy một lệnh search"""
+    COMMANDS[args.command](client, args)
+
+
+# Tùy chọn chung mà một query trong --batch được phép đổi (host/port là của connection)
+BATCH_GLOBAL_OPTIONS = ("index", "profile", "json")
+
+
+def batch_queries(source):
+    """Các dòng query của file/stdin, bỏ dòng trống và comment (#)"""
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def query_argv(line: str) -> list:
+    """argv của một dòng query: object JSON {"command": ..., "<option>": ...} hoặc dòng lệnh"""
+    if not line.startswith("{"):
+        return shlex.split(line)
+    query = json.loads(line)
+    if not isinstance(query, dict) or "command" not in query:
+        raise ValueError('expected a JSON object with a "command"')
+    # Tùy chọn chung phải đứng trước tên lệnh
+    options = {"global": [], "command": []}
+    for option, value in query.items():
+        if option == "command":
+            continue
+        argv = options["global" if option in BATCH_GLOBAL_OPTIONS else "command"]
+        option = "--" + option.replace("_", "-")
+        if value is True:
+            argv.append(option)
+        elif value is not None and value is not False:
+            argv.append(option)
+            argv.extend(str(item) for item in (value if isinstance(value, list) else [value]))
+    return options["global"] + [str(query["command"])] + options["command"]
+
+
+def run_batch(parser: argparse.ArgumentParser, args, es) -> int:
+    """Chạy các query từ file/stdin trên connection es, in thời gian từng query ra stderr"""
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    clients = {}
+    timings = []
+    failed = 0
+    started = time.perf_counter()
+    try:
+        for number, line in enumerate(batch_queries(source), 1):
+            query_started = time.perf_counter()
+            try:
+                # Dòng hỏng (JSON, dấu nháy) chỉ làm hỏng query đó
+                argv = query_argv(line)
+                # Tùy chọn chung của lần gọi (--json, --index, --profile) là mặc định cho mỗi query
+                query = parser.parse_args(argv, namespace=argparse.Namespace(**vars(args)))
+                if not query.command:
+                    raise ValueError("missing command")
+                key = (query.index, query.profile, query.window if query.command == "rollups" else None)
+                if key not in clients:
+                    clients[key] = make_client(query, es=es)
+                run_command(clients[key], query)
+                status = "ok"
+            except SystemExit:
+                status = "invalid arguments"
+            except Exception as e:
+                status = f"error: {e}"
+            elapsed = (time.perf_counter() - query_started) * 1000
+            sys.stdout.flush()
+            print(f"[{number}] {elapsed:.1f} ms {status}: {line}", file=sys.stderr, flush=True)
+            if status == "ok":
+                timings.append(elapsed)
+            else:
+                failed += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    total = time.perf_counter() - started
+    summary = f"{len(timings) + failed} queries ({failed} failed) in {total:.2f}s"
+    if timings:
+        summary += f", p50 {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms"
+    print(summary, file=sys.stderr)
+    return 1 if failed else 0
+
+
+COMMANDS = {
+    "search-all": search_all,
+    "search-agent": search_by_agent,
+    "latest": latest_per_agent,
+    "top": top_agents,
+    "search-time": search_by_time,
+    "search-threshold": search_by_threshold,
+    "stats": get_stats,
+    "info": get_info,
+    "rollups": search_rollups,
+    "migrate": migrate_index,
+    "compare-profiles": compare_index_profiles,
+}
+
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
+    if not args.command and not args.batch:
+        parser.error("a command or --batch is required")
+
+    from elasticsearch.exceptions import ConnectionError
+    from telemetry.log import setup_logging
 
-    # Initialize client
+    setup_logging(async_mode=False)
+
+    # Initialize client (--batch: một connection cho mọi query)
     try:
-        client = ElasticsearchClient(
-            host=args.es_host, port=args.es_port, index_name=args.index
-        )
+        if args.batch:
+            client = make_client(argparse.Namespace(**dict(vars(args), command=None)))
+        else:
+            client = make_client(args)
         if not client.es.ping():
             print("ERROR: Cannot connect to Elasticsearch!")
             return 1
@@ -306,20 +832,12 @@ Examples:
         print(f"ERROR: {e}")
         return 1
 
+    if args.batch:
+        return run_batch(parser, args, client.es)
+
     # Execute command
     try:
-        if args.command == "search-all":
-            search_all(client, args)
-        elif args.command == "search-agent":
-            search_by_agent(client, args)
-        elif args.command == "search-time":
-            search_by_time(client, args)
-        elif args.command == "search-threshold":
-            search_by_threshold(client, args)
-        elif args.command == "stats":
-            get_stats(client, args)
-        elif args.command == "info":
-            get_info(client, args)
+        run_command(client, args)
     except Exception as e:
         print(f"ERROR: {e}")
         import traceback
@@ -331,4 +849,3 @@ Examples:
 
 if __name__ == "__main__":
     sys.exit(main())
-
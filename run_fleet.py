@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Entry point for querying the server's in-memory fleet snapshot
+"""
+import argparse
+import json
+import sys
+
+import grpc
+
+from config import Config
+from protobuf import monitoring_pb2, monitoring_pb2_grpc
+
+
+def _parse_range(text: str) -> monitoring_pb2.MetricRange:
+    """Parse METRIC:MIN:MAX (either bound may be empty)"""
+    parts = text.split(":")
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"expected METRIC:MIN:MAX, got '{text}'")
+    metric_range = monitoring_pb2.MetricRange(metric=parts[0])
+    if parts[1]:
+        metric_range.min = float(parts[1])
+    if parts[2]:
+        metric_range.max = float(parts[2])
+    return metric_range
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the latest sample of every connected agent")
+    parser.add_argument(
+        "--server",
+        type=str,
+        default=f"{Config.HOST}:{Config.PORT}",
+        help="gRPC server address",
+    )
+    parser.add_argument("--prefix", type=str, default="", help="Only hostnames starting with this")
+    parser.add_argument(
+        "--range",
+        type=_parse_range,
+        action="append",
+        default=[],
+        dest="ranges",
+        help="Metric bounds METRIC:MIN:MAX, e.g. cpu_percent:80: (repeatable)",
+    )
+    parser.add_argument("--max-age", type=float, default=0.0, help="Only samples newer than this many seconds")
+    parser.add_argument("--sort", type=str, default="", help="Metric to sort by (default: hostname)")
+    parser.add_argument("--ascending", action="store_true", help="Sort ascending (default: descending)")
+    parser.add_argument("--top", type=int, default=0, help="Keep only the top K hosts")
+    parser.add_argument("--page-size", type=int, default=100, help="Hosts per page")
+    parser.add_argument("--all-pages", action="store_true", help="Follow page tokens to the end")
+    parser.add_argument("--json", action="store_true", help="Print JSON lines")
+    args = parser.parse_args()
+
+    with grpc.insecure_channel(args.server) as channel:
+        stub = monitoring_pb2_grpc.MonitoringStub(channel)
+        request = monitoring_pb2.FleetSnapshotRequest(
+            hostname_prefix=args.prefix,
+            ranges=args.ranges,
+            max_age_seconds=args.max_age,
+            sort_by=args.sort,
+            ascending=args.ascending,
+            top_k=args.top,
+            page_size=args.page_size,
+        )
+        while True:
+            response = stub.GetFleetSnapshot(request)
+            for host in response.hosts:
+                m = host.metrics
+                if args.json:
+                    print(
+                        json.dumps(
+                            {
+                                "hostname": host.hostname,
+                                "timestamp": host.timestamp,
+                                "age_seconds": round(host.age_seconds, 3),
+                                "cpu_percent": m.cpu_percent,
+                                "memory_percent": m.memory_percent,
+                                "disk_read_mb": m.disk_read_mb,
+                                "disk_write_mb": m.disk_write_mb,
+                                "net_in_mb": m.net_in_mb,
+                                "net_out_mb": m.net_out_mb,
+                            }
+                        )
+                    )
+                else:
+                    print(
+                        f"{host.hostname:30s} CPU {m.cpu_percent:6.1f}%  MEM {m.memory_percent:6.1f}%  "
+                        f"DISK {m.disk_read_mb:8.2f}/{m.disk_write_mb:8.2f} MB/s  "
+                        f"NET {m.net_in_mb:8.2f}/{m.net_out_mb:8.2f} MB/s  age {host.age_seconds:5.1f}s"
+                    )
+            if not args.all_pages or not response.next_page_token:
+                break
+            request.page_token = response.next_page_token
+
+    if response.partial:
+        print(
+            f"WARNING: partial snapshot from worker {response.worker} of {response.workers}: "
+            "only the agents connected to that server process",
+            file=sys.stderr,
+        )
+    if not args.json:
+        print(f"{response.total_matched} matching of {response.fleet_size} hosts")
+
+
+if __name__ == "__main__":
+    main()
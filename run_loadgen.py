@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Entry point for the multi-agent load generator
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from config import Config
+from telemetry.log import setup_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many agents against the gRPC server")
+    parser.add_argument(
+        "--server",
+        type=str,
+        default=f"{Config.HOST}:{Config.PORT}",
+        help="gRPC server address",
+    )
+    parser.add_argument("--agents", type=int, default=1000, help="Number of simulated agents")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between samples per agent")
+    parser.add_argument("--duration", type=float, default=60.0, help="Run length in seconds")
+    parser.add_argument(
+        "--pattern",
+        type=str,
+        default="steady",
+        choices=["steady", "sync", "burst"],
+        help="Send pattern (default: steady)",
+    )
+    parser.add_argument("--burst-factor", type=float, default=10.0, help="Rate multiplier inside bursts")
+    parser.add_argument("--burst-period", type=float, default=60.0, help="Seconds between burst starts")
+    parser.add_argument("--burst-duration", type=float, default=10.0, help="Burst length in seconds")
+    parser.add_argument("--channels", type=int, default=8, help="gRPC connections to spread streams over")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for metric series")
+    parser.add_argument(
+        "--local-server",
+        action="store_true",
+        help="Start MonitoringServicer in a child process with an in-memory Kafka stand-in",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    setup_logging()
+
+    from loadgen.runner import LoadGenerator, run_load, serve_local
+
+    server_process = None
+    if args.local_server:
+        port = int(args.server.rsplit(":", 1)[1])
+        server_process = multiprocessing.Process(
+            target=serve_local, args=(port, args.agents + 16), daemon=True
+        )
+        server_process.start()
+        time.sleep(1.0)
+
+    try:
+        generator = LoadGenerator(
+            server_address=args.server,
+            num_agents=args.agents,
+            interval=args.interval,
+            duration=args.duration,
+            pattern=args.pattern,
+            burst_factor=args.burst_factor,
+            burst_period=args.burst_period,
+            burst_duration=args.burst_duration,
+            channels=args.channels,
+            seed=args.seed,
+        )
+        report = run_load(generator)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join(timeout=5)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n=== Load Report ({report['agents']} agents, {report['pattern']}) ===\n")
+        print(f"Elapsed: {report['elapsed_s']:.1f}s")
+        print(f"Sent: {report['sent']} ({report['sent_per_s']:.1f}/s)")
+        print(f"Acked: {report['acked']} ({report['acked_per_s']:.1f}/s)")
+        print(f"Stream errors: {report['stream_errors']}")
+        print("Ack latency:")
+        for name, value in report["ack_latency_ms"].items():
+            print(f"  {name}: {value:.2f} ms")
+        print(f"Commands: {report['commands']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Entry point for re-indexing a Kafka topic into Elasticsearch
+"""
+import sys
+
+if __name__ == "__main__":
+    from elk.replay import main
+
+    sys.exit(main())
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+"""
+Entry point for running the rollup aggregator
+"""
+from elk.rollup import main
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,63 @@
 """
 Entry point for running the gRPC server
 """
+import argparse
 
 from config import Config
+from telemetry.log import setup_logging
 
-if __name__ == "__main__":
-    from grpc_server.server import serve
 
-    serve(port=Config.PORT)
+def main():
+    parser = argparse.ArgumentParser(description="gRPC ingest server forwarding agent metrics to Kafka")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=Config.PORT,
+        help=f"Port to listen on (default: {Config.PORT})",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=Config.GRPC_PROCESSES,
+        help="Worker processes sharing the port via SO_REUSEPORT (default: GRPC_PROCESSES env var or 1)",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help=f"gRPC worker threads per process (default: {Config.GRPC_MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "--stats-port",
+        type=int,
+        default=Config.SERVER_STATS_PORT,
+        help="Local port for the hop latency stats endpoint; with --processes, worker N uses port + N "
+        "(default: SERVER_STATS_PORT env var, 0 disables)",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO)",
+    )
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    if args.processes > 1:
+        from grpc_server.supervisor import serve_processes
+
+        serve_processes(
+            args.port,
+            args.processes,
+            max_workers=args.max_workers,
+            log_level=args.log_level,
+            stats_port=args.stats_port,
+        )
+    else:
+        from grpc_server.server import serve
+
+        serve(port=args.port, max_workers=args.max_workers, stats_port=args.stats_port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Entry point for breaking a sample's delay down per hop (agent, gRPC, server, Kafka, indexing)
+"""
+import argparse
+import json
+import sys
+
+from telemetry.tracing import hop_report, merge_hop_metrics, parse_hop_metrics, scrape
+
+
+def _parse_percents(text: str) -> list:
+    try:
+        percents = [float(part) for part in text.split(",") if part]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated percentiles, got '{text}'")
+    if not percents or any(not 0 < percent <= 100 for percent in percents):
+        raise argparse.ArgumentTypeError("percentiles must be in (0, 100]")
+    return percents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hop latency tracing")
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Commands")
+
+    report = subparsers.add_parser("report", help="Scrape stats endpoints and break the delay down per hop")
+    report.add_argument(
+        "endpoints",
+        nargs="+",
+        metavar="ENDPOINT",
+        help="Stats endpoints of agents, server workers and indexers (host:port or URL), or saved /metrics files",
+    )
+    report.add_argument(
+        "--percentiles",
+        type=_parse_percents,
+        default=[50.0, 90.0, 99.0],
+        help="Comma-separated percentiles (default: 50,90,99)",
+    )
+    report.add_argument("--timeout", type=float, default=5.0, help="Seconds to wait for each endpoint")
+    report.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+
+    parsed = []
+    for endpoint in args.endpoints:
+        try:
+            if "://" not in endpoint and not endpoint.rpartition(":")[2].isdigit():
+                with open(endpoint, "r", encoding="utf-8") as f:
+                    text = f.read()
+            else:
+                text = scrape(endpoint, timeout=args.timeout)
+        except Exception as e:
+            print(f"WARNING: skipping {endpoint}: {e}", file=sys.stderr)
+            continue
+        parsed.append(parse_hop_metrics(text))
+    if not parsed:
+        print("ERROR: no endpoint could be read", file=sys.stderr)
+        return 1
+
+    merged = merge_hop_metrics(parsed)
+    rows = hop_report(merged, args.percentiles)
+    if args.json:
+        print(json.dumps({"hops": rows, "skewed": merged["skewed"]}, indent=2))
+        return 0
+    if not rows:
+        print("No traced samples yet (is TRACING on and are the stats ports set?)")
+        return 0
+
+    columns = [f"p{percent:g}_ms" for percent in args.percentiles]
+    print(f"\n=== Hop latency ({len(parsed)} endpoints) ===\n")
+    print(f"{'Hop':<12} {'Count':>10} {'Avg ms':>10} " + " ".join(f"{c[:-3] + ' ms':>10}" for c in columns) + "  Share")
+    for row in rows:
+        share = f"{row['share'] * 100:5.1f}%" if row["share"] is not None else ""
+        values = " ".join(f"{row[c]:>10.1f}" for c in columns)
+        print(f"{row['hop']:<12} {row['count']:>10} {row['avg_ms']:>10.1f} {values}  {share}")
+    if merged["skewed"]:
+        print(f"\n{merged['skewed']} hops had a negative latency (clock offset between hosts), counted as 0")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+Entry point for running the in-memory time-series store
+"""
+import sys
+
+if __name__ == "__main__":
+    from tsdb.service import main
+
+    sys.exit(main())
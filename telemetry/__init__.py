@@ -0,0 +1,14 @@
+"""
+Telemetry module - in-process latency histograms, hop tracing and a Prometheus-text stats endpoint
+"""
+
+from telemetry.histogram import LatencyHistogram
+from telemetry.exporter import MetricsRegistry, StatsServer
+from telemetry.tracing import HopTracer
+
+__all__ = [
+    "HopTracer",
+    "LatencyHistogram",
+    "MetricsRegistry",
+    "StatsServer",
+]
@@ -0,0 +1,191 @@
+"""
+Stats exporter - serves registered metrics as Prometheus text over HTTP
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from telemetry.histogram import LatencyHistogram
+from telemetry.log import get_logger
+
+logger = get_logger(__name__)
+
+SUMMARY_QUANTILES = (50.0, 90.0, 99.0, 99.9)
+
+Labels = Dict[str, str]
+
+
+def _format_labels(labels: Labels) -> str:
+    """Render a label set as {k="v",...}"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def format_metric(
+    name: str, metric_type: str, help_text: str, samples: Iterable[Tuple[Labels, float]]
+) -> str:
+    """
+    Render a counter or gauge family
+
+    Args:
+        name: Metric name
+        metric_type: "counter" or "gauge"
+        help_text: HELP line text
+        samples: (labels, value) pairs
+
+    Returns:
+        Prometheus text block
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(
+    name: str, help_text: str, samples: Iterable[Tuple[Labels, LatencyHistogram]]
+) -> str:
+    """
+    Render latency histograms as a summary family (quantiles in seconds)
+
+    Args:
+        name: Metric name
+        help_text: HELP line text
+        samples: (labels, histogram) pairs
+
+    Returns:
+        Prometheus text block
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for labels, histogram in samples:
+        for percent, value in histogram.percentiles(SUMMARY_QUANTILES).items():
+            quantile_labels = dict(labels, quantile=f"{percent / 100:g}")
+            lines.append(f"{name}{_format_labels(quantile_labels)} {value:.6f}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum_seconds:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def format_histogram(
+    name: str, help_text: str, samples: Iterable[Tuple[Labels, LatencyHistogram]]
+) -> str:
+    """
+    Render latency histograms as a histogram family (cumulative buckets in seconds)
+
+    Only the non-empty buckets are listed, so histograms of different processes
+    can be merged exactly by summing the bucket counts of equal bounds.
+
+    Args:
+        name: Metric name
+        help_text: HELP line text
+        samples: (labels, histogram) pairs
+
+    Returns:
+        Prometheus text block
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in samples:
+        cumulative = 0
+        for upper, count in histogram.bucket_counts():
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(dict(labels, le=f'{upper:.6f}'))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum_seconds:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """Collects Prometheus text from registered collector callables"""
+
+    def __init__(self):
+        """Initialize empty registry"""
+        self._collectors: List[Callable[[], str]] = []
+        self._lock = threading.Lock()
+
+    def register(self, collector: Callable[[], str]):
+        """
+        Register a collector
+
+        Args:
+            collector: Callable returning Prometheus text for its metrics
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render all registered collectors
+
+        Returns:
+            Prometheus text exposition
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+        chunks = []
+        for collector in collectors:
+            try:
+                chunks.append(collector())
+            except Exception as e:
+                chunks.append(f"# collector error: {e}\n")
+        return "".join(chunks)
+
+
+class StatsServer:
+    """Minimal HTTP listener exposing a MetricsRegistry on /metrics"""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        """
+        Initialize stats server
+
+        Args:
+            registry: Registry to expose
+            port: Port to listen on
+            host: Interface to bind (default: loopback only)
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start serving in a daemon thread"""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stats-server", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Stats endpoint: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
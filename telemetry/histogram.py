@@ -0,0 +1,134 @@
+"""
+Latency histogram - HDR-style log-linear buckets in fixed memory
+"""
+
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# 2**SUB_BUCKET_BITS linear sub-buckets per power of two keeps the relative
+# error of any recorded value below ~3%.
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT // 2
+
+
+class LatencyHistogram:
+    """Fixed-size latency histogram with microsecond resolution (thread-safe)"""
+
+    def __init__(self, max_seconds: float = 60.0):
+        """
+        Initialize histogram
+
+        Args:
+            max_seconds: Largest trackable latency; larger values are clamped
+        """
+        self.max_value = max(int(max_seconds * 1_000_000), SUB_BUCKET_COUNT)
+        self._counts = [0] * (self._index(self.max_value) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        """Map a value in microseconds to its bucket index"""
+        if value < SUB_BUCKET_COUNT:
+            return value
+        exponent = value.bit_length() - SUB_BUCKET_BITS
+        mantissa = value >> exponent
+        return SUB_BUCKET_COUNT + (exponent - 1) * SUB_BUCKET_HALF + (mantissa - SUB_BUCKET_HALF)
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        """Highest value in microseconds that maps to a bucket index"""
+        if index < SUB_BUCKET_COUNT:
+            return index
+        offset = index - SUB_BUCKET_COUNT
+        exponent = offset // SUB_BUCKET_HALF + 1
+        mantissa = offset % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, seconds: float):
+        """
+        Record one latency sample
+
+        Args:
+            seconds: Latency in seconds
+        """
+        value = min(max(int(seconds * 1_000_000), 0), self.max_value)
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+
+    def percentile(self, percent: float) -> float:
+        """
+        Get the latency at a percentile
+
+        Args:
+            percent: Percentile between 0 and 100
+
+        Returns:
+            Latency in seconds (upper bound of the matching bucket), 0.0 if empty
+        """
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = max(1, int(round(self.count * percent / 100.0)))
+            seen = 0
+            for index, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= target:
+                    return min(self._upper_bound(index) / 1_000_000, self.max_seconds)
+            return self.max_seconds
+
+    def percentiles(self, percents: Iterable[float]) -> Dict[float, float]:
+        """
+        Get several percentiles at once
+
+        Args:
+            percents: Percentiles between 0 and 100
+
+        Returns:
+            Dictionary mapping percentile to latency in seconds
+        """
+        return {p: self.percentile(p) for p in percents}
+
+    def bucket_counts(self) -> List[Tuple[float, int]]:
+        """
+        Get the non-empty buckets
+
+        Returns:
+            (upper bound in seconds, count) pairs in increasing order
+        """
+        with self._lock:
+            counts = list(self._counts)
+        return [(self._upper_bound(index) / 1_000_000, count) for index, count in enumerate(counts) if count]
+
+    def merge(self, other: "LatencyHistogram"):
+        """
+        Add the samples of another histogram with the same range into this one
+
+        Args:
+            other: Histogram to merge
+        """
+        with other._lock:
+            counts = list(other._counts)
+            count, total, maximum = other.count, other.sum_seconds, other.max_seconds
+        with self._lock:
+            for index, bucket_count in enumerate(counts[: len(self._counts)]):
+                self._counts[index] += bucket_count
+            self.count += count
+            self.sum_seconds += total
+            self.max_seconds = max(self.max_seconds, maximum)
+
+    def reset(self):
+        """Clear all recorded samples"""
+        with self._lock:
+            self._counts = [0] * len(self._counts)
+            self.count = 0
+            self.sum_seconds = 0.0
+            self.max_seconds = 0.0
@@ -0,0 +1,150 @@
+"""
+Logging - leveled, per-call-site rate-limited, non-blocking logging setup
+
+Records are handed to a bounded in-memory queue and written to stderr by a
+background listener thread, so hot paths never block on terminal I/O. When the
+queue is full records are dropped (and counted) instead of stalling the caller.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site (file + line) so a noisy line cannot flood the output"""
+
+    def __init__(self, burst: int = 10, period: float = 10.0):
+        """
+        Initialize rate limit filter
+
+        Args:
+            burst: Records allowed per call site per period (0 disables limiting)
+            period: Refill period in seconds
+        """
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                # [tokens, last refill, suppressed since last emit]
+                bucket = self._buckets[site] = [float(self.burst), now, 0]
+            tokens = min(
+                self.burst, bucket[0] + (now - bucket[1]) * self.burst / self.period
+            )
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1.0
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    async_mode: Optional[bool] = None,
+    rate_limit: Optional[int] = None,
+    queue_size: int = 10000,
+):
+    """
+    Configure the root logger once per process
+
+    Args:
+        level: Log level name (default: LOG_LEVEL env var or INFO)
+        async_mode: Write through a background thread (default: LOG_ASYNC env var or True)
+        rate_limit: Records per call site per 10 s (default: LOG_RATE_LIMIT env var or 10, 0 disables)
+        queue_size: Capacity of the async record queue
+    """
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    if async_mode is None:
+        async_mode = os.getenv("LOG_ASYNC", "1").lower() not in ("0", "false", "no")
+    if rate_limit is None:
+        rate_limit = int(os.getenv("LOG_RATE_LIMIT", "10"))
+
+    with _setup_lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+
+        if async_mode:
+            log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+            handler: logging.Handler = DroppingQueueHandler(log_queue)
+            _listener = logging.handlers.QueueListener(
+                log_queue, stream_handler, respect_handler_level=False
+            )
+            _listener.start()
+            atexit.register(shutdown_logging)
+        else:
+            handler = stream_handler
+
+        handler.addFilter(RateLimitFilter(burst=rate_limit))
+        root.addHandler(handler)
+        root.setLevel(level)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background listener"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a module logger
+
+    Args:
+        name: Logger name (usually __name__)
+
+    Returns:
+        Logger instance
+    """
+    return logging.getLogger(name)
@@ -0,0 +1,329 @@
+"""
+Hop tracing - per-sample hop timestamps and per-hop latency histograms
+
+A sample picks up one timestamp per hop on its way to Elasticsearch:
+
+    collected -> sent -> received -> produced -> consumed -> indexed
+    (agent)      (agent)  (server)    (server)    (indexer)   (indexer)
+
+The agent's timestamps travel in MetricsRequest.metadata["trace"]; the server
+forwards the whole trace in the "trace" Kafka header. Each process records the
+hops ending at the timestamps it adds, so the agent, server and indexer stats
+endpoints together cover the path, and `run_trace.py report` merges them.
+
+Timestamps are wall-clock (time.time()) because they are compared across hosts:
+a cross-host hop includes the hosts' clock offset. Negative hops are recorded
+as 0 and counted as skewed.
+"""
+
+import json
+import re
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from telemetry.exporter import format_histogram, format_metric
+from telemetry.histogram import LatencyHistogram
+
+HOPS = ("collected", "sent", "received", "produced", "consumed", "indexed")
+
+# (hop, from, to) - what each hop covers:
+#   agent       plugin chain and send queue
+#   grpc        network and the server's stream reader
+#   server      fleet table update and message encoding ("produced" is stamped
+#               into the Kafka header, so before the produce call)
+#   kafka       produce call (including BufferError back-pressure), producer
+#               batching, broker and consumer lag
+#   index       decoding and the Elasticsearch request
+STAGES = (
+    ("agent", "collected", "sent"),
+    ("grpc", "sent", "received"),
+    ("server", "received", "produced"),
+    ("kafka", "produced", "consumed"),
+    ("index", "consumed", "indexed"),
+    ("end_to_end", "collected", "indexed"),
+)
+
+# hop timestamp -> [(hop, from)] of the hops it ends
+_ENDING: Dict[str, List[Tuple[str, str]]] = {hop: [] for hop in HOPS}
+for _stage, _start, _end in STAGES:
+    _ENDING[_end].append((_stage, _start))
+
+TRACE_KEY = "trace"
+TRACE_HEADER = "trace"
+HOP_METRIC = "trace_hop_latency_seconds"
+SKEW_METRIC = "trace_clock_skew_total"
+
+
+def trace_from_metadata(metadata) -> Dict[str, float]:
+    """
+    Hop timestamps carried in a MetricsRequest's metadata
+
+    Args:
+        metadata: google.protobuf.Struct, or its dictionary form (MessageToDict)
+
+    Returns:
+        {hop: timestamp} ({} when the sample carries no trace)
+    """
+    if hasattr(metadata, "fields"):
+        if TRACE_KEY not in metadata.fields:
+            return {}
+        return {hop: float(value) for hop, value in metadata[TRACE_KEY].items()}
+    return {hop: float(value) for hop, value in (metadata or {}).get(TRACE_KEY, {}).items()}
+
+
+def trace_header(trace: Dict[str, float]) -> Tuple[str, bytes]:
+    """
+    Kafka header carrying a trace
+
+    Args:
+        trace: {hop: timestamp}
+
+    Returns:
+        (name, value) header
+    """
+    return TRACE_HEADER, json.dumps(trace, separators=(",", ":")).encode("utf-8")
+
+
+def trace_from_message(msg, value: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """
+    Hop timestamps of a Kafka message: the trace header, else the agent's trace in the value
+
+    Args:
+        msg: Kafka message
+        value: Decoded message value (for messages produced without the header)
+
+    Returns:
+        {hop: timestamp}
+    """
+    for name, header in msg.headers() or []:
+        if name == TRACE_HEADER:
+            try:
+                return {hop: float(timestamp) for hop, timestamp in json.loads(header).items()}
+            except (TypeError, ValueError):
+                return {}
+    return trace_from_metadata((value or {}).get("metadata"))
+
+
+class HopTracer:
+    """Stamps hops and records the hops they end in histograms (thread-safe)"""
+
+    def __init__(self, max_seconds: float = 3600.0):
+        """
+        Initialize hop tracer
+
+        Args:
+            max_seconds: Largest trackable hop latency; larger values are clamped
+        """
+        self.histograms = {hop: LatencyHistogram(max_seconds) for hop, _, _ in STAGES}
+        self._lock = threading.Lock()
+        self.skewed = 0
+
+    def observe(self, trace: Dict[str, float], hop: str):
+        """
+        Record the hops ending at one timestamp of a trace
+
+        Args:
+            trace: {hop: timestamp}
+            hop: Timestamp just added (e.g., "received" records the grpc hop)
+        """
+        for stage, start in _ENDING[hop]:
+            if start not in trace:
+                continue
+            seconds = trace[hop] - trace[start]
+            if seconds < 0:
+                with self._lock:
+                    self.skewed += 1
+                seconds = 0.0
+            self.histograms[stage].record(seconds)
+
+    def stamp(self, trace: Dict[str, float], hop: str, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Add a timestamp to a trace and record the hops it ends
+
+        Args:
+            trace: {hop: timestamp}, updated in place
+            hop: One of HOPS
+            now: Timestamp (default: current time)
+
+        Returns:
+            The trace
+        """
+        trace[hop] = time.time() if now is None else now
+        self.observe(trace, hop)
+        return trace
+
+    def stamp_request(self, request, hop: str, now: Optional[float] = None):
+        """
+        Add a timestamp to a MetricsRequest's metadata trace and record the hops it ends
+
+        Args:
+            request: MetricsRequest
+            hop: One of HOPS
+            now: Timestamp (default: current time)
+        """
+        request.metadata.get_or_create_struct(TRACE_KEY)[hop] = time.time() if now is None else now
+        self.observe(trace_from_metadata(request.metadata), hop)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the recorded hops
+
+        Returns:
+            {hop: {"count", "avg_ms", "p50_ms", "p99_ms"}} for hops with samples
+        """
+        result = {}
+        for hop, histogram in self.histograms.items():
+            if histogram.count:
+                result[hop] = {
+                    "count": histogram.count,
+                    "avg_ms": histogram.sum_seconds / histogram.count * 1000,
+                    "p50_ms": histogram.percentile(50) * 1000,
+                    "p99_ms": histogram.percentile(99) * 1000,
+                }
+        return result
+
+    def render(self) -> str:
+        """
+        Render the hop histograms (stats endpoint collector)
+
+        Returns:
+            Prometheus text
+        """
+        recorded = [({"hop": hop}, histogram) for hop, histogram in self.histograms.items() if histogram.count]
+        return format_histogram(
+            HOP_METRIC, "Latency between consecutive hop timestamps of a sample", recorded
+        ) + format_metric(SKEW_METRIC, "counter", "Hops with a negative latency (clock offset)", [({}, self.skewed)])
+
+
+_SAMPLE = re.compile(r"^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>[^}]*)\})?\s+(?P<value>\S+)")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_hop_metrics(text: str) -> Dict[str, Any]:
+    """
+    Read the hop histograms and skew counter from a stats endpoint's Prometheus text
+
+    Args:
+        text: Scraped /metrics body
+
+    Returns:
+        {"hops": {hop: {"buckets": {upper seconds: cumulative count}, "sum", "count"}}, "skewed"}
+    """
+    hops: Dict[str, Dict[str, Any]] = {}
+    skewed = 0
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match or not match.group("name").startswith(("trace_", HOP_METRIC)):
+            continue
+        name, value = match.group("name"), float(match.group("value"))
+        labels = dict(_LABEL.findall(match.group("labels") or ""))
+        if name == SKEW_METRIC:
+            skewed += int(value)
+            continue
+        if "hop" not in labels:
+            continue
+        entry = hops.setdefault(labels["hop"], {"buckets": {}, "sum": 0.0, "count": 0})
+        if name == f"{HOP_METRIC}_bucket" and labels.get("le") != "+Inf":
+            entry["buckets"][float(labels["le"])] = int(value)
+        elif name == f"{HOP_METRIC}_sum":
+            entry["sum"] = value
+        elif name == f"{HOP_METRIC}_count":
+            entry["count"] = int(value)
+    return {"hops": hops, "skewed": skewed}
+
+
+def merge_hop_metrics(parsed: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the hop histograms of several endpoints (bucket counts of equal bounds add up)
+
+    Args:
+        parsed: Results of parse_hop_metrics
+
+    Returns:
+        Same shape as parse_hop_metrics, with per-bucket (not cumulative) counts
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    skewed = 0
+    for endpoint in parsed:
+        skewed += endpoint["skewed"]
+        for hop, entry in endpoint["hops"].items():
+            target = merged.setdefault(hop, {"buckets": {}, "sum": 0.0, "count": 0})
+            previous = 0
+            for upper in sorted(entry["buckets"]):
+                cumulative = entry["buckets"][upper]
+                target["buckets"][upper] = target["buckets"].get(upper, 0) + cumulative - previous
+                previous = cumulative
+            target["sum"] += entry["sum"]
+            target["count"] += entry["count"]
+    return {"hops": merged, "skewed": skewed}
+
+
+def bucket_percentile(buckets: Dict[float, int], percent: float) -> float:
+    """
+    Latency at a percentile of merged buckets
+
+    Args:
+        buckets: {upper seconds: count}
+        percent: Percentile between 0 and 100
+
+    Returns:
+        Upper bound (seconds) of the bucket holding the percentile, 0.0 if empty
+    """
+    total = sum(buckets.values())
+    if not total:
+        return 0.0
+    target = max(1, int(round(total * percent / 100.0)))
+    seen = 0
+    for upper in sorted(buckets):
+        seen += buckets[upper]
+        if seen >= target:
+            return upper
+    return max(buckets)
+
+
+def hop_report(merged: Dict[str, Any], percents: Iterable[float] = (50.0, 99.0)) -> List[Dict[str, Any]]:
+    """
+    Per-hop breakdown of merged histograms, in path order
+
+    Args:
+        merged: Result of merge_hop_metrics
+        percents: Percentiles to report
+
+    Returns:
+        [{"hop", "count", "avg_ms", "p<n>_ms"..., "share"}]; share is the hop's mean
+        over the end-to-end mean (None without end-to-end samples)
+    """
+    percents = list(percents)
+    hops = merged["hops"]
+    end_to_end = hops.get("end_to_end")
+    end_to_end_avg = end_to_end["sum"] / end_to_end["count"] if end_to_end and end_to_end["count"] else 0.0
+    rows = []
+    for hop, _, _ in STAGES:
+        entry = hops.get(hop)
+        if not entry or not entry["count"]:
+            continue
+        avg = entry["sum"] / entry["count"]
+        row: Dict[str, Any] = {"hop": hop, "count": entry["count"], "avg_ms": round(avg * 1000, 3)}
+        for percent in percents:
+            row[f"p{percent:g}_ms"] = round(bucket_percentile(entry["buckets"], percent) * 1000, 3)
+        row["share"] = round(avg / end_to_end_avg, 3) if end_to_end_avg and hop != "end_to_end" else None
+        rows.append(row)
+    return rows
+
+
+def scrape(endpoint: str, timeout: float = 5.0) -> str:
+    """
+    Fetch a stats endpoint
+
+    Args:
+        endpoint: URL, or host:port (then http://host:port/metrics)
+        timeout: Seconds to wait
+
+    Returns:
+        Prometheus text
+    """
+    url = endpoint if "://" in endpoint else f"http://{endpoint}/metrics"
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.read().decode("utf-8")
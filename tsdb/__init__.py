@@ -0,0 +1,13 @@
+"""
+Time-series module - recent metrics in memory with Gorilla compression
+"""
+
+from tsdb.hybrid import HybridSearchClient
+from tsdb.service import TsdbService
+from tsdb.store import TimeSeriesStore
+
+__all__ = [
+    "HybridSearchClient",
+    "TimeSeriesStore",
+    "TsdbService",
+]
@@ -0,0 +1,267 @@
+"""
+Gorilla codec - delta-of-delta timestamps and XOR-compressed floats in a bit stream
+
+A chunk stores one host's samples: each sample is its timestamp followed by
+one value per metric. Timestamps are written as the change of the interval
+(a steady 5 s interval costs one bit per sample), and each value as the XOR
+with the previous value of the same metric, keeping only the meaningful bits
+(an unchanged value costs one bit).
+"""
+
+import struct
+from typing import Iterator, List, Sequence, Tuple
+
+# Delta-of-delta ranges: (prefix, prefix bits, value bits, bias)
+_DOD_CLASSES = (
+    (0b10, 2, 7, 63),
+    (0b110, 3, 9, 255),
+    (0b1110, 4, 12, 2047),
+)
+_DOD_LARGE_PREFIX = 0b1111
+_DOD_LARGE_BIAS = 1 << 31
+
+
+class BitWriter:
+    """Append-only bit stream backed by a bytearray"""
+
+    __slots__ = ("data", "_acc", "_bits")
+
+    def __init__(self):
+        """Initialize empty stream"""
+        self.data = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, nbits: int):
+        """
+        Append the low nbits of value, most significant bit first
+
+        Args:
+            value: Non-negative integer below 2**nbits
+            nbits: Number of bits
+        """
+        self._acc = (self._acc << nbits) | value
+        self._bits += nbits
+        if self._bits >= 64:
+            nbytes = self._bits >> 3
+            rest = self._bits & 7
+            self.data += (self._acc >> rest).to_bytes(nbytes, "big")
+            self._acc &= (1 << rest) - 1
+            self._bits = rest
+
+    def __len__(self) -> int:
+        """Number of bits written"""
+        return len(self.data) * 8 + self._bits
+
+    def getvalue(self) -> bytes:
+        """Stream contents, zero-padded to a whole byte (the writer stays usable)"""
+        if not self._bits:
+            return bytes(self.data)
+        nbytes = (self._bits + 7) >> 3
+        return bytes(self.data) + (self._acc << (nbytes * 8 - self._bits)).to_bytes(nbytes, "big")
+
+
+class BitReader:
+    """Sequential reader over a byte string written by BitWriter"""
+
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data: bytes):
+        """
+        Initialize reader
+
+        Args:
+            data: Bit stream
+        """
+        self.data = data
+        self.pos = 0
+
+    def read(self, nbits: int) -> int:
+        """
+        Read the next nbits as an unsigned integer
+
+        Args:
+            nbits: Number of bits
+
+        Returns:
+            Integer value
+        """
+        start = self.pos >> 3
+        end = (self.pos + nbits + 7) >> 3
+        window = int.from_bytes(self.data[start:end], "big")
+        self.pos += nbits
+        return (window >> (end * 8 - self.pos)) & ((1 << nbits) - 1)
+
+
+class ChunkEncoder:
+    """Encodes samples of one host (timestamp plus `width` values) into a growing bit stream"""
+
+    __slots__ = (
+        "width",
+        "count",
+        "first_ts",
+        "last_ts",
+        "_writer",
+        "_delta",
+        "_prev",
+        "_lead",
+        "_trail",
+        "_pack",
+    )
+
+    def __init__(self, width: int):
+        """
+        Initialize encoder
+
+        Args:
+            width: Values per sample
+        """
+        self.width = width
+        self.count = 0
+        self.first_ts = 0
+        self.last_ts = 0
+        self._writer = BitWriter()
+        self._delta = 0
+        self._prev = [0] * width
+        self._lead = [-1] * width
+        self._trail = [0] * width
+        self._pack = struct.Struct(f">{width}d")
+
+    def append(self, timestamp: int, values: Sequence[float]):
+        """
+        Append one sample (timestamps must not decrease)
+
+        Args:
+            timestamp: Epoch seconds
+            values: One float per metric
+        """
+        write = self._writer.write
+        bits = struct.unpack(f">{self.width}Q", self._pack.pack(*values))
+
+        if self.count == 0:
+            self.first_ts = timestamp
+            write(timestamp, 64)
+            for i, value in enumerate(bits):
+                write(value, 64)
+                self._prev[i] = value
+            self.last_ts = timestamp
+            self.count = 1
+            return
+
+        delta = timestamp - self.last_ts
+        dod = delta - self._delta
+        if dod == 0:
+            write(0, 1)
+        else:
+            for prefix, prefix_bits, value_bits, bias in _DOD_CLASSES:
+                if -bias <= dod <= bias + 1:
+                    write(prefix, prefix_bits)
+                    write(dod + bias, value_bits)
+                    break
+            else:
+                write(_DOD_LARGE_PREFIX, 4)
+                write(dod + _DOD_LARGE_BIAS, 32)
+        self._delta = delta
+        self.last_ts = timestamp
+
+        prev, leads, trails = self._prev, self._lead, self._trail
+        for i, value in enumerate(bits):
+            xor = value ^ prev[i]
+            prev[i] = value
+            if xor == 0:
+                write(0, 1)
+                continue
+            lead = min(64 - xor.bit_length(), 31)
+            trail = (xor & -xor).bit_length() - 1
+            if leads[i] >= 0 and lead >= leads[i] and trail >= trails[i]:
+                # Meaningful bits fit in the previous window: reuse it
+                write(0b10, 2)
+                write(xor >> trails[i], 64 - leads[i] - trails[i])
+            else:
+                significant = 64 - lead - trail
+                write(0b11, 2)
+                write(lead, 5)
+                write(significant & 63, 6)
+                write(xor >> trail, significant)
+                leads[i] = lead
+                trails[i] = trail
+        self.count += 1
+
+    def nbytes(self) -> int:
+        """Encoded size in bytes"""
+        return (len(self._writer) + 7) >> 3
+
+    def getvalue(self) -> bytes:
+        """Encoded chunk"""
+        return self._writer.getvalue()
+
+
+def iter_chunk(data: bytes, count: int, width: int) -> Iterator[Tuple[int, Tuple[float, ...]]]:
+    """
+    Decode a chunk written by ChunkEncoder lazily, one sample at a time
+
+    Args:
+        data: Encoded bytes
+        count: Number of samples in the chunk
+        width: Values per sample
+
+    Yields:
+        Tuple of (timestamp, `width` floats)
+    """
+    if count == 0:
+        return
+    reader = BitReader(data)
+    read = reader.read
+    unpack = struct.Struct(f">{width}d").unpack
+    pack = struct.Struct(f">{width}Q").pack
+
+    timestamp = read(64)
+    prev = [read(64) for _ in range(width)]
+    yield timestamp, unpack(pack(*prev))
+    leads = [0] * width
+    trails = [0] * width
+    delta = 0
+
+    for _ in range(count - 1):
+        if read(1) == 0:
+            dod = 0
+        elif read(1) == 0:
+            dod = read(7) - 63
+        elif read(1) == 0:
+            dod = read(9) - 255
+        elif read(1) == 0:
+            dod = read(12) - 2047
+        else:
+            dod = read(32) - _DOD_LARGE_BIAS
+        delta += dod
+        timestamp += delta
+
+        for i in range(width):
+            if read(1) == 0:
+                continue
+            if read(1) == 1:
+                leads[i] = read(5)
+                significant = read(6) or 64
+                trails[i] = 64 - leads[i] - significant
+            prev[i] ^= read(64 - leads[i] - trails[i]) << trails[i]
+        yield timestamp, unpack(pack(*prev))
+
+
+def decode_chunk(data: bytes, count: int, width: int) -> Tuple[List[int], List[Tuple[float, ...]]]:
+    """
+    Decode a whole chunk written by ChunkEncoder
+
+    Args:
+        data: Encoded bytes
+        count: Number of samples in the chunk
+        width: Values per sample
+
+    Returns:
+        Tuple of (timestamps, rows of `width` floats)
+    """
+    timestamps: List[int] = []
+    rows: List[Tuple[float, ...]] = []
+    for timestamp, row in iter_chunk(data, count, width):
+        timestamps.append(timestamp)
+        rows.append(row)
+    return timestamps, rows
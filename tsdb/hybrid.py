@@ -0,0 +1,128 @@
+"""
+Hybrid search - recent ranges from the in-memory store, older ranges from Elasticsearch
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from tsdb.store import TimeSeriesStore
+
+
+class HybridSearchClient:
+    """
+    Drop-in for ElasticsearchClient's time-range searches backed by a TimeSeriesStore
+
+    A range is split at the store's horizon: the part before it goes to
+    Elasticsearch and the rest is answered from memory. Every other method is
+    delegated to the Elasticsearch client.
+    """
+
+    def __init__(self, store: TimeSeriesStore, es_client=None):
+        """
+        Initialize hybrid client
+
+        Args:
+            store: Store holding the recent samples
+            es_client: ElasticsearchClient for ranges older than the store's horizon (None: store only)
+        """
+        self.store = store
+        self.es_client = es_client
+
+    def __getattr__(self, name: str):
+        es_client = self.__dict__.get("es_client")
+        if es_client is None:
+            raise AttributeError(name)
+        return getattr(es_client, name)
+
+    def _split(self, start: float, end: float, align: int = 1) -> Optional[int]:
+        """
+        First second answered from the store, or None when the whole range goes to Elasticsearch
+
+        Args:
+            start: Range start (epoch seconds)
+            end: Range end (epoch seconds)
+            align: Round the split up to a multiple of this (bucket boundaries)
+
+        Returns:
+            Split timestamp (<= start means the store answers everything)
+        """
+        horizon = self.store.horizon()
+        if horizon is None:
+            return None if self.es_client is not None else int(start)
+        if self.es_client is None:
+            return int(start)
+        split = -(-horizon // align) * align
+        return split if split <= end else None
+
+    def search_by_time_range(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        size: int = 100,
+        agent: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search metrics within a time range (see ElasticsearchClient.search_by_time_range)
+
+        Args:
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            size: Maximum number of results to return
+            agent: Optional agent name to filter by
+
+        Returns:
+            List of documents sorted by timestamp
+        """
+        if end_time is None:
+            end_time = datetime.now()
+        if start_time is None:
+            start_time = end_time - timedelta(hours=1)
+        start, end = start_time.timestamp(), end_time.timestamp()
+
+        split = self._split(start, end)
+        results: List[Dict[str, Any]] = []
+        if split is None or split > start:
+            es_end = end_time if split is None else datetime.fromtimestamp(split - 1)
+            results = self.es_client.search_by_time_range(start_time, es_end, size, agent=agent)
+        if split is not None and len(results) < size:
+            results.extend(self.store.query_range(max(start, split), end, agent=agent, size=size - len(results)))
+        return results
+
+    def search_downsampled(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        interval: int = 60,
+        agent: Optional[str] = None,
+        max_agents: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-agent bucket statistics (see ElasticsearchClient.search_downsampled)
+
+        The split is moved to a bucket boundary so no bucket is computed from both sources.
+
+        Args:
+            start_time: Start datetime (default: 1 hour ago)
+            end_time: End datetime (default: now)
+            interval: Bucket length in seconds
+            agent: Optional agent name to filter by
+            max_agents: Maximum number of agents taken from Elasticsearch
+
+        Returns:
+            List of {"agent", "timestamp", "count", "<metric>_<stat>"...} sorted by agent then timestamp
+        """
+        if end_time is None:
+            end_time = datetime.now()
+        if start_time is None:
+            start_time = end_time - timedelta(hours=1)
+        start, end = start_time.timestamp(), end_time.timestamp()
+
+        split = self._split(start, end, align=interval)
+        records: List[Dict[str, Any]] = []
+        if split is None or split > start:
+            es_end = end_time if split is None else datetime.fromtimestamp(split - 1)
+            records = self.es_client.search_downsampled(start_time, es_end, interval, agent, max_agents)
+        if split is not None:
+            records.extend(self.store.downsample(max(start, split), end, interval, agent))
+            records.sort(key=lambda r: (r["agent"], r["timestamp"]))
+        return records
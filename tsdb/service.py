@@ -0,0 +1,320 @@
+"""
+Time-series service - fills a TimeSeriesStore from the metrics topic and answers queries
+
+- serve: consume the metrics topic into the store and answer range, downsample
+  and stats queries on a local TCP port (older ranges fall back to Elasticsearch)
+- query: ask a running `serve`
+"""
+
+import json
+import signal
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from analysis_app.consumer import decode_batch
+from config import Config
+from telemetry.log import get_logger, setup_logging
+from tsdb.hybrid import HybridSearchClient
+from tsdb.store import TSDB_FIELDS, TimeSeriesStore
+
+logger = get_logger(__name__)
+
+
+class TsdbService:
+    """Consumes the metrics topic into a TimeSeriesStore and serves queries on a local port"""
+
+    def __init__(
+        self,
+        store: Optional[TimeSeriesStore] = None,
+        consumer=None,
+        es_client=None,
+        batch_size: int = 5000,
+        consumer_group_id: str = "tsdb",
+        port: int = Config.TSDB_QUERY_PORT,
+        prune_interval: float = 60.0,
+    ):
+        """
+        Initialize time-series service
+
+        Args:
+            store: Store to fill (default: one with TSDB_RETENTION_HOURS retention)
+            consumer: Optional Kafka consumer (defaults to a confluent_kafka.Consumer in consumer_group_id)
+            es_client: ElasticsearchClient for ranges older than the store (None: store only)
+            batch_size: Maximum messages per micro-batch
+            consumer_group_id: Kafka consumer group
+            port: Local TCP port for queries (0: no query endpoint)
+            prune_interval: Seconds between retention passes
+        """
+        if consumer is None:
+            from confluent_kafka import Consumer
+
+            # The store is empty at start: consuming from "latest" makes its horizon the start time
+            consumer = Consumer(
+                {
+                    "bootstrap.servers": Config.KAFKA_BOOTSTRAP_SERVER,
+                    "group.id": consumer_group_id,
+                    "auto.offset.reset": "latest",
+                    "enable.auto.commit": True,
+                }
+            )
+        self.store = store or TimeSeriesStore(retention_seconds=Config.TSDB_RETENTION_HOURS * 3600)
+        self.client = HybridSearchClient(self.store, es_client)
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.port = port
+        self.prune_interval = prune_interval
+        self.running = False
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+
+    def process_batch(self, messages: List) -> int:
+        """
+        Append one micro-batch to the store
+
+        Args:
+            messages: Kafka messages from the metrics topic
+
+        Returns:
+            Number of samples stored
+        """
+        return self.store.append_batch(*decode_batch(messages))
+
+    def query(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a query
+
+        Args:
+            request: {"query": "range" | "downsample" | "stats", "start", "end" (epoch seconds),
+                      "agent", "size", "interval"}
+
+        Returns:
+            JSON-serializable reply
+        """
+        kind = request.get("query", "range")
+        if kind == "stats":
+            return self.store.stats()
+        end = float(request.get("end") or time.time())
+        start = float(request.get("start") or end - 3600)
+        start_time, end_time = datetime.fromtimestamp(start), datetime.fromtimestamp(end)
+        agent = request.get("agent")
+        if kind == "range":
+            docs = self.client.search_by_time_range(start_time, end_time, int(request.get("size", 100)), agent=agent)
+            return {"query": kind, "docs": docs}
+        if kind == "downsample":
+            records = self.client.search_downsampled(
+                start_time, end_time, int(request.get("interval", 60)), agent=agent
+            )
+            return {"query": kind, "records": records}
+        raise ValueError(f"Unknown query '{kind}', expected range, downsample or stats")
+
+    def start_server(self):
+        """Start the query endpoint"""
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        reply = service.query(json.loads(line))
+                    except Exception as e:
+                        reply = {"error": str(e)}
+                    self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="tsdb-query", daemon=True).start()
+        logger.info(f"Time-series queries on 127.0.0.1:{self.port}")
+
+    def run(self):
+        """Consume until stopped"""
+        if self.port:
+            self.start_server()
+        self.consumer.subscribe([Config.MONITORING_TOPIC])
+        self.running = True
+        logger.info(
+            f"Storing the last {self.store.retention_seconds / 3600:g} h of '{Config.MONITORING_TOPIC}' in memory"
+        )
+        last_prune = time.monotonic()
+        try:
+            while self.running:
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=1.0)
+                if messages:
+                    try:
+                        self.process_batch(messages)
+                    except Exception as e:
+                        logger.error(f"Error processing batch of {len(messages)} messages: {e}")
+                if time.monotonic() - last_prune >= self.prune_interval:
+                    last_prune = time.monotonic()
+                    self.store.prune()
+                    stats = self.store.stats()
+                    logger.info(
+                        f"Time-series store: {stats['hosts']} hosts, {stats['samples']} samples, "
+                        f"{stats['memory_bytes'] / 1e6:.1f} MB ({stats['bytes_per_sample']} bytes/sample compressed)"
+                    )
+        finally:
+            self.close()
+
+    def stop(self):
+        """Request the consume loop to stop"""
+        self.running = False
+
+    def close(self):
+        """Stop the query endpoint and release the Kafka consumer"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.consumer.close()
+        logger.info("Time-series service stopped")
+
+
+def serve(args):
+    """Run the time-series service"""
+    es_client = None
+    if not args.no_es:
+        from elk.elk_search import ElasticsearchClient
+
+        es_client = ElasticsearchClient(host=args.es_host, port=args.es_port, index_name=args.index)
+    service = TsdbService(
+        store=TimeSeriesStore(
+            retention_seconds=args.retention * 3600,
+            chunk_size=args.chunk_size,
+            cache_chunks=args.cache_chunks,
+        ),
+        es_client=es_client,
+        batch_size=args.batch_size,
+        consumer_group_id=args.consumer_group,
+        port=args.port,
+    )
+
+    def _signal_handler(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down gracefully...")
+        service.stop()
+
+    signal.signal(signal.SIGINT, _signal_handler)
+    signal.signal(signal.SIGTERM, _signal_handler)
+    service.run()
+    return 0
+
+
+def send_query(request: Dict[str, Any], port: int = Config.TSDB_QUERY_PORT, timeout: float = 30.0) -> Dict[str, Any]:
+    """
+    Send one query to a running time-series service
+
+    Args:
+        request: Query (see TsdbService.query)
+        port: Local query port
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Reply dictionary
+    """
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as sock:
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        reply = sock.makefile("rb").readline()
+    return json.loads(reply)
+
+
+def query(args):
+    """Query a running time-series service and print the answer"""
+    end = time.time()
+    request = {
+        "query": args.query,
+        "start": end - args.minutes * 60,
+        "end": end,
+        "agent": args.agent,
+        "size": args.size,
+        "interval": args.interval,
+    }
+    started = time.perf_counter()
+    try:
+        reply = send_query(request, port=args.port)
+    except OSError as e:
+        print(f"ERROR: cannot reach the time-series service on port {args.port}: {e}")
+        return 1
+    elapsed = (time.perf_counter() - started) * 1000
+    if "error" in reply:
+        print(f"ERROR: {reply['error']}")
+        return 1
+    if args.json or args.query == "stats":
+        print(json.dumps(reply, indent=2))
+        return 0
+
+    if args.query == "range":
+        print(f"\n{len(reply['docs'])} samples in the last {args.minutes:g} minutes ({elapsed:.1f} ms)\n")
+        for doc in reply["docs"]:
+            values = "  ".join(f"{field}={doc[field]:.2f}" for field in TSDB_FIELDS)
+            print(f"  {doc['timestamp']}  {doc['agent']:<24} {values}")
+    else:
+        print(f"\n{len(reply['records'])} buckets of {args.interval}s ({elapsed:.1f} ms)\n")
+        for record in reply["records"]:
+            print(
+                f"  {datetime.fromtimestamp(record['timestamp'])}  {record['agent']:<24} n={record['count']:<4} "
+                f"cpu avg={record['cpu_avg']:.1f} max={record['cpu_max']:.1f}  "
+                f"memory avg={record['memory_avg']:.1f} max={record['memory_max']:.1f}"
+            )
+    return 0
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="In-memory store of recent metrics with Elasticsearch fallback")
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Log level (default: LOG_LEVEL env var or INFO)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Commands")
+
+    serve_parser = subparsers.add_parser("serve", help="Consume the metrics topic and serve queries")
+    serve_parser.add_argument(
+        "--retention",
+        type=float,
+        default=Config.TSDB_RETENTION_HOURS,
+        help=f"Hours kept in memory (default: {Config.TSDB_RETENTION_HOURS:g})",
+    )
+    serve_parser.add_argument("--chunk-size", type=int, default=60, help="Samples per compressed chunk (default: 60)")
+    serve_parser.add_argument("--cache-chunks", type=int, default=512, help="Decoded chunks cached (default: 512)")
+    serve_parser.add_argument("--batch-size", type=int, default=5000, help="Maximum messages per micro-batch")
+    serve_parser.add_argument("--consumer-group", type=str, default="tsdb", help="Kafka consumer group ID")
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=Config.TSDB_QUERY_PORT,
+        help=f"Local query port (default: {Config.TSDB_QUERY_PORT})",
+    )
+    serve_parser.add_argument("--no-es", action="store_true", help="Answer from memory only (no Elasticsearch)")
+    serve_parser.add_argument("--es-host", type=str, default="localhost", help="Elasticsearch host")
+    serve_parser.add_argument("--es-port", type=int, default=9200, help="Elasticsearch port")
+    serve_parser.add_argument("--index", type=str, default="agent-metrics", help="Elasticsearch index name")
+
+    query_parser = subparsers.add_parser("query", help="Query a running time-series service")
+    query_parser.add_argument("query", choices=["range", "downsample", "stats"], help="Query type")
+    query_parser.add_argument("--minutes", type=float, default=60, help="Look back this many minutes (default: 60)")
+    query_parser.add_argument("--agent", type=str, default=None, help="Only this agent")
+    query_parser.add_argument("--size", type=int, default=100, help="Maximum samples for range (default: 100)")
+    query_parser.add_argument("--interval", type=int, default=60, help="Bucket seconds for downsample (default: 60)")
+    query_parser.add_argument(
+        "--port",
+        type=int,
+        default=Config.TSDB_QUERY_PORT,
+        help=f"Local query port (default: {Config.TSDB_QUERY_PORT})",
+    )
+    query_parser.add_argument("--json", action="store_true", help="Output as JSON")
+
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+    if args.command == "serve":
+        return serve(args)
+    return query(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Time-series store - the last few hours of every host's metrics, Gorilla-compressed in memory
+
+Each host's samples go to an uncompressed head of at most `chunk_size`
+samples; a full head is encoded into an immutable chunk (see tsdb.gorilla).
+Chunks are also indexed by start time in fixed partitions, so a fleet-wide
+range query visits only the partitions it overlaps and a per-host query
+bisects the host's own chunk list. Decoded chunks are kept in a small LRU so
+repeated queries over hot data skip decoding.
+"""
+
+import bisect
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(
+        "numpy is required for the time-series store. Install it with: pip install numpy"
+    )
+
+from elk.rollup import ROLLUP_METRICS, window_aggregates
+from tsdb.gorilla import ChunkEncoder, decode_chunk, iter_chunk
+
+# Document fields, in the order of the values matrix (the metrics topic fields of ROLLUP_METRICS)
+TSDB_FIELDS: Tuple[str, ...] = tuple(ROLLUP_METRICS)
+
+DOWNSAMPLE_STATS = ("avg", "min", "max")
+
+# Chunks are indexed by start time in partitions of this many seconds
+PARTITION_SECONDS = 600
+
+
+def agent_id_of(hostname: str) -> int:
+    """Numeric suffix of a hostname ("agent-12" -> 12), 0 when there is none (same rule as the indexer)"""
+    try:
+        if "-" in hostname:
+            return int(hostname.split("-")[-1])
+    except ValueError:
+        pass
+    return 0
+
+
+class Chunk:
+    """Immutable compressed block of one host's samples"""
+
+    __slots__ = ("hostname", "start", "end", "count", "data")
+
+    def __init__(self, hostname: str, start: int, end: int, count: int, data: bytes):
+        self.hostname = hostname
+        self.start = start
+        self.end = end
+        self.count = count
+        self.data = data
+
+
+class _Series:
+    """Chunks and open head of one host"""
+
+    __slots__ = ("hostname", "chunks", "starts", "head_ts", "head_rows", "last_ts")
+
+    def __init__(self, hostname: str):
+        self.hostname = hostname
+        self.chunks: List[Chunk] = []
+        self.starts: List[int] = []
+        self.head_ts: List[int] = []
+        self.head_rows: List[List[float]] = []
+        self.last_ts = -1
+
+
+class TimeSeriesStore:
+    """In-memory store serving range and downsample queries over recent samples"""
+
+    def __init__(self, retention_seconds: float = 7200, chunk_size: int = 60, cache_chunks: int = 512):
+        """
+        Initialize time-series store
+
+        Args:
+            retention_seconds: Samples older than this (relative to the newest sample) are dropped
+            chunk_size: Samples per compressed chunk (60 samples is 5 minutes at a 5 s interval)
+            cache_chunks: Decoded chunks kept for repeated queries
+        """
+        self.retention_seconds = retention_seconds
+        self.chunk_size = chunk_size
+        self.cache_chunks = cache_chunks
+        self._series: Dict[str, _Series] = {}
+        self._partitions: Dict[int, List[Chunk]] = {}
+        self._max_span = 0
+        self._cache: "OrderedDict[int, Tuple[Chunk, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Guards _cache only: query threads update the LRU order, the ingest thread evicts pruned chunks
+        self._cache_lock = threading.Lock()
+        self.first = None
+        self.newest = 0
+        self.samples = 0
+        self.dropped = 0
+        self.compressed_bytes = 0
+        self.compressed_samples = 0
+
+    # Ingestion
+
+    def append_batch(self, hostnames: Sequence[str], timestamps: np.ndarray, values: np.ndarray) -> int:
+        """
+        Append a micro-batch of samples
+
+        Samples older than the last one stored for their host are dropped (chunks
+        are append-only), as are samples already outside the retention.
+
+        Args:
+            hostnames: Hostname of each sample
+            timestamps: Sample timestamps (epoch seconds)
+            values: Matrix (batch, TSDB_FIELDS)
+
+        Returns:
+            Number of samples stored
+        """
+        if len(hostnames) == 0:
+            return 0
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        order = np.argsort(timestamps, kind="stable").tolist()
+        ts_list = timestamps.tolist()
+        rows = np.asarray(values, dtype=np.float64).tolist()
+        stored = 0
+        with self._lock:
+            cutoff = max(self.newest, int(timestamps.max())) - self.retention_seconds
+            for i in order:
+                ts = ts_list[i]
+                if ts < cutoff:
+                    self.dropped += 1
+                    continue
+                hostname = hostnames[i]
+                series = self._series.get(hostname)
+                if series is None:
+                    series = self._series[hostname] = _Series(hostname)
+                if ts < series.last_ts:
+                    self.dropped += 1
+                    continue
+                series.last_ts = ts
+                series.head_ts.append(ts)
+                series.head_rows.append(rows[i])
+                if len(series.head_ts) >= self.chunk_size:
+                    self._seal(series)
+                stored += 1
+            if stored:
+                self.newest = max(self.newest, ts_list[order[-1]])
+                if self.first is None:
+                    self.first = int(timestamps.min())
+                self.samples += stored
+        return stored
+
+    def _seal(self, series: _Series):
+        """Encode the head of a series into a chunk (lock held)"""
+        encoder = ChunkEncoder(len(TSDB_FIELDS))
+        for ts, row in zip(series.head_ts, series.head_rows):
+            encoder.append(ts, row)
+        chunk = Chunk(series.hostname, encoder.first_ts, encoder.last_ts, encoder.count, encoder.getvalue())
+        series.chunks.append(chunk)
+        series.starts.append(chunk.start)
+        self._partitions.setdefault(chunk.start // PARTITION_SECONDS, []).append(chunk)
+        self._max_span = max(self._max_span, chunk.end - chunk.start)
+        self.compressed_bytes += len(chunk.data)
+        self.compressed_samples += chunk.count
+        series.head_ts = []
+        series.head_rows = []
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Drop chunks (and heads of silent hosts) that ended before the retention cutoff
+
+        Args:
+            now: Reference time (default: newest sample)
+
+        Returns:
+            Number of chunks dropped
+        """
+        with self._lock:
+            cutoff = (self.newest if now is None else now) - self.retention_seconds
+            for key in [k for k in self._partitions if k * PARTITION_SECONDS < cutoff]:
+                live = [chunk for chunk in self._partitions[key] if chunk.end >= cutoff]
+                if live:
+                    self._partitions[key] = live
+                else:
+                    del self._partitions[key]
+
+            dropped = 0
+            for hostname in list(self._series):
+                series = self._series[hostname]
+                expired = 0
+                while expired < len(series.chunks) and series.chunks[expired].end < cutoff:
+                    chunk = series.chunks[expired]
+                    self.compressed_bytes -= len(chunk.data)
+                    self.compressed_samples -= chunk.count
+                    with self._cache_lock:
+                        self._cache.pop(id(chunk), None)
+                    expired += 1
+                del series.chunks[:expired]
+                del series.starts[:expired]
+                dropped += expired
+                if series.head_ts and series.head_ts[-1] < cutoff:
+                    series.head_ts, series.head_rows = [], []
+                if not series.chunks and not series.head_ts:
+                    del self._series[hostname]
+        return dropped
+
+    def horizon(self) -> Optional[int]:
+        """
+        Oldest timestamp from which the store holds every sample it received
+
+        Returns:
+            Epoch seconds, or None before the first sample
+        """
+        if self.first is None:
+            return None
+        return int(max(self.first, self.newest - self.retention_seconds))
+
+    # Queries
+
+    def _cached(self, chunk: Chunk) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Cached (timestamps, values) of a chunk, marked as recently used, or None"""
+        key = id(chunk)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None or cached[0] is not chunk:
+                return None
+            self._cache.move_to_end(key)
+            return cached[1], cached[2]
+
+    def _decode(self, chunk: Chunk) -> Tuple[np.ndarray, np.ndarray]:
+        """Decoded (timestamps, values) of a chunk, through the LRU cache (decoding runs outside the lock)"""
+        cached = self._cached(chunk)
+        if cached is not None:
+            return cached
+        timestamps, rows = decode_chunk(chunk.data, chunk.count, len(TSDB_FIELDS))
+        decoded = (np.array(timestamps, dtype=np.int64), np.array(rows, dtype=np.float64))
+        with self._cache_lock:
+            self._cache[id(chunk)] = (chunk, decoded[0], decoded[1])
+            if len(self._cache) > self.cache_chunks:
+                self._cache.popitem(last=False)
+        return decoded
+
+    def _candidates(self, start: int, end: int, agent: Optional[str]) -> List[Tuple[int, str, Any]]:
+        """
+        Chunks and heads overlapping [start, end], as (start, hostname, chunk or (timestamps, rows))
+
+        The lists are copied under the lock; decoding happens outside it.
+        """
+        candidates = []
+        with self._lock:
+            if agent is not None:
+                heads = [self._series[agent]] if agent in self._series else []
+                for series in heads:
+                    first = bisect.bisect_left(series.starts, start - self._max_span)
+                    last = bisect.bisect_right(series.starts, end)
+                    candidates.extend((c.start, c.hostname, c) for c in series.chunks[first:last] if c.end >= start)
+            else:
+                heads = self._series.values()
+                low = (start - self._max_span) // PARTITION_SECONDS
+                for key in range(low, end // PARTITION_SECONDS + 1):
+                    for chunk in self._partitions.get(key, ()):
+                        if chunk.start <= end and chunk.end >= start:
+                            candidates.append((chunk.start, chunk.hostname, chunk))
+            for series in heads:
+                if series.head_ts and series.head_ts[0] <= end and series.head_ts[-1] >= start:
+                    head = (list(series.head_ts), list(series.head_rows))
+                    candidates.append((series.head_ts[0], series.hostname, head))
+        candidates.sort(key=lambda candidate: candidate[0])
+        return candidates
+
+    def _samples(self, candidate) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps, values) of a chunk or head candidate"""
+        source = candidate[2]
+        if isinstance(source, Chunk):
+            return self._decode(source)
+        timestamps, rows = source
+        return np.array(timestamps, dtype=np.int64), np.array(rows, dtype=np.float64)
+
+    def _iter_samples(self, candidate, start: int, end: int, lazy: bool) -> Iterator[Tuple[int, Sequence[float]]]:
+        """
+        Samples of a candidate within [start, end]
+
+        A chunk that is not cached is decoded sample by sample when `lazy`, so a
+        merge that stops early never decodes the rest of it; otherwise it is
+        decoded whole and cached.
+        """
+        source = candidate[2]
+        if isinstance(source, Chunk):
+            decoded = self._cached(source)
+            if decoded is None and lazy:
+                samples = iter_chunk(source.data, source.count, len(TSDB_FIELDS))
+            else:
+                timestamps, values = decoded if decoded is not None else self._decode(source)
+                samples = zip(timestamps.tolist(), values.tolist())
+        else:
+            samples = zip(*source)
+        for ts, row in samples:
+            if ts > end:
+                return
+            if ts >= start:
+                yield ts, row
+
+    def query_range(
+        self, start: float, end: float, agent: Optional[str] = None, size: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Oldest samples within [start, end], in the document shape of the agent-metrics index
+
+        Candidates are merged by timestamp and a chunk joins the merge only once
+        the merge reaches its start, so chunks beyond the first `size` samples
+        are never decoded.
+
+        Args:
+            start: Range start (epoch seconds, inclusive)
+            end: Range end (epoch seconds, inclusive)
+            agent: Only this host
+            size: Maximum number of documents
+
+        Returns:
+            List of documents sorted by timestamp
+        """
+        start, end = int(np.ceil(start)), int(end)
+        if size <= 0 or end < start:
+            return []
+        candidates = self._candidates(start, end, agent)
+        lazy = agent is None
+        # Merge heap of (timestamp, candidate index, row, sample iterator)
+        heap: List[Tuple[int, int, Sequence[float], Iterator]] = []
+        documents = []
+        position = 0
+        while len(documents) < size:
+            while position < len(candidates) and (not heap or candidates[position][0] <= heap[0][0]):
+                samples = self._iter_samples(candidates[position], start, end, lazy)
+                first = next(samples, None)
+                if first is not None:
+                    heapq.heappush(heap, (first[0], position, first[1], samples))
+                position += 1
+            if not heap:
+                break
+            ts, index, row, samples = heap[0]
+            documents.append(self._document(candidates[index][1], ts, row))
+            following = next(samples, None)
+            if following is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following[0], index, following[1], samples))
+        return documents
+
+    @staticmethod
+    def _document(hostname: str, timestamp: int, row: Sequence[float]) -> Dict[str, Any]:
+        """Sample as an agent-metrics document (timestamp as the ISO string Elasticsearch returns)"""
+        doc: Dict[str, Any] = {
+            "agent": hostname,
+            "agent_id": agent_id_of(hostname),
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+        }
+        doc.update(zip(TSDB_FIELDS, row))
+        return doc
+
+    def downsample(
+        self, start: float, end: float, interval: int = 60, agent: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-host count, avg, min and max of every metric in fixed buckets
+
+        Args:
+            start: Range start (epoch seconds, inclusive)
+            end: Range end (epoch seconds, inclusive)
+            interval: Bucket length in seconds (buckets are aligned to multiples of it)
+            agent: Only this host
+
+        Returns:
+            List of {"agent", "timestamp", "count", "<metric>_<stat>"...} sorted by agent then timestamp
+        """
+        start, end = int(np.ceil(start)), int(end)
+        hosts: Dict[str, int] = {}
+        codes, timestamps, values = [], [], []
+        for candidate in self._candidates(start, end, agent):
+            ts, rows = self._samples(candidate)
+            keep = (ts >= start) & (ts <= end)
+            if keep.any():
+                code = hosts.setdefault(candidate[1], len(hosts))
+                codes.append(np.full(int(keep.sum()), code, dtype=np.int64))
+                timestamps.append(ts[keep])
+                values.append(rows[keep])
+        if not codes:
+            return []
+
+        names = sorted(hosts, key=hosts.get)
+        buckets = np.concatenate(timestamps) // interval * interval
+        group_codes, group_buckets, counts, avg, mins, maxs, _ = window_aggregates(
+            np.concatenate(codes), buckets, np.concatenate(values)
+        )
+        stats = dict(zip(DOWNSAMPLE_STATS, (avg.tolist(), mins.tolist(), maxs.tolist())))
+        records = []
+        for i, (code, bucket, count) in enumerate(zip(group_codes.tolist(), group_buckets.tolist(), counts.tolist())):
+            record: Dict[str, Any] = {"agent": names[code], "timestamp": bucket, "count": count}
+            for j, metric in enumerate(TSDB_FIELDS):
+                for stat in DOWNSAMPLE_STATS:
+                    record[f"{metric}_{stat}"] = stats[stat][i][j]
+            records.append(record)
+        records.sort(key=lambda r: (r["agent"], r["timestamp"]))
+        return records
+
+    def memory_bytes(self) -> int:
+        """Approximate payload memory: compressed chunks plus uncompressed heads"""
+        with self._lock:
+            head = sum(len(s.head_ts) for s in self._series.values())
+        return self.compressed_bytes + head * 8 * (len(TSDB_FIELDS) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Store statistics
+
+        Returns:
+            Dictionary with hosts, samples, chunks, bytes per sample and the query horizon
+        """
+        with self._lock:
+            hosts = len(self._series)
+            chunks = sum(len(s.chunks) for s in self._series.values())
+            head = sum(len(s.head_ts) for s in self._series.values())
+        raw = 8 * (len(TSDB_FIELDS) + 1)
+        per_sample = self.compressed_bytes / self.compressed_samples if self.compressed_samples else 0.0
+        return {
+            "hosts": hosts,
+            "samples": self.compressed_samples + head,
+            "chunks": chunks,
+            "head_samples": head,
+            "compressed_bytes": self.compressed_bytes,
+            "bytes_per_sample": round(per_sample, 2),
+            "compression_ratio": round(raw / per_sample, 2) if per_sample else 0.0,
+            "memory_bytes": self.memory_bytes(),
+            "dropped": self.dropped,
+            "newest": self.newest,
+            "horizon": self.horizon(),
+        }
+